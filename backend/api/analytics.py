@@ -77,43 +77,43 @@ async def handle_analytics_query(query_data: Dict[str, Any]):
         ]
         
         # 步骤1: 理解分析需求
-        import time
-        time.sleep(0.5)  # 模拟处理时间
+        import asyncio
+        await asyncio.sleep(0.5)  # 模拟处理时间
         progress_steps[0]["status"] = "completed"
         progress_steps[1]["status"] = "in_progress"
         
         # 步骤2: 获取项目数据
         data = await data_fetcher.get_all_data()
         projects = data.get("projects", [])
-        time.sleep(0.5)  # 模拟处理时间
+        await asyncio.sleep(0.5)  # 模拟处理时间
         progress_steps[1]["status"] = "completed"
         progress_steps[2]["status"] = "in_progress"
         
         # 步骤3: 收集任务数据
         # 任务数据已经在get_all_data中收集
-        time.sleep(0.5)  # 模拟处理时间
+        await asyncio.sleep(0.5)  # 模拟处理时间
         progress_steps[2]["status"] = "completed"
         progress_steps[3]["status"] = "in_progress"
         
         # 步骤4: 分析项目数据
         analysis = analyzer.analyze(projects)
-        time.sleep(0.5)  # 模拟处理时间
+        await asyncio.sleep(0.5)  # 模拟处理时间
         progress_steps[3]["status"] = "completed"
         progress_steps[4]["status"] = "in_progress"
         
         # 步骤5: 生成回答
         if context:
             # 后续问题
-            response = llm_integration.generate_follow_up_response(analysis, user_query, context)
+            response = await llm_integration.agenerate_follow_up_response(analysis, user_query, context)
         else:
             # 首次查询
-            response = llm_integration.generate_response(analysis, user_query)
-        time.sleep(0.5)  # 模拟处理时间
+            response = await llm_integration.agenerate_response(analysis, user_query)
+        await asyncio.sleep(0.5)  # 模拟处理时间
         progress_steps[4]["status"] = "completed"
         progress_steps[5]["status"] = "in_progress"
         
         # 步骤6: 整合分析结果
-        time.sleep(0.3)  # 模拟处理时间
+        await asyncio.sleep(0.3)  # 模拟处理时间
         progress_steps[5]["status"] = "completed"
         
         # 返回分析结果
@@ -142,9 +142,44 @@ async def update_config(
     
     db.commit()
     
+    # LLM配置变更后丢弃缓存的提供商实例和回复，下次请求使用新的Key/地址重新创建
+    if "llm" in config_data:
+        from core.response_cache import get_response_cache
+        from llm.factory import get_provider_registry
+        await get_provider_registry().invalidate()
+        get_response_cache().clear()
+    
     return ResponseModel(message="配置已更新")
 
 
+@router.get("/config/llm/cache", response_model=ResponseModel)
+async def get_llm_cache_stats():
+    """获取LLM回复缓存的命中统计"""
+    from core.response_cache import get_response_cache
+    
+    return ResponseModel(data=get_response_cache().get_stats())
+
+
+@router.delete("/config/llm/cache", response_model=ResponseModel)
+async def clear_llm_cache():
+    """清空LLM回复缓存"""
+    from core.response_cache import get_response_cache
+    
+    get_response_cache().clear()
+    return ResponseModel(message="LLM回复缓存已清空")
+
+
+@router.get("/config/llm/metrics", response_model=ResponseModel)
+async def get_llm_metrics_stats():
+    """获取LLM调用指标（token用量、前缀缓存命中token数、耗时）和对冲请求统计"""
+    from llm.factory import get_provider_registry
+    from llm.metrics import get_llm_metrics
+    
+    data = get_llm_metrics().get_stats()
+    data["hedge"] = get_provider_registry().get_hedge_stats()
+    return ResponseModel(data=data)
+
+
 class ValidateRequest(BaseModel):
     """验证请求"""
     provider: str = Field(..., description="提供商")
@@ -1,75 +1,93 @@
 """
 甘特图相关API路由
+
+/gantt/all 用一条按项目和任务顺序排序的查询（项目 LEFT JOIN 任务、项目大类）一次分组生成，
+序列化后的响应体按数据版本号（见 models.data_version）缓存，并以 ETag 返回：
+请求带有相同 If-None-Match 时直接返回 304，数据未变化时重复刷新不再查询数据库。
+数据版本号只感知本进程内的写入，直接修改数据库文件后需要重启服务。
+
+/gantt/window 按时间窗口、项目大类、负责人筛选并按项目分页，只返回与窗口相交的任务条；
+任务条的区间索引（core.gantt_index）与响应体一样按数据版本缓存。
+
+/gantt/feed 以 SSE 推送甘特图变更（core.gantt_feed）：连接时先发送完整数据（snapshot），
+之后每次数据变化发送一批精简的变更事件（delta）。每条消息的 id 为续传令牌，
+重连时通过 resume 参数或 Last-Event-ID 请求头只补发断开期间的变更。
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import base64
+import json
+import secrets
+import threading
+import weakref
+from dataclasses import dataclass, field
+from datetime import date
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from models.database import get_db
-from models.entities import Project, Task, ProjectCategory
-from models.schemas import GanttData, GanttTask, ResponseModel, AllGanttData, ProjectCategoryGantt, ProjectGantt, ProjectPhase
+from core.gantt_feed import GanttFeed, get_gantt_feeds
+from core.gantt_index import GanttIndex, group_by_project, overlaps
+from core.scheduling import DependencyCycleError, Schedule
+from core.timeline import (
+    DAY, day_text, group_spans, phase_boundaries, resolve_timeline, sql_microseconds, to_microseconds
+)
+from models.data_version import DataVersion, get_data_version
+from models.database import get_async_db
+from models.entities import Project, Task, TaskDependency, ProjectCategory
+from models.schemas import GanttData, GanttTask, ResponseModel
 
 router = APIRouter()
 
 
 @router.get("/projects/{project_id}/gantt", response_model=ResponseModel)
-async def get_gantt_data(project_id: int, db: Session = Depends(get_db)):
+async def get_gantt_data(project_id: int, db: AsyncSession = Depends(get_async_db)):
     """获取甘特图数据"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = await db.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
     
-    tasks = db.query(Task).filter(Task.project_id == project_id).order_by(Task.order).all()
+    tasks = (await db.scalars(
+        select(Task).filter(Task.project_id == project_id).order_by(Task.order)
+    )).all()
+    dependencies = (await db.execute(
+        select(TaskDependency.predecessor_id, TaskDependency.successor_id, TaskDependency.lag_days)
+        .join(Task, Task.id == TaskDependency.successor_id)
+        .filter(Task.project_id == project_id)
+    )).all()
     
-    # 转换为甘特图任务格式
-    gantt_tasks = []
-    for i, task in enumerate(tasks):
-        # 根据任务状态和时间字段优先级选择合适的时间字段
-        start_date = None
-        end_date = None
-        start_time_type = "planned"
-        end_time_type = "planned"
-        
-        if task.status == "pending":
-            # 待处理状态：只使用计划时间
-            start_date = task.planned_start_date
-            end_date = task.planned_end_date
-        elif task.status == "active":
-            # 进行中状态：开始时间优先使用实际时间，结束时间使用计划时间
-            start_date = task.actual_start_date or task.planned_start_date
-            end_date = task.planned_end_date
-            if task.actual_start_date:
-                start_time_type = "actual"
-        elif task.status == "completed" or task.status == "cancelled":
-            # 已完成或已取消状态：优先使用实际时间
-            start_date = task.actual_start_date or task.planned_start_date
-            end_date = task.actual_end_date or task.planned_end_date
-            if task.actual_start_date:
-                start_time_type = "actual"
-            if task.actual_end_date:
-                end_time_type = "actual"
-        elif task.status == "delayed":
-            # 延迟状态：开始时间优先使用实际时间，结束时间使用计划时间
-            start_date = task.actual_start_date or task.planned_start_date
-            end_date = task.planned_end_date
-            if task.actual_start_date:
-                start_time_type = "actual"
-        
-        if start_date and end_date:
-            gantt_task = GanttTask(
-                id=f"task_{task.id}",
-                name=task.name,
-                description=task.description,
-                start=start_date.strftime("%Y-%m-%d"),
-                end=end_date.strftime("%Y-%m-%d"),
-                progress=int(task.progress),
-                assignee=task.assignee,
-                custom_class=get_task_css_class(task.status),
-                startTimeType=start_time_type,
-                endTimeType=end_time_type,
-                project_id=task.project_id,
-                order=task.order or 0
-            )
-            gantt_tasks.append(gantt_task)
+    # 转换为甘特图任务格式（没有开始或结束时间的任务不显示）
+    timeline = resolve_timeline(
+        [task.status for task in tasks],
+        *([to_microseconds(getattr(task, column)) for task in tasks] for column in _DATE_COLUMNS)
+    )
+    visible = timeline.visible()
+    schedule = _bar_schedule([task.id for task in tasks], visible, timeline.start, timeline.end, dependencies)
+    gantt_tasks = [
+        GanttTask(
+            id=f"task_{task.id}",
+            name=task.name,
+            description=task.description,
+            start=start,
+            end=end,
+            progress=int(task.progress),
+            assignee=task.assignee,
+            custom_class=get_task_css_class(task.status),
+            startTimeType=start_type,
+            endTimeType=end_type,
+            project_id=task.project_id,
+            order=task.order or 0,
+            **_schedule_fields(schedule, task.id)
+        )
+        for task, is_visible, start, end, start_type, end_type in zip(
+            tasks, visible, timeline.start_days(), timeline.end_days(),
+            timeline.start_types(), timeline.end_types()
+        )
+        if is_visible
+    ]
     
     # 计算项目时间范围
     start_date = project.start_date
@@ -107,212 +125,482 @@ def get_task_css_class(status: str) -> str:
     return status_class_map.get(status, "bar-default")
 
 
-@router.get("/gantt/all", response_model=ResponseModel)
-async def get_all_gantt_data(db: Session = Depends(get_db)):
-    """获取所有项目的甘特图数据，按项目大类分组"""
-    # 查询所有项目大类
-    categories = db.query(ProjectCategory).all()
-    category_map = {cat.id: cat for cat in categories}
-    
-    # 查询所有项目
-    projects = db.query(Project).all()
-    
-    # 按项目大类分组
-    category_projects = {}
-    uncategorized_projects = []
+def _bar_schedule(task_ids, visible, starts, ends, dependencies) -> Optional[Schedule]:
+    """
+    按任务条的起止日期（天）和依赖关系计算关键路径排期
+
+    只有显示的任务条参与计算；没有依赖关系（或数据中存在循环依赖）时为 None
+    """
+    if not dependencies:
+        return None
+    try:
+        return Schedule(
+            (
+                (task_id, start // DAY, end // DAY - start // DAY)
+                for task_id, is_visible, start, end in zip(task_ids, visible, starts, ends) if is_visible
+            ),
+            dependencies
+        )
+    except DependencyCycleError:
+        return None
+
+
+def _schedule_fields(schedule: Optional[Schedule], task_id: int) -> Dict:
+    """任务条的依赖（前置任务条ID）、是否关键和总时差"""
+    item = schedule.tasks.get(task_id) if schedule is not None else None
+    if item is None:
+        return {"dependencies": [], "critical": False, "slack": None}
+    return {
+        "dependencies": [f"task_{predecessor}" for predecessor, _ in schedule.predecessors(task_id)],
+        "critical": item.critical,
+        "slack": item.slack,
+    }
+
+
+def _parse_dependencies(value: Optional[str]) -> List[Tuple[int, int]]:
+    """解析 /gantt/all 查询中的依赖列（"前置任务ID:延迟天数" 以逗号分隔）"""
+    if not value:
+        return []
+    return [tuple(map(int, item.split(":"))) for item in value.split(",")]
+
+
+# 任务时间列，顺序与 core.timeline.resolve_timeline 的参数一致
+_DATE_COLUMNS = ("planned_start_date", "planned_end_date", "actual_start_date", "actual_end_date")
+
+# /gantt/all 查询的列（顺序与 build_all_gantt 中的列一致），时间列转换为微秒数
+_ALL_GANTT_COLUMNS = (
+    Project.id,
+    Project.name,
+    Project.description,
+    sql_microseconds(Project.start_date),
+    sql_microseconds(Project.end_date),
+    Project.progress,
+    ProjectCategory.id,
+    ProjectCategory.name,
+    Task.id,
+    Task.name,
+    Task.description,
+    Task.status,
+    Task.progress,
+    Task.assignee,
+    Task.order,
+    *(sql_microseconds(getattr(Task, column)) for column in _DATE_COLUMNS),
+    # 前置任务，"前置任务ID:延迟天数" 以逗号分隔
+    select(func.group_concat(TaskDependency.predecessor_id.op("||")(":").op("||")(TaskDependency.lag_days)))
+    .where(TaskDependency.successor_id == Task.id)
+    .correlate(Task)
+    .scalar_subquery(),
+)
+
+
+def _all_gantt_query():
+    return (
+        select(*_ALL_GANTT_COLUMNS)
+        .select_from(Project)
+        .outerjoin(ProjectCategory, ProjectCategory.id == Project.category_id)
+        .outerjoin(Task, Task.project_id == Project.id)
+        .order_by(Project.id, Task.order, Task.id)
+    )
+
+
+def build_all_gantt(rows) -> Dict:
+    """
+    将按项目ID、任务顺序排序的查询结果分组为 /gantt/all 的数据
+
+    任务条、项目时间范围（项目日期与任务计划日期的最早/最晚值）和阶段由 core.timeline
+    按列批量计算。有任务依赖的项目按任务条计算关键路径（core.scheduling），任务条带有
+    依赖、是否关键和总时差，阶段按关键路径划分；其余项目按 30%/50%/20% 划分阶段。
+    项目大类按其第一个项目出现的顺序排列，没有大类（或大类已删除）的项目归入最后的“未分类”。
+    """
+    rows = list(rows)
+    if not rows:
+        return {"project_categories": []}
+    (project_ids, project_names, project_descriptions, project_starts, project_ends, project_progress,
+     category_ids, category_names, task_ids, names, descriptions, statuses, progress, assignees, orders,
+     planned_starts, planned_ends, actual_starts, actual_ends, dependency_lists) = zip(*rows)
     
-    for project in projects:
-        if project.category_id and project.category_id in category_map:
-            category_id = project.category_id
-            if category_id not in category_projects:
-                category_projects[category_id] = []
-            category_projects[category_id].append(project)
-        else:
-            uncategorized_projects.append(project)
+    timeline = resolve_timeline(statuses, planned_starts, planned_ends, actual_starts, actual_ends)
+    visible = timeline.visible()
+    task_spans = group_spans(project_ids, planned_starts, planned_ends)
     
-    # 构建甘特图数据
-    project_categories = []
+    # 每个项目第一行的位置
+    firsts = [i for i, project_id in enumerate(project_ids) if i == 0 or project_id != project_ids[i - 1]]
+    span_starts, span_ends = [], []
+    for i in firsts:
+        task_start, task_end = task_spans[project_ids[i]]
+        span_starts.append(min((v for v in (project_starts[i], task_start) if v is not None), default=None))
+        span_ends.append(max((v for v in (project_ends[i], task_end) if v is not None), default=None))
+    phases = phase_boundaries(span_starts, span_ends)
     
-    # 处理有大类的项目
-    for category_id, cat_projects in category_projects.items():
-        category = category_map[category_id]
-        category_gantt = build_category_gantt(category, cat_projects, db)
-        project_categories.append(category_gantt)
+    # 有任务依赖的项目：关键路径排期和按关键路径划分的阶段
+    edges: Dict[int, List[Tuple[int, int, int]]] = {}
+    for project_id, task_id, value in zip(project_ids, task_ids, dependency_lists):
+        if value:
+            edges.setdefault(project_id, []).extend(
+                (predecessor, task_id, lag) for predecessor, lag in _parse_dependencies(value)
+            )
+    schedules: Dict[int, Schedule] = {}
+    if edges:
+        bar_starts, bar_ends = timeline.start, timeline.end
+        for n, (i, j) in enumerate(zip(firsts, firsts[1:] + [len(rows)])):
+            schedule = _bar_schedule(task_ids[i:j], visible[i:j], bar_starts[i:j], bar_ends[i:j],
+                                     edges.get(project_ids[i]))
+            if schedule is None:
+                continue
+            schedules[project_ids[i]] = schedule
+            critical_phases = schedule.phases()
+            if critical_phases and span_starts[n] is not None and span_ends[n] is not None \
+                    and span_starts[n] <= critical_phases[0] * DAY and critical_phases[3] * DAY <= span_ends[n]:
+                phases[n] = tuple(day * DAY for day in critical_phases)
+    span_start_days, span_end_days = day_text(span_starts), day_text(span_ends)
     
-    # 处理未分类的项目
-    if uncategorized_projects:
-        # 创建一个"未分类"的大类
-        uncategorized_category = ProjectCategoryGantt(
-            id=0,
-            name="未分类",
-            projects=[]
-        )
-        
-        for project in uncategorized_projects:
-            project_gantt = build_project_gantt(project, db)
-            uncategorized_category.projects.append(project_gantt)
-        
-        project_categories.append(uncategorized_category)
+    categories: Dict[int, Dict] = {}
+    uncategorized: List[Dict] = []
+    projects: Dict[int, Dict] = {}
+    for n, i in enumerate(firsts):
+        project = projects[project_ids[i]] = {
+            "id": project_ids[i],
+            "name": project_names[i],
+            "description": project_descriptions[i] or "",
+            "start_date": span_start_days[n],
+            "end_date": span_end_days[n],
+            "progress": int(project_progress[i]),
+            "tasks": [],
+            "phases": _phases(span_starts[n], span_ends[n], phases[n]),
+        }
+        if category_ids[i] is None:
+            uncategorized.append(project)
+        else:
+            category = categories.get(category_ids[i])
+            if category is None:
+                category = categories[category_ids[i]] = {
+                    "id": category_ids[i], "name": category_names[i], "projects": []
+                }
+            category["projects"].append(project)
     
-    # 构建完整的甘特图数据
-    all_gantt_data = AllGanttData(
-        project_categories=project_categories
-    )
+    for (project_id, task_id, name, description, status, task_progress, assignee, order,
+         is_visible, start, end, start_type, end_type) in zip(
+            project_ids, task_ids, names, descriptions, statuses, progress, assignees, orders,
+            visible, timeline.start_days(), timeline.end_days(),
+            timeline.start_types(), timeline.end_types()):
+        if not is_visible:
+            continue
+        projects[project_id]["tasks"].append({
+            "id": f"task_{task_id}",
+            "name": name,
+            "description": description,
+            "start": start,
+            "end": end,
+            "progress": int(task_progress),
+            "assignee": assignee or "",
+            **_schedule_fields(schedules.get(project_id), task_id),
+            "custom_class": get_task_css_class(status),
+            "startTimeType": start_type,
+            "endTimeType": end_type,
+            "project_id": project_id,
+            "order": order or 0,
+        })
     
-    return ResponseModel(data=all_gantt_data.dict())
+    project_categories = list(categories.values())
+    if uncategorized:
+        project_categories.append({"id": 0, "name": "未分类", "projects": uncategorized})
+    return {"project_categories": project_categories}
 
 
-def build_category_gantt(category: ProjectCategory, projects: list, db: Session) -> ProjectCategoryGantt:
-    """构建项目大类的甘特图数据"""
-    category_gantt = ProjectCategoryGantt(
-        id=category.id,
-        name=category.name,
-        projects=[]
+def _phases(start: Optional[int], end: Optional[int], boundaries) -> List[Dict]:
+    """项目阶段（core.timeline.phase_boundaries 的结果）转换为接口格式"""
+    if boundaries is None:
+        return []
+    start_day, preparation_end, execution_start, execution_end, closing_start, end_day = day_text(
+        [start, *boundaries, end]
     )
+    return [
+        {"id": "phase_1", "name": "准备阶段", "start": start_day, "end": preparation_end,
+         "description": "项目启动和准备工作"},
+        {"id": "phase_2", "name": "执行阶段", "start": execution_start, "end": execution_end,
+         "description": "项目主要实施工作"},
+        {"id": "phase_3", "name": "收尾阶段", "start": closing_start, "end": end_day,
+         "description": "项目验收和收尾工作"},
+    ]
+
+
+@dataclass
+class _GanttCacheEntry:
+    # ETag 前缀：每个数据库引擎随机生成，避免同一进程内不同数据库的版本号相同时互相命中
+    token: str = field(default_factory=lambda: secrets.token_hex(4))
+    version: int = -1
+    body: Optional[bytes] = None
+    index_version: int = -1
+    index: Optional[GanttIndex] = None
+
+
+class GanttCache:
+    """
+    /gantt/all 响应体和按时间窗口查询使用的任务条索引的缓存
+
+    每个数据库引擎缓存一个按数据版本号生成的响应体和索引，ETag 为 "<前缀>-<版本号>"。
+    生成过程中数据版本发生变化时不缓存（结果可能包含新版本的数据）。
+    """
+
+    def __init__(self, version: Optional[DataVersion] = None):
+        self.version = version or get_data_version()
+        self._entries: "weakref.WeakKeyDictionary[Engine, _GanttCacheEntry]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _entry(self, bind: Engine) -> _GanttCacheEntry:
+        with self._lock:
+            entry = self._entries.get(bind)
+            if entry is None:
+                entry = self._entries[bind] = _GanttCacheEntry()
+            return entry
+
+    def etag(self, bind: Engine, version: int) -> str:
+        """给定数据版本的 ETag"""
+        return f'"{self._entry(bind).token}-{version}"'
+
+    def get(self, bind: Engine, version: int) -> Optional[bytes]:
+        """获取给定数据版本的响应体"""
+        entry = self._entry(bind)
+        with self._lock:
+            return entry.body if entry.version == version else None
+
+    def put(self, bind: Engine, version: int, body: bytes) -> bool:
+        """
+        缓存响应体
+
+        Returns:
+            bool: 是否已缓存（生成期间数据版本发生变化时为False）
+        """
+        entry = self._entry(bind)
+        with self._lock:
+            if self.version.current != version:
+                return False
+            entry.version = version
+            entry.body = body
+            return True
+
+    def get_index(self, bind: Engine, version: int) -> Optional[GanttIndex]:
+        """获取给定数据版本的任务条索引"""
+        entry = self._entry(bind)
+        with self._lock:
+            return entry.index if entry.index_version == version else None
+
+    def put_index(self, bind: Engine, version: int, index: GanttIndex) -> bool:
+        """缓存任务条索引，返回值同 put"""
+        entry = self._entry(bind)
+        with self._lock:
+            if self.version.current != version:
+                return False
+            entry.index_version = version
+            entry.index = index
+            return True
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局甘特图缓存
+gantt_cache = GanttCache()
+
+
+def get_gantt_cache() -> GanttCache:
+    """获取全局甘特图缓存"""
+    return gantt_cache
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
+
+
+@router.get("/gantt/all", response_model=ResponseModel)
+async def get_all_gantt_data(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    获取所有项目的甘特图数据，按项目大类分组
+
+    响应带有 ETag；请求头 If-None-Match 与当前数据版本一致时返回 304
+    """
+    cache = get_gantt_cache()
+    bind = db.get_bind()
+    version = cache.version.current
+    etag = cache.etag(bind, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
     
-    for project in projects:
-        project_gantt = build_project_gantt(project, db)
-        category_gantt.projects.append(project_gantt)
-    
-    return category_gantt
+    body = cache.get(bind, version)
+    if body is None:
+        rows = (await db.execute(_all_gantt_query())).all()
+        # 数据部分不经过 Pydantic 校验（结构由 build_all_gantt 保证）
+        data = {**ResponseModel().model_dump(), "data": build_all_gantt(rows)}
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if not cache.put(bind, version, body):
+            # 结果可能属于更新的版本，不返回旧版本号的 ETag
+            headers = {"Cache-Control": "no-cache"}
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
+def _encode_window_cursor(project_id: int) -> str:
+    """把本页最后一个项目的ID编码为分页游标"""
+    payload = json.dumps({"id": project_id})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
 
-def build_project_gantt(project: Project, db: Session) -> ProjectGantt:
-    """构建项目的甘特图数据"""
-    # 查询项目的任务，按 order 字段排序
-    tasks = db.query(Task).filter(Task.project_id == project.id).order_by(Task.order).all()
+
+def _decode_window_cursor(cursor: str) -> int:
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"无效的分页游标: {e}")
+
+
+@router.get("/gantt/window", response_model=ResponseModel)
+async def get_gantt_window(
+    start: date = Query(..., description="时间窗口开始日期"),
+    end: date = Query(..., description="时间窗口结束日期"),
+    category_id: Optional[int] = Query(None, description="按项目大类筛选，0 表示未分类"),
+    assignee: Optional[str] = Query(None, description="按任务负责人筛选"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    limit: int = Query(50, ge=1, le=500, description="每页项目数"),
+    loaded_start: Optional[date] = Query(None, description="客户端已加载的窗口开始日期"),
+    loaded_end: Optional[date] = Query(None, description="客户端已加载的窗口结束日期"),
+    version: Optional[str] = Query(None, description="已加载数据的版本（上次返回的 version）"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    按时间窗口分页获取甘特图任务条
+
+    只返回与窗口相交的任务条，按项目ID分页（每页 limit 个项目）。缩放或滚动时间轴时，
+    客户端传入已加载的窗口（loaded_start/loaded_end）和 version：版本一致时只返回
+    新窗口中与已加载窗口不相交的任务条（delta 为 true）；数据已变化时返回完整窗口，
+    客户端应丢弃已加载的数据。
+    """
+    if end < start:
+        raise HTTPException(status_code=400, detail="结束日期不能早于开始日期")
+    if (loaded_start is None) != (loaded_end is None):
+        raise HTTPException(status_code=400, detail="loaded_start 和 loaded_end 需要同时提供")
     
-    # 转换为甘特图任务格式
-    gantt_tasks = []
-    for task in tasks:
-        # 根据任务状态和时间字段优先级选择合适的时间字段
-        start_date = None
-        end_date = None
-        start_time_type = "planned"
-        end_time_type = "planned"
-        
-        if task.status == "pending":
-            # 待处理状态：只使用计划时间
-            start_date = task.planned_start_date
-            end_date = task.planned_end_date
-        elif task.status == "active":
-            # 进行中状态：开始时间优先使用实际时间，结束时间使用计划时间
-            start_date = task.actual_start_date or task.planned_start_date
-            end_date = task.planned_end_date
-            if task.actual_start_date:
-                start_time_type = "actual"
-        elif task.status == "completed" or task.status == "cancelled":
-            # 已完成或已取消状态：优先使用实际时间
-            start_date = task.actual_start_date or task.planned_start_date
-            end_date = task.actual_end_date or task.planned_end_date
-            if task.actual_start_date:
-                start_time_type = "actual"
-            if task.actual_end_date:
-                end_time_type = "actual"
-        elif task.status == "delayed":
-            # 延迟状态：开始时间优先使用实际时间，结束时间使用计划时间
-            start_date = task.actual_start_date or task.planned_start_date
-            end_date = task.planned_end_date
-            if task.actual_start_date:
-                start_time_type = "actual"
-        
-        if start_date and end_date:
-            gantt_task = GanttTask(
-                id=f"task_{task.id}",
-                name=task.name,
-                description=task.description,
-                start=start_date.strftime("%Y-%m-%d"),
-                end=end_date.strftime("%Y-%m-%d"),
-                progress=int(task.progress),
-                assignee=task.assignee or "",
-                custom_class=get_task_css_class(task.status),
-                startTimeType=start_time_type,
-                endTimeType=end_time_type,
-                project_id=project.id,
-                order=task.order or 0
-            )
-            gantt_tasks.append(gantt_task)
+    cache = get_gantt_cache()
+    bind = db.get_bind()
+    current = cache.version.current
+    index = cache.get_index(bind, current)
+    if index is None:
+        rows = (await db.execute(_all_gantt_query())).all()
+        index = GanttIndex(build_all_gantt(rows))
+        cache.put_index(bind, current, index)
+    current_version = cache.etag(bind, current).strip('"')
     
-    # 计算项目时间范围
-    start_date = project.start_date
-    end_date = project.end_date
+    bars = index.query(start, end, category_id=category_id, assignee=assignee)
+    delta = loaded_start is not None and version == current_version
+    if delta:
+        bars = [bar for bar in bars if not overlaps(bar, loaded_start, loaded_end)]
     
-    if tasks:
-        task_starts = [t.planned_start_date for t in tasks if t.planned_start_date]
-        task_ends = [t.planned_end_date for t in tasks if t.planned_end_date]
-        
-        if task_starts:
-            start_date = min(task_starts) if not start_date or min(task_starts) < start_date else start_date
-        if task_ends:
-            end_date = max(task_ends) if not end_date or max(task_ends) > end_date else end_date
+    groups = group_by_project(bars)
+    if cursor:
+        after = _decode_window_cursor(cursor)
+        groups = [group for group in groups if group[0] > after]
+    page = groups[:limit]
+    has_more = len(groups) > limit
     
-    # 简单的阶段划分（可以根据实际需求扩展）
-    phases = []
-    if start_date and end_date:
-        # 假设项目分为三个阶段：准备、执行、收尾
-        total_days = (end_date - start_date).days
-        if total_days > 0:
-            phase1_end = start_date
-            phase2_start = start_date
-            phase2_end = end_date
-            phase3_start = end_date
-            
-            if total_days >= 3:
-                phase1_end = start_date
-                phase2_start = start_date
-                phase2_end = start_date
-                phase3_start = start_date
-                
-                # 简单的三阶段划分
-                phase1_end = start_date
-                phase2_start = start_date
-                phase2_end = end_date
-                phase3_start = end_date
-                
-                # 计算阶段日期
-                phase1_days = max(1, int(total_days * 0.3))
-                phase2_days = max(1, int(total_days * 0.5))
-                phase3_days = max(1, total_days - phase1_days - phase2_days)
-                
-                from datetime import timedelta
-                phase1_end = start_date + timedelta(days=phase1_days)
-                phase2_start = phase1_end
-                phase2_end = phase2_start + timedelta(days=phase2_days)
-                phase3_start = phase2_end
+    return ResponseModel(
+        data={
+            "version": current_version,
+            "window": {"start": start.isoformat(), "end": end.isoformat()},
+            "delta": delta,
+            "projects": [
+                {**index.projects[project_id], "tasks": [bar.data for bar in project_bars]}
+                for project_id, project_bars in page
+            ],
+            "task_count": sum(len(project_bars) for _, project_bars in page),
+            "next_cursor": _encode_window_cursor(page[-1][0]) if has_more else None,
+            "has_more": has_more
+        }
+    )
+
+
+# 无变化时发送保活注释的间隔（秒）
+FEED_HEARTBEAT_SECONDS = 15.0
+# 收到数据版本变化后等待的时间（秒），合并同一次提交中 flush 和 commit 的多次递增
+FEED_DEBOUNCE_SECONDS = 0.05
+
+
+def _feed_message(token: str, payload: Dict) -> str:
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {token}\ndata: {data}\n\n"
+
+
+async def _refresh_feed(db: AsyncSession, feed: GanttFeed, version: DataVersion):
+    """数据版本比变更历史中的数据新时重新生成甘特图数据并提交"""
+    current = version.current
+    if current <= feed.version:
+        return
+    rows = (await db.execute(_all_gantt_query())).all()
+    # 结束读事务，下次查询读取最新提交的数据
+    await db.rollback()
+    feed.publish(current, build_all_gantt(rows))
+
+
+async def gantt_feed_stream(request: Request, db: AsyncSession, resume: Optional[str] = None,
+                            heartbeat: float = FEED_HEARTBEAT_SECONDS) -> AsyncIterator[str]:
+    """
+    甘特图变更的 SSE 消息
+
+    续传令牌有效时先补发令牌之后的变更，否则发送完整数据；之后等待数据版本变化并推送变更批次，
+    客户端断开时结束。
+    """
+    feeds = get_gantt_feeds()
+    feed = feeds.get(db.get_bind())
+    # 先订阅再生成数据，不会错过生成期间的变化
+    subscriber = feeds.subscribe()
+    try:
+        await _refresh_feed(db, feed, feeds.version)
+        sequence = feed.parse_token(resume)
+        batches = None if sequence is None else feed.since(sequence)
+        while True:
+            if batches is None:
+                sequence, data = feed.snapshot()
+                yield _feed_message(feed.resume_token(sequence), {"type": "snapshot", "data": data})
+            else:
+                for sequence, events in batches:
+                    yield _feed_message(feed.resume_token(sequence), {"type": "delta", "events": events})
             
-            phases = [
-                ProjectPhase(
-                    id="phase_1",
-                    name="准备阶段",
-                    start=start_date.strftime("%Y-%m-%d"),
-                    end=phase1_end.strftime("%Y-%m-%d"),
-                    description="项目启动和准备工作"
-                ),
-                ProjectPhase(
-                    id="phase_2",
-                    name="执行阶段",
-                    start=phase2_start.strftime("%Y-%m-%d"),
-                    end=phase2_end.strftime("%Y-%m-%d"),
-                    description="项目主要实施工作"
-                ),
-                ProjectPhase(
-                    id="phase_3",
-                    name="收尾阶段",
-                    start=phase3_start.strftime("%Y-%m-%d"),
-                    end=end_date.strftime("%Y-%m-%d"),
-                    description="项目验收和收尾工作"
-                )
-            ]
-    
-    project_gantt = ProjectGantt(
-        id=project.id,
-        name=project.name,
-        description=project.description or "",
-        start_date=start_date.strftime("%Y-%m-%d") if start_date else "",
-        end_date=end_date.strftime("%Y-%m-%d") if end_date else "",
-        progress=int(project.progress),
-        tasks=gantt_tasks,
-        phases=phases
+            while True:
+                if await request.is_disconnected():
+                    return
+                try:
+                    await asyncio.wait_for(subscriber.event.wait(), heartbeat)
+                    break
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+            subscriber.event.clear()
+            await asyncio.sleep(FEED_DEBOUNCE_SECONDS)
+            subscriber.event.clear()
+            await _refresh_feed(db, feed, feeds.version)
+            # 历史已淘汰（客户端落后太多）时重新发送完整数据
+            batches = feed.since(sequence)
+    finally:
+        feeds.unsubscribe(subscriber)
+
+
+@router.get("/gantt/feed")
+async def get_gantt_feed(
+    request: Request,
+    resume: Optional[str] = Query(None, description="续传令牌（上次收到的消息 id）"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    以 SSE 推送甘特图变更
+
+    消息格式为 {"type": "snapshot", "data": <同 /gantt/all 的 data>} 或
+    {"type": "delta", "events": [...]}（事件类型见 core.gantt_feed）。
+    EventSource 自动重连时携带 Last-Event-ID，与 resume 参数等效。
+    """
+    resume = resume or request.headers.get("last-event-id")
+    return StreamingResponse(
+        gantt_feed_stream(request, db, resume),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    
-    return project_gantt
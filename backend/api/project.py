@@ -1,65 +1,161 @@
 """
 项目相关API路由
 """
+import asyncio
+import base64
+import json
+from datetime import date, datetime, timedelta
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, contains_eager
 
-from models.database import get_db
+from core.progress_engine import get_progress_engine
+from core.progress_rollover import get_progress_scheduler
+from models.database import get_async_db, get_db, get_read_db
 from models.entities import Project, Task
-from models.schemas import ProjectCreate, ProjectResponse, ProjectUpdate, ResponseModel
+from models.schemas import ProjectCreate, ProjectResponse, ProjectUpdate, ResponseModel, TaskDependencyCreate
 
 router = APIRouter()
 
 
+# 项目列表支持的排序字段；可为空的日期字段排序时把空值视为最早，保证游标分页的比较结果确定
+PROJECT_SORT_FIELDS = {
+    "id": Project.id,
+    "name": Project.name,
+    "progress": Project.progress,
+    "status": Project.status,
+    "start_date": func.coalesce(Project.start_date, datetime.min),
+    "end_date": func.coalesce(Project.end_date, datetime.min),
+    "created_at": Project.created_at,
+    "updated_at": Project.updated_at,
+}
+DATETIME_SORT_FIELDS = {"start_date", "end_date", "created_at", "updated_at"}
+
+
+def _encode_cursor(sort: str, value, project_id: int) -> str:
+    """把最后一个项目的排序值和ID编码为分页游标"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort, "v": value, "id": project_id}, ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def _progress_as_of() -> Optional[str]:
+    """存储的进度的计算时间（每日进度计算之后的写入会实时更新相关项目的进度）"""
+    as_of = get_progress_scheduler().as_of
+    return as_of.isoformat() if as_of else None
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple:
+    """解析分页游标，返回 (排序值, 项目ID)"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if payload["s"] != sort:
+            raise ValueError("排序字段不一致")
+        value = payload["v"]
+        if sort in DATETIME_SORT_FIELDS:
+            value = datetime.fromisoformat(value)
+        return value, int(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"无效的分页游标: {e}")
+
+
 @router.get("/projects", response_model=ResponseModel)
 async def get_projects(
     status: Optional[str] = Query(None, description="按状态筛选"),
+    category_id: Optional[int] = Query(None, description="按项目大类筛选，0 表示未分类"),
+    start_date_from: Optional[date] = Query(None, description="开始日期不早于"),
+    end_date_to: Optional[date] = Query(None, description="结束日期不晚于"),
+    sort: str = Query("id", description=f"排序字段: {', '.join(PROJECT_SORT_FIELDS)}"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None, description="游标分页：上一页返回的 next_cursor，提供时忽略 page"),
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取项目列表"""
-    from models.entities import ProjectCategory
-    
-    query = db.query(Project)
-    
+    """
+    获取项目列表
+
+    任务数量和已完成任务数量读取项目任务统计表（project_stats），
+    与项目大类一起通过外连接在同一个查询中加载
+    """
+    if sort not in PROJECT_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"不支持的排序字段: {sort}")
+
+    filters = []
     if status:
-        query = query.filter(Project.status == status)
-    
-    total = query.count()
-    projects = query.offset((page - 1) * page_size).limit(page_size).all()
-    
-    # 统计任务数量
-    result = []
-    for p in projects:
-        data = p.to_dict()
-        data['task_count'] = db.query(Task).filter(Task.project_id == p.id).count()
-        data['completed_task_count'] = db.query(Task).filter(
-            Task.project_id == p.id,
-            Task.status == 'completed'
-        ).count()
-        # 添加项目大类名称
-        if p.category_id:
-            category = db.query(ProjectCategory).filter(ProjectCategory.id == p.category_id).first()
-            data['category_name'] = category.name if category else None
+        filters.append(Project.status == status)
+    if category_id is not None:
+        filters.append(Project.category_id.is_(None) if category_id == 0 else Project.category_id == category_id)
+    if start_date_from:
+        filters.append(Project.start_date >= datetime.combine(start_date_from, datetime.min.time()))
+    if end_date_to:
+        filters.append(Project.end_date < datetime.combine(end_date_to + timedelta(days=1), datetime.min.time()))
+
+    total = await db.scalar(select(func.count(Project.id)).filter(*filters))
+
+    sort_column = PROJECT_SORT_FIELDS[sort]
+    descending = order == "desc"
+    query = (
+        select(Project)
+        .outerjoin(Project.category)
+        .outerjoin(Project.stats)
+        .options(contains_eager(Project.category), contains_eager(Project.stats))
+        .filter(*filters)
+        .order_by(
+            sort_column.desc() if descending else sort_column.asc(),
+            Project.id.desc() if descending else Project.id.asc()
+        )
+    )
+
+    if cursor:
+        # 游标分页：从上一页最后一个项目之后继续，不受前面页数影响
+        value, last_id = _decode_cursor(cursor, sort)
+        if descending:
+            query = query.filter(or_(sort_column < value, and_(sort_column == value, Project.id < last_id)))
         else:
-            data['category_name'] = None
+            query = query.filter(or_(sort_column > value, and_(sort_column == value, Project.id > last_id)))
+    else:
+        query = query.offset((page - 1) * page_size)
+
+    # 多取一条判断是否还有下一页
+    rows = (await db.scalars(query.limit(page_size + 1))).all()
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    result = []
+    for project in rows:
+        data = project.to_dict()
+        data['task_count'] = project.stats.task_count if project.stats else 0
+        data['completed_task_count'] = project.stats.completed_count if project.stats else 0
+        data['stats'] = project.stats.to_dict() if project.stats else None
         result.append(data)
-    
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        last_value = getattr(last, sort)
+        if last_value is None and sort in ("start_date", "end_date"):
+            last_value = datetime.min
+        next_cursor = _encode_cursor(sort, last_value, last.id)
+
     return ResponseModel(
         data={
             "total": total,
             "page": page,
             "page_size": page_size,
-            "items": result
+            "items": result,
+            "next_cursor": next_cursor,
+            "progress_as_of": _progress_as_of()
         }
     )
 
 
 @router.get("/projects/{project_id}", response_model=ResponseModel)
-async def get_project(project_id: int, db: Session = Depends(get_db)):
+async def get_project(project_id: int, db: Session = Depends(get_read_db)):
     """获取项目详情"""
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
@@ -69,10 +165,19 @@ async def get_project(project_id: int, db: Session = Depends(get_db)):
     # 按照 order 字段排序获取任务
     tasks = db.query(Task).filter(Task.project_id == project_id).order_by(Task.order).all()
     data['tasks'] = [t.to_dict() for t in tasks]
+    data['progress_as_of'] = _progress_as_of()
     
     return ResponseModel(data=data)
 
 
+@router.post("/projects/progress/rollover", response_model=ResponseModel)
+async def rollover_progress():
+    """按当前日期重新计算进行中任务和项目的进度（每日定时执行，也可手动触发）"""
+    result = await asyncio.to_thread(get_progress_scheduler().run)
+    result["as_of"] = result["as_of"].isoformat()
+    return ResponseModel(message="进度已重新计算", data=result)
+
+
 @router.post("/projects", response_model=ResponseModel)
 async def create_project(project: ProjectCreate, db: Session = Depends(get_db)):
     """创建项目"""
@@ -137,7 +242,7 @@ async def delete_project(project_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/project-categories", response_model=ResponseModel)
-async def get_project_categories(db: Session = Depends(get_db)):
+async def get_project_categories(db: Session = Depends(get_read_db)):
     """获取项目大类列表"""
     from models.entities import ProjectCategory
     
@@ -148,7 +253,7 @@ async def get_project_categories(db: Session = Depends(get_db)):
 
 
 def calculate_project_progress(project_id: int, db: Session) -> float:
-    """计算项目进度
+    """计算项目进度（加载全部任务的全量计算，日常更新使用进度引擎）
     
     基于任务的实际进行天数和计划天数的比例计算项目进度
     项目进度 = (所有任务已实际进行的总天数) / (计划需要的总天数) × 100%
@@ -186,58 +291,39 @@ def calculate_project_progress(project_id: int, db: Session) -> float:
             if actual_days > 0:
                 total_actual_days += actual_days
     
-    # 计算进度百分比
-    progress = (total_actual_days / total_planned_days) * 100.0
+    # 计算进度百分比（进度字段有 0-100 的检查约束，超出计划按100%计）
+    progress = min(100.0, (total_actual_days / total_planned_days) * 100.0)
     
     return progress
 
 
-def calculate_project_dates(project_id: int, db: Session):
-    """计算项目起止时间"""
-    tasks = db.query(Task).filter(Task.project_id == project_id).all()
-    
-    if not tasks:
-        return None, None
-    
-    start_dates = []
-    end_dates = []
-    
-    for task in tasks:
-        if task.actual_start_date:
-            start_dates.append(task.actual_start_date)
-        elif task.planned_start_date:
-            start_dates.append(task.planned_start_date)
-        
-        if task.actual_end_date:
-            end_dates.append(task.actual_end_date)
-        elif task.planned_end_date:
-            end_dates.append(task.planned_end_date)
+def update_project_summary(project_id: int, db: Session, commit: bool = True):
+    """
+    更新项目概要信息（进度和起止时间）
     
-    start_date = min(start_dates) if start_dates else None
-    end_date = max(end_dates) if end_dates else None
+    进度和起止时间由进度引擎按任务增量维护，不再加载项目的全部任务；
+    调用前需要 flush 本事务中的任务修改
     
-    return start_date, end_date
-
-
-def update_project_summary(project_id: int, db: Session):
-    """更新项目概要信息"""
-    project = db.query(Project).filter(Project.id == project_id).first()
+    Args:
+        project_id: 项目ID
+        db: 数据库会话
+        commit: 是否立即提交；传False时只flush，由调用方在同一事务中统一提交
+    """
+    project = db.get(Project, project_id)
     if not project:
         return
     
-    # 计算项目进度
-    progress = calculate_project_progress(project_id, db)
+    progress, start_date, end_date = get_progress_engine().summary(db, project_id)
     project.progress = progress
-    
-    # 计算项目起止时间
-    start_date, end_date = calculate_project_dates(project_id, db)
     if start_date:
         project.start_date = start_date
     if end_date:
         project.end_date = end_date
     
-    db.commit()
-    db.refresh(project)
+    if commit:
+        db.commit()
+    else:
+        db.flush()
 
 
 @router.post("/projects/{project_id}/tasks/{task_id}/move", response_model=ResponseModel)
@@ -260,3 +346,48 @@ async def move_task(
         )
     else:
         raise HTTPException(status_code=400, detail=result["message"])
+
+
+@router.get("/projects/{project_id}/schedule", response_model=ResponseModel)
+async def get_project_schedule(project_id: int, db: Session = Depends(get_db)):
+    """按任务计划日期和依赖关系计算项目排期（关键路径）"""
+    from core.project_service import get_project_service
+    
+    result = get_project_service(db).get_project_schedule(project_id)
+    if result["success"]:
+        return ResponseModel(data=result["data"], message=result["message"])
+    raise HTTPException(status_code=400, detail=result["message"])
+
+
+@router.post("/projects/{project_id}/tasks/{task_id}/dependencies", response_model=ResponseModel)
+async def add_task_dependency(
+    project_id: int,
+    task_id: int,
+    dependency: TaskDependencyCreate,
+    db: Session = Depends(get_db)
+):
+    """添加任务依赖，尚未开始的下游任务按排期顺延"""
+    from core.project_service import get_project_service
+    
+    result = get_project_service(db).add_task_dependency(
+        project_id, task_id, dependency.predecessor_id, dependency.lag_days
+    )
+    if result["success"]:
+        return ResponseModel(data=result["data"], message=result["message"])
+    raise HTTPException(status_code=400, detail=result["message"])
+
+
+@router.delete("/projects/{project_id}/tasks/{task_id}/dependencies/{predecessor_id}", response_model=ResponseModel)
+async def remove_task_dependency(
+    project_id: int,
+    task_id: int,
+    predecessor_id: int,
+    db: Session = Depends(get_db)
+):
+    """删除任务依赖"""
+    from core.project_service import get_project_service
+    
+    result = get_project_service(db).remove_task_dependency(project_id, task_id, predecessor_id)
+    if result["success"]:
+        return ResponseModel(data=result["data"], message=result["message"])
+    raise HTTPException(status_code=400, detail=result["message"])
@@ -0,0 +1,137 @@
+"""
+全文检索API路由
+在对话历史和任务中按关键词检索，结果按相关度（bm25）排序并返回高亮片段
+"""
+import html
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models.database import get_read_db
+from models.schemas import ResponseModel
+from models.search_index import (
+    CONVERSATIONS_FTS, TASKS_FTS, build_match_query, search_index_available
+)
+
+router = APIRouter()
+
+# 片段中标记命中位置的控制字符，转义文本后替换为 <mark> 标签
+_MARK_START, _MARK_END = "\x02", "\x03"
+SNIPPET_TOKENS = 16
+
+
+def _snippet(value: Optional[str]) -> str:
+    """转义片段中的HTML，命中位置用 <mark> 标记"""
+    escaped = html.escape((value or "").strip())
+    return escaped.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+def _snippet_sql(table: str) -> str:
+    # 列号 -1：自动选择命中最多的列
+    return f"snippet({table}, -1, char(2), char(3), '…', {SNIPPET_TOKENS})"
+
+
+def _conversation_query(match: str, session_id: Optional[str], project_id: Optional[int]):
+    """对话检索：(结果列, FROM/WHERE 子句, 参数)"""
+    fts = CONVERSATIONS_FTS.name
+    columns = (
+        f"'conversation' AS type, c.id AS id, c.session_id AS session_id, c.project_id AS project_id, "
+        f"c.role AS title, {_snippet_sql(fts)} AS snippet, bm25({fts}) AS rank, c.timestamp AS timestamp"
+    )
+    clause = f"FROM {fts} JOIN conversations c ON c.id = {fts}.rowid WHERE {fts} MATCH :conversation_match"
+    params = {"conversation_match": match}
+    if session_id:
+        clause += " AND c.session_id = :session_id"
+        params["session_id"] = session_id
+    if project_id is not None:
+        clause += " AND c.project_id = :project_id"
+        params["project_id"] = project_id
+    return columns, clause, params
+
+
+def _task_query(match: str, project_id: Optional[int]):
+    """任务检索：(结果列, FROM/WHERE 子句, 参数)"""
+    fts = TASKS_FTS.name
+    columns = (
+        f"'task' AS type, t.id AS id, NULL AS session_id, t.project_id AS project_id, "
+        f"t.name AS title, {_snippet_sql(fts)} AS snippet, bm25({fts}) AS rank, t.updated_at AS timestamp"
+    )
+    clause = f"FROM {fts} JOIN tasks t ON t.id = {fts}.rowid WHERE {fts} MATCH :task_match"
+    params = {"task_match": match}
+    if project_id is not None:
+        clause += " AND t.project_id = :project_id"
+        params["project_id"] = project_id
+    return columns, clause, params
+
+
+def _timestamp(value) -> Optional[str]:
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value)).isoformat()
+
+
+@router.get("/search", response_model=ResponseModel)
+async def search(
+    q: str = Query(..., min_length=1, description="关键词，多个词用空格分隔（需全部出现）"),
+    scope: str = Query("all", pattern="^(all|conversations|tasks)$", description="检索范围"),
+    session_id: Optional[str] = Query(None, description="只检索该会话的对话"),
+    project_id: Optional[int] = Query(None, description="只检索该项目的对话和任务"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """
+    全文检索对话历史和任务
+
+    返回按相关度排序的结果，snippet 为命中位置附近的片段（HTML已转义，命中部分用 <mark> 标记）
+    """
+    connection = db.connection()
+    if not search_index_available(connection):
+        raise HTTPException(status_code=503, detail="全文检索索引不可用")
+
+    queries = []
+    if scope in ("all", "conversations"):
+        match = build_match_query(connection, CONVERSATIONS_FTS, q)
+        if match:
+            queries.append(_conversation_query(match, session_id, project_id))
+    if scope in ("all", "tasks") and not session_id:
+        match = build_match_query(connection, TASKS_FTS, q)
+        if match:
+            queries.append(_task_query(match, project_id))
+
+    items: List[Dict] = []
+    total = 0
+    params: Dict = {}
+    for _, clause, query_params in queries:
+        params.update(query_params)
+        # 计数不生成片段
+        total += db.execute(text(f"SELECT count(*) {clause}"), query_params).scalar()
+    if total:
+        union = " UNION ALL ".join(f"SELECT {columns} {clause}" for columns, clause, _ in queries)
+        rows = db.execute(
+            text(f"{union} ORDER BY rank LIMIT :limit OFFSET :offset"),
+            {**params, "limit": page_size, "offset": (page - 1) * page_size}
+        ).mappings().all()
+        for row in rows:
+            items.append({
+                "type": row["type"],
+                "id": row["id"],
+                "session_id": row["session_id"],
+                "project_id": row["project_id"],
+                "title": row["title"],
+                "snippet": _snippet(row["snippet"]),
+                "score": round(-row["rank"], 4),
+                "timestamp": _timestamp(row["timestamp"]),
+            })
+
+    return ResponseModel(
+        data={
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "items": items
+        }
+    )
@@ -1,15 +1,19 @@
 """
 任务相关API路由
 """
+import logging
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from models.database import get_db
+from models.database import get_db, get_read_db
 from models.entities import Project, Task
 from models.schemas import TaskCreate, TaskResponse, TaskUpdate, ResponseModel
 from api.project import update_project_summary
+from core.scheduling import push_successors
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -19,7 +23,7 @@ async def get_tasks(
     project_id: int,
     status: Optional[str] = None,
     assignee: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """获取项目任务列表"""
     project = db.query(Project).filter(Project.id == project_id).first()
@@ -84,12 +88,13 @@ async def create_task(
     )
     
     db.add(db_task)
+    db.flush()
+    
+    # 更新项目概要信息，与任务在同一事务中提交
+    update_project_summary(project_id, db, commit=False)
     db.commit()
     db.refresh(db_task)
     
-    # 更新项目概要信息
-    update_project_summary(project_id, db)
-    
     return ResponseModel(data=db_task.to_dict())
 
 
@@ -188,12 +193,18 @@ async def update_task(
         
         print(f"[DEBUG] 进度验证通过")
         
+        # 计划日期变化时重新计算排期，顺延下游任务
+        if 'planned_start_date' in update_data or 'planned_end_date' in update_data:
+            shifted = push_successors(db, task)
+            logger.debug(f"[api.task] 顺延下游任务: {[item.name for item in shifted]}")
+        
+        db.flush()
+        
+        # 更新项目概要信息，与任务在同一事务中提交
+        update_project_summary(project_id, db, commit=False)
         db.commit()
         db.refresh(task)
         
-        # 更新项目概要信息
-        update_project_summary(project_id, db)
-        
         return ResponseModel(data=task.to_dict())
     except HTTPException as he:
         print(f"[DEBUG] HTTPException: {he.detail}")
@@ -223,10 +234,11 @@ async def delete_task(
         raise HTTPException(status_code=404, detail="任务不存在")
     
     db.delete(task)
-    db.commit()
+    db.flush()
     
-    # 更新项目概要信息
-    update_project_summary(project_id, db)
+    # 更新项目概要信息，与任务在同一事务中提交
+    update_project_summary(project_id, db, commit=False)
+    db.commit()
     
     return ResponseModel(message="任务已删除")
 
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步数据库会话负载测试
+在临时数据库上对比两种只读接口写法在并发请求下的吞吐量：
+- sync: async def 接口中直接使用同步 Session 查询（迁移前的写法，数据库I/O阻塞事件循环）
+- async: 使用 AsyncSession（aiosqlite）查询，等待数据库时事件循环可以处理其他请求
+
+两种接口执行相同的查询（全部项目及各项目的任务，与 /gantt/all 相同），
+同时并发请求一个不访问数据库的轻量接口，统计其延迟，反映事件循环是否被阻塞。
+
+运行: python benchmarks/bench_async_db.py [并发数] [持续秒数]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from models.database import create_async_sqlite_engine, create_sqlite_engines, get_storage_profile
+from models.entities import Base, Project, Task
+
+PROJECTS = 50
+TASKS_PER_PROJECT = 20
+# 轻量接口的请求间隔（秒）
+PING_INTERVAL = 0.01
+
+
+def seed(engine):
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    for i in range(PROJECTS):
+        project = Project(name=f"项目{i}", description="基准测试项目")
+        session.add(project)
+        session.flush()
+        session.add_all([
+            Task(project_id=project.id, name=f"任务{i}-{j}", description="任务说明" * 10, order=j)
+            for j in range(TASKS_PER_PROJECT)
+        ])
+    session.commit()
+    session.close()
+
+
+def build_app(url: str, async_url: str) -> tuple:
+    profile = get_storage_profile("performance")
+    write_engine, read_engine = create_sqlite_engines(url, profile)
+    seed(write_engine)
+    async_engine = create_async_sqlite_engine(async_url, profile)
+    ReadSession = sessionmaker(bind=read_engine, autoflush=False)
+    AsyncReadSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def get_sync_db():
+        db = ReadSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncReadSession() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync/gantt")
+    async def sync_gantt(db: Session = Depends(get_sync_db)):
+        result = []
+        for project in db.query(Project).all():
+            tasks = db.query(Task).filter(Task.project_id == project.id).order_by(Task.order).all()
+            result.append({"id": project.id, "name": project.name, "tasks": [t.to_dict() for t in tasks]})
+        return result
+
+    @app.get("/async/gantt")
+    async def async_gantt(db: AsyncSession = Depends(get_async_db)):
+        result = []
+        for project in (await db.scalars(select(Project))).all():
+            tasks = (await db.scalars(
+                select(Task).filter(Task.project_id == project.id).order_by(Task.order)
+            )).all()
+            result.append({"id": project.id, "name": project.name, "tasks": [t.to_dict() for t in tasks]})
+        return result
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app, (write_engine, read_engine, async_engine)
+
+
+async def load(app: FastAPI, mode: str, concurrency: int, duration: float) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    completed = 0
+    ping_latencies = []
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal completed
+            while time.perf_counter() < deadline:
+                response = await client.get(f"/{mode}/gantt")
+                response.raise_for_status()
+                completed += 1
+
+        async def pinger():
+            # 从计划发出请求的时刻开始计时：事件循环被阻塞时 sleep 本身也会被推迟
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                await asyncio.sleep(PING_INTERVAL)
+                await client.get("/ping")
+                ping_latencies.append(time.perf_counter() - started - PING_INTERVAL)
+
+        await asyncio.gather(pinger(), *[worker() for _ in range(concurrency)])
+
+    ping_latencies.sort()
+    return {
+        "rps": completed / duration,
+        "ping_p50_ms": statistics.median(ping_latencies) * 1000,
+        "ping_p95_ms": ping_latencies[int(len(ping_latencies) * 0.95)] * 1000
+    }
+
+
+async def run(concurrency: int, duration: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        app, (write_engine, read_engine, async_engine) = build_app(f"sqlite:///{path}", f"sqlite+aiosqlite:///{path}")
+
+        print(f"并发数: {concurrency}，持续: {duration}秒")
+        print(f"{'模式':<8}{'请求/秒':>10}{'ping P50(ms)':>16}{'ping P95(ms)':>16}")
+        for mode in ("sync", "async"):
+            result = await load(app, mode, concurrency, duration)
+            print(f"{mode:<8}{result['rps']:>10.1f}{result['ping_p50_ms']:>16.1f}{result['ping_p95_ms']:>16.1f}")
+
+        await async_engine.dispose()
+        write_engine.dispose()
+        read_engine.dispose()
+
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    asyncio.run(run(concurrency, duration))
+
+
+if __name__ == "__main__":
+    main()
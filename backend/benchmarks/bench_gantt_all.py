@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/gantt/all 基准测试
+在临时数据库上对比：
+- per-project: 逐个项目查询任务并构建 Pydantic 模型后 .dict()（改为单次查询前的写法）
+- single-query: 一条项目 LEFT JOIN 任务的查询一次分组（每次清空缓存）
+- cached: 数据版本未变化，返回缓存的响应体
+- 304: 请求带有当前 ETag
+
+运行: python benchmarks/bench_gantt_all.py [项目数] [每个项目的任务数] [请求次数]
+"""
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from api import gantt
+from models.database import create_async_sqlite_engine, get_async_db, get_storage_profile
+from models.entities import Base, Project, ProjectCategory, Task
+from models.schemas import GanttTask, ProjectGantt
+
+STATUSES = ["pending", "active", "completed", "delayed"]
+
+
+def seed(url: str, projects: int, tasks_per_project: int):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(insert(ProjectCategory), [{"name": f"大类{i}"} for i in range(10)])
+        conn.execute(insert(Project), [
+            {"name": f"项目{i}", "description": "基准测试项目", "category_id": rng.choice([None, *range(1, 11)])}
+            for i in range(projects)
+        ])
+        rows = []
+        for project_id in range(1, projects + 1):
+            for j in range(tasks_per_project):
+                start = datetime(2026, 1, 1) + timedelta(days=rng.randint(0, 300))
+                rows.append({
+                    "project_id": project_id, "name": f"任务{project_id}-{j}", "description": "任务说明" * 5,
+                    "status": rng.choice(STATUSES), "order": j, "progress": rng.randint(0, 100),
+                    "planned_start_date": start, "planned_end_date": start + timedelta(days=rng.randint(1, 30)),
+                })
+        conn.execute(insert(Task), rows)
+    engine.dispose()
+
+
+def add_per_project_route(app: FastAPI):
+    @app.get("/per-project/gantt")
+    async def per_project(db: AsyncSession = Depends(get_async_db)):
+        result = []
+        for project in (await db.scalars(select(Project))).all():
+            tasks = (await db.scalars(
+                select(Task).filter(Task.project_id == project.id).order_by(Task.order)
+            )).all()
+            gantt_tasks = []
+            for task in tasks:
+                # 改为批量计算前逐个任务的状态分支和 strftime
+                start, end = task.planned_start_date, task.planned_end_date
+                if task.status != "pending":
+                    start = task.actual_start_date or task.planned_start_date
+                if task.status in ("completed", "cancelled"):
+                    end = task.actual_end_date or task.planned_end_date
+                if start and end:
+                    gantt_tasks.append(GanttTask(
+                        id=f"task_{task.id}", name=task.name, description=task.description,
+                        start=start.strftime("%Y-%m-%d"), end=end.strftime("%Y-%m-%d"),
+                        progress=int(task.progress), assignee=task.assignee or "",
+                        custom_class=gantt.get_task_css_class(task.status),
+                        startTimeType="actual" if task.actual_start_date else "planned",
+                        endTimeType="planned", project_id=project.id, order=task.order or 0
+                    ))
+            result.append(ProjectGantt(
+                id=project.id, name=project.name, description=project.description or "",
+                start_date="", end_date="", progress=int(project.progress), tasks=gantt_tasks
+            ).dict())
+        return {"data": result}
+
+
+async def measure(client: httpx.AsyncClient, path: str, count: int, before=None, headers=None) -> float:
+    timings = []
+    for _ in range(count):
+        if before:
+            before()
+        start = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        assert response.status_code in (200, 304)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def run(projects: int, tasks_per_project: int, count: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(f"sqlite:///{path}", projects, tasks_per_project)
+        async_engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{path}", get_storage_profile("performance"))
+        BenchSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def override():
+            async with BenchSession() as db:
+                yield db
+
+        app = FastAPI()
+        app.include_router(gantt.router, prefix="/api/v1")
+        add_per_project_route(app)
+        app.dependency_overrides[get_async_db] = override
+
+        cache = gantt.get_gantt_cache()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            etag = (await client.get("/api/v1/gantt/all")).headers["ETag"]
+            results = [
+                ("per-project", await measure(client, "/per-project/gantt", count)),
+                ("single-query", await measure(client, "/api/v1/gantt/all", count, before=cache.clear)),
+                ("cached", await measure(client, "/api/v1/gantt/all", count)),
+                ("304", await measure(client, "/api/v1/gantt/all", count, headers={"If-None-Match": etag})),
+            ]
+        await async_engine.dispose()
+
+    print(f"项目数: {projects}，每个项目任务数: {tasks_per_project}，请求次数: {count}")
+    print(f"{'方式':<14}{'中位数(ms)':>12}")
+    for name, median in results:
+        print(f"{name:<14}{median:>12.2f}")
+
+
+def main():
+    projects = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    tasks_per_project = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    asyncio.run(run(projects, tasks_per_project, count))
+
+
+if __name__ == "__main__":
+    main()
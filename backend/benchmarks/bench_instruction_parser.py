@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+指令解析微基准测试
+对比原多遍正则解析（代码块、intent对象、requires_confirmation 三轮扫描 + 内容切分）
+与单遍增量解析器在大段AI回复上的耗时
+
+运行: python benchmarks/bench_instruction_parser.py [代码块数量]
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.instruction_parser import InstructionStreamParser, parse_reply
+
+
+def legacy_parse(ai_content: str):
+    """原实现：多次正则扫描"""
+    instructions = []
+    for json_str in re.findall(r'```json\n(.*?)\n```', ai_content, re.DOTALL):
+        try:
+            instruction = json.loads(json_str)
+            if isinstance(instruction, list):
+                instructions.extend(instruction)
+            else:
+                instructions.append(instruction)
+        except json.JSONDecodeError:
+            pass
+    if not instructions:
+        for json_str in re.findall(r'\{\s*"intent"\s*:[^}]*\}', ai_content, re.DOTALL):
+            try:
+                instructions.append(json.loads(json_str))
+            except json.JSONDecodeError:
+                pass
+
+    requires_confirmation = False
+    for instruction in instructions:
+        if instruction.get("requires_confirmation") is not None:
+            requires_confirmation = instruction["requires_confirmation"]
+            break
+    if not requires_confirmation:
+        for json_str in re.findall(r'```json\n(.*?)\n```', ai_content, re.DOTALL):
+            try:
+                data = json.loads(json_str)
+                if data.get("requires_confirmation") is not None:
+                    requires_confirmation = data["requires_confirmation"]
+                    break
+            except json.JSONDecodeError:
+                pass
+        if not requires_confirmation:
+            for json_str in re.findall(r'\{[^}]*\}', ai_content, re.DOTALL):
+                try:
+                    data = json.loads(json_str)
+                    if data.get("requires_confirmation") is not None:
+                        requires_confirmation = data["requires_confirmation"]
+                        break
+                except json.JSONDecodeError:
+                    pass
+
+    blocks = list(re.finditer(r'```json\n(.*?)\n```', ai_content, re.DOTALL))
+    content_blocks = [{"analysis": ai_content[0 if i == 0 else blocks[i - 1].end():m.start()].strip(),
+                       "content": f"```json\n{m.group(1).strip()}\n```"} for i, m in enumerate(blocks)]
+    return instructions or [{"intent": None}], requires_confirmation, content_blocks
+
+
+def new_parse(ai_content: str):
+    parser = parse_reply(ai_content)
+    instructions = parser.instructions()
+    return instructions, parser.requires_confirmation(instructions), parser.content_blocks()
+
+
+def build_reply(block_count: int) -> str:
+    parts = []
+    for i in range(block_count):
+        parts.append(f"第{i}步：我将为项目{i}创建任务，并更新负责人和计划日期。" * 3)
+        instruction = {
+            "intent": "create_task",
+            "data": {
+                "project_name": f"项目{i}",
+                "tasks": [{"name": f"任务{i}-{j}", "assignee": "张三",
+                           "planned_start_date": "2026-02-01"} for j in range(3)]
+            },
+            "content": f"已为项目{i}创建任务",
+            "requires_confirmation": False
+        }
+        parts.append("```json\n" + json.dumps(instruction, ensure_ascii=False, indent=2) + "\n```")
+    parts.append("以上操作已全部完成。")
+    return "\n".join(parts)
+
+
+def bench(func, *args, repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    block_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    reply = build_reply(block_count)
+
+    legacy_result = legacy_parse(reply)
+    new_result = new_parse(reply)
+    assert legacy_result[0] == new_result[0], "指令解析结果不一致"
+
+    # 模拟流式输入：每次20个字符
+    def stream_parse(text):
+        parser = InstructionStreamParser()
+        for i in range(0, len(text), 20):
+            parser.feed(text[i:i + 20])
+        parser.finish()
+        return parser.instructions()
+
+    print(f"回复长度: {len(reply)} 字符, 指令块: {block_count}")
+    print(f"原多遍正则解析:   {bench(legacy_parse, reply):8.2f} ms")
+    print(f"单遍解析(整段):   {bench(new_parse, reply):8.2f} ms")
+    print(f"单遍解析(流式):   {bench(stream_parse, reply):8.2f} ms  （流式时每个块闭合即可执行，无需等待回复结束）")
+
+
+if __name__ == "__main__":
+    main()
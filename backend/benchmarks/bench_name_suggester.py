@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+项目名称模糊建议基准测试
+在临时数据库上对比原 LIKE '%名称%' 查询（找不到时再加载全部项目）与内存 n-gram 索引
+的单次查询耗时，并统计两者对错别字/漏字查询能否给出原项目名
+
+查询由已有项目名变形得到：替换一个字、删除一个字、只取名称的前一部分
+
+运行: python benchmarks/bench_name_suggester.py [项目数] [查询数]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from core.name_suggester import get_name_suggester
+from models.entities import Base, Project
+
+# 常用汉字，组成两字词后拼成项目名称
+CHARS = ("的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说"
+         "产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点"
+         "从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又"
+         "么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入"
+         "常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西")
+SUFFIXES = ["一期", "二期", "升级", "改造", "试点", "推广", ""]
+
+
+def make_names(count: int, rng: random.Random):
+    words = list({rng.choice(CHARS) + rng.choice(CHARS) for _ in range(3000)})
+    names = set()
+    while len(names) < count:
+        names.add("".join(rng.choice(words) for _ in range(rng.randint(2, 4))) + rng.choice(SUFFIXES))
+    return list(names)
+
+
+def make_query(name: str, rng: random.Random) -> str:
+    """错别字、漏字或只说了名称的前一部分"""
+    kind = rng.choice(("replace", "drop", "prefix"))
+    position = rng.randrange(len(name))
+    if kind == "replace":
+        return name[:position] + rng.choice(CHARS) + name[position + 1:]
+    if kind == "drop":
+        return name[:position] + name[position + 1:]
+    return name[:max(len(name) - 3, 2)]
+
+
+def like_lookup(session, name):
+    """原实现：LIKE 查询，没有结果时加载全部项目"""
+    projects = session.query(Project).filter(Project.name.like(f"%{name}%")).all()
+    if not projects:
+        projects = session.query(Project).filter(Project.name.like(f"%{name}%")).all()
+    if not projects:
+        return [p.name for p in session.query(Project).all()]
+    return [p.name for p in projects]
+
+
+def measure(lookup, queries):
+    timings, hits = [], 0
+    for query, expected in queries:
+        start = time.perf_counter()
+        result = lookup(query)
+        timings.append((time.perf_counter() - start) * 1000)
+        hits += expected in result[:5]
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.99) - 1], hits
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(0)
+    names = make_names(count, rng)
+    queries = [(make_query(name, rng), name) for name in rng.sample(names, query_count)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.execute(insert(Project), [{"name": name} for name in names])
+        session = sessionmaker(bind=engine)()
+
+        suggester = get_name_suggester()
+        start = time.perf_counter()
+        suggester.suggest(session, "projects", "预热")
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # LIKE 未命中时加载全部项目，耗时较长，只测一部分查询
+        like_queries = queries[:max(query_count // 10, 1)]
+        like = measure(lambda query: like_lookup(session, query), like_queries)
+        index = measure(lambda query: [s.name for s in suggester.suggest(session, "projects", query)], queries)
+        session.close()
+        engine.dispose()
+
+    print(f"项目数: {count}，索引加载: {build_ms:.0f} ms")
+    print(f"{'方式':<10}{'查询数':>8}{'平均 ms':>10}{'p99 ms':>10}{'前5命中率':>10}")
+    for label, total, (mean, p99, hits) in (("LIKE", len(like_queries), like), ("n-gram", len(queries), index)):
+        print(f"{label:<10}{total:>8}{mean:>10.3f}{p99:>10.3f}{hits / total:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全文检索基准测试
+在临时数据库中写入随机中文对话，对比 /search 接口（FTS5 trigram 索引）与
+LIKE '%关键词%' 全表扫描的单次查询耗时
+
+关键词包括三个字以上的词和两个字的词（经词表展开）
+
+运行: python benchmarks/bench_search.py [消息数] [查询数]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from api import search
+from models.database import get_read_db
+from models.entities import Base, Conversation
+from models.search_index import create_search_index
+
+CHARS = ("的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说"
+         "产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点"
+         "从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又")
+BATCH = 10_000
+
+
+def measure(run, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        run(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            create_search_index(conn)
+        start = time.perf_counter()
+        messages = []
+        for i in range(count):
+            messages.append({"session_id": f"s{i % 500}", "role": "user",
+                             "content": "".join(rng.choice(CHARS) for _ in range(rng.randint(20, 80)))})
+            if len(messages) == BATCH or i == count - 1:
+                with engine.begin() as conn:
+                    conn.execute(insert(Conversation), messages)
+                messages = []
+        print(f"消息数: {count}，写入（含触发器维护索引）: {time.perf_counter() - start:.1f} 秒")
+
+        # 关键词取自已有消息中的片段
+        with engine.connect() as conn:
+            samples = conn.execute(text("SELECT content FROM conversations ORDER BY random() LIMIT :n"),
+                                   {"n": query_count * 2}).scalars().all()
+        queries = {
+            "三字以上": [sample[5:9] for sample in samples[:query_count]],
+            "两字": [sample[10:12] for sample in samples[query_count:]],
+        }
+
+        Session = sessionmaker(bind=engine)
+
+        def override():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = FastAPI()
+        app.include_router(search.router, prefix="/api/v1")
+        app.dependency_overrides[get_read_db] = override
+        client = TestClient(app)
+
+        def fts(query):
+            assert client.get("/api/v1/search", params={"q": query, "scope": "conversations"}).status_code == 200
+
+        def like(query):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT id, content FROM conversations WHERE content LIKE :q LIMIT 20"),
+                             {"q": f"%{query}%"}).all()
+                conn.execute(text("SELECT count(*) FROM conversations WHERE content LIKE :q"),
+                             {"q": f"%{query}%"}).scalar()
+
+        print(f"{'关键词':<10}{'方式':<8}{'平均 ms':>10}{'p99 ms':>10}")
+        for label, terms in queries.items():
+            for name, run in (("LIKE", like), ("FTS5", fts)):
+                mean, p99 = measure(run, terms)
+                print(f"{label:<10}{name:<8}{mean:>10.2f}{p99:>10.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
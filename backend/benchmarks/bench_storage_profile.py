@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite存储配置并发基准测试
+在临时数据库上对比 legacy（回滚日志、默认PRAGMA、单一连接池）与 performance
+（WAL + PRAGMA、读写分离连接池）在并发读写下的吞吐量和 "database is locked" 错误数
+
+写线程：更新一个任务的进度并提交（模拟聊天指令写入）
+读线程：读取一个项目及其全部任务（模拟甘特图读取）
+
+运行: python benchmarks/bench_storage_profile.py [写线程数] [读线程数] [持续秒数]
+"""
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from models.database import create_sqlite_engines, get_storage_profile
+from models.entities import Base, Project, Task
+
+PROJECTS = 50
+TASKS_PER_PROJECT = 20
+
+
+def seed(engine):
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    for i in range(PROJECTS):
+        project = Project(name=f"项目{i}", description="基准测试项目")
+        session.add(project)
+        session.flush()
+        session.add_all([
+            Task(project_id=project.id, name=f"任务{i}-{j}", description="任务说明" * 10)
+            for j in range(TASKS_PER_PROJECT)
+        ])
+    session.commit()
+    session.close()
+
+
+def run(profile_name: str, writers: int, readers: int, duration: float) -> dict:
+    profile = get_storage_profile(profile_name)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        write_engine, read_engine = create_sqlite_engines(url, profile)
+        if profile_name == "legacy":
+            # 早期版本：读写共用同一个引擎
+            read_engine = write_engine
+        seed(write_engine)
+
+        WriteSession = sessionmaker(bind=write_engine, autoflush=False)
+        ReadSession = sessionmaker(bind=read_engine, autoflush=False)
+        counters = {"writes": 0, "reads": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def count(key):
+            with lock:
+                counters[key] += 1
+
+        def writer():
+            while time.perf_counter() < deadline:
+                session = WriteSession()
+                try:
+                    task = session.get(Task, random.randint(1, PROJECTS * TASKS_PER_PROJECT))
+                    task.progress = random.randint(0, 100)
+                    session.commit()
+                    count("writes")
+                except OperationalError:
+                    session.rollback()
+                    count("locked")
+                finally:
+                    session.close()
+
+        def reader():
+            while time.perf_counter() < deadline:
+                session = ReadSession()
+                try:
+                    project_id = random.randint(1, PROJECTS)
+                    session.get(Project, project_id)
+                    session.query(Task).filter(Task.project_id == project_id).order_by(Task.order).all()
+                    count("reads")
+                except OperationalError:
+                    count("locked")
+                finally:
+                    session.close()
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        write_engine.dispose()
+        read_engine.dispose()
+
+    return {key: value / duration if key != "locked" else value for key, value in counters.items()}
+
+
+def main():
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    duration = float(sys.argv[3]) if len(sys.argv) > 3 else 3.0
+
+    print(f"写线程: {writers}，读线程: {readers}，持续: {duration}秒")
+    print(f"{'配置':<12}{'写入/秒':>12}{'读取/秒':>12}{'锁错误':>10}")
+    for profile_name in ("legacy", "performance"):
+        result = run(profile_name, writers, readers, duration)
+        print(f"{profile_name:<12}{result['writes']:>12.0f}{result['reads']:>12.0f}{result['locked']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务时间线批量计算基准测试
+对比逐个任务计算（状态分支 + strftime，改为批量计算前甘特图的写法）与 core.timeline
+按列计算（逐个计算 / numpy 向量化）任务条、时间类型和按项目分组的时间范围的耗时
+
+运行: python benchmarks/bench_timeline.py [任务数] [每个项目的任务数]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.timeline import NUMPY_AVAILABLE, group_spans, resolve_timeline, to_microseconds
+
+STATUSES = ["pending", "active", "completed", "delayed", "cancelled"]
+ROUNDS = 5
+
+
+def generate(count: int, tasks_per_project: int):
+    rng = random.Random(0)
+    tasks = []
+    for i in range(count):
+        planned_start = datetime(2026, 1, 1) + timedelta(days=rng.randint(0, 365))
+        status = rng.choice(STATUSES)
+        actual_start = planned_start + timedelta(days=rng.randint(-3, 5)) if status != "pending" else None
+        actual_end = actual_start + timedelta(days=rng.randint(1, 30)) \
+            if actual_start and status in ("completed", "cancelled") else None
+        tasks.append({
+            "project_id": i // tasks_per_project,
+            "status": status,
+            "planned_start_date": planned_start if rng.random() > 0.05 else None,
+            "planned_end_date": planned_start + timedelta(days=rng.randint(1, 40)),
+            "actual_start_date": actual_start,
+            "actual_end_date": actual_end,
+        })
+    return tasks
+
+
+def per_task(tasks):
+    """逐个任务计算"""
+    bars = []
+    spans = {}
+    for task in tasks:
+        start_type = end_type = "planned"
+        if task["status"] == "pending":
+            start, end = task["planned_start_date"], task["planned_end_date"]
+        elif task["status"] in ("active", "delayed"):
+            start = task["actual_start_date"] or task["planned_start_date"]
+            end = task["planned_end_date"]
+            if task["actual_start_date"]:
+                start_type = "actual"
+        else:
+            start = task["actual_start_date"] or task["planned_start_date"]
+            end = task["actual_end_date"] or task["planned_end_date"]
+            if task["actual_start_date"]:
+                start_type = "actual"
+            if task["actual_end_date"]:
+                end_type = "actual"
+        if start and end:
+            bars.append((start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), start_type, end_type))
+        project_start, project_end = spans.get(task["project_id"], (None, None))
+        if task["planned_start_date"] and (not project_start or task["planned_start_date"] < project_start):
+            project_start = task["planned_start_date"]
+        if task["planned_end_date"] and (not project_end or task["planned_end_date"] > project_end):
+            project_end = task["planned_end_date"]
+        spans[task["project_id"]] = (project_start, project_end)
+    return bars, spans
+
+
+def columnar(columns, use_numpy: bool):
+    """按列计算（时间列已是微秒数，如 /gantt/all 查询中转换）"""
+    project_ids, statuses, planned_starts, planned_ends, actual_starts, actual_ends = columns
+    timeline = resolve_timeline(statuses, planned_starts, planned_ends, actual_starts, actual_ends,
+                                use_numpy=use_numpy)
+    bars = [
+        bar for bar in zip(timeline.visible(), timeline.start_days(), timeline.end_days(),
+                           timeline.start_types(), timeline.end_types())
+        if bar[0]
+    ]
+    return bars, group_spans(project_ids, planned_starts, planned_ends, use_numpy=use_numpy)
+
+
+def measure(run) -> float:
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    tasks_per_project = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    tasks = generate(count, tasks_per_project)
+    columns = (
+        [task["project_id"] for task in tasks],
+        [task["status"] for task in tasks],
+        *([to_microseconds(task[column]) for task in tasks] for column in (
+            "planned_start_date", "planned_end_date", "actual_start_date", "actual_end_date"
+        )),
+    )
+
+    expected = len(per_task(tasks)[0])
+    assert len(columnar(columns, use_numpy=False)[0]) == expected
+
+    print(f"任务数: {count}，每个项目任务数: {tasks_per_project}")
+    print(f"{'方式':<16}{'中位数(ms)':>12}")
+    print(f"{'per-task':<16}{measure(lambda: per_task(tasks)):>12.1f}")
+    print(f"{'columnar':<16}{measure(lambda: columnar(columns, use_numpy=False)):>12.1f}")
+    if NUMPY_AVAILABLE:
+        assert len(columnar(columns, use_numpy=True)[0]) == expected
+        print(f"{'columnar-numpy':<16}{measure(lambda: columnar(columns, use_numpy=True)):>12.1f}")
+    else:
+        print("未安装 numpy，跳过 columnar-numpy")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+聊天上下文构建器
+为 /chat/messages 的系统提示词增量构建项目数据上下文
+
+每个项目渲染为一个独立的文本片段并缓存，只有当项目本身或其任务发生变化时
+（通过 updated_at / 任务数量等签名判断）才重新渲染该项目的片段，
+其余项目直接复用缓存，避免每轮对话都全量查询和拼接整个项目组合。
+
+当全部项目详情超出token预算时，按用户问题和最近几轮对话对项目做相关性排序：
+只有最相关的 top-K 个项目附带完整任务详情，其余项目只保留一行概要。
+"""
+import logging
+import math
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+
+from core.text_utils import estimate_tokens, tokenize
+from models.entities import Project, ProjectCategory, Task
+
+logger = logging.getLogger(__name__)
+
+# 默认附带完整任务详情的项目数量
+DEFAULT_TOP_K = 5
+# 默认项目上下文token预算
+DEFAULT_TOKEN_BUDGET = 6000
+# 项目名称/类别名称在用户消息中直接出现时的加分
+NAME_MATCH_BOOST = 10.0
+CATEGORY_MATCH_BOOST = 3.0
+# 历史消息中的词项权重（当前消息为1）
+HISTORY_WEIGHT = 0.5
+
+
+@dataclass
+class ProjectFragment:
+    """单个项目的已渲染上下文片段"""
+    project_id: int
+    name: str
+    signature: Tuple
+    text: str
+    summary: str = ""
+    category_name: Optional[str] = None
+    tokens: Set[str] = field(default_factory=set)
+    token_count: int = 0
+
+
+@dataclass
+class PortfolioContext:
+    """
+    一次构建得到的项目组合上下文
+
+    mode 为 "full" 时包含全部项目详情；为 "selected" 时只有 fragments 中的项目
+    附带详情，summaries 为其余项目的一行概要
+    """
+    project_names: List[str] = field(default_factory=list)
+    category_names: List[str] = field(default_factory=list)
+    fragments: List[ProjectFragment] = field(default_factory=list)
+    summaries: List[str] = field(default_factory=list)
+    omitted_count: int = 0
+    mode: str = "full"
+    rebuilt_count: int = 0
+
+    @property
+    def selected_projects(self) -> List[str]:
+        """附带完整详情的项目名称（用于调试记录）"""
+        return [fragment.name for fragment in self.fragments]
+
+    def render(self) -> str:
+        """拼接为追加到系统提示词末尾的文本"""
+        return self.render_stable() + self.render_turn()
+
+    def render_stable(self) -> str:
+        """
+        不随用户问题变化的部分（只在数据变化时变化）：类别列表；
+        完整模式下还包括项目列表和全部项目详情
+        """
+        parts = []
+        if self.mode == "full" and self.project_names:
+            parts.append(f"\n\n## 当前系统中存在的项目\n{self.project_names}")
+        if self.category_names:
+            parts.append(f"\n\n## 当前系统中存在的类别\n{self.category_names}")
+        if self.mode == "full" and self.fragments:
+            parts.append("\n\n## 项目详细数据")
+            parts.extend(fragment.text for fragment in self.fragments)
+        return "".join(parts)
+
+    def render_turn(self) -> str:
+        """随用户问题变化的部分：按相关性选取的项目详情和其余项目概要"""
+        parts = []
+        if self.mode != "full" and self.fragments:
+            parts.append("\n\n## 项目详细数据（与当前问题最相关的项目）")
+            parts.extend(fragment.text for fragment in self.fragments)
+        if self.summaries:
+            parts.append("\n\n## 其他项目概要\n")
+            parts.append("\n".join(self.summaries))
+        if self.omitted_count:
+            parts.append(f"\n（另有 {self.omitted_count} 个项目因篇幅限制省略，可通过项目名称查询）")
+        return "".join(parts)
+
+
+def render_project_fragment(project: Dict, tasks: List[Dict]) -> str:
+    """
+    渲染单个项目的上下文片段
+
+    Args:
+        project: 项目字典（Project.to_dict() 的结果）
+        tasks: 任务字典列表（Task.to_dict() 的结果）
+
+    Returns:
+        str: 项目片段文本
+    """
+    lines = [
+        f"\n\n### 项目: {project.get('name')}",
+        f"\n描述: {project.get('description', '无')}",
+        f"\n状态: {project.get('status', '未知')}",
+        f"\n进度: {project.get('progress', 0)}%",
+        f"\n开始日期: {project.get('start_date', '无')}",
+        f"\n结束日期: {project.get('end_date', '无')}",
+        f"\n类别: {project.get('category_name', '无')}",
+        f"\n任务数量: {len(tasks)}",
+    ]
+
+    if tasks:
+        lines.append("\n任务列表:")
+        for task in tasks:
+            lines.append(
+                f"\n- {task.get('name')} (负责人: {task.get('assignee', '未分配')}, "
+                f"状态: {task.get('status', '未知')}, 进度: {task.get('progress', 0)}%, "
+                f"计划开始: {task.get('planned_start_date', '无')}, 计划结束: {task.get('planned_end_date', '无')}, "
+                f"实际开始: {task.get('actual_start_date', '无')}, 实际结束: {task.get('actual_end_date', '无')}, "
+                f"优先级: {task.get('priority', '无')})"
+            )
+
+    return "".join(lines)
+
+
+def render_project_summary(project: Dict, task_count: int) -> str:
+    """
+    渲染单个项目的一行概要
+
+    Args:
+        project: 项目字典（Project.to_dict() 的结果）
+        task_count: 任务数量
+
+    Returns:
+        str: 项目概要文本
+    """
+    return (
+        f"- {project.get('name')} (类别: {project.get('category_name') or '无'}, "
+        f"状态: {project.get('status', '未知')}, 进度: {project.get('progress', 0)}%, "
+        f"任务数: {task_count}, 开始: {project.get('start_date') or '无'}, 结束: {project.get('end_date') or '无'})"
+    )
+
+
+def _signature_recency(signature: Tuple) -> float:
+    """从签名中取项目或其任务的最近更新时间戳，用于相关性相同时排序"""
+    timestamps = [value for value in (signature[0], signature[3], signature[4]) if value is not None]
+    return max(timestamps).timestamp() if timestamps else 0.0
+
+
+class ProjectContextCache:
+    """
+    项目上下文片段缓存
+
+    功能：
+    - 用一条聚合查询获取所有项目的变更签名
+    - 只重新加载并渲染签名发生变化的项目
+    - 删除已不存在项目的片段
+    - 维护项目/类别/任务/负责人名称的倒排索引，按相关性选取项目
+    - 线程安全
+    """
+
+    def __init__(self):
+        # 存储结构: {project_id: ProjectFragment}
+        self._fragments: Dict[int, ProjectFragment] = {}
+        # 倒排索引: {词项: {project_id}}
+        self._index: Dict[str, Set[int]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def _load_signatures(self, db: Session) -> List[Tuple]:
+        """查询所有项目的变更签名，按项目ID排序（含类别名称，类别改名后片段和索引随之更新）"""
+        return db.query(
+            Project.id,
+            Project.updated_at,
+            Project.category_id,
+            func.count(Task.id),
+            func.max(Task.updated_at),
+            func.max(Task.created_at),
+            ProjectCategory.name,
+        ).outerjoin(
+            Task, Task.project_id == Project.id
+        ).outerjoin(
+            ProjectCategory, ProjectCategory.id == Project.category_id
+        ).group_by(Project.id, ProjectCategory.name).order_by(Project.id).all()
+
+    def _render_projects(self, db: Session, signatures: Dict[int, Tuple],
+                         project_ids: List[int]) -> Dict[int, ProjectFragment]:
+        """批量加载并渲染指定项目"""
+        if not project_ids:
+            return {}
+
+        projects = db.query(Project).options(
+            selectinload(Project.tasks),
+            selectinload(Project.category),
+        ).filter(Project.id.in_(project_ids)).all()
+
+        rendered = {}
+        for project in projects:
+            tasks = sorted(project.tasks, key=lambda t: t.id)
+            project_data = project.to_dict()
+            text = render_project_fragment(project_data, [t.to_dict() for t in tasks])
+
+            # 参与检索的名称：项目名、类别名、任务名、负责人
+            searchable = [project.name, project_data.get('category_name')]
+            for task in tasks:
+                searchable.append(task.name)
+                searchable.append(task.assignee)
+
+            rendered[project.id] = ProjectFragment(
+                project_id=project.id,
+                name=project.name,
+                signature=signatures[project.id],
+                text=text,
+                summary=render_project_summary(project_data, len(tasks)),
+                category_name=project_data.get('category_name'),
+                tokens=set(tokenize(" ".join(item for item in searchable if item))),
+                token_count=estimate_tokens(text)
+            )
+        return rendered
+
+    def _store_fragment(self, fragment: ProjectFragment):
+        """保存片段并更新倒排索引（调用方持有锁）"""
+        self._remove_fragment(fragment.project_id)
+        self._fragments[fragment.project_id] = fragment
+        for token in fragment.tokens:
+            self._index[token].add(fragment.project_id)
+
+    def _remove_fragment(self, project_id: int):
+        """删除片段及其倒排索引项（调用方持有锁）"""
+        old = self._fragments.pop(project_id, None)
+        if not old:
+            return
+        for token in old.tokens:
+            postings = self._index.get(token)
+            if postings is not None:
+                postings.discard(project_id)
+                if not postings:
+                    del self._index[token]
+
+    def _score(self, query: str, history: List[str]) -> Dict[int, float]:
+        """按词项IDF和名称直接命中计算项目相关性得分（调用方持有锁）"""
+        total = max(len(self._fragments), 1)
+        weights: Dict[str, float] = defaultdict(float)
+        for text in history:
+            for token in set(tokenize(text)):
+                weights[token] = max(weights[token], HISTORY_WEIGHT)
+        for token in set(tokenize(query)):
+            weights[token] = 1.0
+
+        scores: Dict[int, float] = defaultdict(float)
+        for token, weight in weights.items():
+            postings = self._index.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + total / len(postings))
+            for project_id in postings:
+                scores[project_id] += weight * idf
+
+        combined = "\n".join([query] + list(history))
+        for project_id, fragment in self._fragments.items():
+            if fragment.name and fragment.name in combined:
+                scores[project_id] += NAME_MATCH_BOOST
+            if fragment.category_name and fragment.category_name in combined:
+                scores[project_id] += CATEGORY_MATCH_BOOST
+        return scores
+
+    def build(self, db: Session, query: Optional[str] = None, history: Optional[List[str]] = None,
+              top_k: Optional[int] = None, token_budget: Optional[int] = None) -> PortfolioContext:
+        """
+        构建项目组合上下文
+
+        Args:
+            db: 数据库会话
+            query: 当前用户消息，用于相关性排序
+            history: 最近几轮对话内容，用于相关性排序
+            top_k: 附带完整详情的项目数量，默认读取 CHAT_CONTEXT_TOP_K 环境变量
+            token_budget: 项目上下文token预算，默认读取 CHAT_CONTEXT_TOKEN_BUDGET 环境变量
+
+        Returns:
+            PortfolioContext: 项目名称、类别名称和各项目片段
+        """
+        if top_k is None:
+            top_k = int(os.getenv("CHAT_CONTEXT_TOP_K", DEFAULT_TOP_K))
+        if token_budget is None:
+            token_budget = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+        rows = self._load_signatures(db)
+        category_names = [name for (name,) in db.query(ProjectCategory.name).order_by(ProjectCategory.id).all()]
+
+        with self._lock:
+            signatures = {row[0]: tuple(row[1:]) for row in rows}
+            stale_ids = [
+                project_id for project_id, signature in signatures.items()
+                if project_id not in self._fragments or self._fragments[project_id].signature != signature
+            ]
+
+            rendered = self._render_projects(db, signatures, stale_ids)
+            for fragment in rendered.values():
+                self._store_fragment(fragment)
+
+            # 清理已删除项目的片段
+            for project_id in list(self._fragments.keys()):
+                if project_id not in signatures:
+                    self._remove_fragment(project_id)
+
+            fragments = [self._fragments[row[0]] for row in rows if row[0] in self._fragments]
+
+            if stale_ids:
+                logger.info(f"项目上下文增量构建：重建 {len(rendered)} 个项目片段，复用 {len(fragments) - len(rendered)} 个")
+
+            context = PortfolioContext(
+                project_names=[fragment.name for fragment in fragments],
+                category_names=category_names,
+                fragments=fragments,
+                rebuilt_count=len(rendered)
+            )
+
+            # 全部详情在预算内时直接使用完整上下文
+            if sum(fragment.token_count for fragment in fragments) <= token_budget:
+                return context
+
+            scores = self._score(query or "", history or [])
+
+        return self._select(context, scores, top_k, token_budget)
+
+    def _select(self, context: PortfolioContext, scores: Dict[int, float],
+                top_k: int, token_budget: int) -> PortfolioContext:
+        """在token预算内选取详情项目和概要项目"""
+        ranked = sorted(
+            context.fragments,
+            key=lambda f: (scores.get(f.project_id, 0.0), _signature_recency(f.signature)),
+            reverse=True
+        )
+
+        used = estimate_tokens(str(context.category_names))
+        selected = []
+        summaries = []
+        omitted = 0
+        for fragment in ranked:
+            if len(selected) < top_k and scores.get(fragment.project_id, 0.0) > 0 \
+                    and used + fragment.token_count <= token_budget:
+                selected.append(fragment)
+                used += fragment.token_count
+                continue
+
+            cost = estimate_tokens(fragment.summary)
+            if used + cost <= token_budget:
+                summaries.append(fragment.summary)
+                used += cost
+            else:
+                omitted += 1
+
+        logger.info(
+            f"项目上下文超出预算，按相关性选取：详情 {[f.name for f in selected]}，"
+            f"概要 {len(summaries)} 个，省略 {omitted} 个"
+        )
+
+        return PortfolioContext(
+            project_names=context.project_names,
+            category_names=context.category_names,
+            fragments=selected,
+            summaries=summaries,
+            omitted_count=omitted,
+            mode="selected",
+            rebuilt_count=context.rebuilt_count
+        )
+
+    def invalidate(self, project_id: Optional[int] = None):
+        """
+        使缓存失效
+
+        Args:
+            project_id: 项目ID，为None时清空全部缓存
+        """
+        with self._lock:
+            if project_id is None:
+                self._fragments.clear()
+                self._index.clear()
+            else:
+                self._remove_fragment(project_id)
+
+    def get_stats(self) -> dict:
+        """获取缓存状态统计"""
+        with self._lock:
+            return {
+                "cached_projects": len(self._fragments),
+                "indexed_terms": len(self._index)
+            }
+
+
+# 全局项目上下文缓存实例
+context_cache = ProjectContextCache()
+
+
+def get_context_cache() -> ProjectContextCache:
+    """获取全局项目上下文缓存实例"""
+    return context_cache
@@ -0,0 +1,274 @@
+"""
+甘特图变更推送
+
+对话指令、项目服务或任务接口提交修改后，前端原来需要重新请求完整的 /gantt/all 和 /projects。
+这里把相邻两次甘特图数据（api.gantt.build_all_gantt 的结果）的差异转换为精简的变更事件，
+按批次编号保存最近的历史，供 /gantt/feed（SSE）推送和断线续传：
+- diff_gantt：两次数据之间的变更事件
+  - task_added / task_removed：任务条新增或删除（任务移到其他项目时为删除 + 新增）
+  - task_moved：任务条的起止日期或时间类型变化
+  - task_progress：任务进度或状态样式变化
+  - task_updated：名称、负责人、描述、顺序等其他字段变化
+  - project_added / project_removed / project_updated：项目新增、删除、名称/进度/大类等变化
+  - project_span：项目起止日期变化（同时给出新的阶段）
+- GanttFeed：一个数据库的当前数据、批次编号和最近的变更历史，续传令牌为 "<前缀>-<批次编号>"，
+  前缀每个 GanttFeed 随机生成，服务重启或历史已淘汰的令牌需要重新获取完整数据
+- GanttFeeds：按数据库引擎保存 GanttFeed，数据版本变化（见 models.data_version）时唤醒订阅者
+
+环境变量：
+- GANTT_FEED_HISTORY: 保存的最近变更批次数（默认 256）
+"""
+import asyncio
+import os
+import secrets
+import threading
+import weakref
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.engine import Engine
+
+from models.data_version import DataVersion, get_data_version
+
+DEFAULT_HISTORY = 256
+
+# 变化时产生 task_moved / task_progress 的任务字段，其余字段的变化为 task_updated
+_TASK_MOVE_FIELDS = ("start", "end", "startTimeType", "endTimeType")
+_TASK_PROGRESS_FIELDS = ("progress", "custom_class")
+_PROJECT_SPAN_FIELDS = ("start_date", "end_date", "phases")
+
+
+def flatten_gantt(gantt_data: Dict) -> Tuple[Dict[int, Dict], Dict[str, Dict]]:
+    """
+    把按项目大类分组的甘特图数据展开为项目和任务两张表
+
+    Returns:
+        Tuple: (项目ID -> 项目信息（不含任务，含大类ID和名称）, 任务ID -> 任务数据)
+    """
+    projects: Dict[int, Dict] = {}
+    tasks: Dict[str, Dict] = {}
+    for category in gantt_data["project_categories"]:
+        for project in category["projects"]:
+            projects[project["id"]] = {
+                **{key: value for key, value in project.items() if key != "tasks"},
+                "category_id": category["id"],
+                "category_name": category["name"],
+            }
+            for task in project["tasks"]:
+                tasks[task["id"]] = task
+    return projects, tasks
+
+
+def _changes(old: Dict, new: Dict, fields) -> Dict:
+    return {key: new.get(key) for key in fields if old.get(key) != new.get(key)}
+
+
+def diff_gantt(old: Dict, new: Dict) -> List[Dict]:
+    """
+    两次甘特图数据之间的变更事件
+
+    事件顺序：新增项目、项目变化、任务删除、任务新增和变化、删除项目，
+    客户端按顺序应用时任务所属的项目总是存在。
+    """
+    old_projects, old_tasks = flatten_gantt(old)
+    new_projects, new_tasks = flatten_gantt(new)
+    events: List[Dict] = []
+
+    for project_id, project in new_projects.items():
+        if project_id not in old_projects:
+            events.append({"type": "project_added", "project": project})
+    for project_id, project in new_projects.items():
+        previous = old_projects.get(project_id)
+        if previous is None:
+            continue
+        span = _changes(previous, project, _PROJECT_SPAN_FIELDS)
+        if span:
+            events.append({"type": "project_span", "project_id": project_id,
+                           **{key: project[key] for key in _PROJECT_SPAN_FIELDS}})
+        other_fields = [key for key in project if key not in _PROJECT_SPAN_FIELDS]
+        changes = _changes(previous, project, other_fields)
+        if changes:
+            events.append({"type": "project_updated", "project_id": project_id, "changes": changes})
+
+    for task_id, task in old_tasks.items():
+        current = new_tasks.get(task_id)
+        if current is None or current["project_id"] != task["project_id"]:
+            events.append({"type": "task_removed", "task_id": task_id, "project_id": task["project_id"]})
+    for task_id, task in new_tasks.items():
+        previous = old_tasks.get(task_id)
+        if previous is None or previous["project_id"] != task["project_id"]:
+            events.append({"type": "task_added", "task": task})
+            continue
+        key = {"task_id": task_id, "project_id": task["project_id"]}
+        moved = _changes(previous, task, _TASK_MOVE_FIELDS)
+        if moved:
+            events.append({"type": "task_moved", **key, **{field: task[field] for field in _TASK_MOVE_FIELDS}})
+        progress = _changes(previous, task, _TASK_PROGRESS_FIELDS)
+        if progress:
+            events.append({"type": "task_progress", **key,
+                           **{field: task[field] for field in _TASK_PROGRESS_FIELDS}})
+        other_fields = [field for field in task if field not in _TASK_MOVE_FIELDS + _TASK_PROGRESS_FIELDS]
+        changes = _changes(previous, task, other_fields)
+        if changes:
+            events.append({"type": "task_updated", **key, "changes": changes})
+
+    for project_id in old_projects:
+        if project_id not in new_projects:
+            events.append({"type": "project_removed", "project_id": project_id})
+    return events
+
+
+class GanttFeed:
+    """
+    一个数据库的甘特图变更历史
+
+    Args:
+        history: 保存的最近变更批次数
+    """
+
+    def __init__(self, history: int = DEFAULT_HISTORY):
+        # 续传令牌前缀
+        self.token = secrets.token_hex(4)
+        self.version = -1
+        self.data: Optional[Dict] = None
+        self.sequence = 0
+        # (批次编号, 事件列表)
+        self._batches: Deque[Tuple[int, List[Dict]]] = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def resume_token(self, sequence: int) -> str:
+        """批次 sequence 之后的续传令牌"""
+        return f"{self.token}-{sequence}"
+
+    def parse_token(self, resume_token: Optional[str]) -> Optional[int]:
+        """续传令牌对应的批次编号，令牌无效或属于其他 GanttFeed（如服务重启前）时为 None"""
+        if not resume_token:
+            return None
+        token, _, sequence = resume_token.rpartition("-")
+        if token != self.token or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def publish(self, version: int, data: Dict) -> Optional[Tuple[int, List[Dict]]]:
+        """
+        提交数据版本 version 的甘特图数据
+
+        版本不比当前数据新时忽略（并发生成时较旧的结果晚到）；首次提交只保存数据。
+
+        Returns:
+            Optional[Tuple]: 新的批次 (批次编号, 事件列表)，没有变化时为 None
+        """
+        with self._lock:
+            if version <= self.version:
+                return None
+            previous, self.version, self.data = self.data, version, data
+            if previous is None:
+                return None
+            events = diff_gantt(previous, data)
+            if not events:
+                return None
+            self.sequence += 1
+            batch = (self.sequence, events)
+            self._batches.append(batch)
+            return batch
+
+    def snapshot(self) -> Tuple[int, Optional[Dict]]:
+        """当前数据和对应的批次编号"""
+        with self._lock:
+            return self.sequence, self.data
+
+    def since(self, sequence: int) -> Optional[List[Tuple[int, List[Dict]]]]:
+        """
+        批次 sequence 之后的变更批次
+
+        Returns:
+            Optional[List]: 批次列表（可能为空）；批次编号无效或之后的批次已从历史中淘汰时为 None，
+            客户端需要重新获取完整数据
+        """
+        with self._lock:
+            if sequence > self.sequence:
+                return None
+            batches = [batch for batch in self._batches if batch[0] > sequence]
+            return batches if len(batches) == self.sequence - sequence else None
+
+
+class _Subscriber:
+    __slots__ = ("loop", "event")
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def notify(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+
+class GanttFeeds:
+    """
+    按数据库引擎保存的甘特图变更历史和订阅者
+
+    数据版本变化时唤醒全部订阅者（可能在其他线程中递增，通过 call_soon_threadsafe 通知），
+    由订阅者重新生成甘特图数据并提交到对应的 GanttFeed。
+    """
+
+    def __init__(self, history: int = DEFAULT_HISTORY, version: Optional[DataVersion] = None):
+        self.history = history
+        self.version = version or get_data_version()
+        self._feeds: "weakref.WeakKeyDictionary[Engine, GanttFeed]" = weakref.WeakKeyDictionary()
+        self._subscribers: Set[_Subscriber] = set()
+        self._lock = threading.Lock()
+        self.version.add_listener(self._on_version_changed)
+
+    @classmethod
+    def from_env(cls) -> "GanttFeeds":
+        """按环境变量创建"""
+        return cls(history=int(os.getenv("GANTT_FEED_HISTORY", DEFAULT_HISTORY)))
+
+    def get(self, bind: Engine) -> GanttFeed:
+        """获取数据库引擎的变更历史"""
+        with self._lock:
+            feed = self._feeds.get(bind)
+            if feed is None:
+                feed = self._feeds[bind] = GanttFeed(self.history)
+            return feed
+
+    def subscribe(self) -> _Subscriber:
+        """在当前事件循环中订阅数据版本变化，结束时需要调用 unsubscribe"""
+        subscriber = _Subscriber()
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        """取消订阅"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self) -> int:
+        """当前订阅者数"""
+        return len(self._subscribers)
+
+    def _on_version_changed(self, version: int):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.notify()
+            except RuntimeError:
+                # 订阅者的事件循环已关闭
+                self.unsubscribe(subscriber)
+
+    def clear(self):
+        """清空变更历史"""
+        with self._lock:
+            self._feeds.clear()
+
+
+# 全局甘特图变更历史
+gantt_feeds = GanttFeeds.from_env()
+
+
+def get_gantt_feeds() -> GanttFeeds:
+    """获取全局甘特图变更历史"""
+    return gantt_feeds
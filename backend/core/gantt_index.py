@@ -0,0 +1,182 @@
+"""
+甘特图任务条的时间区间索引
+
+按时间窗口查询甘特图时，只返回与窗口相交的任务条。索引由 /gantt/all 同样的数据
+（api.gantt.build_all_gantt 的结果）一次构建，每个数据版本构建一次：
+- IntervalTree：静态的中心点区间树，查询与 [low, high] 相交的区间为 O(log n + k)
+- GanttIndex：全部任务条一棵树，按项目大类筛选时使用该大类的树（首次使用时构建），
+  负责人筛选在查询结果上进行
+
+日期以 date.toordinal() 的整数保存，任务条的精度为天。
+"""
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (开始, 结束, 数据)
+Interval = Tuple[int, int, object]
+
+
+class _Node:
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center: int, by_start: List[Interval], by_end: List[Interval]):
+        self.center = center
+        # 包含中心点的区间，按开始升序 / 结束降序
+        self.by_start = by_start
+        self.by_end = by_end
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+
+
+class IntervalTree:
+    """
+    静态的中心点区间树（闭区间）
+
+    每个节点保存包含中心点的区间，完全在中心点左侧/右侧的区间分别放入左/右子树。
+    中心点取按开始排序后中间区间的开始，左右子树的区间数都不超过一半，树高为 O(log n)。
+    """
+
+    def __init__(self, intervals: Iterable[Interval]):
+        ordered = sorted(
+            ((min(start, end), max(start, end), item) for start, end, item in intervals),
+            key=lambda interval: interval[0]
+        )
+        self.size = len(ordered)
+        self._root = self._build(ordered)
+
+    @classmethod
+    def _build(cls, intervals: List[Interval]) -> Optional[_Node]:
+        # intervals 已按开始排序，过滤后的子列表保持有序
+        if not intervals:
+            return None
+        center = intervals[len(intervals) // 2][0]
+        left, middle, right = [], [], []
+        for interval in intervals:
+            if interval[1] < center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                middle.append(interval)
+        node = _Node(center, middle, sorted(middle, key=lambda interval: interval[1], reverse=True))
+        node.left = cls._build(left)
+        node.right = cls._build(right)
+        return node
+
+    def query(self, low: int, high: int) -> List[object]:
+        """与闭区间 [low, high] 相交的区间的数据"""
+        result = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if high < node.center:
+                # 节点上的区间都包含中心点（结束 >= 中心点 > high），只需开始 <= high
+                for start, _, item in node.by_start:
+                    if start > high:
+                        break
+                    result.append(item)
+                stack.append(node.left)
+            elif low > node.center:
+                for _, end, item in node.by_end:
+                    if end < low:
+                        break
+                    result.append(item)
+                stack.append(node.right)
+            else:
+                result.extend(item for _, _, item in node.by_start)
+                stack.append(node.left)
+                stack.append(node.right)
+        return result
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class GanttBar:
+    """任务条：所属项目、在项目内的顺序和接口返回的任务数据"""
+    __slots__ = ("project_id", "category_id", "sequence", "start", "end", "data")
+
+    def __init__(self, project_id: int, category_id: int, sequence: int, start: int, end: int, data: Dict):
+        self.project_id = project_id
+        self.category_id = category_id
+        self.sequence = sequence
+        self.start = start
+        self.end = end
+        self.data = data
+
+
+def _ordinal(value: str) -> int:
+    return date.fromisoformat(value).toordinal()
+
+
+class GanttIndex:
+    """一个数据版本的甘特图任务条索引"""
+
+    def __init__(self, gantt_data: Dict):
+        """
+        Args:
+            gantt_data: api.gantt.build_all_gantt 的结果（按项目大类分组的项目和任务）
+        """
+        # 项目ID -> 项目信息（不含任务），未分类项目的大类ID为0
+        self.projects: Dict[int, Dict] = {}
+        self._bars: List[GanttBar] = []
+        for category in gantt_data["project_categories"]:
+            for project in category["projects"]:
+                self.projects[project["id"]] = {
+                    **{key: value for key, value in project.items() if key != "tasks"},
+                    "category_id": category["id"],
+                    "category_name": category["name"],
+                }
+                for sequence, task in enumerate(project["tasks"]):
+                    start, end = sorted((_ordinal(task["start"]), _ordinal(task["end"])))
+                    self._bars.append(GanttBar(project["id"], category["id"], sequence, start, end, task))
+        self._trees: Dict[Optional[int], IntervalTree] = {}
+        self._lock = threading.Lock()
+
+    def _tree(self, category_id: Optional[int]) -> IntervalTree:
+        with self._lock:
+            tree = self._trees.get(category_id)
+            if tree is None:
+                bars = self._bars if category_id is None else [
+                    bar for bar in self._bars if bar.category_id == category_id
+                ]
+                tree = self._trees[category_id] = IntervalTree((bar.start, bar.end, bar) for bar in bars)
+            return tree
+
+    def query(self, start: date, end: date, category_id: Optional[int] = None,
+              assignee: Optional[str] = None) -> List[GanttBar]:
+        """
+        与日期窗口 [start, end] 相交的任务条
+
+        Args:
+            start: 窗口开始日期
+            end: 窗口结束日期
+            category_id: 只查询该项目大类，0 表示未分类
+            assignee: 只查询该负责人的任务
+        """
+        bars = self._tree(category_id).query(start.toordinal(), end.toordinal())
+        if assignee is not None:
+            bars = [bar for bar in bars if bar.data["assignee"] == assignee]
+        return bars
+
+    def __len__(self) -> int:
+        return len(self._bars)
+
+
+def overlaps(bar: GanttBar, start: date, end: date) -> bool:
+    """任务条是否与日期窗口 [start, end] 相交"""
+    return bar.start <= end.toordinal() and bar.end >= start.toordinal()
+
+
+def group_by_project(bars: Sequence[GanttBar]) -> List[Tuple[int, List[GanttBar]]]:
+    """按项目ID分组，项目内按任务顺序排列"""
+    groups: Dict[int, List[GanttBar]] = {}
+    for bar in bars:
+        groups.setdefault(bar.project_id, []).append(bar)
+    return [
+        (project_id, sorted(groups[project_id], key=lambda bar: bar.sequence))
+        for project_id in sorted(groups)
+    ]
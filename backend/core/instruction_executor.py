@@ -0,0 +1,248 @@
+"""
+AI指令批量执行器
+将一轮对话中的任务指令按项目分组，在一个事务内批量执行
+
+create_task / update_task 指令在原实现中逐个任务调用 ProjectService，每个任务都要
+按名称查询项目、提交、刷新并重新计算项目概要。批量执行时：
+- 项目名称和任务名称经名称解析缓存得到ID，项目和已有任务各用一次主键查询加载
+- 所有新增/修改在同一个事务中执行，新增任务用一条 executemany 批量插入
+- 每个涉及的项目只在最后重新计算一次概要
+- 修改了计划日期的任务在最后按依赖关系顺延下游任务（见 core.scheduling），每个项目计算一次排期
+其余指令仍交给逐条执行函数处理，执行顺序与指令顺序一致。
+"""
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from api.project import update_project_summary
+from core.name_resolver import get_name_resolver
+from core.progress_engine import get_progress_engine
+from core.scheduling import load_schedule, shift_to_earliest
+from core.task_utils import apply_task_update
+from models.entities import Project, Task
+from models.project_stats import apply_inserted_tasks
+
+logger = logging.getLogger(__name__)
+
+# 可批量执行的意图
+BATCH_INTENTS = ("create_task", "update_task")
+
+
+@dataclass
+class TaskOperation:
+    """批量执行中的单个任务操作"""
+    intent: str
+    project_name: str
+    task_data: Dict
+
+
+class InstructionExecutor:
+    """
+    AI指令执行器
+
+    Args:
+        db: 数据库会话
+        execute_single: 逐条执行非批量指令的函数，签名 (序号, 指令, 项目服务) -> 结果文本
+    """
+
+    def __init__(self, db: Session, execute_single: Callable[[int, dict, object], str]):
+        from core.project_service import get_project_service
+
+        self.db = db
+        self.project_service = get_project_service(db)
+        self.execute_single = execute_single
+
+    @staticmethod
+    def is_batchable(instruction: dict) -> bool:
+        """判断指令是否可以批量执行"""
+        intent = instruction.get("intent")
+        data = instruction.get("data") or {}
+        project_name = data.get("project_name")
+        if intent not in BATCH_INTENTS or not project_name:
+            return False
+        # 任务名与项目名相同的 update_task 会被修正为项目操作，交给逐条执行处理
+        if intent == "update_task":
+            return all(task.get("name") != project_name for task in data.get("tasks", []))
+        return True
+
+    def execute(self, instructions: List[dict]) -> str:
+        """
+        按顺序执行指令列表，连续的任务指令合并为一批执行
+
+        Args:
+            instructions: 指令列表
+
+        Returns:
+            str: 追加到AI回复末尾的操作结果文本
+        """
+        return "".join(self.iter_results(instructions))
+
+    def iter_results(self, instructions: List[dict]) -> Iterator[str]:
+        """
+        按顺序执行指令列表，逐条（批）产出结果文本
+
+        逐条执行的指令抛出异常时，之前已产出的结果仍然保留在调用方
+        """
+        batch: List[dict] = []
+        for index, instruction in enumerate(instructions, 1):
+            if self.is_batchable(instruction):
+                batch.append(instruction)
+                continue
+            if batch:
+                yield self.execute_batch(batch)
+                batch = []
+            yield self.execute_single(index, instruction, self.project_service)
+        if batch:
+            yield self.execute_batch(batch)
+
+    def execute_batch(self, instructions: List[dict]) -> str:
+        """
+        在一个事务中执行一批 create_task / update_task 指令
+
+        Args:
+            instructions: 任务指令列表
+
+        Returns:
+            str: 操作结果文本
+        """
+        operations: List[TaskOperation] = []
+        output = ""
+        for instruction in instructions:
+            data = instruction.get("data") or {}
+            tasks = data.get("tasks", [])
+            if len(tasks) == 0:
+                logger.warning(f"[core.instruction_executor] 没有任务需要处理，data中没有tasks数组")
+                output += f"\n\n任务操作失败: 未提供任务信息"
+            for task_data in tasks:
+                if task_data.get("name"):
+                    operations.append(TaskOperation(instruction["intent"], data["project_name"], task_data))
+
+        if not operations:
+            return output
+
+        logger.info(f"[core.instruction_executor] 批量执行 {len(operations)} 个任务操作")
+        try:
+            projects, tasks_by_key = self._load(operations)
+            touched_project_ids = set()
+            # 项目ID -> 修改了计划日期的任务
+            rescheduled: Dict[int, List[Task]] = {}
+            new_tasks: List[Task] = []
+            succeeded = failed = 0
+
+            for operation in operations:
+                success, message = self._apply(operation, projects, tasks_by_key, new_tasks)
+                if success:
+                    succeeded += 1
+                    project_id = projects[operation.project_name].id
+                    touched_project_ids.add(project_id)
+                    if operation.intent == "update_task" and (
+                            "planned_start_date" in operation.task_data or "planned_end_date" in operation.task_data):
+                        rescheduled.setdefault(project_id, []).append(
+                            tasks_by_key[(project_id, operation.task_data["name"])]
+                        )
+                    output += f"\n\n任务操作结果: {message}"
+                else:
+                    failed += 1
+                    output += f"\n\n任务操作失败: {message}"
+
+            self.db.flush()
+            if new_tasks:
+                # 新任务在本轮对话中不需要主键，使用 executemany 批量插入，
+                # 避免 ORM 为取回自增主键逐行 INSERT ... RETURNING
+                rows = [self._insert_row(task) for task in new_tasks]
+                self.db.execute(insert(Task), rows)
+                # 批量插入不触发映射事件，单独计入项目任务统计和进度状态，并作废任务名称缓存
+                apply_inserted_tasks(self.db.connection(), rows)
+                get_progress_engine().apply_inserted(self.db, rows)
+                get_name_resolver().invalidate_tasks(self.db, {row["project_id"] for row in rows})
+
+            for project_id, tasks in rescheduled.items():
+                # 本批新建的任务批量插入后没有主键，也不会有依赖关系
+                task_ids = [task.id for task in tasks if task.id is not None]
+                schedule = load_schedule(self.db, project_id) if task_ids else None
+                if schedule is not None:
+                    downstream = {task_id for i in task_ids for task_id in schedule.downstream(i)}
+                    shift_to_earliest(self.db, schedule, [i for i in schedule.order if i in downstream])
+            self.db.flush()
+
+            # 每个涉及的项目只重新计算一次概要
+            for project_id in sorted(touched_project_ids):
+                update_project_summary(project_id, self.db, commit=False)
+
+            self.db.commit()
+            logger.info(f"[core.instruction_executor] 任务批量操作完成，成功: {succeeded}，失败: {failed}")
+            return output
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"[core.instruction_executor] 任务批量操作失败: {str(e)}", exc_info=True)
+            return output + f"\n\n任务操作失败: {str(e)}"
+
+    @staticmethod
+    def _insert_row(task: Task) -> Dict:
+        """任务对象的插入参数，未设置的列交给列默认值"""
+        return {
+            column.key: getattr(task, column.key)
+            for column in Task.__table__.columns
+            if column.key != "id" and getattr(task, column.key) is not None
+        }
+
+    def _load(self, operations: List[TaskOperation]) -> Tuple[Dict[str, Project], Dict[Tuple[int, str], Task]]:
+        """经名称解析缓存得到项目和任务ID，项目和被引用的任务各用一次主键查询加载"""
+        resolver = get_name_resolver()
+        project_ids = resolver.project_ids(self.db, {operation.project_name for operation in operations})
+        projects = {}
+        if project_ids:
+            for project in self.db.query(Project).filter(Project.id.in_(project_ids.values())).all():
+                # 缓存过期（对象已被重命名）时按不存在处理
+                if project_ids.get(project.name) == project.id:
+                    projects[project.name] = project
+
+        task_names: Dict[int, set] = {}
+        for operation in operations:
+            project = projects.get(operation.project_name)
+            if project:
+                task_names.setdefault(project.id, set()).add(operation.task_data["name"])
+        task_ids = {}
+        for project_id, names in task_names.items():
+            for name, task_id in resolver.task_ids(self.db, project_id, names).items():
+                task_ids[task_id] = (project_id, name)
+
+        tasks_by_key: Dict[Tuple[int, str], Task] = {}
+        if task_ids:
+            for task in self.db.query(Task).filter(Task.id.in_(task_ids)).all():
+                if task_ids[task.id] == (task.project_id, task.name):
+                    tasks_by_key[(task.project_id, task.name)] = task
+        return projects, tasks_by_key
+
+    def _apply(self, operation: TaskOperation, projects: Dict[str, Project],
+               tasks_by_key: Dict[Tuple[int, str], Task], new_tasks: List[Task]) -> Tuple[bool, str]:
+        """在内存中应用单个任务操作，返回 (是否成功, 结果消息)"""
+        project: Optional[Project] = projects.get(operation.project_name)
+        if not project:
+            return False, f"项目 '{operation.project_name}' 不存在"
+
+        task_name = operation.task_data["name"]
+        key = (project.id, task_name)
+
+        if operation.intent == "create_task":
+            if key in tasks_by_key:
+                return False, f"任务 '{task_name}' 已存在于项目 '{operation.project_name}' 中"
+            try:
+                task = self.project_service._build_task(project.id, operation.task_data)
+            except (TypeError, ValueError) as e:
+                return False, f"创建任务失败: {str(e)}"
+            tasks_by_key[key] = task
+            new_tasks.append(task)
+            return True, f"任务 '{task_name}' 创建成功，已关联到项目 '{operation.project_name}'"
+
+        task = tasks_by_key.get(key)
+        if task is None:
+            return False, f"任务 '{task_name}' 不存在于项目 '{operation.project_name}' 中"
+        try:
+            apply_task_update(task, self.project_service._build_task_update(operation.task_data))
+        except ValueError as e:
+            return False, f"更新任务失败: {str(e)}"
+        return True, f"任务 '{task.name}' 更新成功"
@@ -0,0 +1,393 @@
+"""
+AI回复指令解析器
+单遍、增量地解析AI回复中的JSON指令
+
+逐块接收LLM输出，维护 ```json 代码块和花括号（含字符串、转义）状态，
+代码块或顶层JSON对象一闭合就产出解析结果，流式和非流式聊天接口共用。
+"""
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FENCE_OPEN = "```json\n"
+FENCE_CLOSE = "\n```"
+
+# 未找到确认标记时用于判断确认轮回答的关键词
+CONFIRMATION_KEYWORDS = ["确认执行吗", "确认吗", "是否确认", "是否执行", "请确认"]
+
+_UNPARSED = object()
+
+
+@dataclass
+class ParsedBlock:
+    """
+    已闭合的JSON块
+
+    kind 为 "fence" 表示 ```json 代码块，"object" 表示正文中的顶层JSON对象；
+    value 为解析结果，解析失败时为 None（parsed 为 False）
+    """
+    kind: str
+    start: int
+    end: int
+    source: str
+    value: Any = None
+    parsed: bool = False
+    # 代码块解析失败时，块内找到的顶层JSON对象
+    inner_objects: Optional[List["ParsedBlock"]] = None
+
+    @property
+    def instructions(self) -> List[Any]:
+        """块中包含的指令（JSON数组会展开）"""
+        if self.parsed:
+            return list(self.value) if isinstance(self.value, list) else [self.value]
+        return [block.value for block in self.inner_objects or [] if _is_instruction(block.value)]
+
+    @property
+    def requires_confirmation(self) -> Any:
+        """块中的requires_confirmation字段，没有时为None"""
+        if isinstance(self.value, dict):
+            return self.value.get("requires_confirmation")
+        return None
+
+
+def _is_instruction(value: Any) -> bool:
+    return isinstance(value, dict) and "intent" in value
+
+
+class _ObjectScanner:
+    """花括号状态机，识别顶层JSON对象的起止位置"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.start = -1
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, char: str, pos: int) -> Optional[int]:
+        """
+        处理一个字符
+
+        Returns:
+            Optional[int]: 顶层对象闭合时返回对象起始位置，否则返回None
+        """
+        if self.depth == 0:
+            if char == "{":
+                self.start = pos
+                self.depth = 1
+            return None
+
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+            elif char == "\\":
+                self.escape = True
+            elif char == '"':
+                self.in_string = False
+            return None
+
+        if char == '"':
+            self.in_string = True
+        elif char == "{":
+            self.depth += 1
+        elif char == "}":
+            self.depth -= 1
+            if self.depth == 0:
+                start = self.start
+                self.reset()
+                return start
+        return None
+
+
+def _load_json(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return _UNPARSED
+
+
+def _scan_objects(text: str, offset: int = 0) -> List[ParsedBlock]:
+    """在一段完整文本中查找可解析的顶层JSON对象"""
+    scanner = _ObjectScanner()
+    blocks = []
+    for pos, char in enumerate(text):
+        start = scanner.feed(char, pos)
+        if start is None:
+            continue
+        value = _load_json(text[start:pos + 1])
+        if value is _UNPARSED:
+            # 不是合法JSON时从下一个字符重新查找，保证内部的合法对象仍能被识别
+            inner = _scan_objects(text[start + 1:pos + 1], offset + start + 1)
+            blocks.extend(inner)
+            continue
+        blocks.append(ParsedBlock(
+            kind="object", start=offset + start, end=offset + pos + 1,
+            source=text[start:pos + 1], value=value, parsed=True
+        ))
+    return blocks
+
+
+class InstructionStreamParser:
+    """
+    增量指令解析器
+
+    使用方式：
+        parser = InstructionStreamParser()
+        for chunk in stream:
+            for block in parser.feed(chunk):
+                ...  # 代码块/JSON对象闭合时立即处理
+        parser.finish()
+        parser.instructions()
+    """
+
+    def __init__(self):
+        self.blocks: List[ParsedBlock] = []
+        self._chunks: List[str] = []
+        self._text = ""
+        self._length = 0
+        # 仍可能被引用的未处理文本（从 _buffer_offset 开始），避免每次拼接完整回复
+        self._buffer = ""
+        self._buffer_offset = 0
+        self._pos = 0
+        self._fence_start = -1
+        self._scanner = _ObjectScanner()
+
+    @property
+    def text(self) -> str:
+        """已接收的完整文本"""
+        if len(self._text) != self._length:
+            self._text = "".join(self._chunks)
+            self._chunks = [self._text]
+        return self._text
+
+    @property
+    def fences(self) -> List[ParsedBlock]:
+        """已闭合的 ```json 代码块"""
+        return [block for block in self.blocks if block.kind == "fence"]
+
+    @property
+    def objects(self) -> List[ParsedBlock]:
+        """正文（代码块之外）中已闭合的顶层JSON对象"""
+        return [block for block in self.blocks if block.kind == "object"]
+
+    def _slice(self, start: int, end: int) -> str:
+        return self._buffer[start - self._buffer_offset:end - self._buffer_offset]
+
+    def feed(self, chunk: str) -> List[ParsedBlock]:
+        """
+        接收一段新文本
+
+        Args:
+            chunk: LLM输出的增量文本
+
+        Returns:
+            List[ParsedBlock]: 本次新闭合的块
+        """
+        if not chunk:
+            return []
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        self._buffer += chunk
+        closed = []
+
+        buffer = self._buffer
+        offset = self._buffer_offset
+        length = self._length
+        while self._pos < length:
+            if self._fence_start >= 0:
+                # 代码块内：只需要查找结束标记
+                content_start = self._fence_start + len(FENCE_OPEN)
+                search_from = max(content_start, self._pos - len(FENCE_CLOSE) + 1)
+                close = buffer.find(FENCE_CLOSE, search_from - offset)
+                if close < 0:
+                    self._pos = length
+                    break
+                closed.append(self._close_fence(content_start, close + offset))
+                continue
+
+            pos = self._pos
+            if self._scanner.depth == 0:
+                # 正文中直接跳到下一个可能的代码块或对象起点
+                brace = buffer.find("{", pos - offset)
+                fence = buffer.find("`", pos - offset)
+                candidates = [i for i in (brace, fence) if i >= 0]
+                if not candidates:
+                    self._pos = length
+                    break
+                pos = min(candidates) + offset
+
+            char = buffer[pos - offset]
+            if char == "`":
+                # 代码块开始标记可能被切分在两个块之间，等待更多文本
+                rest = buffer[pos - offset:pos - offset + len(FENCE_OPEN)]
+                if len(rest) < len(FENCE_OPEN) and FENCE_OPEN.startswith(rest):
+                    self._pos = pos
+                    break
+                if rest == FENCE_OPEN:
+                    self._scanner.reset()
+                    self._fence_start = pos
+                    self._pos = pos + len(FENCE_OPEN)
+                    continue
+
+            start = self._scanner.feed(char, pos)
+            self._pos = pos + 1
+            if start is not None:
+                closed.extend(self._close_object(start, pos + 1))
+
+        self._trim_buffer()
+        self.blocks.extend(closed)
+        return closed
+
+    def _trim_buffer(self):
+        """丢弃不会再被引用的已处理文本"""
+        keep_from = self._pos
+        if self._fence_start >= 0:
+            keep_from = min(keep_from, self._fence_start)
+        if self._scanner.depth > 0:
+            keep_from = min(keep_from, self._scanner.start)
+        if keep_from > self._buffer_offset:
+            self._buffer = self._buffer[keep_from - self._buffer_offset:]
+            self._buffer_offset = keep_from
+
+    def finish(self) -> List[ParsedBlock]:
+        """
+        输入结束
+
+        未闭合的代码块不视为代码块；未闭合的花括号之后可能仍有完整的JSON对象，
+        对剩余文本补充查找一次
+
+        Returns:
+            List[ParsedBlock]: 补充找到的块
+        """
+        remainder_start = -1
+        if self._fence_start >= 0:
+            remainder_start = self._fence_start + len(FENCE_OPEN)
+        elif self._scanner.depth > 0:
+            remainder_start = self._scanner.start + 1
+
+        self._fence_start = -1
+        self._scanner.reset()
+        self._pos = self._length
+
+        if remainder_start < 0:
+            return []
+        closed = _scan_objects(self._slice(remainder_start, self._length), remainder_start)
+        self.blocks.extend(closed)
+        return closed
+
+    def _close_fence(self, content_start: int, close: int) -> ParsedBlock:
+        content = self._slice(content_start, close)
+        end = close + len(FENCE_CLOSE)
+        value = _load_json(content)
+        block = ParsedBlock(
+            kind="fence", start=self._fence_start, end=end,
+            source=content, value=None if value is _UNPARSED else value,
+            parsed=value is not _UNPARSED
+        )
+        if not block.parsed:
+            logger.error(f"解析JSON代码块失败: {content[:100]}")
+            block.inner_objects = _scan_objects(content, content_start)
+        self._fence_start = -1
+        self._pos = end
+        return block
+
+    def _close_object(self, start: int, end: int) -> List[ParsedBlock]:
+        source = self._slice(start, end)
+        value = _load_json(source)
+        if value is _UNPARSED:
+            return _scan_objects(source[1:], start + 1)
+        return [ParsedBlock(kind="object", start=start, end=end, source=source, value=value, parsed=True)]
+
+    def instructions(self) -> List[Any]:
+        """
+        回复中的指令列表
+
+        优先使用 ```json 代码块中的指令；没有可解析的代码块时使用正文中包含intent的JSON对象；
+        都没有时返回 [{"intent": None}]
+        """
+        instructions = []
+        for block in self.fences:
+            if block.parsed:
+                instructions.extend(block.instructions)
+        if instructions:
+            return instructions
+
+        candidates = list(self.objects)
+        for block in self.fences:
+            candidates.extend(block.inner_objects or [])
+        candidates.sort(key=lambda block: block.start)
+        instructions = [block.value for block in candidates if _is_instruction(block.value)]
+        return instructions if instructions else [{"intent": None}]
+
+    def requires_confirmation(self, instructions: Optional[List[Any]] = None) -> Any:
+        """
+        判断回复是否需要用户确认
+
+        依次检查指令、代码块、JSON对象中第一个requires_confirmation字段，
+        都没有（或为false）时根据确认关键词判断
+        """
+        if instructions is None:
+            instructions = self.instructions()
+
+        fence_values = [block.value for block in self.fences if block.parsed]
+        candidates = list(self.objects)
+        for block in self.fences:
+            candidates.extend(block.inner_objects or [])
+        object_values = [block.value for block in sorted(candidates, key=lambda block: block.start)]
+
+        for source in (instructions, fence_values, object_values):
+            for value in source:
+                if isinstance(value, dict) and value.get("requires_confirmation") is not None:
+                    if value["requires_confirmation"]:
+                        return value["requires_confirmation"]
+                    break
+
+        return any(keyword in self.text for keyword in CONFIRMATION_KEYWORDS)
+
+    def content_blocks(self) -> List[dict]:
+        """
+        按 ```json 代码块切分回复，每个代码块和它之前的说明组成一个块，
+        最后一个代码块之后的内容合并到最后一个块
+
+        Returns:
+            List[dict]: [{"analysis": "说明", "content": "JSON代码块"}, ...]
+        """
+        fences = self.fences
+        if not fences:
+            return [{"analysis": "", "content": self.text.strip()}]
+
+        blocks = []
+        prev_end = 0
+        for i, fence in enumerate(fences):
+            analysis = self.text[prev_end:fence.start].strip()
+            if i + 1 == len(fences):
+                after_content = self.text[fence.end:].strip()
+                if after_content:
+                    analysis = f"{analysis}\n{after_content}" if analysis else after_content
+            blocks.append({
+                "analysis": analysis,
+                "content": f"```json\n{fence.source.strip()}\n```"
+            })
+            prev_end = fence.end
+        return blocks
+
+
+def parse_reply(ai_content: str) -> InstructionStreamParser:
+    """
+    一次性解析完整的AI回复
+
+    Args:
+        ai_content: AI的完整回复内容
+
+    Returns:
+        InstructionStreamParser: 已完成解析的解析器
+    """
+    parser = InstructionStreamParser()
+    parser.feed(ai_content)
+    parser.finish()
+    return parser
@@ -0,0 +1,236 @@
+"""
+项目、任务和项目大类的名称解析缓存
+
+AI指令和项目服务按名称定位对象（项目名、项目内的任务名、大类名），原实现每个名称
+查询一次数据库。名称解析器在进程内缓存 名称 -> ID：
+- 项目和大类：首次解析时一次查询加载全部名称
+- 任务：首次解析某个项目中的任务时一次查询加载该项目全部任务的名称
+解析命中后按主键获取对象（会话中已加载的对象不再查询），并校验名称仍然一致，
+不一致时重新加载后再解析一次。同名对象取ID最小的一个，与原 .first() 的结果一致。
+
+缓存通过映射事件在新增、重命名、移动和删除时作废，事务提交或回滚时再次作废涉及的
+缓存（期间其他会话可能基于提交前的数据重新加载）。不经过映射事件的批量写入需要调用
+invalidate_tasks；直接修改数据库后可调用 invalidate()。缓存按数据库引擎分别保存。
+"""
+import threading
+import weakref
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, object_session
+
+from models.entities import Project, ProjectCategory, Task
+
+_SESSION_KEY = "name_resolver_keys"
+
+# 缓存键：("projects",)、("categories",) 或 ("tasks", 项目ID)
+PROJECTS = ("projects",)
+CATEGORIES = ("categories",)
+
+
+def _tasks_key(project_id: int) -> Tuple:
+    return ("tasks", project_id)
+
+
+class NameResolver:
+    """
+    名称解析缓存
+
+    功能：
+    - 按名称解析项目、大类，按 (项目ID, 名称) 解析任务
+    - 首次解析时按表（任务按项目）整体加载
+    - 线程安全；加载期间被作废的结果不会写入缓存
+    """
+
+    def __init__(self):
+        # 数据库引擎 -> 缓存键 -> 名称 -> ID；引擎被回收时随之释放
+        self._maps: "weakref.WeakKeyDictionary[Engine, Dict[Tuple, Dict[str, int]]]" = \
+            weakref.WeakKeyDictionary()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _names(self, db: Session, key: Tuple) -> Dict[str, int]:
+        bind = db.get_bind()
+        with self._lock:
+            names = self._maps.get(bind, {}).get(key)
+            generation = self._generation
+        if names is not None:
+            return names
+
+        if key == PROJECTS:
+            query = select(Project.name, Project.id)
+        elif key == CATEGORIES:
+            query = select(ProjectCategory.name, ProjectCategory.id)
+        else:
+            query = select(Task.name, Task.id).where(Task.project_id == key[1])
+        names = {}
+        for name, object_id in db.execute(query).all():
+            if name not in names or object_id < names[name]:
+                names[name] = object_id
+
+        with self._lock:
+            # 加载期间有写入作废了缓存时不保存，下次解析重新加载
+            if generation == self._generation:
+                self._maps.setdefault(bind, {})[key] = names
+        return names
+
+    def _resolve(self, db: Session, key: Tuple, model, name: Optional[str]):
+        if not name:
+            return None
+        for attempt in range(2):
+            object_id = self._names(db, key).get(name)
+            if object_id is None:
+                return None
+            target = db.get(model, object_id)
+            if target is not None and target.name == name:
+                return target
+            # 缓存已过期（如被其他进程修改），重新加载后再解析一次
+            self.invalidate([key], db.get_bind())
+        return None
+
+    def project(self, db: Session, name: Optional[str]) -> Optional[Project]:
+        """按名称解析项目，不存在时返回None"""
+        return self._resolve(db, PROJECTS, Project, name)
+
+    def category(self, db: Session, name: Optional[str]) -> Optional[ProjectCategory]:
+        """按名称解析项目大类，不存在时返回None"""
+        return self._resolve(db, CATEGORIES, ProjectCategory, name)
+
+    def task(self, db: Session, project_id: int, name: Optional[str]) -> Optional[Task]:
+        """按名称解析项目中的任务，不存在时返回None"""
+        return self._resolve(db, _tasks_key(project_id), Task, name)
+
+    def project_ids(self, db: Session, names: Iterable[str]) -> Dict[str, int]:
+        """批量解析项目名称，返回 名称 -> ID（不存在的名称不包含在结果中）"""
+        return self._ids(db, PROJECTS, names)
+
+    def task_ids(self, db: Session, project_id: int, names: Iterable[str]) -> Dict[str, int]:
+        """批量解析项目中的任务名称，返回 名称 -> ID（不存在的名称不包含在结果中）"""
+        return self._ids(db, _tasks_key(project_id), names)
+
+    def _ids(self, db: Session, key: Tuple, names: Iterable[str]) -> Dict[str, int]:
+        cached = self._names(db, key)
+        return {name: cached[name] for name in names if name in cached}
+
+    def invalidate(self, keys: Optional[Iterable[Tuple]] = None, bind: Optional[Engine] = None):
+        """
+        作废缓存，下次解析时重新加载
+
+        Args:
+            keys: 缓存键，默认全部
+            bind: 数据库引擎，默认全部数据库
+        """
+        with self._lock:
+            self._generation += 1
+            binds = list(self._maps.keys()) if bind is None else [bind]
+            for key_bind in binds:
+                maps = self._maps.get(key_bind)
+                if maps is None:
+                    continue
+                if keys is None:
+                    maps.clear()
+                    continue
+                for key in keys:
+                    maps.pop(key, None)
+
+    def invalidate_tasks(self, db: Session, project_ids: Iterable[int]):
+        """作废项目的任务名称缓存（用于不经过映射事件的批量写入），事务结束时再次作废"""
+        keys = {_tasks_key(project_id) for project_id in project_ids}
+        _track(db, db.get_bind(), keys)
+
+
+# 全局名称解析器
+_name_resolver = NameResolver()
+
+
+def get_name_resolver() -> NameResolver:
+    """获取全局名称解析器"""
+    return _name_resolver
+
+
+def _track(session: Optional[Session], bind: Engine, keys: Iterable[Tuple]):
+    """立即作废缓存，并记录到会话中，在事务提交或回滚时再次作废"""
+    keys = set(keys)
+    _name_resolver.invalidate(keys, bind)
+    if session is not None:
+        session.info.setdefault(_SESSION_KEY, set()).update((bind, key) for key in keys)
+
+
+def _changed(target, *fields) -> Dict[str, Tuple]:
+    """字段在本次 flush 中的变化：字段 -> (修改前的值列表, 修改后的值)"""
+    state = inspect(target)
+    changes = {}
+    for field in fields:
+        history = state.attrs[field].history
+        if history.has_changes():
+            changes[field] = (list(history.deleted), getattr(target, field))
+    return changes
+
+
+def _on_project_write(mapper, connection, target):
+    _track(object_session(target), connection.engine, [PROJECTS, _tasks_key(target.id)])
+
+
+def _on_project_update(mapper, connection, target):
+    if _changed(target, "name"):
+        _track(object_session(target), connection.engine, [PROJECTS])
+
+
+def _on_category_write(mapper, connection, target):
+    _track(object_session(target), connection.engine, [CATEGORIES])
+
+
+def _on_category_update(mapper, connection, target):
+    if _changed(target, "name"):
+        _on_category_write(mapper, connection, target)
+
+
+def _on_task_write(mapper, connection, target):
+    project_id = target.__dict__.get("project_id")
+    # 删除前项目ID未加载时无法确定所属项目，作废全部任务缓存
+    if project_id is None:
+        _name_resolver.invalidate(None, connection.engine)
+        return
+    _track(object_session(target), connection.engine, [_tasks_key(project_id)])
+
+
+def _on_task_update(mapper, connection, target):
+    changes = _changed(target, "name", "project_id")
+    if not changes:
+        return
+    project_ids = {target.project_id}
+    if "project_id" in changes:
+        project_ids.update(changes["project_id"][0])
+    _track(object_session(target), connection.engine,
+           [_tasks_key(project_id) for project_id in project_ids if project_id is not None])
+
+
+for _event in ("after_insert", "after_delete"):
+    event.listen(Project, _event, _on_project_write)
+    event.listen(ProjectCategory, _event, _on_category_write)
+    event.listen(Task, _event, _on_task_write)
+event.listen(Project, "after_update", _on_project_update)
+event.listen(ProjectCategory, "after_update", _on_category_update)
+event.listen(Task, "after_update", _on_task_update)
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    _invalidate_tracked(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _rolled_back(session, previous_transaction):
+    _invalidate_tracked(session)
+
+
+def _invalidate_tracked(session):
+    tracked = session.info.pop(_SESSION_KEY, None)
+    if not tracked:
+        return
+    by_bind: Dict[Engine, set] = {}
+    for bind, key in tracked:
+        by_bind.setdefault(bind, set()).add(key)
+    for bind, keys in by_bind.items():
+        _name_resolver.invalidate(keys, bind)
@@ -0,0 +1,331 @@
+"""
+项目和项目大类的名称模糊建议
+
+按名称找不到项目/大类时，原实现用 LIKE '%名称%' 查询（全表扫描），没有结果时返回全部
+名称，对中文名称的错别字、漏字没有帮助。名称建议在内存中维护字符 n-gram 倒排索引：
+- 中文按单字和相邻两字（二元组）切分，英文和数字按单词加边界符切分为三元组
+- 查询时按 n-gram 出现次数少的优先累加候选的共有 n-gram 数，出现在大量名称中的
+  n-gram 只在没有其他候选来源时使用
+- 按 n-gram 重合度取前若干个候选，再按编辑距离和包含关系计算得分排序
+
+索引按数据库引擎分别保存，首次使用时一次查询加载全部名称；之后名称的新增、重命名
+和删除由映射事件记录，在事务提交后应用到索引，回滚时丢弃。直接修改数据库后可调用
+invalidate() 重新加载。
+"""
+import heapq
+import re
+import threading
+import weakref
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, object_session
+
+from core.text_utils import edit_distance, is_cjk
+from models.entities import Project, ProjectCategory
+
+_SESSION_KEY = "name_suggester_changes"
+
+# 连续的中日韩字符 或 连续的字母数字
+_RUN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9]+")
+
+# 出现在超过该数量名称中的 n-gram 视为常见 n-gram，只在没有其他候选来源时使用
+COMMON_GRAM_POSTINGS = 1000
+# 按 n-gram 重合度保留、用编辑距离重新排序的候选数
+RERANK_CANDIDATES = 16
+# 建议的最低得分
+MIN_SCORE = 0.4
+
+
+def normalize_name(name: str) -> str:
+    """比较用的名称：小写，合并连续空白"""
+    return " ".join(name.lower().split())
+
+
+def name_ngrams(name: str) -> Set[str]:
+    """
+    名称的字符 n-gram
+
+    - 中文：单字和相邻两字
+    - 英文和数字：单词前后加边界符后的三字符片段
+    """
+    grams = set()
+    for run in _RUN_PATTERN.findall(normalize_name(name)):
+        if is_cjk(run[0]):
+            grams.update(run)
+            grams.update(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            padded = f"${run}$"
+            grams.update(padded[i:i + 3] for i in range(max(len(padded) - 2, 1)))
+    return grams
+
+
+def similarity(query: str, name: str, threshold: float = 0.0) -> float:
+    """
+    名称相似度（0-1）
+
+    取编辑距离相似度和包含关系得分的较大者：一个名称包含另一个时得分不低于0.6，
+    长度越接近得分越高
+
+    Args:
+        threshold: 得分低于该值时不需要精确结果（返回0），用于限制编辑距离的计算范围
+    """
+    query, name = normalize_name(query), normalize_name(name)
+    if not query or not name:
+        return 0.0
+    longest = max(len(query), len(name))
+    score = 0.0
+    if query in name or name in query:
+        score = 0.6 + 0.4 * min(len(query), len(name)) / longest
+    # 编辑距离相似度需要超过已有得分和阈值，据此确定距离上限
+    limit = int((1.0 - max(score, threshold)) * longest)
+    distance = edit_distance(query, name, limit)
+    if distance <= limit:
+        score = max(score, 1.0 - distance / longest)
+    return score if score >= threshold else 0.0
+
+
+@dataclass
+class Suggestion:
+    """名称建议"""
+    id: int
+    name: str
+    score: float
+
+
+class NgramIndex:
+    """单个名称集合（如全部项目名称）的 n-gram 倒排索引"""
+
+    def __init__(self, names: Iterable[Tuple[int, str]] = ()):
+        self._names: Dict[int, str] = {}
+        self._grams: Dict[int, Set[str]] = {}
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        for object_id, name in names:
+            self.add(object_id, name)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, object_id: int, name: Optional[str]):
+        """新增或更新名称"""
+        self.remove(object_id)
+        if not name:
+            return
+        grams = name_ngrams(name)
+        self._names[object_id] = name
+        self._grams[object_id] = grams
+        for gram in grams:
+            self._postings[gram].add(object_id)
+
+    def remove(self, object_id: int):
+        """删除名称"""
+        if self._names.pop(object_id, None) is None:
+            return
+        for gram in self._grams.pop(object_id):
+            posting = self._postings[gram]
+            posting.discard(object_id)
+            if not posting:
+                del self._postings[gram]
+
+    def _candidates(self, grams: Set[str]) -> Counter:
+        """候选名称及其与查询共有的 n-gram 数"""
+        postings = sorted((self._postings[gram] for gram in grams if gram in self._postings), key=len)
+        counts: Counter = Counter()
+        for posting in postings:
+            if len(posting) > COMMON_GRAM_POSTINGS and counts:
+                break
+            counts.update(posting)
+        if not counts and postings:
+            # 全部是常见 n-gram：只取包含所有 n-gram 的名称
+            counts.update(dict.fromkeys(set.intersection(*postings), len(postings)))
+        return counts
+
+    def search(self, query: str, limit: int = 5, min_score: float = MIN_SCORE) -> List[Suggestion]:
+        """
+        查找相似名称
+
+        Args:
+            query: 查询名称
+            limit: 最多返回的建议数
+            min_score: 最低得分
+
+        Returns:
+            List[Suggestion]: 按得分从高到低排序的建议，同名只保留一个
+        """
+        grams = name_ngrams(query or "")
+        counts = self._candidates(grams)
+
+        # 先按共有 n-gram 数粗选，再按重合度（Jaccard）保留候选
+        def overlap(item):
+            object_id, count = item
+            return count / (len(grams) + len(self._grams[object_id]) - count)
+
+        candidates = heapq.nlargest(RERANK_CANDIDATES * 4, counts.items(), key=itemgetter(1))
+        candidates = heapq.nlargest(RERANK_CANDIDATES, candidates, key=overlap)
+
+        suggestions: Dict[str, Suggestion] = {}
+        for object_id, _ in candidates:
+            name = self._names[object_id]
+            # 已有足够建议时，新的候选需要超过其中的最低得分
+            threshold = min_score
+            if len(suggestions) >= limit:
+                threshold = max(threshold, sorted(s.score for s in suggestions.values())[-limit])
+            score = similarity(query, name, threshold)
+            if score < min_score or score == 0:
+                continue
+            existing = suggestions.get(name)
+            if existing is None or object_id < existing.id:
+                suggestions[name] = Suggestion(object_id, name, round(score, 3))
+        ranked = sorted(suggestions.values(), key=lambda s: (-s.score, len(s.name), s.id))
+        return ranked[:limit]
+
+    def names(self) -> List[str]:
+        """全部名称（按ID排序，同名只保留一个）"""
+        return list(dict.fromkeys(self._names[object_id] for object_id in sorted(self._names)))
+
+
+# 索引种类 -> 模型（id 和 name 列）
+_SOURCES = {
+    "projects": Project,
+    "categories": ProjectCategory,
+}
+
+
+class NameSuggester:
+    """
+    名称建议管理器
+
+    功能：
+    - 按数据库引擎和种类（项目/大类）懒加载 n-gram 索引
+    - 应用已提交事务中的名称变化
+    - 线程安全
+    """
+
+    def __init__(self):
+        self._indexes: "weakref.WeakKeyDictionary[Engine, Dict[str, NgramIndex]]" = weakref.WeakKeyDictionary()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _index(self, db: Session, kind: str) -> NgramIndex:
+        bind = db.get_bind()
+        with self._lock:
+            index = self._indexes.get(bind, {}).get(kind)
+            generation = self._generation
+        if index is not None:
+            return index
+
+        model = _SOURCES[kind]
+        index = NgramIndex(db.execute(select(model.id, model.name)).all())
+        with self._lock:
+            # 加载期间有提交应用到索引时不保存，下次使用时重新加载
+            if generation == self._generation:
+                self._indexes.setdefault(bind, {})[kind] = index
+        return index
+
+    def suggest(self, db: Session, kind: str, query: str, limit: int = 5,
+                min_score: float = MIN_SCORE) -> List[Suggestion]:
+        """
+        查找相似名称
+
+        Args:
+            db: 数据库会话
+            kind: projects 或 categories
+            query: 查询名称
+            limit: 最多返回的建议数
+            min_score: 最低得分
+        """
+        index = self._index(db, kind)
+        with self._lock:
+            return index.search(query, limit, min_score)
+
+    def all_names(self, db: Session, kind: str) -> List[str]:
+        """全部名称"""
+        index = self._index(db, kind)
+        with self._lock:
+            return index.names()
+
+    def apply(self, bind: Engine, changes: Iterable[Tuple[str, int, Optional[str]]]):
+        """
+        应用已提交的名称变化
+
+        Args:
+            changes: (种类, ID, 新名称)，新名称为None表示删除
+        """
+        with self._lock:
+            self._generation += 1
+            indexes = self._indexes.get(bind, {})
+            for kind, object_id, name in changes:
+                index = indexes.get(kind)
+                if index is not None:
+                    index.add(object_id, name)
+
+    def invalidate(self, bind: Optional[Engine] = None):
+        """作废索引（默认全部数据库），下次使用时重新加载"""
+        with self._lock:
+            self._generation += 1
+            if bind is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(bind, None)
+
+
+# 全局名称建议管理器
+_name_suggester = NameSuggester()
+
+
+def get_name_suggester() -> NameSuggester:
+    """获取全局名称建议管理器"""
+    return _name_suggester
+
+
+def _record(target, connection, kind: str, name: Optional[str]):
+    session = object_session(target)
+    if session is None:
+        _name_suggester.invalidate(connection.engine)
+        return
+    session.info.setdefault(_SESSION_KEY, []).append((connection.engine, kind, target.id, name))
+
+
+def _listen(model, kind: str):
+    def inserted(mapper, connection, target):
+        _record(target, connection, kind, target.name)
+
+    def updated(mapper, connection, target):
+        if inspect(target).attrs.name.history.has_changes():
+            _record(target, connection, kind, target.name)
+
+    def deleted(mapper, connection, target):
+        _record(target, connection, kind, None)
+
+    event.listen(model, "after_insert", inserted)
+    event.listen(model, "after_update", updated)
+    event.listen(model, "after_delete", deleted)
+
+
+for _kind, _model in _SOURCES.items():
+    _listen(_model, _kind)
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    changes = session.info.pop(_SESSION_KEY, None)
+    if not changes:
+        return
+    by_bind: Dict[Engine, List] = defaultdict(list)
+    for bind, kind, object_id, name in changes:
+        by_bind[bind].append((kind, object_id, name))
+    for bind, bind_changes in by_bind.items():
+        _name_suggester.apply(bind, bind_changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _rolled_back(session, previous_transaction):
+    changes = session.info.pop(_SESSION_KEY, None)
+    if changes and previous_transaction.nested:
+        # 只回滚了保存点：外层事务中记录的变化无法区分，重新加载索引
+        for bind in {change[0] for change in changes}:
+            _name_suggester.invalidate(bind)
@@ -0,0 +1,377 @@
+"""
+项目进度和起止时间的增量计算
+
+每个项目维护一份进度状态：
+- 计划总天数、已完成（有实际开始和结束日期）任务的实际总天数：累加值
+- 进行中（只有实际开始日期）任务的开始日期：有序列表，计算进度时只遍历已开始的部分
+- 任务的开始日期（实际优先，否则计划）最小堆和结束日期最大堆：延迟删除，
+  被删除的值在到达堆顶时才弹出
+
+任务写入时由映射事件把修改前后的差值应用到状态上，不再每次加载项目的全部任务；
+状态不存在（首次访问或被作废）时从任务表完整计算一次，其中起止时间与甘特图一样
+由 core.timeline.effective_bounds 按列计算，增量维护的结果与其一致。
+
+状态保存在进程内存中，只包含已提交的数据，只感知经由本进程 SQLAlchemy 会话的写入：
+- flush 时的增量先保存在会话中（session.info），提交后才应用到共享的状态，
+  其他会话不会读到未提交的修改；事务回滚时直接丢弃
+- 有未提交增量的会话计算自己的项目概要时，临时把增量叠加到共享状态上（计算后撤销）
+- 在该事务第一次写入之后才建立的状态可能已包含本次提交，提交时作废而不是叠加增量
+- 直接修改数据库后可调用 invalidate() 重新计算
+
+状态按数据库引擎分别保存，同一进程访问多个数据库（如测试中的临时库）时互不影响。
+"""
+import bisect
+import heapq
+import threading
+import weakref
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, object_session
+
+from core.timeline import effective_bounds, from_microseconds, to_microseconds
+from models.entities import Task
+from models.project_stats import loaded_values, task_changes
+
+_SESSION_KEY = "progress_engine_pending"
+_ONE_DAY = timedelta(days=1)
+_DATE_FIELDS = ("planned_start_date", "planned_end_date", "actual_start_date", "actual_end_date")
+
+
+class LazyHeap:
+    """
+    支持删除任意值的堆（延迟删除）
+
+    Args:
+        largest: 为True时堆顶为最大值
+    """
+
+    def __init__(self, largest: bool = False):
+        self.largest = largest
+        self._heap: List = []
+        self._removed: Counter = Counter()
+
+    def _key(self, value: datetime):
+        # 最大堆：datetime 不能取负，用与 datetime.min 的差取负
+        return datetime.min - value if self.largest else value
+
+    def push(self, value: datetime):
+        heapq.heappush(self._heap, self._key(value))
+
+    def remove(self, value: datetime):
+        self._removed[self._key(value)] += 1
+
+    def extend(self, values: Iterable[datetime]):
+        self._heap.extend(self._key(value) for value in values)
+        heapq.heapify(self._heap)
+
+    def top(self) -> Optional[datetime]:
+        """堆顶值，堆为空时返回None"""
+        while self._heap and self._removed[self._heap[0]]:
+            self._removed[heapq.heappop(self._heap)] -= 1
+        if not self._heap:
+            return None
+        key = self._heap[0]
+        return datetime.min - key if self.largest else key
+
+
+class ProjectProgressState:
+    """单个项目的进度状态"""
+
+    def __init__(self, loaded_at: int = 0, owner: Optional["_PendingWrites"] = None):
+        # 建立状态时的写入序号，以及建立状态的写入中的会话（见 ProgressEngine）
+        self.loaded_at = loaded_at
+        self.owner = owner
+        self.planned_days = 0
+        self.closed_actual_days = 0
+        self.open_starts: List[datetime] = []
+        self.starts = LazyHeap()
+        self.ends = LazyHeap(largest=True)
+
+    def add(self, values: Mapping, sign: int = 1):
+        """
+        计入（sign=1）或移除（sign=-1）一个任务
+
+        Args:
+            values: 任务的计划/实际起止日期
+        """
+        self._add_days(values, sign)
+        actual_start, actual_end = values.get("actual_start_date"), values.get("actual_end_date")
+        start = actual_start or values.get("planned_start_date")
+        end = actual_end or values.get("planned_end_date")
+        if start:
+            self.starts.push(start) if sign > 0 else self.starts.remove(start)
+        if end:
+            self.ends.push(end) if sign > 0 else self.ends.remove(end)
+
+    def load(self, rows: Iterable[Mapping]):
+        """从项目的全部任务建立状态，开始/结束时间按列交给 core.timeline 计算"""
+        columns = {field: [] for field in _DATE_FIELDS}
+        for values in rows:
+            self._add_days(values, 1)
+            for field in _DATE_FIELDS:
+                columns[field].append(to_microseconds(values.get(field)))
+        starts, ends = effective_bounds(*(columns[field] for field in _DATE_FIELDS))
+        self.starts.extend(from_microseconds(value) for value in starts if value is not None)
+        self.ends.extend(from_microseconds(value) for value in ends if value is not None)
+
+    def _add_days(self, values: Mapping, sign: int):
+        """计入/移除任务的计划天数、实际天数和进行中任务的开始日期"""
+        planned_start, planned_end = values.get("planned_start_date"), values.get("planned_end_date")
+        actual_start, actual_end = values.get("actual_start_date"), values.get("actual_end_date")
+
+        if planned_start and planned_end:
+            self.planned_days += sign * max((planned_end - planned_start).days, 0)
+
+        if actual_start and actual_end:
+            self.closed_actual_days += sign * max((actual_end - actual_start).days, 0)
+        elif actual_start:
+            if sign > 0:
+                bisect.insort(self.open_starts, actual_start)
+            else:
+                index = bisect.bisect_left(self.open_starts, actual_start)
+                if index == len(self.open_starts) or self.open_starts[index] != actual_start:
+                    raise ValueError(f"进行中任务的开始日期不在状态中: {actual_start}")
+                del self.open_starts[index]
+
+    def progress(self, now: Optional[datetime] = None) -> float:
+        """项目进度 = 实际进行总天数 / 计划总天数 × 100%（进度字段有 0-100 的检查约束，超出计划按100%计）"""
+        if self.planned_days == 0:
+            return 0.0
+        now = now or datetime.now()
+        # 开始不满一天的进行中任务贡献为0，只遍历有序列表中更早开始的部分
+        started = bisect.bisect_right(self.open_starts, now - _ONE_DAY)
+        open_days = sum((now - start).days for start in self.open_starts[:started])
+        return min(100.0, (self.closed_actual_days + open_days) / self.planned_days * 100.0)
+
+    def dates(self) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """项目起止时间：任务开始日期的最小值和结束日期的最大值"""
+        return self.starts.top(), self.ends.top()
+
+
+class _PendingWrites:
+    """一个会话中尚未提交的增量"""
+    __slots__ = ("since", "deltas", "invalid")
+
+    def __init__(self, since: int):
+        # 本事务第一次写入时的写入序号
+        self.since = since
+        # (数据库引擎, 项目ID) -> [(任务日期, 符号)]
+        self.deltas: Dict[Tuple[Engine, int], List[Tuple[Dict, int]]] = {}
+        # 无法确定增量、提交时需要作废的项目（项目ID为None表示该数据库的全部项目）
+        self.invalid: Set[Tuple[Engine, Optional[int]]] = set()
+
+
+class ProgressEngine:
+    """
+    项目进度状态管理器
+
+    功能：
+    - 按数据库和项目缓存已提交数据的进度状态，首次访问时从任务表加载
+    - 会话提交时应用该会话的增量，回滚时丢弃
+    - 线程安全
+    """
+
+    def __init__(self):
+        # 数据库引擎 -> 项目ID -> 状态；引擎被回收时随之释放
+        self._states: "weakref.WeakKeyDictionary[Engine, Dict[int, ProjectProgressState]]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        # 写入序号：每次有会话开始写入或建立状态时递增
+        self._sequence = 0
+
+    def _next_sequence(self) -> int:
+        """递增写入序号（调用方持有锁）"""
+        self._sequence += 1
+        return self._sequence
+
+    @staticmethod
+    def _load(db: Session, project_id: int, loaded_at: int = 0,
+              owner: Optional[_PendingWrites] = None) -> ProjectProgressState:
+        """从任务表完整计算项目状态（包含该会话已 flush 的修改）"""
+        state = ProjectProgressState(loaded_at, owner)
+        rows = db.query(*(getattr(Task, field) for field in _DATE_FIELDS)).filter(Task.project_id == project_id).all()
+        state.load(row._mapping for row in rows)
+        return state
+
+    def summary(self, db: Session, project_id: int,
+                now: Optional[datetime] = None) -> Tuple[float, Optional[datetime], Optional[datetime]]:
+        """
+        计算项目进度和起止时间（包含该会话尚未提交的修改）
+
+        Returns:
+            (进度, 开始时间, 结束时间)
+        """
+        bind = db.get_bind()
+        key = (bind, project_id)
+        pending: Optional[_PendingWrites] = db.info.get(_SESSION_KEY)
+        if pending is not None and (key in pending.invalid or (bind, None) in pending.invalid):
+            state = self._load(db, project_id)
+            return (state.progress(now), *state.dates())
+
+        deltas = pending.deltas.get(key, []) if pending is not None else []
+        with self._lock:
+            states = self._states.setdefault(bind, {})
+            state = states.get(project_id)
+            if state is None:
+                state = self._load(db, project_id, self._next_sequence(), pending if deltas else None)
+                try:
+                    # 读取的数据包含本会话已 flush 的修改，撤销后才是已提交的数据
+                    for values, sign in reversed(deltas):
+                        state.add(values, -sign)
+                except ValueError:
+                    state = self._load(db, project_id)
+                    return (state.progress(now), *state.dates())
+                states[project_id] = state
+            applied = []
+            try:
+                for values, sign in deltas:
+                    state.add(values, sign)
+                    applied.append((values, sign))
+                start_date, end_date = state.dates()
+                return state.progress(now), start_date, end_date
+            except ValueError:
+                del states[project_id]
+                applied = []
+                state = self._load(db, project_id)
+                return (state.progress(now), *state.dates())
+            finally:
+                for values, sign in reversed(applied):
+                    state.add(values, -sign)
+
+    def record(self, db: Optional[Session], bind: Engine, project_id: Optional[int], values: Mapping, sign: int = 1):
+        """
+        记录会话中一个任务的增量，提交后应用到共享状态
+
+        Args:
+            bind: 任务所在的数据库引擎
+        """
+        if db is None or project_id is None:
+            return
+        self._pending(db).deltas.setdefault((bind, project_id), []).append(
+            ({field: values.get(field) for field in _DATE_FIELDS}, sign)
+        )
+
+    def record_invalid(self, db: Optional[Session], bind: Engine, project_ids: Optional[Iterable[int]]):
+        """记录无法确定增量的项目（为None时为全部项目），提交时作废"""
+        if db is None:
+            self.invalidate(project_ids, bind)
+            return
+        keys = [(bind, None)] if project_ids is None else [(bind, project_id) for project_id in project_ids]
+        self._pending(db).invalid.update(keys)
+
+    def _pending(self, db: Session) -> _PendingWrites:
+        pending = db.info.get(_SESSION_KEY)
+        if pending is None:
+            with self._lock:
+                pending = db.info[_SESSION_KEY] = _PendingWrites(self._next_sequence())
+        return pending
+
+    def apply_inserted(self, db: Session, rows: Iterable[Mapping]):
+        """计入不经过映射事件插入的任务"""
+        bind = db.get_bind()
+        for row in rows:
+            self.record(db, bind, row["project_id"], row)
+
+    def commit(self, pending: _PendingWrites):
+        """把已提交事务的增量应用到共享状态"""
+        with self._lock:
+            for (bind, project_id), deltas in pending.deltas.items():
+                states = self._states.get(bind, {})
+                state = states.get(project_id)
+                if state is None:
+                    continue
+                if (bind, project_id) in pending.invalid or (state.loaded_at > pending.since
+                                                             and state.owner is not pending):
+                    # 状态由其他会话在本事务写入之后建立，可能已包含本次提交
+                    del states[project_id]
+                    continue
+                try:
+                    for values, sign in deltas:
+                        state.add(values, sign)
+                except ValueError:
+                    del states[project_id]
+            for bind, project_id in pending.invalid:
+                if project_id is None:
+                    self._states.get(bind, {}).clear()
+                else:
+                    self._states.get(bind, {}).pop(project_id, None)
+
+    def invalidate(self, project_ids: Optional[Iterable[int]] = None, bind: Optional[Engine] = None):
+        """
+        作废项目状态，下次访问时重新计算
+
+        Args:
+            project_ids: 项目ID，默认全部项目
+            bind: 数据库引擎，默认全部数据库
+        """
+        with self._lock:
+            binds = list(self._states.keys()) if bind is None else [bind]
+            for key in binds:
+                states = self._states.get(key)
+                if states is None:
+                    continue
+                if project_ids is None:
+                    states.clear()
+                    continue
+                for project_id in project_ids:
+                    states.pop(project_id, None)
+
+
+# 全局进度状态管理器
+_progress_engine = ProgressEngine()
+
+
+def get_progress_engine() -> ProgressEngine:
+    """获取全局进度状态管理器"""
+    return _progress_engine
+
+
+def _record(connection, target, project_id, values, sign=1):
+    _progress_engine.record(object_session(target), connection.engine, project_id, values, sign)
+
+
+@event.listens_for(Task, "after_insert")
+def _task_inserted(mapper, connection, target):
+    _record(connection, target, target.project_id, target.__dict__)
+
+
+@event.listens_for(Task, "after_update")
+def _task_updated(mapper, connection, target):
+    changes = task_changes(target)
+    if changes is None:
+        _progress_engine.record_invalid(object_session(target), connection.engine, {target.project_id})
+        return
+    old_values, new_values, changed = changes
+    if not changed:
+        return
+    _record(connection, target, old_values["project_id"], old_values, -1)
+    _record(connection, target, new_values["project_id"], new_values)
+
+
+@event.listens_for(Task, "after_delete")
+def _task_deleted(mapper, connection, target):
+    values = loaded_values(target)
+    if values is None:
+        project_id = target.__dict__.get("project_id")
+        _progress_engine.record_invalid(
+            object_session(target), connection.engine, None if project_id is None else {project_id}
+        )
+        return
+    _record(connection, target, values["project_id"], values, -1)
+
+
+@event.listens_for(Session, "after_commit")
+def _committed(session):
+    pending = session.info.pop(_SESSION_KEY, None)
+    if pending is not None:
+        _progress_engine.commit(pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _rolled_back(session, previous_transaction):
+    # 增量尚未应用到共享状态，直接丢弃
+    session.info.pop(_SESSION_KEY, None)
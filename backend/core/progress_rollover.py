@@ -0,0 +1,259 @@
+"""
+项目和任务进度的每日滚动计算
+
+进行中任务（有实际开始日期、没有实际结束日期）的进度与当天日期有关，存储的 progress
+每过一天就会过期。rollover_progress 用集合式 SQL 一次性重新计算：
+- 进行中任务的进度：规则同 core.task_utils.calculate_task_progress
+- 有进行中任务的项目的进度：规则同 api.project.calculate_project_progress，计划总天数和
+  已完成任务的实际总天数取自项目任务统计表（project_stats），只对进行中任务按当天日期累加
+
+计算时间（as-of）保存在 configurations 表的 progress_as_of 配置项中，读取接口直接返回
+存储的进度和 as-of，不再逐个请求重新计算。
+
+ProgressScheduler 在 FastAPI lifespan 中启动，每天定时执行一次；启动时上次计算早于当天
+则立即补算一次。也可以调用 POST /api/v1/projects/progress/rollover 手动执行。
+
+环境变量：
+- PROGRESS_ROLLOVER_ENABLED: 是否启用每日定时计算（默认 true）
+- PROGRESS_ROLLOVER_TIME: 每天执行的本地时间 HH:MM（默认 00:05）
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, time, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import Float, Integer, and_, case, cast, exists, func, select, update
+from sqlalchemy.orm import Session
+
+from models.entities import ConfigCategory, Configuration, Project, ProjectStats, Task
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_AS_OF_KEY = "progress_as_of"
+DEFAULT_ROLLOVER_TIME = "00:05"
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _parse_time(value: str) -> time:
+    """解析 HH:MM 格式的时间，格式错误时使用默认值"""
+    try:
+        hour, minute = value.strip().split(":")
+        return time(int(hour), int(minute))
+    except (ValueError, AttributeError):
+        logger.warning(f"PROGRESS_ROLLOVER_TIME 格式错误: {value}，使用默认值 {DEFAULT_ROLLOVER_TIME}")
+        return _parse_time(DEFAULT_ROLLOVER_TIME)
+
+
+def _days_between(start, end):
+    """两个日期相差的整天数（同 timedelta.days，负数截断的差异在使用处被下限0吸收）"""
+    return cast(func.julianday(end) - func.julianday(start), Integer)
+
+
+def _open_task_filter():
+    """进行中任务：有实际开始日期、没有实际结束日期"""
+    return and_(Task.actual_start_date.isnot(None), Task.actual_end_date.is_(None))
+
+
+def rollover_progress(db: Session, now: Optional[datetime] = None) -> Dict:
+    """
+    按当前日期重新计算进行中任务和对应项目的进度，并记录计算时间（不提交事务）
+
+    Args:
+        db: 数据库会话
+        now: 计算时间，默认当前时间
+
+    Returns:
+        Dict: as_of（计算时间）、task_count / project_count（更新的任务数和项目数）
+    """
+    now = now or datetime.now()
+    # 批量更新不经过 before_update 事件，按事件的方式显式更新 updated_at（对话上下文等按它判断变化）
+    written_at = datetime.now()
+
+    # 进行中任务：已进行天数 / (计划结束 - 实际开始) 天数，限制在 0-100
+    elapsed_days = _days_between(Task.actual_start_date, now)
+    total_days = _days_between(Task.actual_start_date, Task.planned_end_date)
+    task_progress = case(
+        (and_(Task.planned_end_date.isnot(None), total_days > 0),
+         func.max(0.0, func.min(100.0, cast(elapsed_days, Float) / total_days * 100.0))),
+        else_=0.0
+    )
+    task_result = db.execute(
+        update(Task).where(_open_task_filter()).values(progress=task_progress, updated_at=written_at)
+        .execution_options(synchronize_session=False)
+    )
+
+    # 项目：(已完成任务实际天数 + 进行中任务已进行天数) / 计划总天数
+    open_days = (
+        select(func.coalesce(func.sum(func.max(_days_between(Task.actual_start_date, now), 0)), 0))
+        .where(Task.project_id == Project.id, _open_task_filter())
+        .scalar_subquery()
+    )
+
+    def stats_column(column):
+        return func.coalesce(
+            select(column).where(ProjectStats.project_id == Project.id).scalar_subquery(), 0
+        )
+
+    planned_days = stats_column(ProjectStats.planned_days)
+    # 进度字段有 0-100 的检查约束，超出计划天数的项目按100%计
+    project_progress = case(
+        (planned_days > 0,
+         func.min(100.0, cast(stats_column(ProjectStats.actual_days) + open_days, Float) / planned_days * 100.0)),
+        else_=0.0
+    )
+    project_result = db.execute(
+        update(Project)
+        .where(exists().where(Task.project_id == Project.id, _open_task_filter()))
+        .values(progress=project_progress, updated_at=written_at)
+        .execution_options(synchronize_session=False)
+    )
+
+    _save_as_of(db, now)
+    return {
+        "as_of": now,
+        "task_count": task_result.rowcount,
+        "project_count": project_result.rowcount,
+    }
+
+
+def _save_as_of(db: Session, as_of: datetime):
+    config = db.query(Configuration).filter(Configuration.key == PROGRESS_AS_OF_KEY).first()
+    if not config:
+        config = Configuration(
+            key=PROGRESS_AS_OF_KEY,
+            category=ConfigCategory.SYSTEM.value,
+            description="项目和任务进度的计算时间"
+        )
+        db.add(config)
+    config.value = as_of.isoformat()
+    config.updated_at = datetime.now()
+
+
+def load_as_of(db: Session) -> Optional[datetime]:
+    """读取上次进度计算的时间，未计算过时返回None"""
+    value = db.query(Configuration.value).filter(Configuration.key == PROGRESS_AS_OF_KEY).scalar()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class ProgressScheduler:
+    """
+    每日进度计算调度器
+
+    功能：
+    - 每天在 run_at 时间执行一次 rollover_progress
+    - 启动时上次计算早于当天则立即补算
+    - 手动执行（run），同一时间只执行一次
+    - 缓存最近一次计算时间，读取接口无需查询数据库
+
+    Args:
+        session_factory: 创建数据库会话的工厂，默认使用 models.database.SessionLocal
+        run_at: 每天执行的时间
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, run_at: Optional[time] = None):
+        self._session_factory = session_factory
+        self.run_at = run_at or _parse_time(os.getenv("PROGRESS_ROLLOVER_TIME", DEFAULT_ROLLOVER_TIME))
+        self.as_of: Optional[datetime] = None
+        self._run_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def _session(self) -> Session:
+        if self._session_factory is None:
+            from models.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def load(self) -> Optional[datetime]:
+        """从数据库加载上次计算时间"""
+        db = self._session()
+        try:
+            self.as_of = load_as_of(db)
+        finally:
+            db.close()
+        return self.as_of
+
+    def run(self, now: Optional[datetime] = None) -> Dict:
+        """立即执行一次进度计算并提交（阻塞调用，异步代码中应放到线程中执行）"""
+        with self._run_lock:
+            db = self._session()
+            try:
+                result = rollover_progress(db, now)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+            self.as_of = result["as_of"]
+        logger.info(
+            f"进度计算完成: 任务 {result['task_count']} 个，项目 {result['project_count']} 个，"
+            f"as-of {result['as_of'].isoformat()}"
+        )
+        return result
+
+    def seconds_until_next_run(self, now: Optional[datetime] = None) -> float:
+        """距离下一次定时执行的秒数"""
+        now = now or datetime.now()
+        next_run = datetime.combine(now.date(), self.run_at)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    def is_stale(self, now: Optional[datetime] = None) -> bool:
+        """上次计算是否早于当天"""
+        now = now or datetime.now()
+        return self.as_of is None or self.as_of.date() < now.date()
+
+    async def _loop(self):
+        delay = 0.0 if self.is_stale() else self.seconds_until_next_run()
+        while True:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                # 在线程中执行，完整执行完才响应停止，避免中途关闭连接池
+                await asyncio.to_thread(self.run)
+            except Exception as e:
+                logger.error(f"定时进度计算失败: {e}")
+            delay = self.seconds_until_next_run()
+
+    async def start(self):
+        """加载上次计算时间并启动定时任务（PROGRESS_ROLLOVER_ENABLED=false 时只加载）"""
+        await asyncio.to_thread(self.load)
+        if not _env_flag("PROGRESS_ROLLOVER_ENABLED", True) or self._task is not None:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """停止定时任务，等待正在执行的计算完成"""
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+
+# 全局进度计算调度器
+_progress_scheduler = ProgressScheduler()
+
+
+def get_progress_scheduler() -> ProgressScheduler:
+    """获取全局进度计算调度器"""
+    return _progress_scheduler
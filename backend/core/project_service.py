@@ -3,14 +3,19 @@
 封装项目和任务的创建、更新、删除操作
 """
 import logging
-from datetime import datetime
+from datetime import date, datetime
 from typing import Dict, List, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
 
-from models.entities import Project, Task, ProjectCategory
+from models.entities import Project, Task, TaskDependency, ProjectCategory
 from models.schemas import ProjectCreate, ProjectUpdate, TaskCreate, TaskUpdate
 from api.project import update_project_summary
+from core.name_resolver import get_name_resolver
+from core.name_suggester import get_name_suggester
+from core.progress_engine import get_progress_engine
+from core.scheduling import DependencyCycleError, load_schedule, push_successors, shift_to_earliest
 
 
 class ProjectService:
@@ -25,6 +30,18 @@ class ProjectService:
         """
         self.db = db
     
+    def _find_project(self, name: Optional[str]) -> Optional[Project]:
+        """按名称查找项目（经名称解析缓存，不存在时返回None）"""
+        return get_name_resolver().project(self.db, name)
+    
+    def _find_category(self, name: Optional[str]) -> Optional[ProjectCategory]:
+        """按名称查找项目大类（经名称解析缓存，不存在时返回None）"""
+        return get_name_resolver().category(self.db, name)
+    
+    def _find_task(self, project_id: int, name: Optional[str]) -> Optional[Task]:
+        """按名称查找项目中的任务（经名称解析缓存，不存在时返回None）"""
+        return get_name_resolver().task(self.db, project_id, name)
+    
     def create_project(self, project_data: Dict) -> Dict:
         """
         创建项目
@@ -37,9 +54,7 @@ class ProjectService:
         """
         try:
             # 检查项目是否已存在
-            existing_project = self.db.query(Project).filter(
-                Project.name == project_data.get("project_name")
-            ).first()
+            existing_project = self._find_project(project_data.get("project_name"))
             
             if existing_project:
                 return {
@@ -97,9 +112,7 @@ class ProjectService:
         try:
             # 查找项目
             project_name = project_data.get("project_name")
-            project = self.db.query(Project).filter(
-                Project.name == project_name
-            ).first()
+            project = self._find_project(project_name)
             
             if not project:
                 return {
@@ -119,7 +132,7 @@ class ProjectService:
                 project.status = project_data.get("status")
             
             # 更新项目概要信息
-            update_project_summary(project.id, self.db)
+            update_project_summary(project.id, self.db, commit=False)
             
             self.db.commit()
             self.db.refresh(project)
@@ -149,9 +162,7 @@ class ProjectService:
             Dict: 项目信息
         """
         try:
-            project = self.db.query(Project).filter(
-                Project.name == project_name
-            ).first()
+            project = self._find_project(project_name)
             
             if not project:
                 return {
@@ -184,15 +195,17 @@ class ProjectService:
             Dict: 项目列表
         """
         try:
-            projects = self.db.query(Project).all()
+            # 任务数量读取项目任务统计表，不加载任务
+            projects = self.db.query(Project).options(
+                selectinload(Project.category),
+                selectinload(Project.stats)
+            ).all()
             project_list = []
             
             for project in projects:
                 project_data = project.to_dict()
-                project_data['task_count'] = len(project.tasks)
-                project_data['completed_task_count'] = len([
-                    task for task in project.tasks if task.status == 'completed'
-                ])
+                project_data['task_count'] = project.stats.task_count if project.stats else 0
+                project_data['completed_task_count'] = project.stats.completed_count if project.stats else 0
                 project_list.append(project_data)
             
             return {
@@ -236,9 +249,7 @@ class ProjectService:
                 }
 
             # 查找项目
-            project = self.db.query(Project).filter(
-                Project.name == project_name
-            ).first()
+            project = self._find_project(project_name)
 
             if not project:
                 return {
@@ -248,10 +259,7 @@ class ProjectService:
                 }
 
             # 检查任务是否已存在
-            existing_task = self.db.query(Task).filter(
-                Task.project_id == project.id,
-                Task.name == task_data.get("name")
-            ).first()
+            existing_task = self._find_task(project.id, task_data.get("name"))
             
             if existing_task:
                 return {
@@ -288,7 +296,30 @@ class ProjectService:
         Returns:
             Task: 创建的任务
         """
-        task = Task(
+        task = self._build_task(project_id, task_data)
+        
+        self.db.add(task)
+        self.db.flush()
+        
+        # 更新项目概要信息，与任务在同一事务中提交
+        update_project_summary(project_id, self.db, commit=False)
+        self.db.commit()
+        self.db.refresh(task)
+        
+        return task
+    
+    def _build_task(self, project_id: int, task_data: Dict) -> Task:
+        """
+        根据任务数据构建任务对象（不写入数据库）
+        
+        Args:
+            project_id: 项目ID
+            task_data: 任务数据
+            
+        Returns:
+            Task: 任务对象
+        """
+        return Task(
             project_id=project_id,
             name=task_data.get("name"),
             assignee=task_data.get("assignee"),
@@ -301,15 +332,6 @@ class ProjectService:
             status="pending",
             priority=self._get_priority_value(task_data.get("priority"))
         )
-        
-        self.db.add(task)
-        self.db.commit()
-        self.db.refresh(task)
-        
-        # 更新项目概要信息
-        update_project_summary(project_id, self.db)
-        
-        return task
     
     def _get_priority_value(self, priority: Optional[str]) -> int:
         """
@@ -371,9 +393,7 @@ class ProjectService:
 
             # 查找项目
             logger.debug(f"[core.project_service] 查找项目: {project_name}")
-            project = self.db.query(Project).filter(
-                Project.name == project_name
-            ).first()
+            project = self._find_project(project_name)
 
             if not project:
                 logger.error(f"[core.project_service] 项目 '{project_name}' 不存在")
@@ -386,10 +406,7 @@ class ProjectService:
 
             # 查找任务
             logger.debug(f"[core.project_service] 查找任务: {task_name} 在项目: {project.name}")
-            task = self.db.query(Task).filter(
-                Task.project_id == project.id,
-                Task.name == task_name
-            ).first()
+            task = self._find_task(project.id, task_name)
             
             if not task:
                 logger.error(f"[core.project_service] 任务 '{task_name}' 不存在于项目 '{project_name}' 中")
@@ -401,51 +418,22 @@ class ProjectService:
             logger.debug(f"[core.project_service] 找到任务: {task.name}, ID: {task.id}")
 
             # 准备更新数据
-            logger.debug("[core.project_service] 准备更新数据")
-            update_data = {}
-            if "planned_start_date" in task_data:
-                logger.debug(f"[core.project_service] 设置planned_start_date: {task_data['planned_start_date']}")
-                update_data["planned_start_date"] = task_data["planned_start_date"]
-            if "planned_end_date" in task_data:
-                logger.debug(f"[core.project_service] 设置planned_end_date: {task_data['planned_end_date']}")
-                update_data["planned_end_date"] = task_data["planned_end_date"]
-            if "actual_start_date" in task_data:
-                logger.debug(f"[core.project_service] 设置actual_start_date: {task_data['actual_start_date']}")
-                update_data["actual_start_date"] = task_data["actual_start_date"]
-            if "actual_end_date" in task_data:
-                logger.debug(f"[core.project_service] 设置actual_end_date: {task_data['actual_end_date']}")
-                update_data["actual_end_date"] = task_data["actual_end_date"]
-            if "assignee" in task_data:
-                logger.debug(f"[core.project_service] 设置assignee: {task_data['assignee']}")
-                update_data["assignee"] = task_data["assignee"]
-            if "priority" in task_data:
-                logger.debug(f"[core.project_service] 设置priority: {task_data['priority']}")
-                priority_value = task_data["priority"]
-                # 使用现有的_get_priority_value方法处理优先级
-                if isinstance(priority_value, str):
-                    priority_value = self._get_priority_value(priority_value)
-                update_data["priority"] = priority_value
-            if "status" in task_data:
-                logger.debug(f"[core.project_service] 设置status: {task_data['status']}")
-                update_data["status"] = task_data["status"]
-            logger.debug(f"[core.project_service] 更新数据准备完成: {update_data}")
-
-            # 使用工具类更新任务
-            from core.task_utils import update_task_in_db
-            from models.schemas import TaskUpdate
-            
-            # 创建 TaskUpdate 对象
-            logger.debug(f"[core.project_service] 创建TaskUpdate对象，数据: {update_data}")
-            task_update = TaskUpdate(**update_data)
-            
-            # 调用工具类方法更新任务
-            logger.debug(f"[core.project_service] 调用update_task_in_db函数更新任务")
-            updated_task = update_task_in_db(task, task_update, self.db)
+            task_update = self._build_task_update(task_data)
+            
+            # 调用工具类方法更新任务，与项目概要信息在同一事务中提交
+            from core.task_utils import apply_task_update
+            logger.debug(f"[core.project_service] 调用apply_task_update函数更新任务")
+            updated_task = apply_task_update(task, task_update)
+            # 计划日期变化时重新计算排期，顺延下游任务
+            if "planned_start_date" in task_data or "planned_end_date" in task_data:
+                shifted = push_successors(self.db, updated_task)
+                logger.debug(f"[core.project_service] 顺延下游任务: {[item.name for item in shifted]}")
+            self.db.flush()
+            update_project_summary(task.project_id, self.db, commit=False)
+            self.db.commit()
+            self.db.refresh(updated_task)
             logger.debug(f"[core.project_service] 任务更新成功，ID: {updated_task.id}")
             
-            # 更新项目概要信息
-            update_project_summary(task.project_id, self.db)
-            
             return {
                 "success": True,
                 "message": f"任务 '{task.name}' 更新成功",
@@ -463,6 +451,52 @@ class ProjectService:
                 "data": None
             }
     
+    def _build_task_update(self, task_data: Dict) -> TaskUpdate:
+        """
+        从AI指令的任务数据中提取可更新字段
+
+        Args:
+            task_data: 任务数据
+
+        Returns:
+            TaskUpdate: 任务更新数据
+        """
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        logger.debug("[core.project_service] 准备更新数据")
+        update_data = {}
+        if "planned_start_date" in task_data:
+            logger.debug(f"[core.project_service] 设置planned_start_date: {task_data['planned_start_date']}")
+            update_data["planned_start_date"] = task_data["planned_start_date"]
+        if "planned_end_date" in task_data:
+            logger.debug(f"[core.project_service] 设置planned_end_date: {task_data['planned_end_date']}")
+            update_data["planned_end_date"] = task_data["planned_end_date"]
+        if "actual_start_date" in task_data:
+            logger.debug(f"[core.project_service] 设置actual_start_date: {task_data['actual_start_date']}")
+            update_data["actual_start_date"] = task_data["actual_start_date"]
+        if "actual_end_date" in task_data:
+            logger.debug(f"[core.project_service] 设置actual_end_date: {task_data['actual_end_date']}")
+            update_data["actual_end_date"] = task_data["actual_end_date"]
+        if "assignee" in task_data:
+            logger.debug(f"[core.project_service] 设置assignee: {task_data['assignee']}")
+            update_data["assignee"] = task_data["assignee"]
+        if "priority" in task_data:
+            logger.debug(f"[core.project_service] 设置priority: {task_data['priority']}")
+            priority_value = task_data["priority"]
+            # 使用现有的_get_priority_value方法处理优先级
+            if isinstance(priority_value, str):
+                priority_value = self._get_priority_value(priority_value)
+            update_data["priority"] = priority_value
+        if "status" in task_data:
+            logger.debug(f"[core.project_service] 设置status: {task_data['status']}")
+            update_data["status"] = task_data["status"]
+        logger.debug(f"[core.project_service] 更新数据准备完成: {update_data}")
+        
+        # 创建 TaskUpdate 对象
+        logger.debug(f"[core.project_service] 创建TaskUpdate对象，数据: {update_data}")
+        return TaskUpdate(**update_data)
+    
     def delete_project(self, project_name: str) -> Dict:
         """
         删除项目
@@ -497,9 +531,7 @@ class ProjectService:
                 for name in project_name:
                     try:
                         # 查找项目
-                        project = self.db.query(Project).filter(
-                            Project.name == name
-                        ).first()
+                        project = self._find_project(name)
                         
                         if project:
                             # 删除项目（级联删除相关任务）
@@ -548,9 +580,7 @@ class ProjectService:
             
             # 如果是字符串，删除单个项目
             # 查找项目
-            project = self.db.query(Project).filter(
-                Project.name == project_name
-            ).first()
+            project = self._find_project(project_name)
             
             if not project:
                 return {
@@ -599,9 +629,7 @@ class ProjectService:
                 }
             
             # 检查项目大类是否已存在
-            existing_category = self.db.query(ProjectCategory).filter(
-                ProjectCategory.name == category_name
-            ).first()
+            existing_category = self._find_category(category_name)
             
             if existing_category:
                 return {
@@ -655,9 +683,7 @@ class ProjectService:
                 }
             
             # 查找项目大类
-            category = self.db.query(ProjectCategory).filter(
-                ProjectCategory.name == category_name
-            ).first()
+            category = self._find_category(category_name)
             
             if not category:
                 return {
@@ -707,9 +733,7 @@ class ProjectService:
                 }
             
             # 查找项目大类
-            category = self.db.query(ProjectCategory).filter(
-                ProjectCategory.name == category_name
-            ).first()
+            category = self._find_category(category_name)
             
             if not category:
                 return {
@@ -760,9 +784,7 @@ class ProjectService:
             Dict: 项目大类信息
         """
         try:
-            category = self.db.query(ProjectCategory).filter(
-                ProjectCategory.name == category_name
-            ).first()
+            category = self._find_category(category_name)
             
             if not category:
                 return {
@@ -799,14 +821,15 @@ class ProjectService:
         """
         try:
             categories = self.db.query(ProjectCategory).all()
+            # 各大类的关联项目数量（一次分组查询）
+            project_counts = dict(self.db.query(
+                Project.category_id, func.count(Project.id)
+            ).filter(Project.category_id.isnot(None)).group_by(Project.category_id).all())
             category_list = []
             
             for category in categories:
                 category_data = category.to_dict()
-                # 添加关联项目数量
-                category_data['project_count'] = self.db.query(Project).filter(
-                    Project.category_id == category.id
-                ).count()
+                category_data['project_count'] = project_counts.get(category.id, 0)
                 category_list.append(category_data)
             
             return {
@@ -822,70 +845,48 @@ class ProjectService:
                 "data": []
             }
     
-    def find_similar_projects(self, project_name: str) -> list:
+    def find_similar_projects(self, project_name: str, limit: int = 5) -> list:
         """
         查找与给定名称相似的项目
 
+        使用内存中的名称 n-gram 索引（见 core.name_suggester），按相似度从高到低排序；
+        没有相似项目且项目总数不超过 limit 时返回全部项目名称（供用户选择）
+
         Args:
             project_name: 项目名称
+            limit: 最多返回的项目数
 
         Returns:
             list: 相似的项目名称列表
         """
-        try:
-            # 查找名称相似的项目（使用LIKE查询）
-            projects = self.db.query(Project).filter(
-                Project.name.like(f"%{project_name}%")
-            ).all()
-            
-            # 如果没有找到，查找项目名称是否包含在输入中
-            if not projects:
-                projects = self.db.query(Project).filter(
-                    Project.name.like(f"%{project_name}%")
-                ).all()
-            
-            # 如果还是没有找到，返回所有项目（供用户选择）
-            if not projects:
-                all_projects = self.db.query(Project).all()
-                return [p.name for p in all_projects]
-            
-            return [p.name for p in projects]
-        except Exception as e:
-            logger = logging.getLogger(__name__)
-            logger.error(f"查找相似项目失败: {str(e)}")
-            return []
+        return self._find_similar("projects", project_name, limit)
     
-    def find_similar_categories(self, category_name: str) -> list:
+    def find_similar_categories(self, category_name: str, limit: int = 5) -> list:
         """
         查找与给定名称相似的大类
 
+        规则同 find_similar_projects
+
         Args:
             category_name: 大类名称
+            limit: 最多返回的大类数
 
         Returns:
             list: 相似的项目大类名称列表
         """
+        return self._find_similar("categories", category_name, limit)
+    
+    def _find_similar(self, kind: str, name: str, limit: int) -> list:
         try:
-            # 查找名称相似的大类（使用LIKE查询）
-            categories = self.db.query(ProjectCategory).filter(
-                ProjectCategory.name.like(f"%{category_name}%")
-            ).all()
-            
-            # 如果没有找到，查找大类名称是否包含在输入中
-            if not categories:
-                categories = self.db.query(ProjectCategory).filter(
-                    ProjectCategory.name.like(f"%{category_name}%")
-                ).all()
-            
-            # 如果还是没有找到，返回所有大类
-            if not categories:
-                all_categories = self.db.query(ProjectCategory).all()
-                return [c.name for c in all_categories]
-            
-            return [c.name for c in categories]
+            suggester = get_name_suggester()
+            suggestions = suggester.suggest(self.db, kind, name, limit)
+            if suggestions:
+                return [suggestion.name for suggestion in suggestions]
+            names = suggester.all_names(self.db, kind)
+            return names if len(names) <= limit else []
         except Exception as e:
             logger = logging.getLogger(__name__)
-            logger.error(f"查找相似大类失败: {str(e)}")
+            logger.error(f"查找相似名称失败: {str(e)}")
             return []
     
     def assign_category(self, project_name: str, category_name: str) -> Dict:
@@ -916,9 +917,7 @@ class ProjectService:
                 }
             
             # 查找项目
-            project = self.db.query(Project).filter(
-                Project.name == project_name
-            ).first()
+            project = self._find_project(project_name)
             
             if not project:
                 # 项目不存在，返回相似项目列表
@@ -934,9 +933,7 @@ class ProjectService:
                 }
             
             # 查找项目大类
-            category = self.db.query(ProjectCategory).filter(
-                ProjectCategory.name == category_name
-            ).first()
+            category = self._find_category(category_name)
             
             if not category:
                 # 大类不存在，返回相似大类列表
@@ -998,9 +995,7 @@ class ProjectService:
                 }
             
             # 查找项目
-            project = self.db.query(Project).filter(
-                Project.name == project_name
-            ).first()
+            project = self._find_project(project_name)
             
             if not project:
                 # 项目不存在，返回相似项目列表
@@ -1016,10 +1011,7 @@ class ProjectService:
                 }
             
             # 查找任务
-            task = self.db.query(Task).filter(
-                Task.project_id == project.id,
-                Task.name == task_name
-            ).first()
+            task = self._find_task(project.id, task_name)
             
             if not task:
                 return {
@@ -1032,10 +1024,11 @@ class ProjectService:
             task_name = task.name
             project_id = project.id
             self.db.delete(task)
-            self.db.commit()
+            self.db.flush()
             
-            # 更新项目概要信息
-            update_project_summary(project_id, self.db)
+            # 更新项目概要信息，与任务在同一事务中提交
+            update_project_summary(project_id, self.db, commit=False)
+            self.db.commit()
             
             return {
                 "success": True,
@@ -1071,9 +1064,7 @@ class ProjectService:
                 }
             
             # 查找项目
-            project = self.db.query(Project).filter(
-                Project.name == project_name
-            ).first()
+            project = self._find_project(project_name)
             
             if not project:
                 # 项目不存在，返回相似项目列表
@@ -1088,7 +1079,8 @@ class ProjectService:
                     }
                 }
             
-            # 更新项目概要信息
+            # 作废进度引擎中的项目状态，从任务表完整重新计算
+            get_progress_engine().invalidate({project.id}, self.db.get_bind())
             update_project_summary(project.id, self.db)
             
             # 重新获取项目信息
@@ -1231,33 +1223,199 @@ class ProjectService:
                 "data": None
             }
 
+    
+    def _find_project_task(self, project_id: int, task_id: int) -> Optional[Task]:
+        """按ID查找项目中的任务"""
+        return self.db.query(Task).filter(
+            Task.id == task_id,
+            Task.project_id == project_id
+        ).first()
+    
+    def add_task_dependency(self, project_id: int, task_id: int, predecessor_id: int, lag_days: int = 0) -> Dict:
+        """
+        添加任务依赖（前置任务完成 lag_days 天后任务才能开始）
+
+        添加后尚未开始、计划开始早于最早开始的下游任务按排期顺延。
 
-def ensure_task_order_column(db: Session):
-    """
-    确保 tasks 表有 order 列
+        Args:
+            project_id: 项目ID
+            task_id: 后续任务ID
+            predecessor_id: 前置任务ID（需在同一项目中）
+            lag_days: 延迟天数
+
+        Returns:
+            Dict: 操作结果，data 为依赖关系和被顺延的任务
+        """
+        try:
+            if task_id == predecessor_id:
+                return {
+                    "success": False,
+                    "message": "任务不能依赖自身",
+                    "data": None
+                }
+            
+            task = self._find_project_task(project_id, task_id)
+            predecessor = self._find_project_task(project_id, predecessor_id)
+            if not task or not predecessor:
+                return {
+                    "success": False,
+                    "message": f"任务 ID {task_id if not task else predecessor_id} 不存在于项目中",
+                    "data": None
+                }
+            
+            dependency = self.db.query(TaskDependency).filter(
+                TaskDependency.predecessor_id == predecessor_id,
+                TaskDependency.successor_id == task_id
+            ).first()
+            if dependency is None:
+                dependency = TaskDependency(predecessor_id=predecessor_id, successor_id=task_id, lag_days=lag_days)
+                self.db.add(dependency)
+            else:
+                dependency.lag_days = lag_days
+            self.db.flush()
+            
+            try:
+                schedule = load_schedule(self.db, project_id)
+            except DependencyCycleError:
+                self.db.rollback()
+                return {
+                    "success": False,
+                    "message": f"添加后任务 '{predecessor.name}' 和 '{task.name}' 之间形成循环依赖",
+                    "data": None
+                }
+            
+            shifted = shift_to_earliest(self.db, schedule, schedule.downstream(task_id))
+            self.db.flush()
+            if shifted:
+                update_project_summary(project_id, self.db, commit=False)
+            self.db.commit()
+            
+            return {
+                "success": True,
+                "message": f"任务 '{task.name}' 已设置前置任务 '{predecessor.name}'",
+                "data": {
+                    "dependency": dependency.to_dict(),
+                    "shifted_tasks": [item.to_dict() for item in shifted]
+                }
+            }
+            
+        except Exception as e:
+            self.db.rollback()
+            return {
+                "success": False,
+                "message": f"添加任务依赖失败: {str(e)}",
+                "data": None
+            }
     
-    Args:
-        db: 数据库会话
-    """
-    try:
-        from sqlalchemy import text
-        # 检查 tasks 表是否有 order 列
-        result = db.execute(text("PRAGMA table_info(tasks)"))
-        columns = [row[1] for row in result]
-        
-        if 'order' not in columns:
-            # 添加 order 列
-            db.execute(text("ALTER TABLE tasks ADD COLUMN order INTEGER DEFAULT 0"))
-            db.commit()
-            # 为现有任务设置默认的 order 值
-            tasks = db.execute(text("SELECT id FROM tasks ORDER BY id")).fetchall()
-            for i, task in enumerate(tasks):
-                db.execute(text(f"UPDATE tasks SET order = {i} WHERE id = {task[0]}"))
-            db.commit()
-    except Exception as e:
-        print(f"添加 order 列失败: {str(e)}")
-        db.rollback()
+    def remove_task_dependency(self, project_id: int, task_id: int, predecessor_id: int) -> Dict:
+        """
+        删除任务依赖（已顺延的任务日期不会恢复）
+
+        Args:
+            project_id: 项目ID
+            task_id: 后续任务ID
+            predecessor_id: 前置任务ID
+
+        Returns:
+            Dict: 操作结果
+        """
+        try:
+            dependency = self.db.query(TaskDependency).join(
+                Task, Task.id == TaskDependency.successor_id
+            ).filter(
+                Task.project_id == project_id,
+                TaskDependency.successor_id == task_id,
+                TaskDependency.predecessor_id == predecessor_id
+            ).first()
+            
+            if not dependency:
+                return {
+                    "success": False,
+                    "message": f"任务 ID {task_id} 没有前置任务 ID {predecessor_id}",
+                    "data": None
+                }
+            
+            self.db.delete(dependency)
+            self.db.commit()
+            
+            return {
+                "success": True,
+                "message": "任务依赖已删除",
+                "data": None
+            }
+            
+        except Exception as e:
+            self.db.rollback()
+            return {
+                "success": False,
+                "message": f"删除任务依赖失败: {str(e)}",
+                "data": None
+            }
+    
+    def get_project_schedule(self, project_id: int) -> Dict:
+        """
+        按任务计划日期和依赖关系计算项目排期（关键路径）
+
+        Args:
+            project_id: 项目ID
 
+        Returns:
+            Dict: 操作结果，data 包含各任务的最早/最晚开始和结束、总时差、是否关键，以及关键路径
+        """
+        try:
+            project = self.db.query(Project).filter(Project.id == project_id).first()
+            if not project:
+                return {
+                    "success": False,
+                    "message": f"项目 ID {project_id} 不存在",
+                    "data": None
+                }
+            
+            schedule = load_schedule(self.db, project_id, dependent_only=False)
+            
+            def day(value: int) -> Optional[str]:
+                # 没有任务带计划开始日期时只有相对天数，日期返回 None
+                return date.fromordinal(value).isoformat() if schedule.dated else None
+            
+            return {
+                "success": True,
+                "message": "获取项目排期成功",
+                "data": {
+                    "project_id": project_id,
+                    "start_date": day(schedule.origin),
+                    "finish_date": day(schedule.finish),
+                    "tasks": [
+                        {
+                            "id": item.id,
+                            "predecessors": [
+                                {"id": predecessor, "lag_days": lag}
+                                for predecessor, lag in schedule.predecessors(item.id)
+                            ],
+                            "earliest_start": day(item.earliest_start),
+                            "earliest_finish": day(item.earliest_finish),
+                            "latest_start": day(item.latest_start),
+                            "latest_finish": day(item.latest_finish),
+                            "slack": item.slack,
+                            "critical": item.critical,
+                        }
+                        for item in (schedule.tasks[task_id] for task_id in schedule.order)
+                    ],
+                    "critical_path": schedule.critical_path(),
+                }
+            }
+            
+        except DependencyCycleError as e:
+            return {
+                "success": False,
+                "message": str(e),
+                "data": None
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"获取项目排期失败: {str(e)}",
+                "data": None
+            }
 
 def get_project_service(db: Session) -> ProjectService:
     """
@@ -1269,6 +1427,4 @@ def get_project_service(db: Session) -> ProjectService:
     Returns:
         ProjectService: 项目服务实例
     """
-    # 确保 tasks 表有 order 列
-    ensure_task_order_column(db)
     return ProjectService(db)
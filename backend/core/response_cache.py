@@ -0,0 +1,257 @@
+"""
+LLM回复缓存
+按内容寻址缓存只读请求的LLM回复，避免对未变化的数据重复调用大模型
+
+缓存键为 (模型, 规范化后的消息列表, 数据版本号) 的哈希。项目/任务/大类的任何写入
+都会递增数据版本号（见 models.data_version），旧版本的回复不会再被命中。
+
+- 内存层：LRU + TTL
+- 持久层（可选）：data/llm_cache.db，内存未命中时查询，命中后提升到内存层；
+  同时保存数据版本号，进程重启后继续沿用
+
+环境变量：
+- LLM_CACHE_ENABLED: 是否启用缓存（默认 true）
+- LLM_CACHE_MAX_ENTRIES: 内存层最大条目数（默认 256）
+- LLM_CACHE_TTL: 条目有效期，秒（默认 3600）
+- LLM_CACHE_PERSIST: 是否启用持久层（默认 false）
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from models.data_version import DataVersion, get_data_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 3600.0
+DEFAULT_PERSIST_PATH = Path(__file__).parent.parent.parent / "data" / "llm_cache.db"
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _normalize(content: str) -> str:
+    """合并连续空白，使仅缩进/换行不同的提示词得到相同的缓存键"""
+    return " ".join(content.split())
+
+
+class ResponseCache:
+    """
+    LLM回复缓存
+
+    Args:
+        max_entries: 内存层最大条目数
+        ttl_seconds: 条目有效期（秒）
+        persist_path: 持久层SQLite文件路径，为None时只使用内存层
+        enabled: 为False时 get 始终未命中、set 不保存
+        version: 数据版本，默认使用全局数据版本
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 persist_path: Optional[Path] = None, enabled: bool = True,
+                 version: Optional[DataVersion] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self.enabled = enabled
+        self.version = version or get_data_version()
+        # 键 -> (回复内容, 过期时间)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "persistent_hits": 0, "stores": 0, "evictions": 0, "expirations": 0}
+        if persist_path is not None:
+            self._open_persistent()
+        self.version.add_listener(self._on_version_changed)
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        """根据环境变量创建缓存"""
+        return cls(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+            persist_path=DEFAULT_PERSIST_PATH if _env_flag("LLM_CACHE_PERSIST", False) else None,
+            enabled=_env_flag("LLM_CACHE_ENABLED", True)
+        )
+
+    def make_key(self, model: str, messages: List, version: Optional[int] = None) -> str:
+        """
+        计算缓存键
+
+        Args:
+            model: 模型名称
+            messages: 消息列表（llm.base.Message 或包含 role/content 的字典）
+            version: 构建消息时的数据版本号，默认为当前版本；
+                消息中包含从数据库读取的内容时，应在读取前取得版本号
+
+        Returns:
+            str: 包含当前数据版本号的缓存键
+        """
+        normalized = []
+        for message in messages:
+            if isinstance(message, dict):
+                role, content = message.get("role"), message.get("content") or ""
+            else:
+                role, content = message.role, message.content or ""
+            normalized.append([role, _normalize(content)])
+        payload = json.dumps([model, normalized], ensure_ascii=False, separators=(",", ":"))
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        if version is None:
+            version = self.version.current
+        return f"{version}:{digest}"
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        查询缓存
+
+        Returns:
+            Optional[str]: 命中时返回回复内容，否则返回None
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                content, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return content
+                del self._entries[key]
+                self._stats["expirations"] += 1
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT content, expires_at FROM llm_responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._put(key, row[0], row[1])
+                    self._stats["hits"] += 1
+                    self._stats["persistent_hits"] += 1
+                    return row[0]
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, content: str):
+        """保存回复内容"""
+        if not self.enabled or not content:
+            return
+        # 生成回复期间数据已变化，该回复不会再被命中
+        version = int(key.split(":", 1)[0])
+        if version != self.version.current:
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._put(key, content, expires_at)
+            self._stats["stores"] += 1
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, content, data_version, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, content, version, expires_at)
+                )
+                self._conn.commit()
+
+    def clear(self):
+        """清空缓存（包括持久层）"""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM llm_responses")
+                self._conn.commit()
+
+    def get_stats(self) -> Dict:
+        """获取命中统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            if self._conn is not None:
+                stats["persistent_entries"] = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats.update({
+            "enabled": self.enabled,
+            "persistent": self._conn is not None,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "data_version": self.version.current
+        })
+        return stats
+
+    def close(self):
+        """停止监听数据版本并关闭持久层连接"""
+        self.version.remove_listener(self._on_version_changed)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _put(self, key: str, content: str, expires_at: float):
+        """写入内存层并按LRU淘汰（调用方持有锁）"""
+        self._entries[key] = (content, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _open_persistent(self):
+        """打开持久层并恢复数据版本号"""
+        try:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.persist_path), check_same_thread=False)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, data_version INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"[core.response_cache] 打开持久缓存失败，仅使用内存缓存: {str(e)}")
+            return
+
+        row = conn.execute("SELECT value FROM cache_meta WHERE key = 'data_version'").fetchone()
+        if row is not None:
+            self.version.advance_to(int(row[0]))
+        self._conn = conn
+        self._on_version_changed(self.version.current)
+        logger.info(f"[core.response_cache] 持久缓存已启用: {self.persist_path}，数据版本: {self.version.current}")
+
+    def _on_version_changed(self, version: int):
+        """删除旧版本的条目；启用持久层时保存新版本号并清理持久层"""
+        with self._lock:
+            prefix = f"{version}:"
+            for key in [key for key in self._entries if not key.startswith(prefix)]:
+                del self._entries[key]
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_meta (key, value) VALUES ('data_version', ?)", (str(version),)
+            )
+            self._conn.execute(
+                "DELETE FROM llm_responses WHERE data_version < ? OR expires_at <= ?", (version, time.time())
+            )
+            self._conn.commit()
+
+
+# 全局回复缓存实例
+response_cache = ResponseCache.from_env()
+
+
+def get_response_cache() -> ResponseCache:
+    """获取全局LLM回复缓存"""
+    return response_cache
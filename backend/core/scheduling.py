@@ -0,0 +1,239 @@
+"""
+任务排期计算（关键路径法）
+
+任务依赖关系（models.entities.TaskDependency，完成-开始，可带延迟天数）构成有向无环图，
+Schedule 在 O(V+E) 内完成：
+- 拓扑排序（Kahn 算法），存在循环依赖时抛出 DependencyCycleError
+- 正推：最早开始 = max(任务自身的开始日期, 各前置任务的最早结束 + 延迟)，最早结束 = 最早开始 + 工期
+- 逆推：最晚结束 = min(各后续任务的最晚开始 - 延迟)，没有后续任务时为项目的最早完工日期
+- 总时差 = 最晚开始 - 最早开始，时差为 0 的任务在关键路径上
+
+日期为整数天数（如 date.toordinal()），工期为结束日期减开始日期的天数，
+延迟为 0 时后续任务最早可在前置任务结束当天开始。
+
+数据库相关：
+- load_schedule：按项目中任务的计划日期和依赖关系构建排期
+- shift_to_earliest：把尚未开始、计划开始早于最早开始的任务顺延
+- push_successors：任务计划日期修改后重新构建排期并顺延其下游任务
+"""
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from models.entities import Task, TaskDependency, TaskStatus
+
+# (任务ID, 开始日期（None 表示只受前置任务约束）, 工期)
+ScheduleInput = Tuple[int, Optional[int], int]
+# (前置任务ID, 后续任务ID, 延迟天数)
+DependencyInput = Tuple[int, int, int]
+
+
+class DependencyCycleError(ValueError):
+    """任务依赖关系存在循环"""
+
+    def __init__(self, task_ids: Sequence[int]):
+        self.task_ids = list(task_ids)
+        super().__init__(f"任务依赖关系存在循环: {self.task_ids}")
+
+
+class ScheduledTask:
+    """一个任务的排期结果"""
+    __slots__ = ("id", "start", "duration", "earliest_start", "earliest_finish", "latest_start", "latest_finish")
+
+    def __init__(self, task_id: int, start: Optional[int], duration: int):
+        self.id = task_id
+        self.start = start
+        self.duration = max(0, duration)
+        self.earliest_start = self.earliest_finish = 0
+        self.latest_start = self.latest_finish = 0
+
+    @property
+    def slack(self) -> int:
+        """总时差（天）"""
+        return self.latest_start - self.earliest_start
+
+    @property
+    def critical(self) -> bool:
+        """是否在关键路径上"""
+        return self.slack <= 0
+
+
+class Schedule:
+    """
+    一组任务的关键路径排期
+
+    Args:
+        tasks: (任务ID, 开始日期, 工期)
+        dependencies: (前置任务ID, 后续任务ID, 延迟天数)，涉及不在 tasks 中的任务时忽略
+    """
+
+    def __init__(self, tasks: Iterable[ScheduleInput], dependencies: Iterable[DependencyInput]):
+        self.tasks: Dict[int, ScheduledTask] = {
+            task_id: ScheduledTask(task_id, start, duration) for task_id, start, duration in tasks
+        }
+        self._successors: Dict[int, List[Tuple[int, int]]] = {task_id: [] for task_id in self.tasks}
+        self._predecessors: Dict[int, List[Tuple[int, int]]] = {task_id: [] for task_id in self.tasks}
+        for predecessor, successor, lag in dependencies:
+            if predecessor in self.tasks and successor in self.tasks:
+                self._successors[predecessor].append((successor, lag or 0))
+                self._predecessors[successor].append((predecessor, lag or 0))
+
+        self.order = self._topological_order()
+        self._position = {task_id: i for i, task_id in enumerate(self.order)}
+        starts = [task.start for task in self.tasks.values() if task.start is not None]
+        # 没有开始日期也没有前置任务的任务从最早的开始日期开始（都没有开始日期时为 0）
+        self.origin = min(starts, default=0)
+        # 是否有任务带开始日期；没有时各日期只是相对 0 的天数，不对应实际日期
+        self.dated = bool(starts)
+        self._forward(self.order)
+        self.finish = max((task.earliest_finish for task in self.tasks.values()), default=self.origin)
+        self._backward(reversed(self.order))
+
+    def _topological_order(self) -> List[int]:
+        in_degree = {task_id: len(predecessors) for task_id, predecessors in self._predecessors.items()}
+        queue = deque(task_id for task_id, degree in in_degree.items() if degree == 0)
+        order = []
+        while queue:
+            task_id = queue.popleft()
+            order.append(task_id)
+            for successor, _ in self._successors[task_id]:
+                in_degree[successor] -= 1
+                if in_degree[successor] == 0:
+                    queue.append(successor)
+        if len(order) < len(self.tasks):
+            raise DependencyCycleError(sorted(task_id for task_id, degree in in_degree.items() if degree > 0))
+        return order
+
+    def _forward(self, task_ids: Iterable[int]):
+        """按拓扑顺序正推"""
+        for task_id in task_ids:
+            task = self.tasks[task_id]
+            earliest = self.origin if task.start is None else task.start
+            for predecessor, lag in self._predecessors[task_id]:
+                earliest = max(earliest, self.tasks[predecessor].earliest_finish + lag)
+            task.earliest_start = earliest
+            task.earliest_finish = earliest + task.duration
+
+    def _backward(self, task_ids: Iterable[int]):
+        """按拓扑逆序逆推"""
+        for task_id in task_ids:
+            task = self.tasks[task_id]
+            latest = self.finish
+            for successor, lag in self._successors[task_id]:
+                latest = min(latest, self.tasks[successor].latest_start - lag)
+            task.latest_finish = latest
+            task.latest_start = latest - task.duration
+
+    def _reachable(self, task_id: int, edges: Dict[int, List[Tuple[int, int]]]) -> List[int]:
+        """沿 edges 可到达的任务（含自身），按拓扑顺序排列"""
+        seen = {task_id}
+        stack = [task_id]
+        while stack:
+            for neighbor, _ in edges[stack.pop()]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+        return sorted(seen, key=self._position.__getitem__)
+
+    def predecessors(self, task_id: int) -> List[Tuple[int, int]]:
+        """任务的前置任务和延迟天数"""
+        return list(self._predecessors[task_id])
+
+    def downstream(self, task_id: int) -> List[int]:
+        """任务及其全部下游任务，按拓扑顺序排列"""
+        return self._reachable(task_id, self._successors)
+
+    def critical_path(self) -> List[int]:
+        """关键路径上的任务，按最早开始排列"""
+        return sorted((task.id for task in self.tasks.values() if task.critical),
+                      key=lambda task_id: (self.tasks[task_id].earliest_start, self._position[task_id]))
+
+    def phases(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        按关键路径划分项目阶段：第一个关键任务为准备阶段，最后一个关键任务为收尾阶段，其间为执行阶段
+
+        Returns:
+            Optional[Tuple]: (准备结束, 执行开始, 执行结束, 收尾开始)；关键任务少于3个或首尾任务重叠时为 None
+        """
+        path = self.critical_path()
+        if len(path) < 3:
+            return None
+        preparation_end = self.tasks[path[0]].earliest_finish
+        closing_start = self.tasks[path[-1]].earliest_start
+        if preparation_end > closing_start:
+            return None
+        return preparation_end, preparation_end, closing_start, closing_start
+
+
+def _day(value: Optional[datetime]) -> Optional[int]:
+    return None if value is None else value.date().toordinal()
+
+
+def _duration(start: Optional[datetime], end: Optional[datetime]) -> int:
+    return 0 if start is None or end is None else (end.date() - start.date()).days
+
+
+def load_schedule(db: Session, project_id: int, dependent_only: bool = True) -> Optional[Schedule]:
+    """
+    按项目中任务的计划日期和依赖关系构建排期
+
+    Args:
+        dependent_only: 为 True 时项目没有依赖关系返回 None
+
+    Raises:
+        DependencyCycleError: 依赖关系存在循环
+    """
+    dependencies = db.query(
+        TaskDependency.predecessor_id, TaskDependency.successor_id, TaskDependency.lag_days
+    ).join(Task, Task.id == TaskDependency.successor_id).filter(Task.project_id == project_id).all()
+    if not dependencies and dependent_only:
+        return None
+    tasks = db.query(Task.id, Task.planned_start_date, Task.planned_end_date).filter(
+        Task.project_id == project_id
+    ).all()
+    return Schedule(
+        ((task_id, _day(start), _duration(start, end)) for task_id, start, end in tasks),
+        dependencies
+    )
+
+
+def shift_to_earliest(db: Session, schedule: Schedule, task_ids: Iterable[int]) -> List[Task]:
+    """
+    把尚未开始、计划开始早于最早开始的任务顺延到最早开始（保持工期），不提前任何任务
+
+    Returns:
+        List[Task]: 被顺延的任务（调用方负责提交）
+    """
+    shifted = []
+    for task_id in task_ids:
+        item = schedule.tasks[task_id]
+        if item.start is None or item.earliest_start <= item.start:
+            continue
+        task = db.get(Task, task_id)
+        if task is None or task.status != TaskStatus.PENDING.value or task.planned_start_date is None:
+            continue
+        delta = timedelta(days=item.earliest_start - item.start)
+        task.planned_start_date += delta
+        if task.planned_end_date is not None:
+            task.planned_end_date += delta
+        item.start = item.earliest_start
+        shifted.append(task)
+    return shifted
+
+
+def push_successors(db: Session, task: Task) -> List[Task]:
+    """
+    任务计划日期修改后重新构建项目排期，并顺延受影响的下游任务（不调整该任务本身）
+
+    Returns:
+        List[Task]: 被顺延的下游任务（调用方负责提交）
+    """
+    # 会话不自动 flush，先写入修改后的计划日期再读取排期
+    db.flush()
+    schedule = load_schedule(db, task.project_id)
+    if schedule is None:
+        return []
+    successors = [task_id for task_id in schedule.downstream(task.id) if task_id != task.id]
+    return shift_to_earliest(db, schedule, successors)
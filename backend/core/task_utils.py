@@ -24,75 +24,7 @@ def update_task_in_db(task: Task, task_update: TaskUpdate, db: Session) -> Task:
         更新后的任务对象
     """
     try:
-        # 获取所有字段，包括null值，确保能清空字段
-        update_data = task_update.dict(exclude_unset=False)
-        
-        # 移除未设置的字段（None值需要保留用于清空）
-        # 只移除真正未传的字段，保留显式传的null值
-        original_data = task_update.dict(exclude_unset=True)
-        for key in list(update_data.keys()):
-            if update_data[key] is None and key not in original_data:
-                del update_data[key]
-        
-        # 处理日期字段
-        date_fields = ['planned_start_date', 'planned_end_date', 'actual_start_date', 'actual_end_date']
-        current_year = datetime.now().year
-        for field in date_fields:
-            if field in update_data:
-                if update_data[field]:
-                    date_str = update_data[field]
-                    try:
-                        # 尝试解析ISO格式（带T的格式）
-                        update_data[field] = datetime.fromisoformat(date_str)
-                    except ValueError:
-                        try:
-                            # 尝试解析YYYY-MM-DD格式
-                            update_data[field] = datetime.strptime(date_str, '%Y-%m-%d')
-                        except ValueError:
-                            # 处理只包含月日的格式（如"2-27"或"02-27"）
-                            try:
-                                # 拆分月日
-                                parts = date_str.split('-')
-                                if len(parts) == 2:
-                                    month, day = parts
-                                    # 构建完整日期字符串
-                                    full_date_str = f'{current_year}-{int(month):02d}-{int(day):02d}'
-                                    update_data[field] = datetime.strptime(full_date_str, '%Y-%m-%d')
-                                else:
-                                    # 尝试解析中文格式日期（如"2026年02月06日"）
-                                    try:
-                                        update_data[field] = datetime.strptime(date_str, '%Y年%m月%d日')
-                                    except ValueError:
-                                        raise ValueError(f"Invalid date format: {date_str}")
-                            except (ValueError, IndexError) as e:
-                                raise ValueError(f"无法解析日期: {date_str}")
-                else:
-                    # 显式设置为None，清空日期
-                    update_data[field] = None
-        
-        # 设置任务属性
-        for key, value in update_data.items():
-            # 跳过进度字段，始终自动计算
-            if key != 'progress':
-                setattr(task, key, value)
-        
-        # 验证日期是否倒挂
-        # 计划开始日期不能晚于计划结束日期
-        if task.planned_start_date and task.planned_end_date:
-            if task.planned_start_date > task.planned_end_date:
-                raise ValueError("任务更新失败: 计划开始日期不能晚于计划结束日期")
-        
-        # 实际开始日期不能晚于实际结束日期
-        if task.actual_start_date and task.actual_end_date:
-            if task.actual_start_date > task.actual_end_date:
-                raise ValueError("任务更新失败: 实际开始日期不能晚于实际结束日期")
-        
-        # 强制自动计算任务进度，无论是否有手动设置
-        task.progress = calculate_task_progress(task)
-        
-        # 验证进度值
-        if task.progress < 0 or task.progress > 100:
-            raise ValueError(f"任务进度值无效: {task.progress}，进度值必须在 0-100 之间")
+        apply_task_update(task, task_update)
         
         # 提交更改
         db.commit()
@@ -104,6 +36,113 @@ def update_task_in_db(task: Task, task_update: TaskUpdate, db: Session) -> Task:
         raise
 
 
+def apply_task_update(task: Task, task_update: TaskUpdate) -> Task:
+    """
+    将更新数据应用到任务对象（不提交事务）
+
+    日期校验失败时抛出 ValueError，任务对象保持不变，便于批量更新时跳过单个任务
+
+    Args:
+        task: 要更新的任务对象
+        task_update: 任务更新数据
+
+    Returns:
+        更新后的任务对象
+    """
+    # 获取所有字段，包括null值，确保能清空字段
+    update_data = task_update.dict(exclude_unset=False)
+    
+    # 移除未设置的字段（None值需要保留用于清空）
+    # 只移除真正未传的字段，保留显式传的null值
+    original_data = task_update.dict(exclude_unset=True)
+    for key in list(update_data.keys()):
+        if update_data[key] is None and key not in original_data:
+            del update_data[key]
+    
+    # 处理日期字段
+    date_fields = ['planned_start_date', 'planned_end_date', 'actual_start_date', 'actual_end_date']
+    for field in date_fields:
+        if field in update_data:
+            update_data[field] = parse_task_date(update_data[field])
+    
+    # 跳过进度字段，始终自动计算
+    update_data.pop('progress', None)
+    
+    # 验证日期是否倒挂（基于更新后的值，校验通过后才修改任务）
+    def new_value(field):
+        return update_data[field] if field in update_data else getattr(task, field)
+    
+    # 计划开始日期不能晚于计划结束日期
+    planned_start, planned_end = new_value('planned_start_date'), new_value('planned_end_date')
+    if planned_start and planned_end and planned_start > planned_end:
+        raise ValueError("任务更新失败: 计划开始日期不能晚于计划结束日期")
+    
+    # 实际开始日期不能晚于实际结束日期
+    actual_start, actual_end = new_value('actual_start_date'), new_value('actual_end_date')
+    if actual_start and actual_end and actual_start > actual_end:
+        raise ValueError("任务更新失败: 实际开始日期不能晚于实际结束日期")
+    
+    # 设置任务属性
+    for key, value in update_data.items():
+        setattr(task, key, value)
+    
+    # 强制自动计算任务进度，无论是否有手动设置
+    task.progress = calculate_task_progress(task)
+    
+    # 验证进度值
+    if task.progress < 0 or task.progress > 100:
+        raise ValueError(f"任务进度值无效: {task.progress}，进度值必须在 0-100 之间")
+    
+    return task
+
+
+def parse_task_date(date_str: Optional[str]) -> Optional[datetime]:
+    """
+    解析任务日期
+
+    支持ISO格式、YYYY-MM-DD、月-日（补当前年份）和中文格式（如"2026年02月06日"），
+    空值返回None（用于清空日期）
+
+    Args:
+        date_str: 日期字符串
+
+    Returns:
+        解析后的日期
+    """
+    if not date_str:
+        # 显式设置为None，清空日期
+        return None
+    if isinstance(date_str, datetime):
+        return date_str
+    
+    current_year = datetime.now().year
+    try:
+        # 尝试解析ISO格式（带T的格式）
+        return datetime.fromisoformat(date_str)
+    except ValueError:
+        try:
+            # 尝试解析YYYY-MM-DD格式
+            return datetime.strptime(date_str, '%Y-%m-%d')
+        except ValueError:
+            # 处理只包含月日的格式（如"2-27"或"02-27"）
+            try:
+                # 拆分月日
+                parts = date_str.split('-')
+                if len(parts) == 2:
+                    month, day = parts
+                    # 构建完整日期字符串
+                    full_date_str = f'{current_year}-{int(month):02d}-{int(day):02d}'
+                    return datetime.strptime(full_date_str, '%Y-%m-%d')
+                else:
+                    # 尝试解析中文格式日期（如"2026年02月06日"）
+                    try:
+                        return datetime.strptime(date_str, '%Y年%m月%d日')
+                    except ValueError:
+                        raise ValueError(f"Invalid date format: {date_str}")
+            except (ValueError, IndexError) as e:
+                raise ValueError(f"无法解析日期: {date_str}")
+
+
 def calculate_task_progress(task: Task) -> float:
     """
     计算任务进度
@@ -0,0 +1,106 @@
+"""
+文本处理工具
+提供中英文混合文本的分词、token估算和编辑距离，供上下文检索、名称建议等模块复用
+"""
+import re
+from typing import List, Optional
+
+# 连续的中日韩字符 或 连续的字母数字
+_TOKEN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9]+")
+
+
+def is_cjk(char: str) -> bool:
+    """判断字符是否为中日韩统一表意文字"""
+    code = ord(char)
+    return 0x3400 <= code <= 0x4DBF or 0x4E00 <= code <= 0x9FFF or 0xF900 <= code <= 0xFAFF
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    将文本切分为检索用的词项
+
+    - 英文和数字按单词切分并转为小写
+    - 中文没有空格分词，按相邻两字切分为二元组（单字词保留单字）
+
+    Args:
+        text: 输入文本
+
+    Returns:
+        List[str]: 词项列表（可能包含重复项）
+    """
+    if not text:
+        return []
+
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if is_cjk(run[0]):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本对应的LLM token数
+
+    中文字符大约1个token，其余字符大约4个字符1个token
+
+    Args:
+        text: 输入文本
+
+    Returns:
+        int: 估算的token数
+    """
+    if not text:
+        return 0
+    cjk_count = sum(1 for char in text if is_cjk(char))
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """
+    编辑距离（Levenshtein，插入/删除/替换各计1）
+
+    Args:
+        a: 文本
+        b: 文本
+        limit: 距离上限；提供时只计算对角线两侧 limit 宽的带状区域，
+            超过上限时提前结束并返回 limit + 1
+
+    Returns:
+        int: 编辑距离
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is None:
+        limit = len(a)
+    if len(a) - len(b) > limit:
+        return limit + 1
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        best = current[0]
+        for j in range(low, high + 1):
+            # 替换/相同、删除、插入三者取最小（内层循环避免调用 min）
+            value = previous[j - 1] + (char_a != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if value > limit:
+                value = over
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return over
+        previous = current
+    return previous[-1]
@@ -0,0 +1,315 @@
+"""
+任务时间线的批量计算
+
+甘特图任务条、项目起止时间和项目阶段原来在各处逐个任务计算（状态分支 + strftime），
+这里按列批量计算，供甘特图（api.gantt）和项目进度引擎（core.progress_engine 完整计算项目状态时）共用：
+- resolve_timeline：按任务状态选择任务条的开始/结束时间和时间类型（actual/planned）
+  - pending：计划开始、计划结束
+  - active/delayed：实际开始（没有时用计划开始）、计划结束
+  - completed/cancelled：实际开始、实际结束（没有时用计划时间）
+- effective_bounds：各任务的开始/结束时间（实际优先，否则计划）
+- effective_span：项目起止时间（effective_bounds 的最早开始和最晚结束）
+- group_spans：按项目分组的最早开始和最晚结束
+- phase_boundaries：项目的准备/执行/收尾阶段划分
+
+时间以距 1970-01-01 的微秒数（整数）表示，缺失值为 None；数据库中的日期列可用
+sql_microseconds() 在查询中直接转换（SQLite 日期精度为毫秒），不需要逐行解析 datetime。
+
+设置 TIMELINE_NUMPY=1 且安装了 numpy 时，大于 NUMPY_MIN_BATCH 的批次用 numpy 向量化计算，
+否则逐个计算，结果相同。输入是查询返回的 list，转换为数组的开销抵消了向量化的收益
+（10 万任务时两者相近，见 benchmarks/bench_timeline.py），因此默认不使用 numpy。
+
+环境变量：
+- TIMELINE_NUMPY: 设为 1 时使用 numpy（需已安装）
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import BigInteger, cast, func
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+USE_NUMPY = NUMPY_AVAILABLE and os.getenv("TIMELINE_NUMPY", "0") == "1"
+# 小批次转换为数组的开销大于逐个计算
+NUMPY_MIN_BATCH = 256
+
+DAY = 86_400_000_000
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+# 1970-01-01 的儒略日
+_EPOCH_JULIAN_DAY = 2440587.5
+
+_START_ACTUAL_STATUSES = ("active", "delayed")
+_FINISHED_STATUSES = ("completed", "cancelled")
+
+
+def to_microseconds(value: Optional[datetime]) -> Optional[int]:
+    """datetime 转换为距 1970-01-01 的微秒数"""
+    return None if value is None else (value - _EPOCH) // _ONE_MICROSECOND
+
+
+def from_microseconds(value: Optional[int]) -> Optional[datetime]:
+    """距 1970-01-01 的微秒数转换为 datetime"""
+    return None if value is None else _EPOCH + timedelta(microseconds=value)
+
+
+def sql_microseconds(column):
+    """在查询中把日期列转换为距 1970-01-01 的微秒数（SQLite 的 julianday 精度为毫秒）"""
+    return cast(func.round((func.julianday(column) - _EPOCH_JULIAN_DAY) * 86_400_000), BigInteger) * 1000
+
+
+def _use_numpy(size: int, use_numpy: Optional[bool]) -> bool:
+    if use_numpy is None:
+        use_numpy = USE_NUMPY and size >= NUMPY_MIN_BATCH
+    return use_numpy and NUMPY_AVAILABLE
+
+
+def _array(values: Sequence[Optional[int]]):
+    # 微秒数在 float64 的精确整数范围内（约 ±285 年），缺失值为 NaN
+    return np.array(values, dtype=np.float64)
+
+
+def _list(values) -> List[Optional[int]]:
+    return [None if value != value else int(value) for value in values.tolist()]
+
+
+class TaskTimeline:
+    """一批任务的任务条（resolve_timeline 的结果），各列按任务的输入顺序排列"""
+
+    def __init__(self, start, end, start_actual, end_actual):
+        # list（逐个计算）或 numpy 数组（向量化计算，缺失值为 NaN）
+        self._start = start
+        self._end = end
+        self._start_actual = start_actual
+        self._end_actual = end_actual
+        self._numpy = NUMPY_AVAILABLE and isinstance(start, np.ndarray)
+
+    def __len__(self) -> int:
+        return len(self._start)
+
+    @property
+    def start(self) -> List[Optional[int]]:
+        """任务条开始时间（微秒数）"""
+        return _list(self._start) if self._numpy else self._start
+
+    @property
+    def end(self) -> List[Optional[int]]:
+        """任务条结束时间（微秒数）"""
+        return _list(self._end) if self._numpy else self._end
+
+    def visible(self) -> List[bool]:
+        """开始和结束时间都有值（在甘特图中显示）"""
+        if self._numpy:
+            return (~np.isnan(self._start) & ~np.isnan(self._end)).tolist()
+        return [start is not None and end is not None for start, end in zip(self._start, self._end)]
+
+    def start_days(self) -> List[str]:
+        """开始日期 YYYY-MM-DD，缺失时为空串"""
+        return day_text(self._start)
+
+    def end_days(self) -> List[str]:
+        """结束日期 YYYY-MM-DD，缺失时为空串"""
+        return day_text(self._end)
+
+    def start_types(self) -> List[str]:
+        """开始时间类型：actual 或 planned"""
+        return _time_types(self._start_actual)
+
+    def end_types(self) -> List[str]:
+        """结束时间类型：actual 或 planned"""
+        return _time_types(self._end_actual)
+
+
+def _time_types(flags) -> List[str]:
+    if NUMPY_AVAILABLE and isinstance(flags, np.ndarray):
+        return np.where(flags, "actual", "planned").tolist()
+    return ["actual" if flag else "planned" for flag in flags]
+
+
+def resolve_timeline(status: Sequence[Optional[str]],
+                     planned_start: Sequence[Optional[int]],
+                     planned_end: Sequence[Optional[int]],
+                     actual_start: Sequence[Optional[int]],
+                     actual_end: Sequence[Optional[int]],
+                     use_numpy: Optional[bool] = None) -> TaskTimeline:
+    """
+    按任务状态批量选择任务条的开始和结束时间
+
+    Args:
+        status: 任务状态列（未知状态或 None 的任务没有任务条）
+        planned_start / planned_end / actual_start / actual_end: 时间列（微秒数，缺失为 None）
+        use_numpy: 是否使用 numpy，默认按批次大小和 TIMELINE_NUMPY 决定
+
+    Returns:
+        TaskTimeline: 任务条
+    """
+    if _use_numpy(len(status), use_numpy):
+        return _resolve_numpy(status, planned_start, planned_end, actual_start, actual_end)
+
+    starts, ends, start_actual, end_actual = [], [], [], []
+    for task_status, p_start, p_end, a_start, a_end in zip(
+            status, planned_start, planned_end, actual_start, actual_end):
+        if task_status == "pending":
+            starts.append(p_start)
+            ends.append(p_end)
+            start_actual.append(False)
+            end_actual.append(False)
+        elif task_status in _START_ACTUAL_STATUSES:
+            starts.append(p_start if a_start is None else a_start)
+            ends.append(p_end)
+            start_actual.append(a_start is not None)
+            end_actual.append(False)
+        elif task_status in _FINISHED_STATUSES:
+            starts.append(p_start if a_start is None else a_start)
+            ends.append(p_end if a_end is None else a_end)
+            start_actual.append(a_start is not None)
+            end_actual.append(a_end is not None)
+        else:
+            starts.append(None)
+            ends.append(None)
+            start_actual.append(False)
+            end_actual.append(False)
+    return TaskTimeline(starts, ends, start_actual, end_actual)
+
+
+def _resolve_numpy(status, planned_start, planned_end, actual_start, actual_end) -> TaskTimeline:
+    status = np.array(status, dtype=object)
+    p_start, p_end = _array(planned_start), _array(planned_end)
+    a_start, a_end = _array(actual_start), _array(actual_end)
+    pending = status == "pending"
+    started = (status == _START_ACTUAL_STATUSES[0]) | (status == _START_ACTUAL_STATUSES[1])
+    finished = (status == _FINISHED_STATUSES[0]) | (status == _FINISHED_STATUSES[1])
+    has_actual_start = ~np.isnan(a_start)
+    has_actual_end = ~np.isnan(a_end)
+
+    actual_first_start = np.where(has_actual_start, a_start, p_start)
+    start = np.where(pending, p_start, np.where(started | finished, actual_first_start, np.nan))
+    end = np.where(pending | started, p_end,
+                   np.where(finished, np.where(has_actual_end, a_end, p_end), np.nan))
+    return TaskTimeline(start, end, (started | finished) & has_actual_start, finished & has_actual_end)
+
+
+def effective_bounds(planned_start: Sequence[Optional[int]],
+                     planned_end: Sequence[Optional[int]],
+                     actual_start: Sequence[Optional[int]],
+                     actual_end: Sequence[Optional[int]]) -> Tuple[List[Optional[int]], List[Optional[int]]]:
+    """
+    各任务的开始时间和结束时间（实际优先，否则计划）
+
+    Returns:
+        Tuple: (开始时间列表, 结束时间列表)，与输入等长，没有值时为 None
+    """
+    starts = [p if a is None else a for p, a in zip(planned_start, actual_start)]
+    ends = [p if a is None else a for p, a in zip(planned_end, actual_end)]
+    return starts, ends
+
+
+def effective_span(planned_start: Sequence[Optional[int]],
+                   planned_end: Sequence[Optional[int]],
+                   actual_start: Sequence[Optional[int]],
+                   actual_end: Sequence[Optional[int]],
+                   use_numpy: Optional[bool] = None) -> Tuple[Optional[int], Optional[int]]:
+    """
+    项目起止时间：各任务的开始时间（实际优先，否则计划）的最早值、结束时间的最晚值
+
+    Returns:
+        Tuple: (最早开始, 最晚结束)，没有值时为 None
+    """
+    if _use_numpy(len(planned_start), use_numpy):
+        a_start, a_end = _array(actual_start), _array(actual_end)
+        starts = np.where(np.isnan(a_start), _array(planned_start), a_start)
+        ends = np.where(np.isnan(a_end), _array(planned_end), a_end)
+        start = np.fmin.reduce(starts) if len(starts) else np.nan
+        end = np.fmax.reduce(ends) if len(ends) else np.nan
+        return (None if np.isnan(start) else int(start)), (None if np.isnan(end) else int(end))
+
+    starts, ends = effective_bounds(planned_start, planned_end, actual_start, actual_end)
+    return (min((s for s in starts if s is not None), default=None),
+            max((e for e in ends if e is not None), default=None))
+
+
+def group_spans(keys: Sequence[Hashable],
+                starts: Sequence[Optional[int]],
+                ends: Sequence[Optional[int]],
+                use_numpy: Optional[bool] = None) -> Dict[Hashable, Tuple[Optional[int], Optional[int]]]:
+    """
+    按键分组的最早开始和最晚结束（缺失值不参与计算）
+
+    Args:
+        keys: 分组键（如项目ID），相同的键需要相邻（如按项目排序的查询结果）
+    """
+    if _use_numpy(len(keys), use_numpy):
+        keys = np.asarray(keys)
+        if not len(keys):
+            return {}
+        boundaries = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+        group_starts = np.fmin.reduceat(_array(starts), boundaries)
+        group_ends = np.fmax.reduceat(_array(ends), boundaries)
+        return dict(zip(keys[boundaries].tolist(), zip(_list(group_starts), _list(group_ends))))
+
+    spans: Dict[Hashable, Tuple[Optional[int], Optional[int]]] = {}
+    for key, start, end in zip(keys, starts, ends):
+        group_start, group_end = spans.get(key, (None, None))
+        if start is not None and (group_start is None or start < group_start):
+            group_start = start
+        if end is not None and (group_end is None or end > group_end):
+            group_end = end
+        spans[key] = (group_start, group_end)
+    return spans
+
+
+def phase_boundaries(starts: Sequence[Optional[int]],
+                     ends: Sequence[Optional[int]]) -> List[Optional[Tuple[int, int, int, int]]]:
+    """
+    项目阶段划分：准备（30%）、执行（50%）、收尾，项目少于3天时不划分准备和收尾
+
+    Returns:
+        List: 每个项目的 (准备结束, 执行开始, 执行结束, 收尾开始)（微秒数）；
+        没有起止时间或结束不晚于开始（按天计）时为 None
+    """
+    result = []
+    for start, end in zip(starts, ends):
+        if start is None or end is None:
+            result.append(None)
+            continue
+        total_days = (end - start) // DAY
+        if total_days <= 0:
+            result.append(None)
+        elif total_days < 3:
+            result.append((start, start, end, end))
+        else:
+            preparation_end = start + max(1, int(total_days * 0.3)) * DAY
+            execution_end = preparation_end + max(1, int(total_days * 0.5)) * DAY
+            result.append((preparation_end, preparation_end, execution_end, execution_end))
+    return result
+
+
+def day_text(values) -> List[str]:
+    """时间（微秒数）转换为 YYYY-MM-DD，缺失值为空串"""
+    if NUMPY_AVAILABLE and isinstance(values, np.ndarray):
+        # 只格式化不重复的日期，缺失值（NaN）排在最后
+        days, inverse = np.unique(np.floor_divide(values, DAY), return_inverse=True)
+        missing = np.isnan(days)
+        labels = np.empty(len(days), dtype=object)
+        labels[missing] = ""
+        labels[~missing] = np.datetime_as_string(days[~missing].astype(np.int64).astype("datetime64[D]"))
+        return labels[inverse.reshape(-1)].tolist()
+
+    cache: Dict[int, str] = {}
+    texts = []
+    for value in values:
+        if value is None:
+            texts.append("")
+            continue
+        day = value // DAY
+        text = cache.get(day)
+        if text is None:
+            text = cache[day] = (_EPOCH + timedelta(days=day)).strftime("%Y-%m-%d")
+        texts.append(text)
+    return texts
@@ -11,8 +11,11 @@ from llm.base import (
     TaskInfo,
 )
 from llm.doubao_client import DoubaoProvider
-from llm.factory import LLMProviderFactory, get_default_provider
+from llm.factory import LLMProviderFactory, get_default_provider, get_provider_registry
+from llm.hedged import HedgedProvider
 from llm.kimi_client import KimiProvider
+from llm.metrics import get_llm_metrics
+from llm.mock_client import MockProvider
 from llm.openai_client import OpenAIProvider
 
 __all__ = [
@@ -26,6 +29,10 @@ __all__ = [
     "OpenAIProvider",
     "KimiProvider",
     "DoubaoProvider",
+    "MockProvider",
+    "HedgedProvider",
     "LLMProviderFactory",
     "get_default_provider",
+    "get_provider_registry",
+    "get_llm_metrics",
 ]
@@ -1,10 +1,16 @@
 """
 LLM提供商统一接口定义
 """
+import asyncio
+import logging
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
-from typing import Any, Dict, Iterator, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 
+import httpx
+
+logger = logging.getLogger(__name__)
 
 @dataclass
 class Message:
@@ -52,6 +58,8 @@ class ResponseChunk:
     content: str
     is_finished: bool = False
     reasoning_content: Optional[str] = None
+    # 用量统计，通常只在最后一个数据块中出现
+    usage: Optional[Dict[str, Any]] = None
 
 
 @dataclass
@@ -85,9 +93,60 @@ class ProjectInfo:
 class LLMProviderInterface(ABC):
     """LLM提供商统一接口"""
     
+    # 通过工厂创建时是否必须提供API Key
+    requires_api_key = True
+    
     def __init__(self, api_key: str, base_url: Optional[str] = None):
         self.api_key = api_key
         self.base_url = base_url
+        self._async_client: Optional[httpx.AsyncClient] = None
+        # 进行中的异步请求数；请求关闭时仍有请求在使用客户端则延后到最后一个请求结束
+        self._in_flight = 0
+        self._close_requested = False
+    
+    def get_async_client(self) -> httpx.AsyncClient:
+        """获取（首次使用时创建）该提供商的长连接异步HTTP客户端"""
+        if self._async_client is None or self._async_client.is_closed:
+            from llm.http_client import create_async_client
+            self._async_client = create_async_client(self.base_url, self.api_key)
+        return self._async_client
+    
+    def close(self):
+        """关闭同步HTTP客户端"""
+        client = getattr(self, "client", None)
+        if isinstance(client, httpx.Client) and not client.is_closed:
+            client.close()
+    
+    async def aclose(self):
+        """关闭异步HTTP客户端，释放连接池"""
+        if self._async_client is not None and not self._async_client.is_closed:
+            await self._async_client.aclose()
+        self._async_client = None
+    
+    @asynccontextmanager
+    async def track_request(self):
+        """标记一个进行中的异步请求（achat / achat_stream 在整个请求期间持有）"""
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            if self._close_requested and self._in_flight == 0:
+                await self._close_clients()
+    
+    async def aclose_when_idle(self):
+        """没有进行中的请求时立即关闭HTTP客户端，否则在最后一个请求结束后关闭"""
+        self._close_requested = True
+        if self._in_flight == 0:
+            await self._close_clients()
+    
+    async def _close_clients(self):
+        """关闭同步和异步HTTP客户端"""
+        try:
+            self.close()
+            await self.aclose()
+        except Exception as e:
+            logger.warning(f"关闭LLM提供商客户端失败: {e}")
     
     @abstractmethod
     def chat(self, 
@@ -103,6 +162,26 @@ class LLMProviderInterface(ABC):
         """流式对话"""
         pass
     
+    async def achat(self,
+                    messages: List[Message],
+                    config: Optional[LLMConfig] = None) -> LLMResponse:
+        """异步非流式对话，默认在线程池中执行同步实现，不阻塞事件循环"""
+        async with self.track_request():
+            return await asyncio.to_thread(self.chat, messages, config)
+    
+    async def achat_stream(self,
+                           messages: List[Message],
+                           config: Optional[LLMConfig] = None) -> AsyncIterator[ResponseChunk]:
+        """异步流式对话，默认在线程池中逐块迭代同步实现"""
+        async with self.track_request():
+            iterator = self.chat_stream(messages, config)
+            finished = object()
+            while True:
+                chunk = await asyncio.to_thread(next, iterator, finished)
+                if chunk is finished:
+                    break
+                yield chunk
+    
     @abstractmethod
     def validate_config(self) -> bool:
         """验证配置是否有效"""
@@ -2,7 +2,7 @@
 豆包 (字节跳动) LLM客户端
 """
 import json
-from typing import Iterator, List, Optional
+from typing import AsyncIterator, Iterator, List, Optional
 
 import httpx
 
@@ -22,11 +22,19 @@ class DoubaoProvider(LLMProviderInterface):
             timeout=60.0
         )
     
-    def chat(self, 
-             messages: List[Message], 
-             config: Optional[LLMConfig] = None) -> LLMResponse:
-        """非流式对话"""
-        config = config or LLMConfig(model="doubao-pro-32k")
+    def _build_payload(self, messages: List[Message], config: LLMConfig, stream: bool = False) -> dict:
+        """构建请求体"""
+        if stream:
+            return {
+                "model": config.model,
+                "messages": [m.to_dict() for m in messages],
+                "temperature": config.temperature,
+                "max_tokens": config.max_tokens,
+                "top_p": config.top_p,
+                "stream": True,
+                # 在最后一个数据块中返回用量（含前缀缓存命中的token数）
+                "stream_options": {"include_usage": True}
+            }
         
         payload = {
             "model": config.model,
@@ -37,10 +45,10 @@ class DoubaoProvider(LLMProviderInterface):
             "stream": False
         }
         
-        response = self.client.post("/chat/completions", json=payload)
-        response.raise_for_status()
-        
-        data = response.json()
+        return payload
+    
+    def _parse_response(self, data: dict) -> LLMResponse:
+        """解析非流式响应"""
         choice = data["choices"][0]
         
         return LLMResponse(
@@ -50,6 +58,37 @@ class DoubaoProvider(LLMProviderInterface):
             finish_reason=choice.get("finish_reason", "")
         )
     
+    def _parse_stream_line(self, line: str) -> Optional[ResponseChunk]:
+        """解析一行SSE数据，无内容时返回None"""
+        if not line or line.strip() == "data: [DONE]" or not line.startswith("data: "):
+            return None
+        
+        try:
+            data = json.loads(line[6:])
+        except json.JSONDecodeError:
+            return None
+        
+        usage = data.get("usage")
+        if "choices" in data and len(data["choices"]) > 0:
+            delta = data["choices"][0].get("delta", {})
+            content = delta.get("content", "")
+            if content:
+                return ResponseChunk(content=content, is_finished=False, usage=usage)
+        if usage:
+            return ResponseChunk(content="", is_finished=False, usage=usage)
+        return None
+    
+    def chat(self, 
+             messages: List[Message], 
+             config: Optional[LLMConfig] = None) -> LLMResponse:
+        """非流式对话"""
+        config = config or LLMConfig(model="doubao-pro-32k")
+        
+        response = self.client.post("/chat/completions", json=self._build_payload(messages, config))
+        response.raise_for_status()
+        
+        return self._parse_response(response.json())
+    
     def chat_stream(self, 
                     messages: List[Message], 
                     config: Optional[LLMConfig] = None) -> Iterator[ResponseChunk]:
@@ -57,32 +96,45 @@ class DoubaoProvider(LLMProviderInterface):
         config = config or LLMConfig(model="doubao-pro-32k")
         config.stream = True
         
-        payload = {
-            "model": config.model,
-            "messages": [m.to_dict() for m in messages],
-            "temperature": config.temperature,
-            "max_tokens": config.max_tokens,
-            "top_p": config.top_p,
-            "stream": True
-        }
-        
+        payload = self._build_payload(messages, config, stream=True)
         with self.client.stream("POST", "/chat/completions", json=payload) as response:
             response.raise_for_status()
             
             for line in response.iter_lines():
-                if not line or line.strip() == "data: [DONE]":
-                    continue
-                
-                if line.startswith("data: "):
-                    try:
-                        data = json.loads(line[6:])
-                        if "choices" in data and len(data["choices"]) > 0:
-                            delta = data["choices"][0].get("delta", {})
-                            content = delta.get("content", "")
-                            if content:
-                                yield ResponseChunk(content=content, is_finished=False)
-                    except json.JSONDecodeError:
-                        continue
+                chunk = self._parse_stream_line(line)
+                if chunk:
+                    yield chunk
+        
+        yield ResponseChunk(content="", is_finished=True)
+    
+    async def achat(self,
+                    messages: List[Message],
+                    config: Optional[LLMConfig] = None) -> LLMResponse:
+        """异步非流式对话"""
+        config = config or LLMConfig(model="doubao-pro-32k")
+        
+        async with self.track_request():
+            response = await self.get_async_client().post("/chat/completions", json=self._build_payload(messages, config))
+        response.raise_for_status()
+        
+        return self._parse_response(response.json())
+    
+    async def achat_stream(self,
+                           messages: List[Message],
+                           config: Optional[LLMConfig] = None) -> AsyncIterator[ResponseChunk]:
+        """异步流式对话"""
+        config = config or LLMConfig(model="doubao-pro-32k")
+        config.stream = True
+        
+        payload = self._build_payload(messages, config, stream=True)
+        async with self.track_request(), \
+                self.get_async_client().stream("POST", "/chat/completions", json=payload) as response:
+            response.raise_for_status()
+            
+            async for line in response.aiter_lines():
+                chunk = self._parse_stream_line(line)
+                if chunk:
+                    yield chunk
         
         yield ResponseChunk(content="", is_finished=True)
     
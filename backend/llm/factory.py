@@ -1,14 +1,19 @@
 """
 LLM提供商工厂
 """
+import logging
 import os
-from typing import Dict, Optional, Type
+import threading
+from typing import Dict, List, Optional, Tuple, Type
 
 from llm.base import LLMProviderInterface
 from llm.doubao_client import DoubaoProvider
 from llm.kimi_client import KimiProvider
+from llm.mock_client import MockProvider
 from llm.openai_client import OpenAIProvider
 
+logger = logging.getLogger(__name__)
+
 
 class LLMProviderFactory:
     """LLM提供商工厂"""
@@ -17,6 +22,7 @@ class LLMProviderFactory:
         "openai": OpenAIProvider,
         "kimi": KimiProvider,
         "doubao": DoubaoProvider,
+        "mock": MockProvider,
     }
     
     @classmethod
@@ -28,34 +34,48 @@ class LLMProviderFactory:
         创建LLM提供商实例
         
         Args:
-            provider_type: 提供商类型 (openai/kimi/doubao)
+            provider_type: 提供商类型 (openai/kimi/doubao/mock)
             api_key: API Key，如果为None则从环境变量读取
             base_url: Base URL，如果为None则使用默认值
             
         Returns:
             LLMProviderInterface: LLM提供商实例
         """
+        provider_type, api_key, base_url = cls.resolve_settings(provider_type, api_key, base_url)
+        return cls._providers[provider_type](api_key=api_key, base_url=base_url)
+    
+    @classmethod
+    def resolve_settings(cls,
+                         provider_type: str,
+                         api_key: Optional[str] = None,
+                         base_url: Optional[str] = None) -> Tuple[str, str, Optional[str]]:
+        """
+        解析提供商配置，未提供的 api_key / base_url 从环境变量读取
+        
+        Returns:
+            Tuple[str, str, Optional[str]]: (提供商类型, API Key, Base URL)
+        """
         provider_type = provider_type.lower()
         
         if provider_type not in cls._providers:
             raise ValueError(f"不支持的LLM提供商: {provider_type}，"
                            f"支持的提供商: {list(cls._providers.keys())}")
         
-        provider_class = cls._providers[provider_type]
-        
         # 如果未提供api_key，从环境变量读取
         if api_key is None:
             env_key = f"{provider_type.upper()}_API_KEY"
             api_key = os.getenv(env_key)
             if not api_key:
-                raise ValueError(f"未提供API Key，请设置{env_key}环境变量或在配置中提供")
+                if cls._providers[provider_type].requires_api_key:
+                    raise ValueError(f"未提供API Key，请设置{env_key}环境变量或在配置中提供")
+                api_key = ""
         
         # 如果未提供base_url，从环境变量读取
         if base_url is None:
             env_url = f"{provider_type.upper()}_BASE_URL"
             base_url = os.getenv(env_url)
         
-        return provider_class(api_key=api_key, base_url=base_url)
+        return provider_type, api_key, base_url
     
     @classmethod
     def register_provider(cls, name: str, provider_class: Type[LLMProviderInterface]):
@@ -74,10 +94,120 @@ class LLMProviderFactory:
         return list(cls._providers.keys())
 
 
+class ProviderRegistry:
+    """
+    LLM提供商实例缓存
+    
+    按 (提供商, API Key, Base URL) 缓存提供商实例，复用其HTTP连接池，
+    避免每次请求都重新建立TCP/TLS连接
+    """
+    
+    def __init__(self):
+        # 存储结构: {(provider_type, api_key, base_url): provider}
+        self._providers: Dict[Tuple[str, str, Optional[str]], LLMProviderInterface] = {}
+        self._lock = threading.Lock()
+    
+    def get(self,
+            provider_type: str,
+            api_key: Optional[str] = None,
+            base_url: Optional[str] = None) -> LLMProviderInterface:
+        """
+        获取提供商实例，不存在时创建并缓存
+        
+        Args:
+            provider_type: 提供商类型 (openai/kimi/doubao)
+            api_key: API Key，如果为None则从环境变量读取
+            base_url: Base URL，如果为None则从环境变量读取
+            
+        Returns:
+            LLMProviderInterface: LLM提供商实例
+        """
+        key = LLMProviderFactory.resolve_settings(provider_type, api_key, base_url)
+        
+        with self._lock:
+            provider = self._providers.get(key)
+            if provider is None:
+                provider = LLMProviderFactory.create_provider(*key)
+                self._providers[key] = provider
+                logger.info(f"创建LLM提供商实例: {key[0]}")
+            return provider
+    
+    def get_hedged(self, provider_types: List[str]) -> LLMProviderInterface:
+        """
+        获取对冲请求提供商实例，不存在时创建并缓存
+        
+        对冲提供商本身不持有成员实例，每次请求时从本缓存获取，成员失效后自动使用新实例
+        
+        Args:
+            provider_types: 参与对冲的提供商类型，第一个为主提供商
+        """
+        from llm.hedged import HedgedProvider
+        
+        key = ("hedged", ",".join(t.strip().lower() for t in provider_types), None)
+        with self._lock:
+            provider = self._providers.get(key)
+            if provider is None:
+                provider = HedgedProvider(provider_types)
+                self._providers[key] = provider
+                logger.info(f"创建对冲LLM提供商: {key[1]}")
+            return provider
+    
+    def _pop(self, provider_type: Optional[str] = None) -> List[LLMProviderInterface]:
+        """移除缓存中的提供商实例（为None时移除全部）"""
+        with self._lock:
+            keys = [key for key in self._providers
+                    if provider_type is None or key[0] == provider_type.lower()]
+            return [self._providers.pop(key) for key in keys]
+    
+    async def invalidate(self, provider_type: Optional[str] = None):
+        """
+        使缓存失效并关闭对应的HTTP客户端（配置变更时调用）
+        
+        移出缓存后新请求使用新实例；仍在进行中的请求继续使用原实例，最后一个请求结束后再关闭其客户端
+        
+        Args:
+            provider_type: 提供商类型，为None时清空全部缓存
+        """
+        for provider in self._pop(provider_type):
+            await provider.aclose_when_idle()
+    
+    async def aclose_all(self):
+        """关闭所有提供商实例的HTTP客户端（应用关闭时调用）"""
+        await self.invalidate()
+    
+    def get_stats(self) -> dict:
+        """获取缓存状态统计"""
+        with self._lock:
+            return {"cached_providers": [key[0] for key in self._providers]}
+    
+    def get_hedge_stats(self) -> dict:
+        """获取已创建的对冲提供商的统计（按成员列表分组）"""
+        with self._lock:
+            hedged = {key[1]: provider for key, provider in self._providers.items() if key[0] == "hedged"}
+        return {members: provider.get_stats() for members, provider in hedged.items()}
+
+
+# 全局提供商实例缓存
+provider_registry = ProviderRegistry()
+
+
+def get_provider_registry() -> ProviderRegistry:
+    """获取全局提供商实例缓存"""
+    return provider_registry
+
+
 def get_default_provider() -> Optional[LLMProviderInterface]:
-    """获取默认LLM提供商"""
+    """
+    获取默认LLM提供商（复用缓存的实例）
+    
+    LLM_HEDGE_PROVIDERS 配置了两个及以上提供商时返回对冲请求提供商
+    """
+    hedge_types = [t for t in os.getenv("LLM_HEDGE_PROVIDERS", "").split(",") if t.strip()]
+    if len(hedge_types) >= 2:
+        return provider_registry.get_hedged(hedge_types)
+    
     provider_type = os.getenv("DEFAULT_LLM_PROVIDER", "openai")
     try:
-        return LLMProviderFactory.create_provider(provider_type)
+        return provider_registry.get(provider_type)
     except ValueError:
         return None
@@ -0,0 +1,304 @@
+"""
+对冲请求LLM提供商
+先向主提供商发送请求，超过对冲延迟仍未收到首个token时向备用提供商再发送一次，
+使用最先成功的响应并取消其余请求；主提供商出错时立即切换到备用提供商。
+
+对冲延迟由各提供商的首token耗时直方图自动确定（取 LLM_HEDGE_QUANTILE 分位数），
+样本不足时使用 LLM_HEDGE_DELAY。
+
+环境变量：
+- LLM_HEDGE_PROVIDERS: 参与对冲的提供商，逗号分隔，第一个为主提供商（如 "doubao,kimi"），
+  少于两个时不启用对冲
+- LLM_HEDGE_DELAY: 样本不足时的对冲延迟，秒（默认 2.0）
+- LLM_HEDGE_QUANTILE: 计算对冲延迟使用的分位数（默认 0.9）
+- {PROVIDER}_MODEL: 发送给该提供商时使用的模型名称（如 KIMI_MODEL），未设置时沿用请求中的模型
+"""
+import asyncio
+import bisect
+import dataclasses
+import logging
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from llm.base import LLMConfig, LLMProviderInterface, LLMResponse, Message, ResponseChunk
+
+logger = logging.getLogger(__name__)
+
+# 直方图桶上界（秒），按1.5倍递增，覆盖 50ms ~ 50s
+BUCKET_BOUNDS = tuple(round(0.05 * 1.5 ** i, 3) for i in range(18))
+# 使用直方图计算对冲延迟所需的最少样本数
+MIN_SAMPLES = 20
+# 自动计算的对冲延迟范围（秒）
+MIN_HEDGE_DELAY = 0.1
+MAX_HEDGE_DELAY = 10.0
+
+
+class LatencyHistogram:
+    """固定桶的耗时直方图"""
+
+    def __init__(self, bounds: Tuple[float, ...] = BUCKET_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        """记录一次耗时"""
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        估算分位数（返回所在桶的上界），没有样本时返回None
+        """
+        if self.count == 0:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return self.bounds[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else None,
+            "p50_ms": _ms(self.quantile(0.5)),
+            "p90_ms": _ms(self.quantile(0.9)),
+            "p99_ms": _ms(self.quantile(0.99))
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+class HedgedProvider(LLMProviderInterface):
+    """
+    对冲请求LLM提供商
+
+    只有异步接口（achat / achat_stream）会对冲；同步接口直接使用主提供商。
+
+    Args:
+        provider_types: 参与对冲的提供商类型，第一个为主提供商
+        resolver: 按类型获取提供商实例的函数，默认使用全局提供商实例缓存
+        delay: 样本不足时的对冲延迟（秒）
+        quantile: 计算对冲延迟使用的分位数
+    """
+
+    requires_api_key = False
+
+    def __init__(self, provider_types: List[str],
+                 resolver: Optional[Callable[[str], LLMProviderInterface]] = None,
+                 delay: Optional[float] = None, quantile: Optional[float] = None):
+        super().__init__(api_key="")
+        self.provider_types = [t.strip().lower() for t in provider_types if t.strip()]
+        self.resolver = resolver or _registry_resolver
+        self.default_delay = delay if delay is not None else float(os.getenv("LLM_HEDGE_DELAY", "2.0"))
+        self.quantile = quantile if quantile is not None else float(os.getenv("LLM_HEDGE_QUANTILE", "0.9"))
+        self._histograms: Dict[str, LatencyHistogram] = {t: LatencyHistogram() for t in self.provider_types}
+        self._stats = {"requests": 0, "hedged": 0, "failovers": 0, "wins": {t: 0 for t in self.provider_types}}
+        self._lock = threading.Lock()
+
+    def _members(self) -> List[Tuple[str, LLMProviderInterface]]:
+        """按顺序获取可用的提供商实例（未配置的提供商跳过）"""
+        members = []
+        for provider_type in self.provider_types:
+            try:
+                members.append((provider_type, self.resolver(provider_type)))
+            except ValueError as e:
+                logger.warning(f"[llm.hedged] 跳过不可用的LLM提供商 {provider_type}: {e}")
+        if not members:
+            raise ValueError(f"没有可用的LLM提供商: {self.provider_types}")
+        return members
+
+    def hedge_delay(self, provider_type: str) -> float:
+        """该提供商的对冲延迟：首token耗时分位数，样本不足时使用默认值"""
+        with self._lock:
+            histogram = self._histograms[provider_type]
+            if histogram.count < MIN_SAMPLES:
+                return self.default_delay
+            return min(MAX_HEDGE_DELAY, max(MIN_HEDGE_DELAY, histogram.quantile(self.quantile)))
+
+    def _observe(self, provider_type: str, seconds: float):
+        with self._lock:
+            self._histograms[provider_type].observe(seconds)
+
+    @staticmethod
+    def _member_config(provider_type: str, config: Optional[LLMConfig]) -> Optional[LLMConfig]:
+        """不同提供商的模型名称不同，按 {PROVIDER}_MODEL 替换"""
+        model = os.getenv(f"{provider_type.upper()}_MODEL")
+        if config is None or not model:
+            return config
+        return dataclasses.replace(config, model=model)
+
+    async def _hedge(self, members: List[Tuple[str, LLMProviderInterface]],
+                     attempt: Callable[[str, LLMProviderInterface], Awaitable[Any]],
+                     discard: Optional[Callable[[Any], Awaitable[None]]] = None) -> Any:
+        """
+        对冲执行：主提供商超过对冲延迟未完成时启动下一个备用提供商，出错时立即启动，
+        返回最先成功的结果并取消其余请求
+
+        Args:
+            members: 提供商列表，第一个为主提供商
+            attempt: 向单个提供商发起请求的协程函数
+            discard: 同时成功但未被采用的结果的清理函数
+        """
+        with self._lock:
+            self._stats["requests"] += 1
+
+        backups = list(members[1:])
+        tasks: Dict[asyncio.Task, str] = {}
+
+        def launch(name: str, provider: LLMProviderInterface):
+            tasks[asyncio.create_task(attempt(name, provider))] = name
+
+        launch(*members[0])
+        delay = self.hedge_delay(members[0][0])
+        last_error: Optional[BaseException] = None
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    tasks, timeout=delay if backups else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    name, provider = backups.pop(0)
+                    logger.info(f"[llm.hedged] {delay:.2f}秒内未收到首个token，向备用提供商 {name} 发送对冲请求")
+                    with self._lock:
+                        self._stats["hedged"] += 1
+                    launch(name, provider)
+                    continue
+
+                winner = None
+                for task in done:
+                    name = tasks.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        logger.warning(f"[llm.hedged] 提供商 {name} 请求失败: {last_error}")
+                        continue
+                    if winner is None:
+                        winner = (name, task.result())
+                    elif discard is not None:
+                        await discard(task.result())
+
+                if winner is not None:
+                    with self._lock:
+                        self._stats["wins"][winner[0]] += 1
+                    return winner[1]
+
+                # 全部失败：立即启动下一个备用提供商
+                if backups and not tasks:
+                    name, provider = backups.pop(0)
+                    with self._lock:
+                        self._stats["failovers"] += 1
+                    launch(name, provider)
+            raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif discard is not None and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+
+    async def _attempt_chat(self, name: str, provider: LLMProviderInterface,
+                            messages: List[Message], config: Optional[LLMConfig]) -> LLMResponse:
+        started = time.perf_counter()
+        try:
+            response = await provider.achat(messages, self._member_config(name, config))
+        except asyncio.CancelledError:
+            # 被取消的请求至少耗时这么久，同样计入直方图，避免慢请求被对冲后样本偏低
+            self._observe(name, time.perf_counter() - started)
+            raise
+        self._observe(name, time.perf_counter() - started)
+        return response
+
+    async def _open_stream(self, name: str, provider: LLMProviderInterface,
+                           messages: List[Message], config: Optional[LLMConfig]) -> tuple:
+        """发起流式请求并等待首个有内容的数据块，返回 (数据流, 已读取的数据块)"""
+        started = time.perf_counter()
+        stream = provider.achat_stream(messages, self._member_config(name, config))
+        buffered: List[ResponseChunk] = []
+        try:
+            async for chunk in stream:
+                buffered.append(chunk)
+                if chunk.content or chunk.reasoning_content or chunk.is_finished:
+                    break
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                self._observe(name, time.perf_counter() - started)
+            await stream.aclose()
+            raise
+        self._observe(name, time.perf_counter() - started)
+        return stream, buffered
+
+    async def achat(self,
+                    messages: List[Message],
+                    config: Optional[LLMConfig] = None) -> LLMResponse:
+        """异步非流式对话（对冲）"""
+        return await self._hedge(
+            self._members(),
+            lambda name, provider: self._attempt_chat(name, provider, messages, config)
+        )
+
+    async def achat_stream(self,
+                           messages: List[Message],
+                           config: Optional[LLMConfig] = None) -> AsyncIterator[ResponseChunk]:
+        """异步流式对话（按首个token对冲）"""
+        stream, buffered = await self._hedge(
+            self._members(),
+            lambda name, provider: self._open_stream(name, provider, messages, config),
+            discard=lambda result: result[0].aclose()
+        )
+        try:
+            for chunk in buffered:
+                yield chunk
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    def chat(self,
+             messages: List[Message],
+             config: Optional[LLMConfig] = None) -> LLMResponse:
+        """同步非流式对话（不对冲，使用主提供商）"""
+        name, provider = self._members()[0]
+        return provider.chat(messages, self._member_config(name, config))
+
+    def chat_stream(self,
+                    messages: List[Message],
+                    config: Optional[LLMConfig] = None) -> Iterator[ResponseChunk]:
+        """同步流式对话（不对冲，使用主提供商）"""
+        name, provider = self._members()[0]
+        return provider.chat_stream(messages, self._member_config(name, config))
+
+    def validate_config(self) -> bool:
+        """验证主提供商配置是否有效"""
+        return self._members()[0][1].validate_config()
+
+    def get_model_list(self) -> List[str]:
+        """获取主提供商的可用模型列表"""
+        return self._members()[0][1].get_model_list()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取对冲统计和各提供商的首token耗时直方图"""
+        with self._lock:
+            stats = {
+                "providers": list(self.provider_types),
+                "requests": self._stats["requests"],
+                "hedged": self._stats["hedged"],
+                "failovers": self._stats["failovers"],
+                "wins": dict(self._stats["wins"]),
+                "latency": {t: histogram.to_dict() for t, histogram in self._histograms.items()}
+            }
+        stats["hedge_delay_ms"] = {t: _ms(self.hedge_delay(t)) for t in self.provider_types}
+        return stats
+
+
+def _registry_resolver(provider_type: str) -> LLMProviderInterface:
+    from llm.factory import get_provider_registry
+    return get_provider_registry().get(provider_type)
@@ -0,0 +1,47 @@
+"""
+LLM异步HTTP客户端
+为各提供商创建长连接、带连接池的 httpx.AsyncClient
+"""
+import os
+from typing import Optional
+
+import httpx
+
+# HTTP/2 依赖 h2 包（httpx[http2]），未安装时退回 HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def create_async_client(base_url: str,
+                        api_key: str,
+                        timeout: float = 60.0,
+                        max_connections: Optional[int] = None) -> httpx.AsyncClient:
+    """
+    创建LLM提供商使用的异步HTTP客户端
+
+    Args:
+        base_url: API基础地址
+        api_key: API Key
+        timeout: 读取超时时间（秒）
+        max_connections: 最大连接数，默认读取 LLM_MAX_CONNECTIONS 环境变量
+
+    Returns:
+        httpx.AsyncClient: 异步HTTP客户端
+    """
+    if max_connections is None:
+        max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {api_key}"},
+        timeout=httpx.Timeout(timeout, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60.0
+        ),
+        http2=HTTP2_AVAILABLE
+    )
@@ -2,7 +2,7 @@
 Kimi (Moonshot AI) LLM客户端
 """
 import json
-from typing import Iterator, List, Optional
+from typing import AsyncIterator, Iterator, List, Optional
 
 import httpx
 
@@ -22,11 +22,17 @@ class KimiProvider(LLMProviderInterface):
             timeout=60.0
         )
     
-    def chat(self, 
-             messages: List[Message], 
-             config: Optional[LLMConfig] = None) -> LLMResponse:
-        """非流式对话"""
-        config = config or LLMConfig(model="kimi-k2-turbo-preview")
+    def _build_payload(self, messages: List[Message], config: LLMConfig, stream: bool = False) -> dict:
+        """构建请求体"""
+        if stream:
+            return {
+                "model": config.model,
+                "messages": [m.to_dict() for m in messages],
+                "temperature": config.temperature,
+                "max_tokens": config.max_tokens,
+                "top_p": config.top_p,
+                "stream": True
+            }
         
         payload = {
             "model": config.model,
@@ -37,10 +43,10 @@ class KimiProvider(LLMProviderInterface):
             "stream": False
         }
         
-        response = self.client.post("/chat/completions", json=payload)
-        response.raise_for_status()
-        
-        data = response.json()
+        return payload
+    
+    def _parse_response(self, data: dict) -> LLMResponse:
+        """解析非流式响应"""
         choice = data["choices"][0]
         
         # Kimi思考模型支持reasoning_content
@@ -55,6 +61,46 @@ class KimiProvider(LLMProviderInterface):
             reasoning_content=reasoning_content
         )
     
+    def _parse_stream_line(self, line: str) -> Optional[ResponseChunk]:
+        """解析一行SSE数据，无内容时返回None"""
+        if not line or line.strip() == "data: [DONE]" or not line.startswith("data: "):
+            return None
+        
+        try:
+            data = json.loads(line[6:])
+        except json.JSONDecodeError:
+            return None
+        
+        # Kimi 在最后一个数据块的 choices[0] 中返回用量
+        usage = data.get("usage")
+        if "choices" in data and len(data["choices"]) > 0:
+            choice = data["choices"][0]
+            usage = usage or choice.get("usage")
+            delta = choice.get("delta", {})
+            content = delta.get("content", "")
+            reasoning = delta.get("reasoning_content")
+            if content or reasoning:
+                return ResponseChunk(
+                    content=content,
+                    is_finished=False,
+                    reasoning_content=reasoning,
+                    usage=usage
+                )
+        if usage:
+            return ResponseChunk(content="", is_finished=False, usage=usage)
+        return None
+    
+    def chat(self, 
+             messages: List[Message], 
+             config: Optional[LLMConfig] = None) -> LLMResponse:
+        """非流式对话"""
+        config = config or LLMConfig(model="kimi-k2-turbo-preview")
+        
+        response = self.client.post("/chat/completions", json=self._build_payload(messages, config))
+        response.raise_for_status()
+        
+        return self._parse_response(response.json())
+    
     def chat_stream(self, 
                     messages: List[Message], 
                     config: Optional[LLMConfig] = None) -> Iterator[ResponseChunk]:
@@ -62,37 +108,45 @@ class KimiProvider(LLMProviderInterface):
         config = config or LLMConfig(model="kimi-k2-turbo-preview")
         config.stream = True
         
-        payload = {
-            "model": config.model,
-            "messages": [m.to_dict() for m in messages],
-            "temperature": config.temperature,
-            "max_tokens": config.max_tokens,
-            "top_p": config.top_p,
-            "stream": True
-        }
-        
+        payload = self._build_payload(messages, config, stream=True)
         with self.client.stream("POST", "/chat/completions", json=payload) as response:
             response.raise_for_status()
             
             for line in response.iter_lines():
-                if not line or line.strip() == "data: [DONE]":
-                    continue
-                
-                if line.startswith("data: "):
-                    try:
-                        data = json.loads(line[6:])
-                        if "choices" in data and len(data["choices"]) > 0:
-                            delta = data["choices"][0].get("delta", {})
-                            content = delta.get("content", "")
-                            reasoning = delta.get("reasoning_content")
-                            if content or reasoning:
-                                yield ResponseChunk(
-                                    content=content,
-                                    is_finished=False,
-                                    reasoning_content=reasoning
-                                )
-                    except json.JSONDecodeError:
-                        continue
+                chunk = self._parse_stream_line(line)
+                if chunk:
+                    yield chunk
+        
+        yield ResponseChunk(content="", is_finished=True)
+    
+    async def achat(self,
+                    messages: List[Message],
+                    config: Optional[LLMConfig] = None) -> LLMResponse:
+        """异步非流式对话"""
+        config = config or LLMConfig(model="kimi-k2-turbo-preview")
+        
+        async with self.track_request():
+            response = await self.get_async_client().post("/chat/completions", json=self._build_payload(messages, config))
+        response.raise_for_status()
+        
+        return self._parse_response(response.json())
+    
+    async def achat_stream(self,
+                           messages: List[Message],
+                           config: Optional[LLMConfig] = None) -> AsyncIterator[ResponseChunk]:
+        """异步流式对话"""
+        config = config or LLMConfig(model="kimi-k2-turbo-preview")
+        config.stream = True
+        
+        payload = self._build_payload(messages, config, stream=True)
+        async with self.track_request(), \
+                self.get_async_client().stream("POST", "/chat/completions", json=payload) as response:
+            response.raise_for_status()
+            
+            async for line in response.aiter_lines():
+                chunk = self._parse_stream_line(line)
+                if chunk:
+                    yield chunk
         
         yield ResponseChunk(content="", is_finished=True)
     
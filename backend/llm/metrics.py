@@ -0,0 +1,107 @@
+"""
+LLM调用指标
+按模型累计请求数、token用量、服务端前缀缓存命中的token数、耗时和首token耗时
+
+用于验证提示词前缀布局的效果：cached_tokens / prompt_tokens 越高，
+服务端前缀缓存命中越多，首token耗时和输入token费用越低。
+"""
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+def cached_prompt_tokens(usage: Optional[Dict[str, Any]]) -> int:
+    """
+    从用量统计中读取前缀缓存命中的输入token数
+
+    OpenAI / 豆包: usage.prompt_tokens_details.cached_tokens
+    Kimi: usage.cached_tokens
+    """
+    if not usage:
+        return 0
+    details = usage.get("prompt_tokens_details") or {}
+    return int(details.get("cached_tokens") or usage.get("cached_tokens") or 0)
+
+
+@dataclass
+class ModelMetrics:
+    """单个模型的累计指标"""
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    latency_total: float = 0.0
+    latency_count: int = 0
+    first_token_total: float = 0.0
+    first_token_count: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_hit_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            "avg_latency_ms": round(self.latency_total / self.latency_count * 1000, 1) if self.latency_count else None,
+            "avg_first_token_ms": round(self.first_token_total / self.first_token_count * 1000, 1)
+            if self.first_token_count else None
+        }
+
+
+class LLMMetrics:
+    """LLM调用指标收集器（线程安全）"""
+
+    def __init__(self):
+        self._models: Dict[str, ModelMetrics] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, usage: Optional[Dict[str, Any]] = None,
+               latency: Optional[float] = None, first_token_latency: Optional[float] = None):
+        """
+        记录一次LLM调用
+
+        Args:
+            model: 模型名称
+            usage: 响应中的用量统计（LLMResponse.usage 或流式最后一块的 usage）
+            latency: 总耗时（秒）
+            first_token_latency: 流式调用的首token耗时（秒）
+        """
+        usage = usage or {}
+        with self._lock:
+            metrics = self._models.setdefault(model, ModelMetrics())
+            metrics.requests += 1
+            metrics.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+            metrics.completion_tokens += int(usage.get("completion_tokens") or 0)
+            metrics.cached_tokens += cached_prompt_tokens(usage)
+            if latency is not None:
+                metrics.latency_total += latency
+                metrics.latency_count += 1
+            if first_token_latency is not None:
+                metrics.first_token_total += first_token_latency
+                metrics.first_token_count += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取按模型汇总的指标和总计"""
+        with self._lock:
+            total = ModelMetrics()
+            for metrics in self._models.values():
+                for name in total.__dataclass_fields__:
+                    setattr(total, name, getattr(total, name) + getattr(metrics, name))
+            return {
+                "models": {model: metrics.to_dict() for model, metrics in self._models.items()},
+                "total": total.to_dict()
+            }
+
+    def reset(self):
+        """清空指标"""
+        with self._lock:
+            self._models.clear()
+
+
+# 全局LLM调用指标
+llm_metrics = LLMMetrics()
+
+
+def get_llm_metrics() -> LLMMetrics:
+    """获取全局LLM调用指标"""
+    return llm_metrics
@@ -0,0 +1,118 @@
+"""
+本地模拟LLM客户端
+不发送网络请求，按配置的延迟返回固定回复或回显用户消息，用于离线开发和测试
+（如对冲请求、流式接口）
+
+环境变量（通过工厂创建时使用）：
+- MOCK_LLM_LATENCY: 首个数据块前的延迟，秒（默认 0.05）
+- MOCK_LLM_CHUNK_DELAY: 后续数据块之间的延迟，秒（默认 0.01）
+- MOCK_LLM_REPLY: 固定回复内容，未设置时回显最后一条用户消息
+"""
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Iterator, List, Optional
+
+from llm.base import LLMConfig, LLMProviderInterface, LLMResponse, Message, ResponseChunk
+
+# 流式输出时每个数据块的字符数
+CHUNK_SIZE = 8
+
+
+class MockProvider(LLMProviderInterface):
+    """
+    模拟LLM提供商
+
+    Args:
+        latency: 首个数据块（非流式时为整个回复）前的延迟，秒
+        chunk_delay: 后续数据块之间的延迟，秒
+        reply: 固定回复内容
+        fail: 为True时调用抛出异常，用于测试故障切换
+    """
+
+    requires_api_key = False
+
+    def __init__(self, api_key: str = "", base_url: Optional[str] = None,
+                 latency: Optional[float] = None, chunk_delay: Optional[float] = None,
+                 reply: Optional[str] = None, fail: bool = False):
+        super().__init__(api_key, base_url)
+        self.latency = latency if latency is not None else float(os.getenv("MOCK_LLM_LATENCY", "0.05"))
+        self.chunk_delay = chunk_delay if chunk_delay is not None else float(os.getenv("MOCK_LLM_CHUNK_DELAY", "0.01"))
+        self.reply = reply if reply is not None else os.getenv("MOCK_LLM_REPLY")
+        self.fail = fail
+        self.calls = 0
+
+    def _reply_for(self, messages: List[Message]) -> str:
+        if self.reply is not None:
+            return self.reply
+        user_messages = [m.content for m in messages if m.role == "user"]
+        return f"收到您的消息：{user_messages[-1] if user_messages else ''}"
+
+    def _response(self, messages: List[Message], config: Optional[LLMConfig]) -> LLMResponse:
+        content = self._reply_for(messages)
+        prompt_chars = sum(len(m.content or "") for m in messages)
+        return LLMResponse(
+            content=content,
+            model=config.model if config else "mock",
+            usage={
+                "prompt_tokens": prompt_chars,
+                "completion_tokens": len(content),
+                "total_tokens": prompt_chars + len(content)
+            },
+            finish_reason="stop"
+        )
+
+    def _start(self):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("模拟LLM提供商调用失败")
+
+    @staticmethod
+    def _split(content: str) -> List[str]:
+        return [content[i:i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE)]
+
+    def chat(self,
+             messages: List[Message],
+             config: Optional[LLMConfig] = None) -> LLMResponse:
+        """非流式对话"""
+        self._start()
+        time.sleep(self.latency)
+        return self._response(messages, config)
+
+    def chat_stream(self,
+                    messages: List[Message],
+                    config: Optional[LLMConfig] = None) -> Iterator[ResponseChunk]:
+        """流式对话"""
+        self._start()
+        response = self._response(messages, config)
+        for i, piece in enumerate(self._split(response.content)):
+            time.sleep(self.latency if i == 0 else self.chunk_delay)
+            yield ResponseChunk(content=piece)
+        yield ResponseChunk(content="", is_finished=True, usage=response.usage)
+
+    async def achat(self,
+                    messages: List[Message],
+                    config: Optional[LLMConfig] = None) -> LLMResponse:
+        """异步非流式对话"""
+        self._start()
+        await asyncio.sleep(self.latency)
+        return self._response(messages, config)
+
+    async def achat_stream(self,
+                           messages: List[Message],
+                           config: Optional[LLMConfig] = None) -> AsyncIterator[ResponseChunk]:
+        """异步流式对话"""
+        self._start()
+        response = self._response(messages, config)
+        for i, piece in enumerate(self._split(response.content)):
+            await asyncio.sleep(self.latency if i == 0 else self.chunk_delay)
+            yield ResponseChunk(content=piece)
+        yield ResponseChunk(content="", is_finished=True, usage=response.usage)
+
+    def validate_config(self) -> bool:
+        """验证配置是否有效"""
+        return True
+
+    def get_model_list(self) -> List[str]:
+        """获取可用模型列表"""
+        return ["mock"]
@@ -8,9 +8,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from api import chat, config, gantt, project, task, analytics
+from api import chat, config, gantt, project, search, task, analytics
 from voice import voice_api
-from models.database import init_db
+from core.progress_rollover import get_progress_scheduler
+from models.database import async_engine, init_db
 
 
 @asynccontextmanager
@@ -18,8 +19,15 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时初始化数据库
     init_db()
+    # 启动每日进度计算（上次计算早于当天时立即补算）
+    await get_progress_scheduler().start()
     yield
-    # 关闭时清理资源
+    await get_progress_scheduler().stop()
+    # 关闭时清理资源：关闭LLM提供商的HTTP连接池
+    from llm.factory import get_provider_registry
+    await get_provider_registry().aclose_all()
+    # 关闭异步数据库连接池
+    await async_engine.dispose()
 
 
 # 创建FastAPI应用
@@ -47,6 +55,7 @@ app.include_router(task.router, prefix="/api/v1", tags=["task"])
 app.include_router(gantt.router, prefix="/api/v1", tags=["gantt"])
 app.include_router(config.router, prefix="/api/v1", tags=["config"])
 app.include_router(analytics.router, prefix="/api/v1", tags=["analytics"])
+app.include_router(search.router, prefix="/api/v1", tags=["search"])
 app.include_router(voice_api.router, prefix="/api/v1", tags=["voice"])
 
 # 静态文件服务（生产环境）
@@ -0,0 +1,103 @@
+"""
+业务数据版本号
+项目、任务、任务依赖、项目大类发生任何写入时递增，用于使依赖这些数据的缓存失效
+
+通过 Session 事件自动维护：
+- after_flush：flush 中包含被跟踪表的新增/修改/删除时递增，并标记会话
+- do_orm_execute：通过会话执行的 INSERT/UPDATE/DELETE 语句涉及被跟踪表时同上
+- after_commit：被标记的会话提交后再递增一次，保证在 flush 与 commit 之间
+  基于未提交数据生成的缓存不会在提交后被使用
+"""
+import threading
+from typing import Callable, List
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# 变化时需要递增版本号的表
+TRACKED_TABLES = frozenset({"projects", "tasks", "task_dependencies", "project_categories"})
+
+_SESSION_FLAG = "data_version_changed"
+
+
+class DataVersion:
+    """
+    进程内的数据版本计数器
+
+    只跟踪经由本进程 SQLAlchemy 会话发生的写入；直接修改数据库文件不会被感知
+    """
+
+    def __init__(self):
+        self._version = 0
+        self._listeners: List[Callable[[int], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> int:
+        """当前版本号"""
+        return self._version
+
+    def bump(self) -> int:
+        """递增版本号并通知监听者"""
+        with self._lock:
+            self._version += 1
+            version = self._version
+        for listener in list(self._listeners):
+            listener(version)
+        return version
+
+    def advance_to(self, version: int):
+        """将版本号推进到不小于给定值（用于从持久化存储恢复）"""
+        with self._lock:
+            self._version = max(self._version, version)
+
+    def add_listener(self, listener: Callable[[int], None]):
+        """注册版本变化回调，参数为新版本号"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int], None]):
+        """移除版本变化回调"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+
+# 全局数据版本
+data_version = DataVersion()
+
+
+def get_data_version() -> DataVersion:
+    """获取全局数据版本"""
+    return data_version
+
+
+def _is_tracked(obj) -> bool:
+    table = getattr(obj, "__table__", None)
+    return table is not None and table.name in TRACKED_TABLES
+
+
+@event.listens_for(Session, "after_flush")
+def _on_after_flush(session, flush_context):
+    if any(_is_tracked(obj) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_SESSION_FLAG] = True
+        data_version.bump()
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_do_orm_execute(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name in TRACKED_TABLES:
+        orm_execute_state.session.info[_SESSION_FLAG] = True
+        data_version.bump()
+
+
+@event.listens_for(Session, "after_commit")
+def _on_after_commit(session):
+    if session.info.pop(_SESSION_FLAG, False):
+        data_version.bump()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _on_after_rollback(session, previous_transaction):
+    session.info.pop(_SESSION_FLAG, None)
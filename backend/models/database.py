@@ -1,29 +1,194 @@
 """
 数据库连接和初始化
+
+SQLite 存储配置（StorageProfile）通过引擎的 connect 事件应用到每个新连接：
+WAL 日志模式下读写互不阻塞，因此分别使用两个连接池：
+- 写连接池（engine / SessionLocal / get_db）：较小，限制并发写入事务的数量
+- 读连接池（read_engine / ReadSessionLocal / get_read_db）：较大，连接设置 query_only，
+  供只读接口使用
+- 异步连接池（async_engine / AsyncSessionLocal / get_async_db）：基于 aiosqlite，
+  数据库I/O不阻塞事件循环，供读多写少的异步接口使用（项目列表、甘特图、对话历史）
+
+环境变量：
+- SQLITE_PROFILE: 存储配置名称，performance（默认）/ durable / legacy
+- SQLITE_<字段名>: 覆盖配置中的单个字段，如 SQLITE_MMAP_SIZE、SQLITE_BUSY_TIMEOUT、
+  SQLITE_READ_POOL_SIZE
 """
+import dataclasses
 import os
+from dataclasses import dataclass
 from pathlib import Path
+from typing import List, Optional, Tuple
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from models.entities import Base, Configuration
+# 注册会话事件，项目/任务/大类写入时递增数据版本号
+import models.data_version  # noqa: F401
+# 注册任务映射事件，增量维护项目任务统计
+from models.project_stats import refresh_project_stats
+from models.migrations import run_migrations
 
 # 数据库路径
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
 DATABASE_PATH = DATA_DIR / "app.db"
 DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """
+    SQLite 存储配置
+
+    值为 None（或0）的 PRAGMA 不设置，使用 SQLite 默认值
+    """
+    name: str
+    journal_mode: Optional[str] = "WAL"
+    synchronous: Optional[str] = "NORMAL"
+    # 内存映射读取的字节数
+    mmap_size: int = 256 * 1024 * 1024
+    # 页缓存大小，负数表示 KiB
+    cache_size: int = -64 * 1024
+    temp_store: Optional[str] = "MEMORY"
+    # 等待其他连接释放写锁的毫秒数
+    busy_timeout: int = 5000
+    write_pool_size: int = 4
+    read_pool_size: int = 8
+
+    def pragmas(self) -> List[str]:
+        """每个新连接上执行的 PRAGMA 语句"""
+        pragmas = []
+        if self.journal_mode:
+            pragmas.append(f"PRAGMA journal_mode={self.journal_mode}")
+        if self.synchronous:
+            pragmas.append(f"PRAGMA synchronous={self.synchronous}")
+        if self.mmap_size:
+            pragmas.append(f"PRAGMA mmap_size={self.mmap_size}")
+        if self.cache_size:
+            pragmas.append(f"PRAGMA cache_size={self.cache_size}")
+        if self.temp_store:
+            pragmas.append(f"PRAGMA temp_store={self.temp_store}")
+        if self.busy_timeout:
+            pragmas.append(f"PRAGMA busy_timeout={self.busy_timeout}")
+        return pragmas
+
+
+STORAGE_PROFILES = {
+    # WAL + synchronous=NORMAL：崩溃时可能丢失最后几个事务，但不会损坏数据库
+    "performance": StorageProfile(name="performance"),
+    # 每次提交都同步到磁盘
+    "durable": StorageProfile(name="durable", synchronous="FULL", mmap_size=0),
+    # 不设置任何 PRAGMA（回滚日志模式，与早期版本行为一致）
+    "legacy": StorageProfile(
+        name="legacy", journal_mode=None, synchronous=None, mmap_size=0,
+        cache_size=0, temp_store=None, busy_timeout=0
+    ),
+}
+
+
+def get_storage_profile(name: Optional[str] = None) -> StorageProfile:
+    """
+    获取存储配置，并应用 SQLITE_<字段名> 环境变量的覆盖
+
+    Args:
+        name: 配置名称，默认读取 SQLITE_PROFILE 环境变量
+    """
+    name = (name or os.getenv("SQLITE_PROFILE", "performance")).lower()
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"不支持的存储配置: {name}，支持的配置: {list(STORAGE_PROFILES.keys())}")
+
+    overrides = {}
+    for field in dataclasses.fields(StorageProfile):
+        value = os.getenv(f"SQLITE_{field.name.upper()}")
+        if field.name == "name" or value is None:
+            continue
+        overrides[field.name] = int(value) if field.type is int else value
+    return dataclasses.replace(STORAGE_PROFILES[name], **overrides)
+
+
+def apply_storage_profile(engine: Engine, profile: StorageProfile, read_only: bool = False):
+    """
+    在引擎的每个新连接上应用存储配置
+
+    Args:
+        engine: SQLite 引擎
+        profile: 存储配置
+        read_only: 是否为只读连接（设置 query_only，误写入时直接报错）
+    """
+    pragmas = profile.pragmas()
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def create_sqlite_engines(url: str, profile: StorageProfile) -> Tuple[Engine, Engine]:
+    """
+    创建写引擎和读引擎
+
+    Returns:
+        Tuple[Engine, Engine]: (写引擎, 读引擎)
+    """
+    write_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=profile.write_pool_size,
+        max_overflow=profile.write_pool_size,
+        echo=False
+    )
+    read_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=profile.read_pool_size,
+        max_overflow=profile.read_pool_size,
+        echo=False
+    )
+    apply_storage_profile(write_engine, profile)
+    apply_storage_profile(read_engine, profile, read_only=True)
+    return write_engine, read_engine
+
+
+def create_async_sqlite_engine(url: str, profile: StorageProfile) -> AsyncEngine:
+    """
+    创建 aiosqlite 异步引擎，连接池大小与读连接池一致
+
+    aiosqlite 默认不使用连接池（每次请求重新打开数据库并执行 PRAGMA），这里显式使用队列连接池
+
+    Args:
+        url: 数据库地址（sqlite+aiosqlite:///...）
+        profile: 存储配置
+    """
+    async_engine = create_async_engine(
+        url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=profile.read_pool_size,
+        max_overflow=profile.read_pool_size,
+        echo=False
+    )
+    apply_storage_profile(async_engine.sync_engine, profile)
+    return async_engine
+
 
 # 创建引擎
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=False
-)
+storage_profile = get_storage_profile()
+engine, read_engine = create_sqlite_engines(DATABASE_URL, storage_profile)
+async_engine = create_async_sqlite_engine(ASYNC_DATABASE_URL, storage_profile)
 
 # 会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 
 
 def get_db():
@@ -35,10 +200,28 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """获取只读数据库会话（用于只读接口的依赖注入，使用独立的读连接池）"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """获取异步数据库会话（用于异步接口的依赖注入）"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
-    """初始化数据库，创建表和默认数据"""
-    # 创建所有表
+    """初始化数据库：创建表、执行数据库迁移并插入默认数据"""
+    # 创建所有表（新表不需要迁移）
     Base.metadata.create_all(bind=engine)
+    # 已有数据库上的新增列、索引和派生表
+    for migration in run_migrations(engine):
+        print(f"已执行数据库迁移 {migration.version}: {migration.name}")
     
     # 插入默认配置
     db = SessionLocal()
@@ -71,30 +254,13 @@ def init_db():
     finally:
         db.close()
     
-    # 检查并添加 tasks 表的 order 列
-    db = SessionLocal()
-    try:
-        from sqlalchemy import text
-        # 检查 tasks 表是否有 order 列
-        result = db.execute(text("PRAGMA table_info(tasks)"))
-        columns = [row[1] for row in result]
-        
-        if 'order' not in columns:
-            # 添加 order 列
-            db.execute(text("ALTER TABLE tasks ADD COLUMN \"order\" INTEGER DEFAULT 0"))
-            db.commit()
-            # 为现有任务设置默认的 order 值
-            tasks = db.execute(text("SELECT id FROM tasks ORDER BY id")).fetchall()
-            for i, task in enumerate(tasks):
-                db.execute(text(f"UPDATE tasks SET \"order\" = {i} WHERE id = {task[0]}"))
-            db.commit()
-            print("已成功添加 tasks.order 列并设置默认值")
-        else:
-            print("tasks.order 列已存在")
-    except Exception as e:
-        print(f"添加 order 列失败: {str(e)}")
-        db.rollback()
-    finally:
-        db.close()
+    # 缺少统计行的项目（如不经过 ORM 插入的项目）重新计算
+    with engine.begin() as conn:
+        missing = conn.execute(text(
+            "SELECT projects.id FROM projects LEFT JOIN project_stats ON project_stats.project_id = projects.id "
+            "WHERE project_stats.project_id IS NULL"
+        )).scalars().all()
+        if missing:
+            print(f"重新计算项目任务统计: {refresh_project_stats(conn, missing)} 个项目")
     
     print(f"数据库初始化完成: {DATABASE_PATH}")
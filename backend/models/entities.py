@@ -4,7 +4,9 @@ SQLAlchemy ORM 模型定义
 from datetime import datetime
 from enum import Enum as PyEnum
 
-from sqlalchemy import CheckConstraint, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, event
+from sqlalchemy import (
+    CheckConstraint, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint, event
+)
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
 
@@ -93,6 +95,7 @@ class Project(Base):
     tasks = relationship("Task", back_populates="project", cascade="all, delete-orphan")
     conversations = relationship("Conversation", back_populates="project")
     category = relationship("ProjectCategory", back_populates="projects")
+    stats = relationship("ProjectStats", back_populates="project", uselist=False, viewonly=True)
     
     # 约束
     __table_args__ = (
@@ -101,6 +104,7 @@ class Project(Base):
             f"status IN {tuple(s.value for s in ProjectStatus)}",
             name='chk_project_status'
         ),
+        Index('idx_projects_name', 'name'),
         Index('idx_projects_status', 'status'),
         Index('idx_projects_dates', 'start_date', 'end_date'),
     )
@@ -145,6 +149,15 @@ class Task(Base):
     
     # 关系
     project = relationship("Project", back_populates="tasks")
+    # 依赖关系（删除任务时一并删除）
+    predecessor_links = relationship(
+        "TaskDependency", foreign_keys="TaskDependency.successor_id",
+        back_populates="successor", cascade="all, delete-orphan"
+    )
+    successor_links = relationship(
+        "TaskDependency", foreign_keys="TaskDependency.predecessor_id",
+        back_populates="predecessor", cascade="all, delete-orphan"
+    )
     
     # 约束
     __table_args__ = (
@@ -158,6 +171,7 @@ class Task(Base):
             name='chk_task_priority'
         ),
         Index('idx_tasks_project_id', 'project_id'),
+        Index('idx_tasks_project_name', 'project_id', 'name'),
         Index('idx_tasks_status', 'status'),
         Index('idx_tasks_assignee', 'assignee'),
         Index('idx_tasks_priority', 'priority'),
@@ -185,6 +199,93 @@ class Task(Base):
         }
 
 
+class TaskDependency(Base):
+    """
+    任务依赖关系表（完成-开始）
+
+    后续任务在前置任务结束 lag_days 天后才能开始，排期计算见 core/scheduling.py
+    """
+    __tablename__ = 'task_dependencies'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    predecessor_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), nullable=False)
+    successor_id = Column(Integer, ForeignKey('tasks.id', ondelete='CASCADE'), nullable=False)
+    lag_days = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=func.current_timestamp(), nullable=False)
+    
+    # 关系
+    predecessor = relationship("Task", foreign_keys=[predecessor_id], back_populates="successor_links")
+    successor = relationship("Task", foreign_keys=[successor_id], back_populates="predecessor_links")
+    
+    # 约束
+    __table_args__ = (
+        CheckConstraint('predecessor_id != successor_id', name='chk_task_dependency_self'),
+        UniqueConstraint('predecessor_id', 'successor_id', name='uq_task_dependency'),
+        Index('idx_task_dependencies_successor', 'successor_id'),
+    )
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'predecessor_id': self.predecessor_id,
+            'successor_id': self.successor_id,
+            'lag_days': self.lag_days,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class ProjectStats(Base):
+    """
+    项目任务统计表（反规范化）
+
+    由 models/project_stats.py 中的任务映射事件在同一事务内增量维护，
+    可通过 python -m models.project_stats 重新计算
+    """
+    __tablename__ = 'project_stats'
+    
+    project_id = Column(Integer, ForeignKey('projects.id', ondelete='CASCADE'), primary_key=True)
+    task_count = Column(Integer, default=0, nullable=False)
+    # 按状态统计
+    pending_count = Column(Integer, default=0, nullable=False)
+    active_count = Column(Integer, default=0, nullable=False)
+    completed_count = Column(Integer, default=0, nullable=False)
+    delayed_count = Column(Integer, default=0, nullable=False)
+    cancelled_count = Column(Integer, default=0, nullable=False)
+    # 按优先级统计
+    high_priority_count = Column(Integer, default=0, nullable=False)
+    medium_priority_count = Column(Integer, default=0, nullable=False)
+    low_priority_count = Column(Integer, default=0, nullable=False)
+    # 计划/实际工期合计（天），只统计开始和结束日期都有值的任务
+    planned_days = Column(Integer, default=0, nullable=False)
+    actual_days = Column(Integer, default=0, nullable=False)
+    min_planned_start_date = Column(DateTime, nullable=True)
+    max_planned_end_date = Column(DateTime, nullable=True)
+    min_actual_start_date = Column(DateTime, nullable=True)
+    max_actual_end_date = Column(DateTime, nullable=True)
+    
+    # 关系
+    project = relationship("Project", back_populates="stats")
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'task_count': self.task_count,
+            'status_counts': {
+                status.value: getattr(self, f'{status.value}_count') for status in TaskStatus
+            },
+            'priority_counts': {
+                priority.value: getattr(self, f'{priority.name.lower()}_priority_count') for priority in TaskPriority
+            },
+            'planned_days': self.planned_days,
+            'actual_days': self.actual_days,
+            'min_planned_start_date': self.min_planned_start_date.isoformat() if self.min_planned_start_date else None,
+            'max_planned_end_date': self.max_planned_end_date.isoformat() if self.max_planned_end_date else None,
+            'min_actual_start_date': self.min_actual_start_date.isoformat() if self.min_actual_start_date else None,
+            'max_actual_end_date': self.max_actual_end_date.isoformat() if self.max_actual_end_date else None,
+        }
+
+
 class Conversation(Base):
     """对话历史表"""
     __tablename__ = 'conversations'
@@ -0,0 +1,179 @@
+"""
+数据库结构迁移
+
+schema_version 表记录已执行的迁移版本，init_db 在启动时执行尚未执行的迁移，
+请求处理过程中不再检查数据库结构。
+
+新增迁移：在本模块末尾用 @migration(版本号, 名称) 注册函数，版本号递增，
+函数接收同一事务内的连接，返回 False 表示当前环境无法完成（如 SQLite 缺少所需的扩展），
+不记录该版本，下次执行时重试。Base.metadata.create_all 会先创建缺少的表（新表不需要迁移），
+迁移负责已有数据库上的新增列、索引、派生表的回填等，应可在新建的数据库上重复执行。
+
+所有待执行的迁移在同一个 BEGIN IMMEDIATE 事务中执行，多个进程同时启动时依次等待写锁，
+取得写锁后重新读取版本号，迁移只会执行一次。
+
+查看和执行迁移：
+    python -m models.migrations
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from models.entities import Base, ProjectStats, TaskDependency
+from models.project_stats import refresh_project_stats
+from models.search_index import create_search_index
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_TABLE = "schema_version"
+
+
+@dataclass(frozen=True)
+class Migration:
+    """数据库结构迁移"""
+    version: int
+    name: str
+    upgrade: Callable[[Connection], Optional[bool]]
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    """注册迁移（版本号必须递增）"""
+    def decorator(func: Callable[[Connection], Optional[bool]]):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"迁移版本号必须递增: {version} {name}")
+        MIGRATIONS.append(Migration(version, name, func))
+        return func
+    return decorator
+
+
+def _create_version_table(connection: Connection):
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+        f"version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at DATETIME NOT NULL)"
+    ))
+
+
+def current_version(connection: Connection) -> int:
+    """数据库当前的迁移版本，未执行过迁移时为0"""
+    _create_version_table(connection)
+    return connection.execute(text(f"SELECT coalesce(max(version), 0) FROM {SCHEMA_VERSION_TABLE}")).scalar()
+
+
+def applied_versions(connection: Connection) -> Set[int]:
+    """已执行的迁移版本"""
+    _create_version_table(connection)
+    return set(connection.execute(text(f"SELECT version FROM {SCHEMA_VERSION_TABLE}")).scalars())
+
+
+def run_migrations(engine: Engine) -> List[Migration]:
+    """
+    执行尚未执行的迁移
+
+    Args:
+        engine: 数据库引擎（写引擎）
+
+    Returns:
+        List[Migration]: 本次执行的迁移
+    """
+    with engine.connect() as connection:
+        # 先取得写锁再读取版本号，避免多个进程重复执行同一迁移
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            applied = applied_versions(connection)
+            pending = [m for m in MIGRATIONS if m.version not in applied]
+            completed = []
+            for item in pending:
+                logger.info(f"执行数据库迁移 {item.version}: {item.name}")
+                if item.upgrade(connection) is False:
+                    logger.warning(f"数据库迁移 {item.version}: {item.name} 未完成，下次启动时重试")
+                    continue
+                completed.append(item)
+                connection.execute(
+                    text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, name, applied_at) "
+                         f"VALUES (:version, :name, :applied_at)"),
+                    {"version": item.version, "name": item.name, "applied_at": datetime.now()}
+                )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+    return completed
+
+
+def _columns(connection: Connection, table: str) -> List[str]:
+    return [row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))]
+
+
+# ---------------------------------------------------------------------------
+# 迁移
+# ---------------------------------------------------------------------------
+
+@migration(1, "tasks.order")
+def _add_task_order(connection: Connection):
+    """任务排序列，已有任务按创建顺序（id）在项目内编号"""
+    if "order" in _columns(connection, "tasks"):
+        return
+    connection.execute(text('ALTER TABLE tasks ADD COLUMN "order" INTEGER NOT NULL DEFAULT 0'))
+    connection.execute(text(
+        'UPDATE tasks SET "order" = ranked.position FROM ('
+        'SELECT id, row_number() OVER (PARTITION BY project_id ORDER BY id) - 1 AS position FROM tasks'
+        ') AS ranked WHERE ranked.id = tasks.id'
+    ))
+
+
+@migration(2, "conversations.analysis")
+def _add_conversation_analysis(connection: Connection):
+    """对话的分析过程列（原 add_analysis_column.py）"""
+    if "analysis" not in _columns(connection, "conversations"):
+        connection.execute(text("ALTER TABLE conversations ADD COLUMN analysis TEXT"))
+
+
+@migration(3, "model indexes")
+def _create_model_indexes(connection: Connection):
+    """补建模型中声明、已有数据库中缺少的索引（如按名称查找项目和任务的索引）"""
+    existing = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars())
+    for table in Base.metadata.sorted_tables:
+        # 之后的迁移创建的表连同索引一起创建
+        if table.name not in existing:
+            continue
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+
+
+@migration(4, "project_stats backfill")
+def _backfill_project_stats(connection: Connection):
+    """创建项目任务统计表并按已有任务计算"""
+    ProjectStats.__table__.create(bind=connection, checkfirst=True)
+    refresh_project_stats(connection)
+
+
+@migration(5, "full-text search index")
+def _create_search_index(connection: Connection) -> bool:
+    """对话和任务的全文检索索引（SQLite 不支持 FTS5 trigram 时不记录版本，下次启动时重试）"""
+    return create_search_index(connection)
+
+
+@migration(6, "task dependencies")
+def _create_task_dependencies(connection: Connection):
+    """任务依赖关系表（删除任务时会删除其依赖关系，已有数据库上的写入也需要该表）"""
+    TaskDependency.__table__.create(bind=connection, checkfirst=True)
+    for index in TaskDependency.__table__.indexes:
+        index.create(bind=connection, checkfirst=True)
+
+
+if __name__ == "__main__":
+    from models.database import engine
+
+    Base.metadata.create_all(bind=engine)
+    applied = run_migrations(engine)
+    for item in applied:
+        print(f"已执行迁移 {item.version}: {item.name}")
+    with engine.connect() as conn:
+        print(f"当前数据库版本: {current_version(conn)}")
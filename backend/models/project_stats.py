@@ -0,0 +1,277 @@
+"""
+项目任务统计（project_stats 表）的增量维护
+
+通过任务的映射事件在写入任务的同一事务内更新统计，读取项目列表、大类统计和分析数据时
+不再需要扫描全部任务：
+- after_insert / after_delete：按任务的贡献值增加/减少计数和工期合计
+- after_update：按修改前后贡献值之差更新；任务移动到其他项目时分别更新两个项目
+- 项目的 after_insert / after_delete：插入全部为0的统计行/删除统计行
+- 日期范围（最早开始/最晚结束）无法增量减少，相关字段变化时对该项目重新聚合
+- 相关字段设置 active_history，对已过期的对象赋值时也会加载修改前的值；
+  仍无法确定修改前的值时，对该项目完整重新计算
+
+不经过 ORM 映射事件的批量写入（如 insert(Task) 的 executemany）需要调用
+apply_inserted_tasks / refresh_project_stats。
+
+统计可能因直接修改数据库等原因与任务不一致，可运行以下命令重新计算：
+    python -m models.project_stats
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import Integer, case, cast, delete, event, func, inspect, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+
+from models.entities import Project, ProjectStats, Task, TaskPriority, TaskStatus
+
+# 任务状态/优先级 -> 统计列
+STATUS_COLUMNS = {status.value: f"{status.value}_count" for status in TaskStatus}
+PRIORITY_COLUMNS = {priority.value: f"{priority.name.lower()}_priority_count" for priority in TaskPriority}
+COUNT_COLUMNS = ("task_count", *STATUS_COLUMNS.values(), *PRIORITY_COLUMNS.values(), "planned_days", "actual_days")
+
+# 影响统计的任务字段
+TRACKED_FIELDS = (
+    "project_id", "status", "priority",
+    "planned_start_date", "planned_end_date", "actual_start_date", "actual_end_date",
+)
+DATE_FIELDS = TRACKED_FIELDS[3:]
+
+stats_table = ProjectStats.__table__
+
+
+def _days(start: Optional[datetime], end: Optional[datetime]) -> int:
+    """工期天数，开始或结束日期为空时为0"""
+    if start is None or end is None:
+        return 0
+    return max((end - start).days, 0)
+
+
+def task_contribution(values: Mapping) -> Dict[str, int]:
+    """
+    单个任务对项目统计的贡献值
+
+    Args:
+        values: 任务字段值，至少包含 TRACKED_FIELDS 中的字段（project_id 除外）
+    """
+    contribution = dict.fromkeys(COUNT_COLUMNS, 0)
+    contribution["task_count"] = 1
+    status_column = STATUS_COLUMNS.get(values.get("status") or TaskStatus.PENDING.value)
+    if status_column:
+        contribution[status_column] = 1
+    priority_column = PRIORITY_COLUMNS.get(values.get("priority") or TaskPriority.MEDIUM.value)
+    if priority_column:
+        contribution[priority_column] = 1
+    contribution["planned_days"] = _days(values.get("planned_start_date"), values.get("planned_end_date"))
+    contribution["actual_days"] = _days(values.get("actual_start_date"), values.get("actual_end_date"))
+    return contribution
+
+
+def _apply_delta(connection: Connection, project_id: int, delta: Dict[str, int], refresh_dates: bool):
+    """把计数增量写入项目统计行（不存在时插入），并按需重新聚合日期范围"""
+    if project_id is None:
+        return
+    if any(delta.values()):
+        statement = sqlite_insert(stats_table).values(project_id=project_id, **delta)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[stats_table.c.project_id],
+            set_={column: stats_table.c[column] + statement.excluded[column] for column in delta}
+        ))
+    if refresh_dates:
+        _refresh_dates(connection, project_id)
+
+
+def _refresh_dates(connection: Connection, project_id: int):
+    """重新聚合项目的日期范围（按 project_id 索引只扫描该项目的任务）"""
+    def aggregate(function, column):
+        return select(function(column)).where(Task.project_id == project_id).scalar_subquery()
+
+    values = {
+        "min_planned_start_date": aggregate(func.min, Task.planned_start_date),
+        "max_planned_end_date": aggregate(func.max, Task.planned_end_date),
+        "min_actual_start_date": aggregate(func.min, Task.actual_start_date),
+        "max_actual_end_date": aggregate(func.max, Task.actual_end_date),
+    }
+    result = connection.execute(
+        update(stats_table).where(stats_table.c.project_id == project_id).values(**values)
+    )
+    if result.rowcount == 0:
+        connection.execute(sqlite_insert(stats_table).values(project_id=project_id, **values))
+
+
+def _negate(contribution: Dict[str, int]) -> Dict[str, int]:
+    return {column: -value for column, value in contribution.items()}
+
+
+def _subtract(new: Dict[str, int], old: Dict[str, int]) -> Dict[str, int]:
+    return {column: new[column] - old[column] for column in new}
+
+
+def apply_inserted_tasks(connection: Connection, rows: Iterable[Mapping]):
+    """
+    把不经过映射事件插入的任务计入统计
+
+    Args:
+        connection: 执行插入的连接（同一事务）
+        rows: 插入的任务字段值
+    """
+    deltas: Dict[int, Dict[str, int]] = {}
+    dated = set()
+    for row in rows:
+        project_id = row["project_id"]
+        delta = deltas.setdefault(project_id, dict.fromkeys(COUNT_COLUMNS, 0))
+        for column, value in task_contribution(row).items():
+            delta[column] += value
+        if any(row.get(field) is not None for field in DATE_FIELDS):
+            dated.add(project_id)
+    for project_id, delta in deltas.items():
+        _apply_delta(connection, project_id, delta, project_id in dated)
+
+
+def refresh_project_stats(connection: Connection, project_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    从任务表重新计算项目统计
+
+    Args:
+        connection: 数据库连接（会话中可使用 db.connection()）
+        project_ids: 需要重新计算的项目ID，默认全部项目
+
+    Returns:
+        int: 重新计算的项目数量
+    """
+    ids = None if project_ids is None else sorted(set(project_ids))
+    if ids is not None and not ids:
+        return 0
+
+    def days(start, end):
+        return func.coalesce(func.max(cast(func.julianday(end) - func.julianday(start), Integer), 0), 0)
+
+    columns = [
+        Project.id.label("project_id"),
+        func.count(Task.id).label("task_count"),
+    ]
+    columns += [
+        func.coalesce(func.sum(case((Task.status == status, 1), else_=0)), 0).label(column)
+        for status, column in STATUS_COLUMNS.items()
+    ]
+    columns += [
+        func.coalesce(func.sum(case((Task.priority == priority, 1), else_=0)), 0).label(column)
+        for priority, column in PRIORITY_COLUMNS.items()
+    ]
+    columns += [
+        func.coalesce(func.sum(days(Task.planned_start_date, Task.planned_end_date)), 0).label("planned_days"),
+        func.coalesce(func.sum(days(Task.actual_start_date, Task.actual_end_date)), 0).label("actual_days"),
+        func.min(Task.planned_start_date).label("min_planned_start_date"),
+        func.max(Task.planned_end_date).label("max_planned_end_date"),
+        func.min(Task.actual_start_date).label("min_actual_start_date"),
+        func.max(Task.actual_end_date).label("max_actual_end_date"),
+    ]
+    query = select(*columns).select_from(Project).outerjoin(Task, Task.project_id == Project.id).group_by(Project.id)
+
+    if ids is None:
+        connection.execute(delete(stats_table))
+    else:
+        query = query.where(Project.id.in_(ids))
+        connection.execute(delete(stats_table).where(stats_table.c.project_id.in_(ids)))
+
+    result = connection.execute(stats_table.insert().from_select([column.name for column in columns], query))
+    return result.rowcount
+
+
+def loaded_values(target: Task) -> Optional[Dict]:
+    """对象当前已加载的字段值，有字段未加载时返回None"""
+    values = {field: target.__dict__[field] for field in TRACKED_FIELDS if field in target.__dict__}
+    return values if len(values) == len(TRACKED_FIELDS) else None
+
+
+def _track_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# 赋值时加载修改前的值（默认只对已加载的字段记录），after_update 中才能计算增量
+for _field in TRACKED_FIELDS:
+    event.listen(getattr(Task, _field), "set", _track_old_value, active_history=True)
+
+
+@event.listens_for(Task, "after_insert")
+def _task_inserted(mapper, connection, target):
+    values = {field: getattr(target, field) for field in TRACKED_FIELDS}
+    _apply_delta(
+        connection, values["project_id"], task_contribution(values),
+        refresh_dates=any(values[field] is not None for field in DATE_FIELDS)
+    )
+
+
+def task_changes(target: Task) -> Optional[Tuple[Dict, Dict, Set[str]]]:
+    """
+    任务在本次 flush 中影响统计的字段变化（在 after_update 事件中调用）
+
+    Returns:
+        (修改前的值, 修改后的值, 变化的字段)；修改前的值未加载时返回None
+    """
+    state = inspect(target)
+    new_values, old_values = {}, {}
+    changed = set()
+    for field in TRACKED_FIELDS:
+        history = state.attrs[field].history
+        new_values[field] = getattr(target, field)
+        if not history.has_changes():
+            old_values[field] = new_values[field]
+            continue
+        if not history.deleted:
+            return None
+        changed.add(field)
+        old_values[field] = history.deleted[0]
+    return old_values, new_values, changed
+
+
+@event.listens_for(Task, "after_update")
+def _task_updated(mapper, connection, target):
+    changes = task_changes(target)
+    if changes is None:
+        # 修改前的值未加载，无法计算增量
+        refresh_project_stats(connection, {target.project_id})
+        return
+    old_values, new_values, changed = changes
+    if not changed:
+        return
+
+    dates_changed = bool(changed & set(DATE_FIELDS))
+    new_contribution = task_contribution(new_values)
+    old_contribution = task_contribution(old_values)
+    if old_values["project_id"] != new_values["project_id"]:
+        _apply_delta(connection, old_values["project_id"], _negate(old_contribution), refresh_dates=True)
+        _apply_delta(connection, new_values["project_id"], new_contribution, refresh_dates=True)
+    else:
+        _apply_delta(connection, new_values["project_id"], _subtract(new_contribution, old_contribution), dates_changed)
+
+
+@event.listens_for(Task, "after_delete")
+def _task_deleted(mapper, connection, target):
+    values = loaded_values(target)
+    if values is None:
+        # 删除前字段未加载：行已删除无法再读取，按已知的项目ID（未知时全部项目）重新计算
+        project_id = target.__dict__.get("project_id")
+        refresh_project_stats(connection, None if project_id is None else {project_id})
+        return
+    _apply_delta(connection, values["project_id"], _negate(task_contribution(values)), refresh_dates=True)
+
+
+@event.listens_for(Project, "after_insert")
+def _project_inserted(mapper, connection, target):
+    # 没有任务的项目同样有统计行（全部为0）
+    connection.execute(sqlite_insert(stats_table).values(project_id=target.id).on_conflict_do_nothing())
+
+
+@event.listens_for(Project, "after_delete")
+def _project_deleted(mapper, connection, target):
+    # SQLite 默认不启用外键约束，ON DELETE CASCADE 不生效，需要显式删除
+    connection.execute(delete(stats_table).where(stats_table.c.project_id == target.id))
+
+
+if __name__ == "__main__":
+    from models.database import engine
+
+    with engine.begin() as conn:
+        count = refresh_project_stats(conn)
+    print(f"已重新计算 {count} 个项目的任务统计")
@@ -109,6 +109,12 @@ class TaskUpdate(BaseModel):
     order: Optional[int] = Field(None, ge=0, description="任务顺序")
 
 
+class TaskDependencyCreate(BaseModel):
+    """添加任务依赖请求"""
+    predecessor_id: int = Field(..., description="前置任务ID")
+    lag_days: int = Field(0, ge=0, description="前置任务完成后的延迟天数")
+
+
 class TaskResponse(BaseModel):
     """任务响应"""
     id: int
@@ -147,6 +153,8 @@ class GanttTask(BaseModel):
     endTimeType: Optional[str] = None  # 结束时间类型：actual 或 planned
     project_id: Optional[int] = None  # 项目ID，用于任务点击时定位项目
     order: Optional[int] = 0  # 任务顺序
+    critical: bool = False  # 是否在关键路径上（项目有任务依赖时计算）
+    slack: Optional[int] = None  # 总时差（天）
 
 
 class GanttData(BaseModel):
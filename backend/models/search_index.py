@@ -0,0 +1,181 @@
+"""
+对话和任务的全文检索索引（SQLite FTS5）
+
+- conversations_fts：conversations.content / analysis
+- tasks_fts：tasks.name / description / deliverable
+
+索引表为外部内容表，不重复保存文本：内容来自原表上的视图（<索引表>_source），由原表
+上的触发器在新增、修改和删除时同步维护，包括不经过 ORM 的批量删除。
+
+分词使用 trigram：按连续三个字符建立索引，不依赖空格分词，中文和英文都按子串匹配。
+trigram 无法直接匹配少于三个字符的词（中文常见的两字词），检索时从词表
+（<索引表>_vocab，fts5vocab）中取出以该词开头的全部三字片段，展开为 OR 查询；
+视图在文本末尾补两个空格，使位于文本末尾的短词同样有以它开头的片段。
+
+init_db 执行数据库迁移（models/migrations.py）时创建索引表和触发器并回填已有数据，
+SQLite 不支持时不记录迁移版本，下次启动时重试；索引是否可用按数据库引擎缓存，检索请求不再查询数据库结构。
+索引可能因直接修改数据库等原因与原表不一致，可运行以下命令重新建立：
+    python -m models.search_index
+"""
+import logging
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+# 短词展开的三字片段上限（按出现的行数从多到少）
+MAX_EXPANSIONS = 500
+# 索引内容（视图和触发器）补在文本末尾的字符
+_PADDING = "  "
+
+# 按数据库引擎缓存的索引是否可用（创建索引或首次检索时确定）
+_available: "weakref.WeakKeyDictionary[Engine, bool]" = weakref.WeakKeyDictionary()
+_available_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class SearchTable:
+    """全文检索索引表定义"""
+    name: str
+    source: str
+    columns: Tuple[str, ...]
+
+    @property
+    def vocab(self) -> str:
+        return f"{self.name}_vocab"
+
+    @property
+    def view(self) -> str:
+        return f"{self.name}_source"
+
+
+CONVERSATIONS_FTS = SearchTable("conversations_fts", "conversations", ("content", "analysis"))
+TASKS_FTS = SearchTable("tasks_fts", "tasks", ("name", "description", "deliverable"))
+SEARCH_TABLES = (CONVERSATIONS_FTS, TASKS_FTS)
+
+
+def _padded(table: SearchTable, prefix: str) -> str:
+    """写入索引的列值（空值按空串处理，末尾补空格）"""
+    return ", ".join(f"coalesce({prefix}{column}, '') || '{_PADDING}'" for column in table.columns)
+
+
+def _schema(table: SearchTable) -> List[str]:
+    columns = ", ".join(table.columns)
+    padded_columns = ", ".join(
+        f"coalesce({column}, '') || '{_PADDING}' AS {column}" for column in table.columns
+    )
+    insert = f"INSERT INTO {table.name}(rowid, {columns}) VALUES (new.id, {_padded(table, 'new.')});"
+    delete = (
+        f"INSERT INTO {table.name}({table.name}, rowid, {columns}) "
+        f"VALUES ('delete', old.id, {_padded(table, 'old.')});"
+    )
+    return [
+        f"CREATE VIEW IF NOT EXISTS {table.view} AS SELECT id, {padded_columns} FROM {table.source}",
+        f"CREATE VIRTUAL TABLE {table.name} USING fts5("
+        f"{columns}, content='{table.view}', content_rowid='id', tokenize='trigram')",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table.vocab} USING fts5vocab({table.name}, 'row')",
+        f"CREATE TRIGGER IF NOT EXISTS {table.name}_ai AFTER INSERT ON {table.source} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table.name}_ad AFTER DELETE ON {table.source} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table.name}_au AFTER UPDATE OF {columns} ON {table.source} "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+def create_search_index(connection: Connection) -> bool:
+    """
+    创建全文检索索引表和触发器，新建时回填已有数据
+
+    Args:
+        connection: 数据库连接（同一事务）
+
+    Returns:
+        bool: 是否可用；SQLite 未编译 FTS5 或不支持 trigram 分词时为False
+    """
+    available = _create_search_tables(connection)
+    with _available_lock:
+        _available[connection.engine] = available
+    return available
+
+
+def _create_search_tables(connection: Connection) -> bool:
+    for table in SEARCH_TABLES:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+        ).first()
+        if exists:
+            continue
+        try:
+            for statement in _schema(table):
+                connection.execute(text(statement))
+        except Exception as e:
+            logger.warning(f"无法创建全文检索索引 {table.name}（需要 SQLite 3.34+ 的 FTS5 trigram 分词）: {e}")
+            return False
+        rebuild_search_index(connection, table)
+    return True
+
+
+def rebuild_search_index(connection: Connection, table: SearchTable):
+    """从原表重新建立索引（如直接修改过数据库文件）"""
+    connection.execute(text(f"INSERT INTO {table.name}({table.name}) VALUES ('rebuild')"))
+
+
+def search_index_available(connection: Connection) -> bool:
+    """全文检索索引表是否已创建（每个数据库引擎只查询一次数据库结构）"""
+    with _available_lock:
+        available = _available.get(connection.engine)
+    if available is None:
+        names = {table.name for table in SEARCH_TABLES}
+        rows = connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars()
+        available = names <= set(rows)
+        with _available_lock:
+            _available[connection.engine] = available
+    return available
+
+
+def _phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match_query(connection: Connection, table: SearchTable, query: str) -> Optional[str]:
+    """
+    把用户输入转换为 FTS5 MATCH 表达式
+
+    按空白拆分为多个词，全部词都需要出现（AND）；少于三个字符的词展开为以它开头的
+    三字片段的 OR 组合。
+
+    Returns:
+        Optional[str]: MATCH 表达式；没有有效的词或短词在索引中不存在时为None（无结果）
+    """
+    groups = []
+    for term in query.split():
+        term = term.lower()
+        if len(term) >= 3:
+            groups.append(_phrase(term))
+            continue
+        upper = term[:-1] + chr(ord(term[-1]) + 1)
+        expansions = connection.execute(
+            text(f"SELECT term FROM {table.vocab} WHERE term >= :low AND term < :high "
+                 f"ORDER BY cnt DESC LIMIT {MAX_EXPANSIONS}"),
+            {"low": term, "high": upper}
+        ).scalars().all()
+        if not expansions:
+            return None
+        groups.append("(" + " OR ".join(_phrase(expansion) for expansion in expansions) + ")")
+    return " AND ".join(groups) if groups else None
+
+
+if __name__ == "__main__":
+    from models.database import engine
+
+    with engine.begin() as conn:
+        if create_search_index(conn):
+            for search_table in SEARCH_TABLES:
+                rebuild_search_index(conn, search_table)
+            print("已重新建立全文检索索引")
+        else:
+            print("全文检索索引不可用")
@@ -61,6 +61,19 @@ class ProjectAnalyzer:
         task_priority_counts = {}
         
         for project in projects:
+            stats = project.get("stats")
+            if stats:
+                # 项目列表接口附带的任务统计，不需要遍历任务
+                total_tasks += stats["task_count"]
+                completed_tasks += stats["status_counts"].get("completed", 0)
+                for status, count in stats["status_counts"].items():
+                    if count:
+                        task_status_counts[status] = task_status_counts.get(status, 0) + count
+                for priority, count in stats["priority_counts"].items():
+                    if count:
+                        task_priority_counts[int(priority)] = task_priority_counts.get(int(priority), 0) + count
+                continue
+            
             tasks = project.get("tasks", [])
             total_tasks += len(tasks)
             
@@ -2,6 +2,10 @@
 from typing import Dict, Any, List
 import os
 import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 class LLMIntegration:
     """大模型集成"""
@@ -13,48 +17,106 @@ class LLMIntegration:
         self.context_history = {}
     
     def generate_response(self, analysis: Dict[str, Any], query: str) -> str:
-        """生成分析响应"""
+        """生成分析响应，配置了LLM时调用大模型，否则使用模拟响应"""
         if self.use_mock:
             return self._generate_mock_response(analysis, query)
         
-        try:
-            # 构建提示词
-            prompt = self._build_prompt(analysis, query)
-            
-            # 调用大模型API
-            # 这里使用模拟实现，实际项目中需要调用OpenAI API
-            # 例如：
-            # import openai
-            # response = openai.ChatCompletion.create(
-            #     model="gpt-3.5-turbo",
-            #     messages=[{"role": "system", "content": "你是一个专业的项目管理分析师"},
-            #              {"role": "user", "content": prompt}]
-            # )
-            # return response.choices[0].message.content
-            
-            # 暂时使用模拟响应
-            return self._generate_mock_response(analysis, query)
-        except Exception as e:
-            print(f"Error generating response: {e}")
-            return "抱歉，分析过程中出现错误，请稍后再试。"
+        prompt = self._build_prompt(analysis, query)
+        content = self._chat(prompt)
+        return content or self._generate_mock_response(analysis, query)
     
     def generate_follow_up_response(self, analysis: Dict[str, Any], query: str, context: str) -> str:
         """生成后续问题的响应"""
         if self.use_mock:
             return self._generate_mock_follow_up(analysis, query, context)
         
-        try:
-            # 构建后续问题提示词
-            prompt = self._build_follow_up_prompt(analysis, query, context)
-            
-            # 调用大模型API
-            # 这里使用模拟实现，实际项目中需要调用OpenAI API
-            
-            # 暂时使用模拟响应
+        prompt = self._build_follow_up_prompt(analysis, query, context)
+        content = self._chat(prompt)
+        return content or self._generate_mock_follow_up(analysis, query, context)
+    
+    async def agenerate_response(self, analysis: Dict[str, Any], query: str) -> str:
+        """异步生成分析响应，与 generate_response 相同，等待期间不阻塞事件循环"""
+        if self.use_mock:
+            return self._generate_mock_response(analysis, query)
+        
+        prompt = self._build_prompt(analysis, query)
+        content = await self._achat(prompt)
+        return content or self._generate_mock_response(analysis, query)
+    
+    async def agenerate_follow_up_response(self, analysis: Dict[str, Any], query: str, context: str) -> str:
+        """异步生成后续问题的响应"""
+        if self.use_mock:
             return self._generate_mock_follow_up(analysis, query, context)
+        
+        prompt = self._build_follow_up_prompt(analysis, query, context)
+        content = await self._achat(prompt)
+        return content or self._generate_mock_follow_up(analysis, query, context)
+    
+    def _prepare(self, prompt: str):
+        """
+        默认LLM提供商、消息、配置和缓存键
+        
+        模型与对话接口相同（DOUBAO_MODEL），相同数据上的相同提示词使用缓存的回复
+        """
+        from core.response_cache import get_response_cache
+        from llm.base import LLMConfig, Message
+        from llm.factory import get_default_provider
+        
+        provider = get_default_provider()
+        if not provider:
+            return None, None, None, None
+        
+        messages = [
+            Message(role="system", content="你是一个专业的项目管理分析师"),
+            Message(role="user", content=prompt)
+        ]
+        config = LLMConfig(model=os.getenv('DOUBAO_MODEL', 'doubao-1-5-pro-32k-250115'))
+        cache_key = get_response_cache().make_key(config.model, messages)
+        return provider, messages, config, cache_key
+    
+    def _chat(self, prompt: str) -> str:
+        """调用默认LLM提供商，失败时返回空字符串"""
+        from core.response_cache import get_response_cache
+        from llm.metrics import get_llm_metrics
+        
+        provider, messages, config, cache_key = self._prepare(prompt)
+        if not provider:
+            return ""
+        cached_content = get_response_cache().get(cache_key)
+        if cached_content is not None:
+            return cached_content
+        
+        try:
+            started = time.perf_counter()
+            response = provider.chat(messages, config)
+            get_llm_metrics().record(config.model, response.usage, latency=time.perf_counter() - started)
+            get_response_cache().set(cache_key, response.content)
+            return response.content
+        except Exception as e:
+            logger.error(f"调用LLM失败: {e}")
+            return ""
+    
+    async def _achat(self, prompt: str) -> str:
+        """异步调用默认LLM提供商，失败时返回空字符串"""
+        from core.response_cache import get_response_cache
+        from llm.metrics import get_llm_metrics
+        
+        provider, messages, config, cache_key = self._prepare(prompt)
+        if not provider:
+            return ""
+        cached_content = get_response_cache().get(cache_key)
+        if cached_content is not None:
+            return cached_content
+        
+        try:
+            started = time.perf_counter()
+            response = await provider.achat(messages, config)
+            get_llm_metrics().record(config.model, response.usage, latency=time.perf_counter() - started)
+            get_response_cache().set(cache_key, response.content)
+            return response.content
         except Exception as e:
-            print(f"Error generating follow-up response: {e}")
-            return "抱歉，分析过程中出现错误，请稍后再试。"
+            logger.error(f"调用LLM失败: {e}")
+            return ""
     
     def _build_prompt(self, analysis: Dict[str, Any], query: str) -> str:
         """构建提示词"""
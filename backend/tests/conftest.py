@@ -0,0 +1,40 @@
+"""
+测试公共夹具
+提供基于内存SQLite的独立数据库会话，避免测试污染 data/app.db
+"""
+import sys
+import os
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models.entities import Base
+
+
+@pytest.fixture
+def memory_engine():
+    """内存数据库引擎（所有连接共享同一个数据库）"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(memory_engine):
+    """内存数据库会话"""
+    session = sessionmaker(autocommit=False, autoflush=False, bind=memory_engine)()
+    try:
+        yield session
+    finally:
+        session.close()
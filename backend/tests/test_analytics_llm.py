@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试分析模块的大模型调用（同步和异步使用相同的模型和缓存）
+"""
+import asyncio
+
+import llm.factory
+from llm.base import LLMResponse
+from services.analytics.llm_integration import LLMIntegration
+
+
+class _Provider:
+    def __init__(self):
+        self.models = []
+
+    def chat(self, messages, config):
+        self.models.append(config.model)
+        return LLMResponse(content=f"回复{len(self.models)}", model=config.model, usage={}, finish_reason="stop")
+
+    async def achat(self, messages, config):
+        return self.chat(messages, config)
+
+
+def test_sync_and_async_use_configured_model(monkeypatch):
+    provider = _Provider()
+    monkeypatch.setattr(llm.factory, "get_default_provider", lambda: provider)
+    monkeypatch.setenv("DOUBAO_MODEL", "doubao-test")
+    analysis = {"overview": {"total_projects": 1, "average_progress": 37.5}}
+    integration = LLMIntegration(api_key="sk-test")
+
+    assert integration.generate_response(analysis, "整体进度如何") == "回复1"
+    # 相同数据上的相同问题使用缓存的回复
+    assert asyncio.run(integration.agenerate_response(analysis, "整体进度如何")) == "回复1"
+    assert asyncio.run(integration.agenerate_follow_up_response(analysis, "哪个最慢", "回复1")) == "回复2"
+    assert provider.models == ["doubao-test", "doubao-test"]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试异步数据库会话和迁移到异步会话的只读接口
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from api import chat, gantt, project
+from models.database import create_async_sqlite_engine, get_async_db, get_storage_profile
+from models.entities import Base, Conversation, Project, ProjectCategory, SessionInfo, Task
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "app.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    session = sessionmaker(bind=sync_engine)()
+    category = ProjectCategory(name="研发")
+    session.add(category)
+    session.flush()
+    alpha = Project(name="Alpha", category=category)
+    beta = Project(name="Beta")
+    session.add_all([alpha, beta])
+    session.flush()
+    session.add_all([
+        Task(project_id=alpha.id, name="设计", status="completed", order=0,
+             planned_start_date=datetime(2026, 1, 1), planned_end_date=datetime(2026, 1, 10)),
+        Task(project_id=alpha.id, name="开发", status="pending", order=1,
+             planned_start_date=datetime(2026, 1, 11), planned_end_date=datetime(2026, 2, 1)),
+        Conversation(session_id="s1", role="user", content="第一个问题", timestamp=datetime(2026, 1, 1, 9)),
+        Conversation(session_id="s1", role="assistant", content="回答", timestamp=datetime(2026, 1, 1, 9, 1)),
+        Conversation(session_id="s2", role="user", content="另一个会话", timestamp=datetime(2026, 1, 2, 9)),
+        SessionInfo(session_id="s2", name="已命名会话"),
+    ])
+    session.commit()
+    session.close()
+    sync_engine.dispose()
+
+    async_engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{path}", get_storage_profile("performance"))
+    AsyncTestSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override():
+        async with AsyncTestSession() as db:
+            yield db
+
+    app = FastAPI()
+    for module in (project, gantt, chat):
+        app.include_router(module.router, prefix="/api/v1")
+    app.dependency_overrides[get_async_db] = override
+    with TestClient(app) as test_client:
+        yield test_client
+    asyncio.run(async_engine.dispose())
+
+
+def test_async_engine_applies_storage_profile(client):
+    """异步引擎的连接同样应用存储配置"""
+    override = client.app.dependency_overrides[get_async_db]
+
+    async def journal_mode():
+        async for db in override():
+            return (await db.execute(text("PRAGMA journal_mode"))).scalar()
+
+    assert asyncio.run(journal_mode()) == "wal"
+
+
+def test_project_list_and_gantt(client):
+    items = client.get("/api/v1/projects").json()["data"]["items"]
+    alpha = next(item for item in items if item["name"] == "Alpha")
+    assert alpha["task_count"] == 2
+    assert alpha["completed_task_count"] == 1
+    assert alpha["category_name"] == "研发"
+    assert client.get("/api/v1/projects", params={"status": "completed"}).json()["data"]["total"] == 0
+
+    data = client.get(f"/api/v1/projects/{alpha['id']}/gantt").json()["data"]
+    assert [t["name"] for t in data["tasks"]] == ["设计", "开发"]
+    assert data["start_date"] == "2026-01-01"
+    assert client.get("/api/v1/projects/999/gantt").status_code == 404
+
+    categories = client.get("/api/v1/gantt/all").json()["data"]["project_categories"]
+    assert [(c["name"], [p["name"] for p in c["projects"]]) for c in categories] == [
+        ("研发", ["Alpha"]), ("未分类", ["Beta"])
+    ]
+
+
+def test_chat_history_and_sessions(client):
+    history = client.get("/api/v1/chat/history", params={"session_id": "s1"}).json()["data"]
+    assert [m["content"] for m in history["items"]] == ["第一个问题", "回答"]
+    assert client.get("/api/v1/chat/history", params={"limit": 1}).json()["data"]["total"] == 1
+
+    sessions = client.get("/api/v1/chat/sessions").json()["data"]["sessions"]
+    assert [(s["id"], s["name"]) for s in sessions] == [("s2", "已命名会话"), ("s1", "第一个问题")]
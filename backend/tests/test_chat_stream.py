@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试流式聊天接口
+"""
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import llm.factory
+from api import chat
+from llm.base import LLMProviderInterface, LLMResponse, ResponseChunk
+from models.database import get_db
+from models.entities import Conversation, Project
+
+
+REPLY_CHUNKS = [
+    "好的，我来创建项目。\n",
+    "```json\n{\"intent\": \"create_",
+    "project\", \"data\": {\"project_name\": \"流式项目\"}}\n``",
+    "`\n",
+    "已完成。",
+]
+
+
+class FakeStreamProvider(LLMProviderInterface):
+    """按预设分块返回内容的提供商"""
+
+    def __init__(self, chunks):
+        super().__init__(api_key="sk-test")
+        self.chunks = chunks
+
+    def chat(self, messages, config=None):
+        return LLMResponse(content="".join(self.chunks), model="fake", usage={}, finish_reason="stop")
+
+    def chat_stream(self, messages, config=None):
+        for content in self.chunks:
+            yield ResponseChunk(content=content)
+        yield ResponseChunk(content="", is_finished=True)
+
+    def validate_config(self):
+        return True
+
+    def get_model_list(self):
+        return []
+
+
+@pytest.fixture
+def client(db_session, monkeypatch):
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = lambda: db_session
+    monkeypatch.setattr(llm.factory, "get_default_provider", lambda: FakeStreamProvider(REPLY_CHUNKS))
+    return TestClient(app)
+
+
+def _events(response):
+    return [json.loads(line[6:]) for line in response.text.split("\n") if line.startswith("data: ")]
+
+
+def test_stream_forwards_chunks_and_executes_instruction(client, db_session):
+    """逐块转发LLM输出，指令块闭合后立即执行并保存最终消息"""
+    response = client.post("/api/v1/chat/messages/stream", json={"message": "创建流式项目", "session_id": "s1"})
+
+    assert response.status_code == 200
+    events = _events(response)
+    types = [event["type"] for event in events]
+
+    assert types[0] == "start"
+    assert types[-1] == "end"
+    assert [e["content"] for e in events if e["type"] == "chunk"] == REPLY_CHUNKS
+
+    # 指令结果在最后一个内容块之前发出（指令块闭合时执行）
+    result_index = types.index("instruction_result")
+    assert result_index < len(types) - 2
+    assert "操作结果" in events[result_index]["content"]
+
+    assert db_session.query(Project).filter(Project.name == "流式项目").count() == 1
+
+    end = events[-1]
+    assert end["content"].startswith("".join(REPLY_CHUNKS))
+    assert "操作结果" in end["content"]
+    saved = db_session.query(Conversation).filter(Conversation.id == end["message_id"]).one()
+    assert saved.role == "assistant"
+    assert saved.content == end["content"]
+
+
+def test_non_stream_shares_instruction_handling(client, db_session):
+    """非流式接口使用相同的上下文构建和指令执行逻辑"""
+    response = client.post("/api/v1/chat/messages", json={"message": "创建流式项目", "session_id": "s2"})
+
+    data = response.json()["data"]
+    assert data["content"].startswith("".join(REPLY_CHUNKS))
+    assert "操作结果" in data["content"]
+    assert data["requires_confirmation"] is False
+    assert db_session.query(Project).filter(Project.name == "流式项目").count() == 1
+
+
+def test_stream_skips_unparsed_fence_when_another_fence_parses(client, db_session, monkeypatch):
+    """解析失败的代码块不在流式过程中执行，与非流式接口一样在有可解析的代码块时忽略"""
+    chunks = [
+        "```json\n{\"intent\": \"create_project\", \"data\": {\"project_name\": \"草稿项目\"}} 多余内容\n```\n",
+        "```json\n{\"intent\": \"create_project\", \"data\": {\"project_name\": \"正式项目\"}}\n```\n",
+    ]
+    monkeypatch.setattr(llm.factory, "get_default_provider", lambda: FakeStreamProvider(chunks))
+
+    response = client.post("/api/v1/chat/messages/stream", json={"message": "创建项目", "session_id": "s3"})
+
+    assert response.status_code == 200
+    assert [name for name, in db_session.query(Project.name)] == ["正式项目"]
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试聊天上下文增量构建
+"""
+from datetime import datetime
+
+from core.context_builder import ProjectContextCache
+from models.entities import Project, ProjectCategory, Task
+
+
+def _seed(db):
+    """创建两个项目和若干任务"""
+    category = ProjectCategory(name="信创工作")
+    db.add(category)
+    db.flush()
+
+    project_a = Project(name="项目A", description="A描述", category_id=category.id)
+    project_b = Project(name="项目B")
+    db.add_all([project_a, project_b])
+    db.flush()
+
+    db.add_all([
+        Task(project_id=project_a.id, name="任务A1", assignee="张三",
+             planned_start_date=datetime(2026, 2, 1), planned_end_date=datetime(2026, 2, 10)),
+        Task(project_id=project_b.id, name="任务B1"),
+    ])
+    db.commit()
+    return project_a, project_b
+
+
+def test_first_build_renders_all_projects(db_session):
+    """首次构建渲染所有项目片段"""
+    _seed(db_session)
+    cache = ProjectContextCache()
+
+    context = cache.build(db_session)
+
+    assert context.rebuilt_count == 2
+    assert context.project_names == ["项目A", "项目B"]
+    assert context.category_names == ["信创工作"]
+    text = context.render()
+    assert "## 当前系统中存在的项目\n['项目A', '项目B']" in text
+    assert "### 项目: 项目A" in text
+    assert "类别: 信创工作" in text
+    assert "- 任务A1 (负责人: 张三" in text
+
+
+def test_only_changed_project_is_rebuilt(db_session):
+    """只有发生变化的项目会重新渲染"""
+    project_a, project_b = _seed(db_session)
+    cache = ProjectContextCache()
+    cache.build(db_session)
+
+    # 未变化时完全复用
+    assert cache.build(db_session).rebuilt_count == 0
+
+    # 更新项目B的任务
+    task = db_session.query(Task).filter(Task.project_id == project_b.id).first()
+    task.assignee = "李四"
+    db_session.commit()
+
+    context = cache.build(db_session)
+    assert context.rebuilt_count == 1
+    assert "- 任务B1 (负责人: 李四" in context.render()
+
+    # 新增任务同样触发重建
+    db_session.add(Task(project_id=project_a.id, name="任务A2"))
+    db_session.commit()
+    context = cache.build(db_session)
+    assert context.rebuilt_count == 1
+    assert "任务A2" in context.render()
+
+
+def test_deleted_project_is_dropped(db_session):
+    """删除的项目从上下文中移除"""
+    project_a, project_b = _seed(db_session)
+    cache = ProjectContextCache()
+    cache.build(db_session)
+
+    db_session.delete(project_b)
+    db_session.commit()
+
+    context = cache.build(db_session)
+    assert context.project_names == ["项目A"]
+    assert "项目B" not in context.render()
+    assert cache.get_stats()["cached_projects"] == 1
+
+
+def test_category_rename_refreshes_context(db_session):
+    """项目类别改名后重新渲染该类别下的项目"""
+    _seed(db_session)
+    cache = ProjectContextCache()
+    cache.build(db_session)
+
+    category = db_session.query(ProjectCategory).one()
+    category.name = "数字化转型"
+    db_session.commit()
+
+    context = cache.build(db_session)
+    assert context.rebuilt_count == 1
+    assert context.category_names == ["数字化转型"]
+    assert "类别: 数字化转型" in context.render()
+    assert "信创工作" not in context.render()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试聊天上下文的相关性选取
+"""
+from core.context_builder import ProjectContextCache
+from core.text_utils import estimate_tokens, tokenize
+from models.entities import Project, ProjectCategory, Task
+
+
+def _seed(db, count=20):
+    """创建若干项目，每个项目带几个任务"""
+    category = ProjectCategory(name="信创工作")
+    db.add(category)
+    db.flush()
+
+    for i in range(count):
+        project = Project(name=f"项目{i:02d}", description="常规项目描述" * 5)
+        db.add(project)
+        db.flush()
+        for j in range(3):
+            db.add(Task(project_id=project.id, name=f"常规任务{i}-{j}", assignee="张三"))
+
+    special = Project(name="赢和系统部署优化", category_id=category.id)
+    db.add(special)
+    db.flush()
+    db.add(Task(project_id=special.id, name="数据库迁移", assignee="李四"))
+    db.commit()
+    return special
+
+
+def test_tokenize_mixed_text():
+    """中文按二元组切分，英文数字按单词切分"""
+    assert tokenize("部署优化 GPT-4") == ["部署", "署优", "优化", "gpt", "4"]
+    assert tokenize("") == []
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("项目") == 2
+
+
+def test_full_context_within_budget(db_session):
+    """全部详情在预算内时保持完整上下文"""
+    _seed(db_session, count=2)
+    cache = ProjectContextCache()
+
+    context = cache.build(db_session, query="你好", token_budget=100000)
+
+    assert context.mode == "full"
+    assert len(context.fragments) == 3
+    assert "## 当前系统中存在的项目" in context.render()
+
+
+def test_relevant_project_selected_when_over_budget(db_session):
+    """超出预算时只附带相关项目详情，其余项目保留概要"""
+    _seed(db_session)
+    cache = ProjectContextCache()
+
+    context = cache.build(db_session, query="李四负责的数据库迁移进展如何？", top_k=2, token_budget=1000)
+
+    assert context.mode == "selected"
+    assert context.selected_projects == ["赢和系统部署优化"]
+    text = context.render()
+    assert "### 项目: 赢和系统部署优化" in text
+    assert "- 数据库迁移 (负责人: 李四" in text
+    assert "## 其他项目概要" in text
+    assert "### 项目: 项目00" not in text
+    assert estimate_tokens(text) <= 1000 + 50
+
+
+def test_history_and_name_match(db_session):
+    """项目名称在历史消息中出现时也会被选中"""
+    _seed(db_session)
+    cache = ProjectContextCache()
+
+    context = cache.build(
+        db_session,
+        query="它的进度怎么样",
+        history=["帮我看看项目07"],
+        top_k=1,
+        token_budget=1000
+    )
+
+    assert context.selected_projects == ["项目07"]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试所有项目的甘特图（/gantt/all）：单次查询生成和按数据版本缓存
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from api import gantt
+from models.database import create_async_sqlite_engine, get_async_db, get_storage_profile
+from models.entities import Base, Project, ProjectCategory, Task
+
+
+@pytest.fixture
+def gantt_env(tmp_path):
+    path = tmp_path / "app.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    Session = sessionmaker(bind=sync_engine)
+    session = Session()
+    category = ProjectCategory(name="研发")
+    session.add(category)
+    session.flush()
+    alpha = Project(name="Alpha", category=category, start_date=datetime(2026, 1, 5))
+    beta = Project(name="Beta")
+    gamma = Project(name="Gamma", category=category)
+    session.add_all([alpha, beta, gamma])
+    session.flush()
+    session.add_all([
+        Task(project_id=alpha.id, name="开发", status="active", order=1,
+             planned_start_date=datetime(2026, 1, 11), planned_end_date=datetime(2026, 2, 1),
+             actual_start_date=datetime(2026, 1, 12)),
+        Task(project_id=alpha.id, name="设计", status="completed", order=0,
+             planned_start_date=datetime(2026, 1, 1), planned_end_date=datetime(2026, 1, 10)),
+        Task(project_id=alpha.id, name="未排期", status="pending", order=2),
+    ])
+    session.commit()
+    session.close()
+
+    async_engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{path}", get_storage_profile("performance"))
+    AsyncTestSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    async def override():
+        async with AsyncTestSession() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(gantt.router, prefix="/api/v1")
+    app.dependency_overrides[get_async_db] = override
+    with TestClient(app) as client:
+        yield client, Session, statements
+    asyncio.run(async_engine.dispose())
+    sync_engine.dispose()
+
+
+def test_all_gantt_single_query(gantt_env):
+    client, _, statements = gantt_env
+    response = client.get("/api/v1/gantt/all")
+    assert response.status_code == 200
+    categories = response.json()["data"]["project_categories"]
+    assert [(c["name"], [p["name"] for p in c["projects"]]) for c in categories] == [
+        ("研发", ["Alpha", "Gamma"]), ("未分类", ["Beta"])
+    ]
+
+    alpha = categories[0]["projects"][0]
+    # 没有开始和结束时间的任务不显示
+    assert [t["name"] for t in alpha["tasks"]] == ["设计", "开发"]
+    assert alpha["tasks"][1]["start"] == "2026-01-12"
+    assert alpha["tasks"][1]["startTimeType"] == "actual"
+    assert alpha["tasks"][1]["assignee"] == ""
+    # 项目时间范围包括任务的计划时间
+    assert (alpha["start_date"], alpha["end_date"]) == ("2026-01-01", "2026-02-01")
+    assert [phase["id"] for phase in alpha["phases"]] == ["phase_1", "phase_2", "phase_3"]
+    assert categories[1]["projects"][0]["tasks"] == []
+    assert categories[1]["projects"][0]["phases"] == []
+
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+
+
+def test_all_gantt_etag_and_cache(gantt_env):
+    client, Session, statements = gantt_env
+    first = client.get("/api/v1/gantt/all")
+    etag = first.headers["ETag"]
+
+    # 数据未变化：带 If-None-Match 返回 304，不带时返回缓存的响应体，均不查询数据库
+    statements.clear()
+    assert client.get("/api/v1/gantt/all", headers={"If-None-Match": etag}).status_code == 304
+    cached = client.get("/api/v1/gantt/all")
+    assert cached.content == first.content
+    assert cached.headers["ETag"] == etag
+    assert statements == []
+
+    session = Session()
+    session.query(Project).filter_by(name="Beta").one().name = "Beta 2"
+    session.commit()
+    session.close()
+
+    changed = client.get("/api/v1/gantt/all", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["data"]["project_categories"][1]["projects"][0]["name"] == "Beta 2"
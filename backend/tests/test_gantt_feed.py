@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试甘特图变更推送（差异事件、续传令牌和 SSE 消息）
+"""
+import asyncio
+import json
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from api.gantt import gantt_feed_stream
+from core.gantt_feed import GanttFeed, diff_gantt
+from models.database import create_async_sqlite_engine, get_storage_profile
+from models.entities import Base, Project, Task
+
+
+def _gantt(projects):
+    return {"project_categories": [{"id": 0, "name": "未分类", "projects": projects}]}
+
+
+def _project(project_id, tasks, start="2026-01-01", end="2026-01-31", progress=0):
+    return {"id": project_id, "name": f"P{project_id}", "description": "", "start_date": start,
+            "end_date": end, "progress": progress, "tasks": tasks, "phases": []}
+
+
+def _task(task_id, project_id, start="2026-01-01", end="2026-01-10", progress=0, name="任务"):
+    return {"id": f"task_{task_id}", "name": name, "start": start, "end": end, "progress": progress,
+            "custom_class": "task-pending", "startTimeType": "planned", "endTimeType": "planned",
+            "project_id": project_id, "order": 0}
+
+
+def test_diff_gantt_events():
+    old = _gantt([_project(1, [_task(1, 1), _task(2, 1)]), _project(2, [_task(3, 2)])])
+    new = _gantt([
+        _project(1, [_task(1, 1, end="2026-01-12", progress=50), _task(3, 1, name="改名")], end="2026-02-28"),
+        _project(3, [_task(4, 3)]),
+    ])
+    events = diff_gantt(old, new)
+    assert [event["type"] for event in events] == [
+        "project_added", "project_span", "task_removed", "task_removed",
+        "task_moved", "task_progress", "task_added", "task_added", "project_removed",
+    ]
+    moved = events[4]
+    assert (moved["task_id"], moved["end"]) == ("task_1", "2026-01-12")
+    assert events[5]["progress"] == 50
+    # 移到其他项目的任务为删除 + 新增
+    assert {event["task"]["id"] for event in events if event["type"] == "task_added"} == {"task_3", "task_4"}
+    assert diff_gantt(new, new) == []
+
+    renamed = diff_gantt(new, _gantt([_project(1, [_task(1, 1, end="2026-01-12", progress=50),
+                                                   _task(3, 1, name="再改名")], end="2026-02-28"),
+                                      _project(3, [_task(4, 3)])]))
+    assert renamed == [{"type": "task_updated", "task_id": "task_3", "project_id": 1,
+                        "changes": {"name": "再改名"}}]
+
+
+def test_feed_history_and_resume_tokens():
+    feed = GanttFeed(history=2)
+    assert feed.publish(1, _gantt([_project(1, [])])) is None
+    assert feed.publish(1, _gantt([])) is None
+    sequence, events = feed.publish(2, _gantt([_project(1, [], progress=10)]))
+    assert sequence == 1 and events[0]["type"] == "project_updated"
+    assert feed.publish(3, _gantt([_project(1, [], progress=10)])) is None
+    feed.publish(4, _gantt([_project(1, [], progress=20)]))
+    feed.publish(5, _gantt([_project(1, [], progress=30)]))
+
+    assert feed.parse_token(feed.resume_token(2)) == 2
+    assert feed.parse_token("other-2") is None
+    assert feed.parse_token(None) is None
+    assert [batch[0] for batch in feed.since(1)] == [2, 3]
+    assert feed.since(3) == []
+    # 批次1已淘汰
+    assert feed.since(0) is None
+    assert feed.since(4) is None
+
+
+class _Request:
+    async def is_disconnected(self):
+        return False
+
+
+def _payload(message):
+    lines = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    return lines["id"], json.loads(lines["data"])
+
+
+def test_feed_stream_snapshot_delta_and_resume(tmp_path):
+    path = tmp_path / "app.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    Session = sessionmaker(bind=sync_engine)
+    session = Session()
+    project = Project(name="Alpha")
+    session.add(project)
+    session.flush()
+    session.add(Task(project_id=project.id, name="设计", status="pending",
+                     planned_start_date=datetime(2026, 1, 1), planned_end_date=datetime(2026, 1, 10)))
+    session.commit()
+    session.close()
+
+    async def run():
+        async_engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{path}", get_storage_profile("performance"))
+        AsyncTestSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        try:
+            async with AsyncTestSession() as db:
+                stream = gantt_feed_stream(_Request(), db)
+                token, snapshot = _payload(await anext(stream))
+                assert snapshot["type"] == "snapshot"
+                tasks = snapshot["data"]["project_categories"][0]["projects"][0]["tasks"]
+                assert [task["name"] for task in tasks] == ["设计"]
+
+                writer = Session()
+                task = writer.query(Task).one()
+                task.progress = 40
+                task.planned_end_date = datetime(2026, 1, 20)
+                writer.commit()
+                writer.close()
+
+                delta_token, delta = _payload(await asyncio.wait_for(anext(stream), 5))
+                assert delta["type"] == "delta"
+                assert [event["type"] for event in delta["events"]] == ["project_span", "task_moved", "task_progress"]
+                assert delta["events"][1]["end"] == "2026-01-20"
+                await stream.aclose()
+
+            async with AsyncTestSession() as db:
+                # 从第一次连接的令牌续传：只补发断开期间的变更
+                stream = gantt_feed_stream(_Request(), db, resume=token)
+                assert _payload(await anext(stream)) == (delta_token, delta)
+                await stream.aclose()
+
+                stream = gantt_feed_stream(_Request(), db, resume="unknown-0")
+                assert _payload(await anext(stream))[1]["type"] == "snapshot"
+                await stream.aclose()
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(run())
+    sync_engine.dispose()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按时间窗口查询甘特图（区间索引、筛选、分页和增量加载）
+"""
+import asyncio
+import random
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from api import gantt
+from core.gantt_index import IntervalTree
+from models.database import create_async_sqlite_engine, get_async_db, get_storage_profile
+from models.entities import Base, Project, ProjectCategory, Task
+
+
+def test_interval_tree_matches_linear_scan():
+    rng = random.Random(0)
+    intervals = []
+    for i in range(500):
+        start = rng.randint(0, 1000)
+        intervals.append((start, start + rng.randint(0, 60), i))
+    tree = IntervalTree(intervals)
+    assert len(tree) == 500
+
+    for _ in range(200):
+        low = rng.randint(-50, 1050)
+        high = low + rng.randint(0, 200)
+        expected = {i for start, end, i in intervals if start <= high and end >= low}
+        assert set(tree.query(low, high)) == expected
+    assert IntervalTree([]).query(0, 10) == []
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "app.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    Session = sessionmaker(bind=sync_engine)
+    session = Session()
+    category = ProjectCategory(name="研发")
+    session.add(category)
+    session.flush()
+    alpha = Project(name="Alpha", category=category)
+    beta = Project(name="Beta")
+    gamma = Project(name="Gamma", category=category)
+    session.add_all([alpha, beta, gamma])
+    session.flush()
+
+    def task(project, name, start, end, assignee=None):
+        return Task(project_id=project.id, name=name, status="pending", assignee=assignee,
+                    planned_start_date=datetime(2026, *start), planned_end_date=datetime(2026, *end))
+
+    session.add_all([
+        task(alpha, "一月", (1, 1), (1, 31), "张三"),
+        task(alpha, "三月", (3, 1), (3, 31), "李四"),
+        task(beta, "跨月", (1, 20), (2, 10), "张三"),
+        task(gamma, "二月", (2, 1), (2, 28)),
+    ])
+    session.commit()
+    session.close()
+
+    async_engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{path}", get_storage_profile("performance"))
+    AsyncTestSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override():
+        async with AsyncTestSession() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(gantt.router, prefix="/api/v1")
+    app.dependency_overrides[get_async_db] = override
+    with TestClient(app) as test_client:
+        test_client.Session = Session
+        yield test_client
+    asyncio.run(async_engine.dispose())
+    sync_engine.dispose()
+
+
+def _window(client, **params):
+    response = client.get("/api/v1/gantt/window", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def _bars(data):
+    return {(p["name"], t["name"]) for p in data["projects"] for t in p["tasks"]}
+
+
+def test_window_filters(client):
+    data = _window(client, start="2026-01-15", end="2026-01-25")
+    assert _bars(data) == {("Alpha", "一月"), ("Beta", "跨月")}
+    assert data["delta"] is False
+    beta = next(p for p in data["projects"] if p["name"] == "Beta")
+    assert (beta["category_id"], beta["category_name"]) == (0, "未分类")
+
+    assert _bars(_window(client, start="2026-02-05", end="2026-03-05")) == {
+        ("Alpha", "三月"), ("Beta", "跨月"), ("Gamma", "二月")
+    }
+    category_id = _window(client, start="2026-01-01", end="2026-01-01")["projects"][0]["category_id"]
+    assert _bars(_window(client, start="2026-01-01", end="2026-12-31", category_id=category_id)) == {
+        ("Alpha", "一月"), ("Alpha", "三月"), ("Gamma", "二月")
+    }
+    assert _bars(_window(client, start="2026-01-01", end="2026-12-31", assignee="张三")) == {
+        ("Alpha", "一月"), ("Beta", "跨月")
+    }
+    assert client.get("/api/v1/gantt/window", params={"start": "2026-02-01", "end": "2026-01-01"}).status_code == 400
+
+
+def test_window_pagination(client):
+    first = _window(client, start="2026-01-01", end="2026-12-31", limit=2)
+    assert [p["name"] for p in first["projects"]] == ["Alpha", "Beta"]
+    assert first["has_more"] is True
+    second = _window(client, start="2026-01-01", end="2026-12-31", limit=2, cursor=first["next_cursor"])
+    assert [p["name"] for p in second["projects"]] == ["Gamma"]
+    assert second["has_more"] is False and second["next_cursor"] is None
+
+
+def test_window_delta(client):
+    january = _window(client, start="2026-01-01", end="2026-01-31")
+    # 向后滚动：只返回新窗口中未加载过的任务条
+    scrolled = _window(client, start="2026-01-15", end="2026-02-15", loaded_start="2026-01-01",
+                       loaded_end="2026-01-31", version=january["version"])
+    assert scrolled["delta"] is True
+    assert _bars(scrolled) == {("Gamma", "二月")}
+
+    session = client.Session()
+    session.query(Task).filter_by(name="二月").one().name = "二月（调整）"
+    session.commit()
+    session.close()
+
+    # 数据已变化：返回完整窗口
+    refreshed = _window(client, start="2026-01-15", end="2026-02-15", loaded_start="2026-01-01",
+                        loaded_end="2026-01-31", version=january["version"])
+    assert refreshed["delta"] is False
+    assert refreshed["version"] != january["version"]
+    assert _bars(refreshed) == {("Alpha", "一月"), ("Beta", "跨月"), ("Gamma", "二月（调整）")}
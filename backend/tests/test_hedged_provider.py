@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试对冲请求LLM提供商
+"""
+import asyncio
+import time
+
+from llm.base import LLMConfig, Message
+from llm.factory import LLMProviderFactory, get_default_provider, get_provider_registry
+from llm.hedged import MIN_SAMPLES, HedgedProvider
+from llm.mock_client import MockProvider
+
+MESSAGES = [Message(role="user", content="你好")]
+
+
+def _hedged(providers: dict, delay: float = 0.05) -> HedgedProvider:
+    return HedgedProvider(list(providers), resolver=providers.__getitem__, delay=delay)
+
+
+def _collect(provider: HedgedProvider) -> str:
+    async def run():
+        return "".join([chunk.content async for chunk in provider.achat_stream(MESSAGES, LLMConfig(model="m"))])
+    return asyncio.run(run())
+
+
+def test_fast_primary_is_not_hedged():
+    """主提供商在对冲延迟内返回首个token时不请求备用提供商"""
+    primary = MockProvider(latency=0.001, reply="主提供商的回复")
+    backup = MockProvider(latency=0.001, reply="备用")
+    provider = _hedged({"primary": primary, "backup": backup}, delay=1.0)
+
+    assert _collect(provider) == "主提供商的回复"
+    assert backup.calls == 0
+    assert provider.get_stats()["hedged"] == 0
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    """超过对冲延迟后启动备用提供商，采用先到的数据流并取消主提供商"""
+    primary = MockProvider(latency=2.0, reply="慢")
+    backup = MockProvider(latency=0.01, reply="备用提供商的回复")
+    provider = _hedged({"primary": primary, "backup": backup})
+
+    started = time.perf_counter()
+    assert _collect(provider) == "备用提供商的回复"
+    assert time.perf_counter() - started < 1.0
+
+    stats = provider.get_stats()
+    assert stats["hedged"] == 1
+    assert stats["wins"] == {"primary": 0, "backup": 1}
+    # 被取消的主提供商请求也计入耗时直方图
+    assert stats["latency"]["primary"]["count"] == 1
+
+
+def test_primary_failure_fails_over_immediately():
+    """主提供商出错时不等待对冲延迟，立即使用备用提供商"""
+    provider = _hedged({
+        "primary": MockProvider(fail=True),
+        "backup": MockProvider(latency=0.01, reply="备用")
+    }, delay=5.0)
+
+    response = asyncio.run(provider.achat(MESSAGES, LLMConfig(model="m")))
+
+    assert response.content == "备用"
+    assert provider.get_stats()["failovers"] == 1
+
+
+def test_hedge_delay_follows_latency_histogram():
+    """样本足够后对冲延迟取主提供商首token耗时的分位数"""
+    provider = _hedged({"primary": MockProvider(), "backup": MockProvider()}, delay=2.0)
+    assert provider.hedge_delay("primary") == 2.0
+
+    for _ in range(MIN_SAMPLES):
+        provider._observe("primary", 0.3)
+
+    assert 0.3 <= provider.hedge_delay("primary") < 0.5
+
+
+def test_factory_creates_mock_and_hedged_providers(monkeypatch):
+    """mock 提供商不需要API Key；配置多个提供商时默认提供商为对冲提供商"""
+    assert isinstance(LLMProviderFactory.create_provider("mock"), MockProvider)
+
+    monkeypatch.setenv("LLM_HEDGE_PROVIDERS", "mock,mock")
+    provider = get_default_provider()
+    try:
+        assert isinstance(provider, HedgedProvider)
+        assert get_default_provider() is provider
+        assert "mock,mock" in get_provider_registry().get_hedge_stats()
+    finally:
+        asyncio.run(get_provider_registry().invalidate())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试AI指令批量执行器
+"""
+from datetime import datetime
+
+from sqlalchemy import event
+
+from core.instruction_executor import InstructionExecutor
+from core.project_service import ProjectService
+from models.entities import Project, Task
+
+
+def _unexpected(index, instruction, project_service):
+    raise AssertionError(f"不应逐条执行: {instruction}")
+
+
+def _create_project(db_session, name):
+    project = Project(name=name)
+    db_session.add(project)
+    db_session.commit()
+    return project
+
+
+def test_create_tasks_in_one_transaction(db_session, memory_engine):
+    """50个任务的create_task指令只执行少量SQL语句"""
+    project = _create_project(db_session, "批量项目")
+    tasks = [
+        {"name": f"任务{i}", "planned_start_date": "2026-01-01", "planned_end_date": f"2026-02-{i % 28 + 1:02d}"}
+        for i in range(50)
+    ]
+
+    statements = []
+    event.listen(memory_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    output = InstructionExecutor(db_session, _unexpected).execute([
+        {"intent": "create_task", "data": {"project_name": "批量项目", "tasks": tasks}}
+    ])
+
+    assert output.count("任务操作结果") == 50
+    assert len(statements) <= 15
+    assert db_session.query(Task).filter(Task.project_id == project.id).count() == 50
+    db_session.refresh(project)
+    assert project.end_date is not None
+
+
+def test_mixed_batch_results_keep_instruction_order(db_session):
+    """创建、更新、重复和不存在的任务按指令顺序输出结果，非任务指令逐条执行"""
+    _create_project(db_session, "项目A")
+    calls = []
+
+    def execute_single(index, instruction, project_service):
+        calls.append((index, instruction["intent"]))
+        return f"\n\n单条指令{index}"
+
+    output = InstructionExecutor(db_session, execute_single).execute([
+        {"intent": "create_task", "data": {"project_name": "项目A", "tasks": [
+            {"name": "任务1", "planned_start_date": "2026-01-01", "planned_end_date": "2026-01-10"}, {"name": "任务1"}
+        ]}},
+        {"intent": "update_task", "data": {"project_name": "项目A", "tasks": [
+            {"name": "任务1", "actual_start_date": "2026-01-01", "actual_end_date": "2026-01-10"}, {"name": "任务2", "progress": 10}
+        ]}},
+        {"intent": "query_project", "data": {"project_name": "项目A"}},
+        {"intent": "create_task", "data": {"project_name": "项目B", "tasks": [{"name": "任务3"}]}},
+        {"intent": "update_task", "data": {"project_name": "项目A", "tasks": [{"name": "项目A"}]}},
+    ])
+
+    assert output.split("\n\n")[1:] == [
+        "任务操作结果: 任务 '任务1' 创建成功，已关联到项目 '项目A'",
+        "任务操作失败: 任务 '任务1' 已存在于项目 '项目A' 中",
+        "任务操作结果: 任务 '任务1' 更新成功",
+        "任务操作失败: 任务 '任务2' 不存在于项目 '项目A' 中",
+        "单条指令3",
+        "任务操作失败: 项目 '项目B' 不存在",
+        "单条指令5",
+    ]
+    assert calls == [(3, "query_project"), (5, "update_task")]
+
+    task = db_session.query(Task).filter(Task.name == "任务1").one()
+    assert task.progress == 100
+    assert db_session.query(Project).filter(Project.name == "项目A").one().progress == 100
+
+
+def test_reschedule_skips_tasks_created_in_batch(db_session):
+    """同一批中新建并修改计划日期的任务不参与顺延，其余修改照常提交"""
+    project = _create_project(db_session, "排期项目")
+    design = Task(project_id=project.id, name="设计", status="pending",
+                  planned_start_date=datetime(2026, 3, 1), planned_end_date=datetime(2026, 3, 5))
+    develop = Task(project_id=project.id, name="开发", status="pending",
+                   planned_start_date=datetime(2026, 3, 5), planned_end_date=datetime(2026, 3, 10))
+    db_session.add_all([design, develop])
+    db_session.commit()
+    assert ProjectService(db_session).add_task_dependency(project.id, develop.id, design.id)["success"]
+
+    output = InstructionExecutor(db_session, _unexpected).execute([
+        {"intent": "create_task", "data": {"project_name": "排期项目", "tasks": [
+            {"name": "测试", "planned_start_date": "2026-03-10", "planned_end_date": "2026-03-12"}
+        ]}},
+        {"intent": "update_task", "data": {"project_name": "排期项目", "tasks": [
+            {"name": "测试", "planned_end_date": "2026-03-14"}, {"name": "设计", "planned_end_date": "2026-03-07"}
+        ]}},
+    ])
+
+    assert "任务操作失败" not in output
+    db_session.expire_all()
+    created = db_session.query(Task).filter(Task.name == "测试").one()
+    assert created.planned_end_date == datetime(2026, 3, 14)
+    assert (develop.planned_start_date, develop.planned_end_date) == (datetime(2026, 3, 7), datetime(2026, 3, 12))
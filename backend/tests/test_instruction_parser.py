@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试增量指令解析器
+"""
+from core.instruction_parser import InstructionStreamParser, parse_reply
+
+REPLY = """好的，我先创建项目。
+```json
+{"intent": "create_project", "data": {"project_name": "项目A", "tasks": [{"name": "任务{1}"}]}}
+```
+然后分配大类：
+```json
+[{"intent": "assign_category", "data": {"project_name": "项目A", "category_name": "信创"}}]
+```
+已完成。"""
+
+
+def test_fenced_instructions_and_blocks():
+    """代码块中的指令（含嵌套对象和数组）按顺序解析"""
+    parser = parse_reply(REPLY)
+
+    instructions = parser.instructions()
+    assert [i["intent"] for i in instructions] == ["create_project", "assign_category"]
+    assert instructions[0]["data"]["tasks"][0]["name"] == "任务{1}"
+
+    blocks = parser.content_blocks()
+    assert len(blocks) == 2
+    assert blocks[0]["analysis"] == "好的，我先创建项目。"
+    assert blocks[1]["analysis"] == "然后分配大类：\n已完成。"
+    assert blocks[1]["content"].startswith("```json\n[{")
+
+
+def test_incremental_feed_matches_full_parse():
+    """逐字符输入与一次性解析结果一致，代码块闭合时立即产出"""
+    parser = InstructionStreamParser()
+    closed_at = []
+    for pos, char in enumerate(REPLY):
+        for block in parser.feed(char):
+            closed_at.append((block.kind, pos))
+    parser.finish()
+
+    assert parser.instructions() == parse_reply(REPLY).instructions()
+    assert parser.content_blocks() == parse_reply(REPLY).content_blocks()
+    first_close = REPLY.index("\n```\n") + len("\n```") - 1
+    assert closed_at[0] == ("fence", first_close)
+
+
+def test_bare_nested_object_and_confirmation():
+    """没有代码块时解析正文中的嵌套JSON对象和确认标记"""
+    reply = '我将删除任务。{"intent": "delete_task", "data": {"project_name": "项目A", ' \
+            '"tasks": [{"name": "任务1"}]}, "requires_confirmation": true} 请回复。'
+    parser = parse_reply(reply)
+
+    instructions = parser.instructions()
+    assert instructions[0]["intent"] == "delete_task"
+    assert instructions[0]["data"]["tasks"] == [{"name": "任务1"}]
+    assert parser.requires_confirmation() is True
+
+
+def test_no_instruction_and_keyword_confirmation():
+    """没有指令时返回空意图，确认关键词触发确认"""
+    parser = parse_reply("我将创建项目{名称}，确认执行吗？")
+
+    assert parser.instructions() == [{"intent": None}]
+    assert parser.requires_confirmation() is True
+    assert parser.content_blocks() == [{"analysis": "", "content": "我将创建项目{名称}，确认执行吗？"}]
+
+
+def test_invalid_fence_falls_back_to_inner_object():
+    """代码块不是合法JSON时仍能识别其中的指令对象"""
+    reply = '```json\n// 注释\n{"intent": "query_project", "data": {"project_name": "项目A"}}\n```'
+
+    assert parse_reply(reply).instructions()[0]["intent"] == "query_project"
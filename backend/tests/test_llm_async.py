@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试LLM提供商的异步接口
+"""
+import asyncio
+import json
+
+import httpx
+
+from llm.base import LLMConfig, LLMProviderInterface, LLMResponse, Message, ResponseChunk
+from llm.kimi_client import KimiProvider
+from llm.openai_client import OpenAIProvider
+
+
+def _mock_client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url="https://llm.test/v1", transport=httpx.MockTransport(handler))
+
+
+def test_achat_uses_async_client():
+    """achat 通过异步客户端发送请求并解析响应"""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json={
+            "model": "gpt-test",
+            "choices": [{"message": {"content": "你好"}, "finish_reason": "stop"}],
+            "usage": {"total_tokens": 3}
+        })
+
+    async def run():
+        provider = OpenAIProvider(api_key="sk-test")
+        provider._async_client = _mock_client(handler)
+        response = await provider.achat([Message(role="user", content="hi")], LLMConfig(model="gpt-test"))
+        await provider.aclose()
+        return provider, response
+
+    provider, response = asyncio.run(run())
+
+    assert response.content == "你好"
+    assert response.usage == {"total_tokens": 3}
+    assert requests[0]["model"] == "gpt-test"
+    assert requests[0]["stream"] is False
+    assert provider._async_client is None
+
+
+def test_achat_stream_yields_deltas():
+    """achat_stream 逐块返回增量内容（含思考内容）"""
+    body = "\n".join([
+        'data: {"choices": [{"delta": {"reasoning_content": "思考"}}]}',
+        'data: {"choices": [{"delta": {"content": "你"}}]}',
+        'data: {"choices": [{"delta": {"content": "好"}}]}',
+        "data: [DONE]",
+    ])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text=body)
+
+    async def run():
+        provider = KimiProvider(api_key="sk-test")
+        provider._async_client = _mock_client(handler)
+        return [chunk async for chunk in provider.achat_stream([Message(role="user", content="hi")])]
+
+    chunks = asyncio.run(run())
+
+    assert [c.content for c in chunks] == ["", "你", "好", ""]
+    assert chunks[0].reasoning_content == "思考"
+    assert chunks[-1].is_finished
+
+
+class SyncOnlyProvider(LLMProviderInterface):
+    """只实现同步接口的提供商"""
+
+    def chat(self, messages, config=None):
+        return LLMResponse(content="sync", model="m", usage={}, finish_reason="stop")
+
+    def chat_stream(self, messages, config=None):
+        yield ResponseChunk(content="a")
+        yield ResponseChunk(content="", is_finished=True)
+
+    def validate_config(self):
+        return True
+
+    def get_model_list(self):
+        return []
+
+
+def test_default_async_methods_wrap_sync_implementation():
+    """未实现原生异步接口的提供商在线程池中执行同步实现"""
+
+    async def run():
+        provider = SyncOnlyProvider(api_key="sk-test")
+        response = await provider.achat([])
+        chunks = [chunk async for chunk in provider.achat_stream([])]
+        return response, chunks
+
+    response, chunks = asyncio.run(run())
+
+    assert response.content == "sync"
+    assert [c.content for c in chunks] == ["a", ""]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试数据库结构迁移
+"""
+from sqlalchemy import event, inspect, text
+
+from core.project_service import get_project_service
+from models.entities import Project, ProjectStats, Task
+import models.migrations
+from models.migrations import MIGRATIONS, applied_versions, current_version, run_migrations
+
+
+def test_migrates_legacy_database(memory_engine, db_session):
+    alpha, beta = Project(name="Alpha"), Project(name="Beta")
+    db_session.add_all([alpha, beta])
+    db_session.flush()
+    db_session.add_all([Task(project_id=project.id, name=f"任务{i}") for i in range(3) for project in (alpha, beta)])
+    db_session.commit()
+    alpha_id, beta_id = alpha.id, beta.id
+    db_session.close()
+
+    # 模拟早期版本的数据库：没有 order 列、名称索引、项目统计表和任务依赖表
+    with memory_engine.begin() as conn:
+        conn.execute(text("DROP TABLE task_dependencies"))
+        conn.execute(text('ALTER TABLE tasks DROP COLUMN "order"'))
+        conn.execute(text("DROP INDEX idx_projects_name"))
+        conn.execute(text("DROP TABLE project_stats"))
+
+    applied = run_migrations(memory_engine)
+    assert [m.version for m in applied] == [m.version for m in MIGRATIONS]
+
+    with memory_engine.connect() as conn:
+        assert current_version(conn) == MIGRATIONS[-1].version
+        orders = conn.execute(text('SELECT project_id, "order" FROM tasks ORDER BY id')).all()
+    # 按项目内的创建顺序编号
+    assert [order for project_id, order in orders if project_id == alpha_id] == [0, 1, 2]
+    assert [order for project_id, order in orders if project_id == beta_id] == [0, 1, 2]
+    assert "idx_projects_name" in {index["name"] for index in inspect(memory_engine).get_indexes("projects")}
+    assert db_session.get(ProjectStats, alpha_id).task_count == 3
+    assert "idx_task_dependencies_successor" in {
+        index["name"] for index in inspect(memory_engine).get_indexes("task_dependencies")
+    }
+
+    # 已执行的迁移不会重复执行
+    assert run_migrations(memory_engine) == []
+
+
+def test_incomplete_migration_is_retried(memory_engine, monkeypatch):
+    """迁移返回 False 时不记录版本，之后的迁移照常执行，下次执行时重试"""
+    monkeypatch.setattr(models.migrations, "create_search_index", lambda connection: False)
+    applied = run_migrations(memory_engine)
+    assert 5 not in [m.version for m in applied]
+    with memory_engine.connect() as conn:
+        assert applied_versions(conn) == {m.version for m in MIGRATIONS} - {5}
+
+    monkeypatch.undo()
+    assert [m.version for m in run_migrations(memory_engine)] == [5]
+    assert run_migrations(memory_engine) == []
+
+
+def test_request_paths_do_not_inspect_schema(memory_engine, db_session):
+    run_migrations(memory_engine)
+    statements = []
+    event.listen(memory_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    service = get_project_service(db_session)
+    result = service.create_project({"project_name": "Alpha"})
+    assert result["success"], result["message"]
+    assert not [statement for statement in statements if "PRAGMA" in statement.upper()]
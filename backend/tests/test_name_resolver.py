@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试项目、任务和项目大类的名称解析缓存
+"""
+import pytest
+from sqlalchemy import event, text
+
+from core.instruction_executor import InstructionExecutor
+from core.name_resolver import get_name_resolver
+from core.project_service import ProjectService
+from models.entities import Project, ProjectCategory, Task
+
+
+@pytest.fixture
+def statements(memory_engine):
+    """记录执行的SQL语句"""
+    executed = []
+    event.listen(memory_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: executed.append(statement))
+    return executed
+
+
+def test_resolves_and_follows_writes(db_session):
+    resolver = get_name_resolver()
+    category = ProjectCategory(name="研发")
+    alpha = Project(name="Alpha", category=category)
+    db_session.add_all([alpha, Project(name="Alpha")])
+    db_session.flush()
+    db_session.add(Task(project_id=alpha.id, name="设计"))
+    db_session.commit()
+
+    # 同名项目取ID最小的一个
+    assert resolver.project(db_session, "Alpha") is alpha
+    assert resolver.category(db_session, "研发") is category
+    assert resolver.task(db_session, alpha.id, "设计").name == "设计"
+    assert resolver.project(db_session, "Beta") is None
+
+    # 新增、重命名、移动和删除后重新解析
+    beta = Project(name="Beta")
+    db_session.add(beta)
+    db_session.commit()
+    assert resolver.project(db_session, "Beta") is beta
+
+    alpha.name = "Gamma"
+    db_session.commit()
+    assert resolver.project(db_session, "Gamma") is alpha
+    assert resolver.project(db_session, "Alpha").id != alpha.id
+
+    task = resolver.task(db_session, alpha.id, "设计")
+    task.project_id = beta.id
+    db_session.commit()
+    assert resolver.task(db_session, alpha.id, "设计") is None
+    assert resolver.task(db_session, beta.id, "设计") is task
+
+    db_session.delete(task)
+    db_session.delete(category)
+    db_session.commit()
+    assert resolver.task(db_session, beta.id, "设计") is None
+    assert resolver.category(db_session, "研发") is None
+
+
+def test_rollback_discards_uncommitted_names(db_session):
+    resolver = get_name_resolver()
+    db_session.add(Project(name="临时"))
+    db_session.flush()
+    assert resolver.project(db_session, "临时") is not None
+    db_session.rollback()
+    assert resolver.project(db_session, "临时") is None
+
+
+def test_cached_lookups_do_not_query_by_name(db_session, statements):
+    service = ProjectService(db_session)
+    service.create_project({"project_name": "Alpha"})
+    service._create_task(service._find_project("Alpha").id, {"name": "设计"})
+
+    statements.clear()
+    for _ in range(3):
+        project = service._find_project("Alpha")
+        assert service._find_task(project.id, "设计") is not None
+    assert not [s for s in statements if "WHERE projects.name" in s or "tasks.name =" in s]
+
+
+def test_stale_cache_is_detected(db_session):
+    resolver = get_name_resolver()
+    project = Project(name="Alpha")
+    db_session.add(project)
+    db_session.commit()
+    assert resolver.project(db_session, "Alpha") is project
+
+    # 绕过ORM修改名称，解析时校验名称并重新加载
+    db_session.execute(text("UPDATE projects SET name = 'Beta'"))
+    db_session.commit()
+    assert resolver.project(db_session, "Alpha") is None
+    assert resolver.project(db_session, "Beta") is project
+
+
+def test_batch_insert_invalidates_task_names(db_session):
+    db_session.add(Project(name="批量项目"))
+    db_session.commit()
+    executor = InstructionExecutor(db_session, lambda *args: "")
+    project = get_name_resolver().project(db_session, "批量项目")
+    assert get_name_resolver().task(db_session, project.id, "任务1") is None
+
+    executor.execute([{"intent": "create_task", "data": {"project_name": "批量项目", "tasks": [{"name": "任务1"}]}}])
+    assert get_name_resolver().task(db_session, project.id, "任务1") is not None
+
+    output = executor.execute([{"intent": "create_task", "data": {"project_name": "批量项目", "tasks": [{"name": "任务1"}]}}])
+    assert "已存在" in output
+
+
+def test_name_lookups_use_indexes(db_session):
+    def plan(statement):
+        return " ".join(str(row[-1]) for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {statement}")))
+
+    assert "idx_projects_name" in plan("SELECT id FROM projects WHERE name = 'Alpha'")
+    assert "idx_tasks_project_name" in plan("SELECT id FROM tasks WHERE project_id = 1 AND name = '设计'")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试项目和项目大类的名称模糊建议
+"""
+from core.name_suggester import NgramIndex, get_name_suggester, name_ngrams
+from core.project_service import ProjectService
+from core.text_utils import edit_distance
+from models.entities import Project, ProjectCategory
+
+
+def test_edit_distance_with_limit():
+    assert edit_distance("智慧园区", "智慧园区") == 0
+    assert edit_distance("智慧园区", "智慧圆区") == 1
+    assert edit_distance("kitten", "sitting") == 3
+    assert edit_distance("kitten", "sitting", limit=2) == 3
+    assert edit_distance("abc", "abcdef", limit=1) == 2
+
+
+def test_ngrams():
+    assert name_ngrams("研发") == {"研", "发", "研发"}
+    assert name_ngrams("CRM 升级") == {"$cr", "crm", "rm$", "升", "级", "升级"}
+
+
+def test_search_ranks_typos_and_partial_names():
+    index = NgramIndex(enumerate(["华东智慧园区一期", "华东智慧园区二期", "数据中台建设", "CRM 系统升级", "客服系统"]))
+
+    assert index.search("华东智慧圆区一期")[0].name == "华东智慧园区一期"
+    assert index.search("数据中台")[0].name == "数据中台建设"
+    assert index.search("crm升级")[0].name == "CRM 系统升级"
+    # 漏字
+    assert index.search("客系统")[0].name == "客服系统"
+    assert index.search("完全无关") == []
+
+    index.remove(2)
+    index.add(4, "客户服务系统")
+    assert [s.name for s in index.search("数据中台")] == []
+    assert index.search("客户服务")[0].name == "客户服务系统"
+
+
+def test_service_suggestions(db_session):
+    db_session.add_all([Project(name=name) for name in ("华东智慧园区一期", "数据中台建设", "客服系统")])
+    db_session.add(ProjectCategory(name="研发"))
+    db_session.commit()
+    service = ProjectService(db_session)
+
+    assert service.find_similar_projects("华东智慧圆区")[0] == "华东智慧园区一期"
+    assert service.find_similar_categories("研法") == ["研发"]
+    # 没有相似名称：数量不多时返回全部供选择，否则返回空列表
+    assert service.find_similar_projects("毫不相干") == ["华东智慧园区一期", "数据中台建设", "客服系统"]
+    assert service.find_similar_projects("毫不相干", limit=2) == []
+
+    result = service.assign_category("数据中台", "研发")
+    assert result["success"] is False
+    assert result["data"]["suggestions"][0] == "数据中台建设"
+
+
+def test_index_follows_committed_changes(db_session):
+    suggester = get_name_suggester()
+    project = Project(name="数据中台建设")
+    db_session.add(project)
+    db_session.commit()
+    assert suggester.suggest(db_session, "projects", "数据中台")[0].name == "数据中台建设"
+
+    project.name = "客服系统"
+    db_session.commit()
+    assert suggester.suggest(db_session, "projects", "数据中台") == []
+    assert suggester.suggest(db_session, "projects", "客服系")[0].name == "客服系统"
+
+    db_session.add(Project(name="临时项目"))
+    db_session.flush()
+    db_session.rollback()
+    assert suggester.suggest(db_session, "projects", "临时项目") == []
+
+    db_session.delete(project)
+    db_session.commit()
+    assert suggester.suggest(db_session, "projects", "客服系统") == []
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试项目进度增量计算引擎
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from api.project import calculate_project_progress, update_project_summary
+from core.progress_engine import LazyHeap, get_progress_engine
+from core.project_service import ProjectService
+from core.timeline import effective_span, from_microseconds, to_microseconds
+from models.entities import Base, Project, Task
+
+DATE_FIELDS = ["planned_start_date", "planned_end_date", "actual_start_date", "actual_end_date"]
+
+
+@pytest.fixture(autouse=True)
+def fresh_engine():
+    get_progress_engine().invalidate()
+    yield
+    get_progress_engine().invalidate()
+
+
+def _random_dates(rng):
+    base = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    values = {}
+    for field in DATE_FIELDS:
+        values[field] = base + timedelta(days=rng.randint(-60, 30)) if rng.random() < 0.7 else None
+    return values
+
+
+def _assert_matches_full_scan(db_session, project_id):
+    progress, start_date, end_date = get_progress_engine().summary(db_session, project_id)
+    assert progress == pytest.approx(calculate_project_progress(project_id, db_session))
+    rows = db_session.query(*(getattr(Task, field) for field in DATE_FIELDS)).filter(Task.project_id == project_id).all()
+    columns = [[to_microseconds(row[index]) for row in rows] for index in range(len(DATE_FIELDS))]
+    assert (start_date, end_date) == tuple(from_microseconds(value) for value in effective_span(*columns))
+
+
+def test_lazy_heap():
+    heap = LazyHeap(largest=True)
+    for day in (3, 1, 3, 2):
+        heap.push(datetime(2026, 1, day))
+    heap.remove(datetime(2026, 1, 3))
+    assert heap.top() == datetime(2026, 1, 3)
+    heap.remove(datetime(2026, 1, 3))
+    assert heap.top() == datetime(2026, 1, 2)
+    heap.remove(datetime(2026, 1, 2))
+    heap.remove(datetime(2026, 1, 1))
+    assert heap.top() is None
+
+
+def test_random_task_writes_match_full_scan(db_session):
+    """随机的新增、修改、移动和删除后，增量结果与全量计算一致"""
+    rng = random.Random(42)
+    projects = [Project(name=f"项目{i}") for i in range(3)]
+    db_session.add_all(projects)
+    db_session.commit()
+    for project in projects:
+        get_progress_engine().summary(db_session, project.id)
+
+    tasks = []
+    for step in range(200):
+        action = rng.random()
+        if action < 0.4 or not tasks:
+            task = Task(project_id=rng.choice(projects).id, name=f"任务{step}", **_random_dates(rng))
+            db_session.add(task)
+            tasks.append(task)
+        elif action < 0.8:
+            task = rng.choice(tasks)
+            field = rng.choice(DATE_FIELDS + ["project_id"])
+            if field == "project_id":
+                task.project_id = rng.choice(projects).id
+            else:
+                setattr(task, field, _random_dates(rng)[field])
+        else:
+            task = tasks.pop(rng.randrange(len(tasks)))
+            db_session.delete(task)
+
+        if step % 5 == 0:
+            db_session.commit()
+        else:
+            db_session.flush()
+        for project in projects:
+            _assert_matches_full_scan(db_session, project.id)
+
+
+def test_summary_update_does_not_scan_tasks(db_session, memory_engine):
+    """状态建立后，更新单个任务时概要计算不再查询任务表"""
+    project = Project(name="项目")
+    db_session.add(project)
+    db_session.commit()
+    tasks = [
+        Task(project_id=project.id, name=f"任务{i}",
+             planned_start_date=datetime(2026, 1, 1), planned_end_date=datetime(2026, 1, 1 + i))
+        for i in range(1, 20)
+    ]
+    db_session.add_all(tasks)
+    db_session.flush()
+    update_project_summary(project.id, db_session, commit=False)
+    db_session.commit()
+
+    statements = []
+    event.listen(memory_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    tasks[0].actual_start_date = datetime(2026, 1, 1)
+    tasks[0].actual_end_date = datetime(2026, 1, 3)
+    db_session.flush()
+    update_project_summary(project.id, db_session, commit=False)
+    db_session.commit()
+
+    # 只允许按主键重新加载已过期的任务本身，不允许按项目扫描任务
+    assert not [s for s in statements
+                if s.lstrip().upper().startswith("SELECT") and "FROM tasks" in s and "tasks.project_id = ?" in s]
+    assert project.progress == pytest.approx(calculate_project_progress(project.id, db_session))
+    assert project.start_date == datetime(2026, 1, 1)
+    assert project.end_date == datetime(2026, 1, 20)
+
+
+def test_rollback_discards_uncommitted_deltas(db_session):
+    project = Project(name="项目")
+    db_session.add(project)
+    db_session.add(Task(project_id=1, name="任务", planned_start_date=datetime(2026, 1, 1),
+                        planned_end_date=datetime(2026, 1, 11)))
+    db_session.commit()
+    get_progress_engine().summary(db_session, project.id)
+
+    db_session.add(Task(project_id=project.id, name="临时", planned_start_date=datetime(2025, 1, 1),
+                        planned_end_date=datetime(2027, 1, 1)))
+    db_session.flush()
+    assert get_progress_engine().summary(db_session, project.id)[1] == datetime(2025, 1, 1)
+    db_session.rollback()
+
+    _assert_matches_full_scan(db_session, project.id)
+    assert get_progress_engine().summary(db_session, project.id)[1] == datetime(2026, 1, 1)
+
+
+def test_overrun_project_progress_is_capped(db_session):
+    """实际天数超出计划的项目进度按100%计，更新任务不违反进度字段的检查约束"""
+    project = Project(name="超期项目")
+    db_session.add(project)
+    db_session.flush()
+    task = Task(project_id=project.id, name="任务", planned_start_date=datetime(2026, 1, 1),
+                planned_end_date=datetime(2026, 1, 5), actual_start_date=datetime(2026, 1, 1))
+    db_session.add(task)
+    db_session.commit()
+
+    result = ProjectService(db_session).update_task("超期项目", "任务", {"actual_end_date": "2026-01-21"})
+    assert result["success"], result["message"]
+    db_session.expire_all()
+    assert project.progress == 100.0
+    assert get_progress_engine().summary(db_session, project.id)[0] == 100.0
+
+
+def test_uncommitted_deltas_stay_in_writing_session(tmp_path):
+    """未提交的修改只影响写入会话自己的概要，提交后才对其他会话可见，回滚后不留痕迹"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    setup = Session()
+    project = Project(name="项目")
+    setup.add(project)
+    setup.flush()
+    setup.add(Task(project_id=project.id, name="任务", planned_start_date=datetime(2026, 1, 1),
+                   planned_end_date=datetime(2026, 1, 11), actual_start_date=datetime(2026, 1, 1),
+                   actual_end_date=datetime(2026, 1, 6)))
+    setup.commit()
+    project_id = project.id
+    setup.close()
+    reader, writer = Session(), Session()
+    engine_state = get_progress_engine()
+
+    def progress(session):
+        return engine_state.summary(session, project_id)[0]
+
+    for cached in (True, False):
+        if not cached:
+            engine_state.invalidate()
+        else:
+            assert progress(reader) == 50.0
+        task = writer.query(Task).one()
+        task.actual_end_date = datetime(2026, 1, 11)
+        writer.flush()
+        assert progress(writer) == 100.0
+        assert progress(reader) == 50.0
+        writer.rollback()
+        assert (progress(reader), progress(writer)) == (50.0, 50.0)
+        reader.rollback()
+
+    task = writer.query(Task).one()
+    task.actual_end_date = datetime(2026, 1, 11)
+    writer.commit()
+    assert (progress(reader), progress(writer)) == (100.0, 100.0)
+    reader.close()
+    writer.close()
+    engine.dispose()
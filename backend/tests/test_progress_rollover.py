@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试每日进度计算
+"""
+import asyncio
+import random
+from datetime import datetime, time, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from core.progress_engine import get_progress_engine
+from core.progress_rollover import ProgressScheduler, load_as_of, rollover_progress
+from core.task_utils import calculate_task_progress
+from models.entities import Project, Task
+
+NOW = datetime(2026, 3, 1, 9, 30)
+
+
+def test_rollover_matches_per_task_calculation(db_session):
+    rng = random.Random(7)
+    projects = [Project(name=f"项目{i}") for i in range(4)]
+    db_session.add_all(projects)
+    db_session.flush()
+    for i in range(60):
+        start = NOW - timedelta(days=rng.randint(-5, 40))
+        planned_end = start + timedelta(days=rng.randint(-2, 30)) if rng.random() < 0.8 else None
+        db_session.add(Task(
+            project_id=rng.choice(projects).id, name=f"任务{i}",
+            planned_start_date=start - timedelta(days=rng.randint(0, 3)), planned_end_date=planned_end,
+            actual_start_date=start if rng.random() < 0.7 else None,
+            actual_end_date=start + timedelta(days=3) if rng.random() < 0.2 else None,
+        ))
+    db_session.commit()
+
+    result = rollover_progress(db_session, NOW)
+    db_session.commit()
+    db_session.expire_all()
+
+    open_tasks = db_session.query(Task).filter(Task.actual_start_date.isnot(None), Task.actual_end_date.is_(None)).all()
+    assert result["task_count"] == len(open_tasks)
+    for task in open_tasks:
+        expected = 0.0
+        if task.planned_end_date and (task.planned_end_date - task.actual_start_date).days > 0:
+            elapsed = (NOW - task.actual_start_date).days / (task.planned_end_date - task.actual_start_date).days
+            expected = max(0.0, min(100.0, elapsed * 100.0))
+        assert task.progress == pytest.approx(expected)
+
+    for project in projects:
+        if not any(task.project_id == project.id for task in open_tasks):
+            continue
+        progress = get_progress_engine().summary(db_session, project.id, now=NOW)[0]
+        assert project.progress == pytest.approx(min(progress, 100.0))
+    assert load_as_of(db_session) == NOW
+
+
+def test_rollover_uses_current_date_by_default(db_session):
+    project = Project(name="项目")
+    db_session.add(project)
+    db_session.flush()
+    task = Task(project_id=project.id, name="开发",
+                actual_start_date=datetime.now().replace(hour=0, minute=0) - timedelta(days=5),
+                planned_start_date=datetime.now() - timedelta(days=5),
+                planned_end_date=datetime.now().replace(hour=0, minute=0) + timedelta(days=5))
+    db_session.add(task)
+    db_session.commit()
+
+    rollover_progress(db_session)
+    db_session.commit()
+    db_session.refresh(task)
+    assert task.progress == pytest.approx(calculate_task_progress(task))
+
+
+def test_rollover_touches_updated_at(db_session):
+    """批量更新的任务和项目同样更新 updated_at，未更新的任务不变"""
+    project = Project(name="项目")
+    db_session.add(project)
+    db_session.flush()
+    open_task = Task(project_id=project.id, name="开发", actual_start_date=NOW - timedelta(days=5),
+                     planned_start_date=NOW - timedelta(days=5), planned_end_date=NOW + timedelta(days=5))
+    done_task = Task(project_id=project.id, name="设计", actual_start_date=NOW - timedelta(days=9),
+                     actual_end_date=NOW - timedelta(days=6))
+    db_session.add_all([open_task, done_task])
+    db_session.commit()
+    stale = datetime(2020, 1, 1)
+    db_session.query(Task).update({Task.updated_at: stale})
+    db_session.query(Project).update({Project.updated_at: stale})
+    db_session.commit()
+
+    rollover_progress(db_session, NOW)
+    db_session.commit()
+    db_session.expire_all()
+    assert open_task.updated_at > stale
+    assert project.updated_at > stale
+    assert done_task.updated_at == stale
+
+
+def test_scheduler_run_and_next_run(memory_engine, db_session):
+    scheduler = ProgressScheduler(sessionmaker(bind=memory_engine), run_at=time(0, 5))
+    assert scheduler.load() is None
+    assert scheduler.is_stale(NOW)
+
+    scheduler.run(NOW)
+    assert scheduler.as_of == NOW
+    assert not scheduler.is_stale(NOW + timedelta(hours=10))
+    assert scheduler.is_stale(NOW + timedelta(days=1))
+    assert load_as_of(db_session) == NOW
+
+    assert scheduler.seconds_until_next_run(datetime(2026, 3, 1, 0, 0)) == 5 * 60
+    assert scheduler.seconds_until_next_run(datetime(2026, 3, 1, 0, 5)) == 24 * 3600
+
+
+def test_scheduler_catches_up_on_start(memory_engine, monkeypatch):
+    monkeypatch.setenv("PROGRESS_ROLLOVER_ENABLED", "true")
+    scheduler = ProgressScheduler(sessionmaker(bind=memory_engine))
+
+    async def start_and_stop():
+        await scheduler.start()
+        for _ in range(100):
+            if scheduler.as_of is not None:
+                break
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+    asyncio.run(start_and_stop())
+    assert scheduler.as_of is not None and not scheduler.is_stale()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试项目列表接口：聚合查询、筛选、排序和游标分页
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from api import project
+from models.database import create_async_sqlite_engine, get_async_db, get_storage_profile
+from models.entities import Base, Project, ProjectCategory, Task
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "app.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=sync_engine)
+    session = sessionmaker(bind=sync_engine)()
+    categories = [ProjectCategory(name="研发"), ProjectCategory(name="市场")]
+    session.add_all(categories)
+    for i in range(30):
+        p = Project(
+            name=f"项目{i:02d}",
+            status="active" if i % 3 else "pending",
+            category=categories[i % 2] if i % 5 else None,
+            start_date=datetime(2026, 1 + i % 12, 1) if i % 4 else None,
+            end_date=datetime(2026, 1 + i % 12, 20),
+        )
+        session.add(p)
+        session.flush()
+        session.add_all([
+            Task(project_id=p.id, name=f"任务{j}", status="completed" if j < i % 3 else "pending")
+            for j in range(i % 4)
+        ])
+    session.commit()
+    session.close()
+    sync_engine.dispose()
+
+    async_engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{path}", get_storage_profile("performance"))
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    AsyncTestSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override():
+        async with AsyncTestSession() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(project.router, prefix="/api/v1")
+    app.dependency_overrides[get_async_db] = override
+    with TestClient(app) as test_client:
+        test_client.statements = statements
+        yield test_client
+    asyncio.run(async_engine.dispose())
+
+
+def _list(client, **params):
+    response = client.get("/api/v1/projects", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def test_counts_come_from_constant_number_of_queries(client):
+    """任务统计和项目大类不随项目数量增加查询次数"""
+    client.get("/api/v1/projects", params={"page_size": 1})
+    client.statements.clear()
+
+    data = _list(client, page_size=100)
+
+    assert data["total"] == 30
+    assert len([s for s in client.statements if s.lstrip().upper().startswith("SELECT")]) == 2
+    item = next(i for i in data["items"] if i["name"] == "项目07")
+    assert (item["task_count"], item["completed_task_count"], item["category_name"]) == (3, 1, "市场")
+    assert next(i for i in data["items"] if i["name"] == "项目05")["category_name"] is None
+    assert set(data["items"][0]) >= {"id", "name", "status", "progress", "task_count", "completed_task_count", "category_name"}
+
+
+def test_filters(client):
+    assert _list(client, status="pending")["total"] == 10
+    assert _list(client, category_id=0)["total"] == 6
+    assert {i["category_name"] for i in _list(client, category_id=1)["items"]} == {"研发"}
+    data = _list(client, start_date_from="2026-11-01", page_size=100)
+    assert data["total"] == len(data["items"]) > 0
+    assert all(i["start_date"] >= "2026-11-01" for i in data["items"])
+    assert all(i["end_date"] < "2026-03-01" for i in _list(client, end_date_to="2026-02-20", page_size=100)["items"])
+
+
+@pytest.mark.parametrize("sort,order", [("id", "asc"), ("name", "desc"), ("start_date", "asc"), ("end_date", "desc")])
+def test_cursor_pagination_matches_full_listing(client, sort, order):
+    """按游标逐页读取的结果与一次读取全部结果一致，没有重复和遗漏"""
+    expected = [i["id"] for i in _list(client, sort=sort, order=order, page_size=100)["items"]]
+
+    seen, cursor = [], None
+    while True:
+        params = {"sort": sort, "order": order, "page_size": 7}
+        if cursor:
+            params["cursor"] = cursor
+        data = _list(client, **params)
+        seen.extend(i["id"] for i in data["items"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == expected
+    assert len(seen) == 30
+
+
+def test_invalid_sort_and_cursor(client):
+    assert client.get("/api/v1/projects", params={"sort": "secret"}).status_code == 400
+    assert client.get("/api/v1/projects", params={"cursor": "not-a-cursor"}).status_code == 400
+    cursor = _list(client, sort="name", page_size=5)["next_cursor"]
+    assert client.get("/api/v1/projects", params={"sort": "id", "cursor": cursor}).status_code == 400
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试项目任务统计的增量维护
+"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from core.instruction_executor import InstructionExecutor
+from core.project_service import ProjectService
+from models.entities import Project, ProjectCategory, ProjectStats, Task
+from models.project_stats import refresh_project_stats
+
+COLUMNS = [column for column in ProjectStats.__table__.columns]
+
+
+def _snapshot(db_session):
+    return sorted(tuple(row) for row in db_session.execute(select(*COLUMNS)).all())
+
+
+def _assert_consistent(db_session):
+    """增量维护的统计与从任务表重新计算的结果一致"""
+    db_session.flush()
+    incremental = _snapshot(db_session)
+    refresh_project_stats(db_session.connection())
+    assert incremental == _snapshot(db_session)
+    return incremental
+
+
+def _stats(db_session, project):
+    return db_session.execute(select(*COLUMNS).where(ProjectStats.project_id == project.id)).mappings().one()
+
+
+def test_stats_follow_task_writes(db_session):
+    alpha, beta = Project(name="Alpha"), Project(name="Beta")
+    db_session.add_all([alpha, beta])
+    db_session.flush()
+    design = Task(project_id=alpha.id, name="设计", priority=1,
+                  planned_start_date=datetime(2026, 1, 1), planned_end_date=datetime(2026, 1, 11))
+    build = Task(project_id=alpha.id, name="开发", status="active",
+                 planned_start_date=datetime(2026, 1, 5), planned_end_date=datetime(2026, 2, 1))
+    db_session.add_all([design, build, Task(project_id=beta.id, name="调研")])
+    db_session.commit()
+
+    stats = _stats(db_session, alpha)
+    assert (stats["task_count"], stats["pending_count"], stats["active_count"]) == (2, 1, 1)
+    assert (stats["high_priority_count"], stats["medium_priority_count"]) == (1, 1)
+    assert stats["planned_days"] == 10 + 27
+    assert stats["min_planned_start_date"] == datetime(2026, 1, 1)
+    _assert_consistent(db_session)
+
+    # 更新状态和日期
+    design.status = "completed"
+    design.actual_start_date = datetime(2026, 1, 2)
+    design.actual_end_date = datetime(2026, 1, 9)
+    build.planned_end_date = datetime(2026, 1, 20)
+    db_session.commit()
+    stats = _assert_consistent(db_session)
+    assert _stats(db_session, alpha)["completed_count"] == 1
+    assert _stats(db_session, alpha)["max_planned_end_date"] == datetime(2026, 1, 20)
+
+    # 移动到其他项目
+    build.project_id = beta.id
+    db_session.commit()
+    _assert_consistent(db_session)
+    assert (_stats(db_session, alpha)["task_count"], _stats(db_session, beta)["task_count"]) == (1, 2)
+
+    # 删除任务，最早开始日期随之变化
+    db_session.delete(design)
+    db_session.commit()
+    _assert_consistent(db_session)
+    assert _stats(db_session, alpha)["min_planned_start_date"] is None
+
+    # 删除项目时删除统计行
+    db_session.delete(beta)
+    db_session.commit()
+    assert db_session.query(ProjectStats).filter(ProjectStats.project_id == beta.id).count() == 0
+    _assert_consistent(db_session)
+
+
+def test_project_without_tasks_has_stats_row(db_session):
+    """新建的项目即使没有任务也有统计行，启动时不会因此重新计算"""
+    project = Project(name="空项目")
+    db_session.add(project)
+    db_session.commit()
+
+    stats = _stats(db_session, project)
+    assert (stats["task_count"], stats["planned_days"], stats["min_planned_start_date"]) == (0, 0, None)
+    _assert_consistent(db_session)
+
+
+def test_update_of_expired_task(db_session):
+    """对已过期的对象直接赋值时同样能得到正确的统计"""
+    project = Project(name="Alpha")
+    db_session.add(project)
+    db_session.flush()
+    task = Task(project_id=project.id, name="设计")
+    db_session.add(task)
+    db_session.commit()
+
+    db_session.expire(task)
+    task.status = "delayed"
+    db_session.commit()
+
+    assert _stats(db_session, project)["delayed_count"] == 1
+    assert _stats(db_session, project)["pending_count"] == 0
+    _assert_consistent(db_session)
+
+
+def test_batch_insert_and_service_readers(db_session):
+    """批量插入的任务计入统计；项目列表和大类列表读取统计"""
+    category = ProjectCategory(name="研发")
+    db_session.add(category)
+    db_session.add(Project(name="批量项目", category=category))
+    db_session.commit()
+
+    InstructionExecutor(db_session, lambda *args: "").execute([
+        {"intent": "create_task", "data": {"project_name": "批量项目", "tasks": [
+            {"name": f"任务{i}", "planned_start_date": "2026-01-01", "planned_end_date": "2026-01-10"}
+            for i in range(5)
+        ]}}
+    ])
+    _assert_consistent(db_session)
+
+    service = ProjectService(db_session)
+    project = service.get_projects()["data"][0]
+    assert (project["task_count"], project["completed_task_count"]) == (5, 0)
+    assert service.get_categories()["data"][0]["project_count"] == 1
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试系统提示词的前缀布局和LLM调用指标
+"""
+import json
+
+from api.chat import SYSTEM_PROMPT_RULES, _build_chat_messages
+from core.context_builder import get_context_cache
+from llm.base import LLMConfig, Message
+from llm.kimi_client import KimiProvider
+from llm.metrics import LLMMetrics, cached_prompt_tokens
+from llm.openai_client import OpenAIProvider
+from models.entities import Project, Task
+
+TURN_MARKER = "\n\n## 当前日期"
+
+
+def _stable_prefix(messages) -> str:
+    system = messages[0].content
+    return system[:system.index(TURN_MARKER)]
+
+
+def test_system_prompt_prefix_is_byte_stable(db_session, monkeypatch):
+    """规则和项目组合位于最前面，不随问题和日期变化；按问题选取的详情在日期之后"""
+    for i in range(6):
+        project = Project(name=f"项目{i}", description="说明" * 50)
+        db_session.add(project)
+        db_session.flush()
+        db_session.add(Task(project_id=project.id, name=f"任务{i}"))
+    db_session.commit()
+    get_context_cache().invalidate()
+    monkeypatch.setenv("CHAT_CONTEXT_TOKEN_BUDGET", "400")
+    monkeypatch.setenv("CHAT_CONTEXT_TOP_K", "1")
+
+    first, first_context = _build_chat_messages(db_session, "p1", "项目1的进度")
+    second, second_context = _build_chat_messages(db_session, "p2", "项目4的进度")
+
+    assert first_context.selected_projects == ["项目1"]
+    assert second_context.selected_projects == ["项目4"]
+    assert first[0].content.startswith(SYSTEM_PROMPT_RULES)
+    assert _stable_prefix(first) == _stable_prefix(second)
+    assert "### 项目: 项目1" in first[0].content.split(TURN_MARKER)[1]
+    assert "当前的年月日是" not in SYSTEM_PROMPT_RULES
+
+
+def test_full_portfolio_is_part_of_stable_prefix(db_session):
+    """项目数据在预算内时，完整项目组合都位于日期之前"""
+    db_session.add(Project(name="小项目"))
+    db_session.commit()
+    get_context_cache().invalidate()
+
+    messages, context = _build_chat_messages(db_session, "p3", "你好")
+
+    assert context.mode == "full"
+    assert "### 项目: 小项目" in _stable_prefix(messages)
+
+
+def test_cached_tokens_from_provider_usage():
+    """兼容OpenAI/豆包和Kimi两种缓存命中字段，按模型汇总"""
+    assert cached_prompt_tokens({"prompt_tokens_details": {"cached_tokens": 1024}}) == 1024
+    assert cached_prompt_tokens({"cached_tokens": 512}) == 512
+    assert cached_prompt_tokens(None) == 0
+
+    metrics = LLMMetrics()
+    metrics.record("m", {"prompt_tokens": 2000, "completion_tokens": 50,
+                         "prompt_tokens_details": {"cached_tokens": 1500}}, latency=0.5)
+    metrics.record("m", {"prompt_tokens": 2000, "completion_tokens": 50}, latency=1.5, first_token_latency=0.2)
+
+    stats = metrics.get_stats()
+    assert stats["models"]["m"]["cache_hit_ratio"] == 0.375
+    assert stats["models"]["m"]["avg_latency_ms"] == 1000.0
+    assert stats["models"]["m"]["avg_first_token_ms"] == 200.0
+    assert stats["total"]["requests"] == 2
+
+
+def test_stream_usage_is_reported():
+    """流式请求要求返回用量，最后一块中的用量被解析出来"""
+    openai = OpenAIProvider(api_key="sk-test")
+    payload = openai._build_payload([Message(role="user", content="hi")], LLMConfig(model="m"), stream=True)
+    assert payload["stream_options"] == {"include_usage": True}
+
+    usage = {"prompt_tokens": 10, "prompt_tokens_details": {"cached_tokens": 8}}
+    chunk = openai._parse_stream_line("data: " + json.dumps({"choices": [], "usage": usage}))
+    assert chunk.content == "" and chunk.usage == usage
+
+    kimi_line = {"choices": [{"delta": {}, "finish_reason": "stop", "usage": {"cached_tokens": 8}}]}
+    chunk = KimiProvider(api_key="sk-test")._parse_stream_line("data: " + json.dumps(kimi_line))
+    assert chunk.usage == {"cached_tokens": 8}
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试LLM提供商实例缓存
+"""
+import asyncio
+
+import httpx
+
+from llm.base import Message
+from llm.factory import ProviderRegistry, get_default_provider
+
+
+def test_registry_reuses_provider_per_settings():
+    """相同配置复用实例，不同Key创建新实例"""
+    registry = ProviderRegistry()
+
+    first = registry.get("openai", api_key="sk-a")
+    assert registry.get("OpenAI", api_key="sk-a") is first
+    assert registry.get("openai", api_key="sk-b") is not first
+    assert registry.get("kimi", api_key="sk-a") is not first
+
+
+def test_invalidate_closes_clients():
+    """失效时关闭同步和异步HTTP客户端"""
+    registry = ProviderRegistry()
+    provider = registry.get("doubao", api_key="sk-a")
+
+    async def run():
+        async_client = provider.get_async_client()
+        await registry.invalidate("doubao")
+        return async_client
+
+    async_client = asyncio.run(run())
+
+    assert provider.client.is_closed
+    assert async_client.is_closed
+    assert registry.get("doubao", api_key="sk-a") is not provider
+
+
+def test_invalidate_waits_for_in_flight_requests():
+    """失效时仍在进行中的请求继续使用原客户端，最后一个请求结束后再关闭"""
+    registry = ProviderRegistry()
+    provider = registry.get("doubao", api_key="sk-a")
+
+    async def run():
+        release = asyncio.Event()
+
+        async def handler(request):
+            await release.wait()
+            return httpx.Response(200, json={
+                "model": "doubao-test", "choices": [{"message": {"content": "完成"}, "finish_reason": "stop"}]
+            })
+
+        client = provider._async_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), base_url="http://llm.test"
+        )
+        request = asyncio.create_task(provider.achat([Message(role="user", content="你好")]))
+        await asyncio.sleep(0.01)
+
+        await registry.invalidate("doubao")
+        assert registry.get("doubao", api_key="sk-a") is not provider
+        assert not client.is_closed
+
+        release.set()
+        assert (await request).content == "完成"
+        return client
+
+    client = asyncio.run(run())
+    assert client.is_closed
+    assert provider.client.is_closed
+
+
+def test_default_provider_is_cached(monkeypatch):
+    """默认提供商在多次请求间复用，环境变量中的Key变化后重新创建"""
+    monkeypatch.setenv("DEFAULT_LLM_PROVIDER", "kimi")
+    monkeypatch.setenv("KIMI_API_KEY", "sk-old")
+
+    provider = get_default_provider()
+    assert get_default_provider() is provider
+
+    monkeypatch.setenv("KIMI_API_KEY", "sk-new")
+    assert get_default_provider() is not provider
+    assert get_default_provider().api_key == "sk-new"
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试LLM回复缓存
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import llm.factory
+from api import chat
+from core.response_cache import ResponseCache
+from llm.base import LLMProviderInterface, LLMResponse, Message, ResponseChunk
+from models.data_version import DataVersion, get_data_version
+from models.database import get_db
+from models.entities import Project
+
+
+def test_lru_ttl_and_version_keys(monkeypatch):
+    """LRU淘汰、TTL过期，数据版本变化后旧键不再命中"""
+    version = DataVersion()
+    cache = ResponseCache(max_entries=2, ttl_seconds=60, version=version)
+    messages = [Message(role="user", content="哪个项目  进度最慢？")]
+
+    key = cache.make_key("m", messages)
+    assert key == cache.make_key("m", [{"role": "user", "content": "哪个项目 进度最慢？\n"}])
+    cache.set(key, "项目A")
+    cache.set(cache.make_key("m", [Message(role="user", content="b")]), "b")
+    assert cache.get(key) == "项目A"
+    cache.set(cache.make_key("m", [Message(role="user", content="c")]), "c")
+    assert cache.get(cache.make_key("m", [Message(role="user", content="b")])) is None
+    assert cache.get_stats()["evictions"] == 1
+
+    monkeypatch.setattr("core.response_cache.time.time", lambda: 10 ** 12)
+    assert cache.get(key) is None
+    assert cache.get_stats()["expirations"] == 1
+
+    monkeypatch.undo()
+    cache.set(key, "项目A")
+    version.bump()
+    assert cache.get(cache.make_key("m", messages)) is None
+    assert cache.get_stats()["entries"] == 0
+    # 生成回复期间数据已变化时不保存
+    cache.set(key, "项目A")
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_writes_bump_data_version(db_session):
+    """项目/任务写入在flush和commit时递增数据版本"""
+    version = get_data_version()
+    before = version.current
+
+    db_session.add(Project(name="版本项目"))
+    db_session.commit()
+    assert version.current == before + 2
+
+    db_session.query(Project).all()
+    db_session.commit()
+    assert version.current == before + 2
+
+
+def test_persistent_tier_survives_restart(tmp_path):
+    """持久层在新实例中命中，并恢复数据版本号"""
+    path = tmp_path / "llm_cache.db"
+    first = ResponseCache(persist_path=path, version=DataVersion())
+    first.version.bump()
+    key = first.make_key("m", [Message(role="user", content="q")])
+    first.set(key, "answer")
+    first.close()
+
+    second = ResponseCache(persist_path=path, version=DataVersion())
+    assert second.version.current == 1
+    assert second.get(key) == "answer"
+    assert second.get_stats()["persistent_hits"] == 1
+    second.close()
+
+
+class CountingProvider(LLMProviderInterface):
+    """返回固定回复并记录调用次数的提供商"""
+
+    def __init__(self, reply):
+        super().__init__(api_key="sk-test")
+        self.reply = reply
+        self.calls = 0
+
+    def chat(self, messages, config=None):
+        self.calls += 1
+        return LLMResponse(content=self.reply, model="fake", usage={}, finish_reason="stop")
+
+    def chat_stream(self, messages, config=None):
+        self.calls += 1
+        yield ResponseChunk(content=self.reply)
+        yield ResponseChunk(content="", is_finished=True)
+
+    def validate_config(self):
+        return True
+
+    def get_model_list(self):
+        return []
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(chat, "get_response_cache", lambda: cache)
+    yield cache
+    cache.close()
+
+
+def _client(db_session, monkeypatch, provider):
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = lambda: db_session
+    monkeypatch.setattr(llm.factory, "get_default_provider", lambda: provider)
+    return TestClient(app)
+
+
+def test_read_only_reply_is_cached_until_data_changes(db_session, monkeypatch, cache):
+    """只读回复被缓存（流式和非流式共用），数据写入后重新调用LLM"""
+    provider = CountingProvider("进度最慢的是项目A。")
+    client = _client(db_session, monkeypatch, provider)
+
+    for session_id in ("s1", "s2"):
+        response = client.post("/api/v1/chat/messages", json={"message": "哪个项目最慢？", "session_id": session_id})
+        assert response.json()["data"]["content"] == "进度最慢的是项目A。"
+    assert provider.calls == 1
+
+    response = client.post("/api/v1/chat/messages/stream", json={"message": "哪个项目最慢？", "session_id": "s3"})
+    assert "进度最慢的是项目A。" in response.text
+    assert provider.calls == 1
+    assert cache.get_stats()["hits"] == 2
+
+    db_session.add(Project(name="新项目"))
+    db_session.commit()
+    client.post("/api/v1/chat/messages", json={"message": "哪个项目最慢？", "session_id": "s4"})
+    assert provider.calls == 2
+
+
+def test_write_reply_is_not_cached(db_session, monkeypatch, cache):
+    """包含写操作指令的回复不缓存"""
+    provider = CountingProvider('```json\n{"intent": "create_category", "data": {"category_name": "信创"}}\n```')
+    client = _client(db_session, monkeypatch, provider)
+
+    client.post("/api/v1/chat/messages", json={"message": "创建大类", "session_id": "w1"})
+
+    assert cache.get_stats()["stores"] == 0
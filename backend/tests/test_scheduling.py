@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试任务依赖和关键路径排期（拓扑排序、正推/逆推和下游任务顺延）
+"""
+from datetime import datetime
+
+import pytest
+
+from api.gantt import build_all_gantt, _all_gantt_query
+from core.project_service import ProjectService
+from core.scheduling import DependencyCycleError, Schedule
+from models.entities import Project, Task, TaskDependency
+
+
+def test_critical_path_and_slack():
+    # A(3) -> B(2) -> D(4)，A -> C(1) -> D
+    schedule = Schedule(
+        [(1, 0, 3), (2, None, 2), (3, None, 1), (4, None, 4)],
+        [(1, 2, 0), (1, 3, 0), (2, 4, 0), (3, 4, 0)]
+    )
+    assert schedule.order[0] == 1 and schedule.order[-1] == 4
+    assert schedule.finish == 9
+    assert [(t.earliest_start, t.latest_start) for t in (schedule.tasks[i] for i in (1, 2, 3, 4))] == [
+        (0, 0), (3, 3), (3, 4), (5, 5)
+    ]
+    assert schedule.tasks[3].slack == 1
+    assert schedule.critical_path() == [1, 2, 4]
+    assert schedule.phases() == (3, 3, 5, 5)
+
+    assert schedule.downstream(2) == [2, 4]
+
+    # 延迟天数
+    lagged = Schedule([(1, 0, 3), (2, 0, 2)], [(1, 2, 2)])
+    assert lagged.tasks[2].earliest_start == 5
+
+    with pytest.raises(DependencyCycleError):
+        Schedule([(1, 0, 1), (2, 0, 1), (3, 0, 1)], [(1, 2, 0), (2, 3, 0), (3, 2, 0)])
+
+
+@pytest.fixture
+def project(db_session):
+    project = Project(name="Alpha")
+    db_session.add(project)
+    db_session.flush()
+    for name, start, end in (("设计", 1, 5), ("开发", 3, 10), ("测试", 8, 12), ("文档", 2, 4)):
+        db_session.add(Task(project_id=project.id, name=name, status="pending",
+                            planned_start_date=datetime(2026, 3, start), planned_end_date=datetime(2026, 3, end)))
+    db_session.commit()
+    return project
+
+
+def _tasks(db_session, project):
+    return {task.name: task for task in db_session.query(Task).filter_by(project_id=project.id)}
+
+
+def test_dependencies_push_successors(db_session, project):
+    service = ProjectService(db_session)
+    tasks = _tasks(db_session, project)
+
+    result = service.add_task_dependency(project.id, tasks["开发"].id, tasks["设计"].id)
+    assert result["success"], result["message"]
+    # 开发原计划 3/3 开始，早于设计结束（3/5），顺延并保持工期
+    assert [item["name"] for item in result["data"]["shifted_tasks"]] == ["开发"]
+    assert service.add_task_dependency(project.id, tasks["测试"].id, tasks["开发"].id, lag_days=1)["success"]
+    db_session.expire_all()
+    assert (tasks["开发"].planned_start_date, tasks["开发"].planned_end_date) == (
+        datetime(2026, 3, 5), datetime(2026, 3, 12)
+    )
+    assert tasks["测试"].planned_start_date == datetime(2026, 3, 13)
+
+    cycle = service.add_task_dependency(project.id, tasks["设计"].id, tasks["测试"].id)
+    assert not cycle["success"] and "循环" in cycle["message"]
+    assert db_session.query(TaskDependency).count() == 2
+
+    # 设计延后两天：只顺延下游任务，不相关的任务不变
+    assert service.update_task("Alpha", "设计", {"planned_end_date": "2026-03-07"})["success"]
+    db_session.expire_all()
+    assert tasks["开发"].planned_start_date == datetime(2026, 3, 7)
+    assert tasks["测试"].planned_start_date == datetime(2026, 3, 15)
+    assert tasks["文档"].planned_start_date == datetime(2026, 3, 2)
+
+    schedule = service.get_project_schedule(project.id)["data"]
+    assert schedule["critical_path"] == [tasks[name].id for name in ("设计", "开发", "测试")]
+    assert schedule["finish_date"] == "2026-03-19"
+
+    assert service.remove_task_dependency(project.id, tasks["测试"].id, tasks["开发"].id)["success"]
+    assert not service.remove_task_dependency(project.id, tasks["测试"].id, tasks["开发"].id)["success"]
+    # 删除任务时一并删除其依赖
+    db_session.delete(tasks["设计"])
+    db_session.commit()
+    assert db_session.query(TaskDependency).count() == 0
+
+
+def test_schedule_of_undated_tasks(db_session):
+    """没有任务带计划开始日期时排期只有相对天数，日期返回 None"""
+    project = Project(name="未排期")
+    db_session.add(project)
+    db_session.flush()
+    first, second = Task(project_id=project.id, name="调研"), Task(project_id=project.id, name="方案")
+    db_session.add_all([first, second])
+    db_session.commit()
+    service = ProjectService(db_session)
+    assert service.add_task_dependency(project.id, second.id, first.id)["success"]
+
+    result = service.get_project_schedule(project.id)
+    assert result["success"], result["message"]
+    schedule = result["data"]
+    assert (schedule["start_date"], schedule["finish_date"]) == (None, None)
+    assert {task["earliest_start"] for task in schedule["tasks"]} == {None}
+    assert schedule["critical_path"] == [first.id, second.id]
+
+
+def test_gantt_critical_flags_and_phases(db_session, project):
+    service = ProjectService(db_session)
+    tasks = _tasks(db_session, project)
+    service.add_task_dependency(project.id, tasks["开发"].id, tasks["设计"].id)
+    service.add_task_dependency(project.id, tasks["测试"].id, tasks["开发"].id)
+
+    data = build_all_gantt(db_session.execute(_all_gantt_query()).all())
+    alpha = data["project_categories"][0]["projects"][0]
+    bars = {bar["name"]: bar for bar in alpha["tasks"]}
+    assert bars["开发"]["dependencies"] == [f"task_{tasks['设计'].id}"]
+    assert [name for name, bar in bars.items() if bar["critical"]] == ["设计", "开发", "测试"]
+    assert bars["文档"]["critical"] is False and bars["文档"]["slack"] > 0
+    # 阶段按关键路径划分：准备阶段为第一个关键任务，收尾阶段为最后一个关键任务
+    assert [(phase["start"], phase["end"]) for phase in alpha["phases"]] == [
+        ("2026-03-01", "2026-03-05"), ("2026-03-05", "2026-03-12"), ("2026-03-12", "2026-03-16")
+    ]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试对话和任务的全文检索
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event, text
+from sqlalchemy.orm import sessionmaker
+
+from api import search
+from models.database import get_read_db
+from models.entities import Conversation, Project, Task
+from models.search_index import CONVERSATIONS_FTS, build_match_query, create_search_index
+
+
+@pytest.fixture
+def search_session(memory_engine):
+    with memory_engine.begin() as conn:
+        assert create_search_index(conn)
+    session = sessionmaker(bind=memory_engine)()
+    project = Project(name="Alpha")
+    session.add(project)
+    session.flush()
+    session.add_all([
+        Conversation(session_id="s1", role="user", content="帮我看一下数据中台的进度", project_id=project.id,
+                     timestamp=datetime(2026, 1, 1, 9)),
+        Conversation(session_id="s1", role="assistant", content="数据中台目前完成了60%",
+                     analysis="根据任务进度计算", timestamp=datetime(2026, 1, 1, 9, 1)),
+        Conversation(session_id="s2", role="user", content="客服系统什么时候上线？<script>",
+                     timestamp=datetime(2026, 1, 2, 9)),
+        Task(project_id=project.id, name="接口联调", description="和客服系统联调接口",
+             deliverable="联调报告"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(search_session):
+    def override():
+        yield search_session
+
+    app = FastAPI()
+    app.include_router(search.router, prefix="/api/v1")
+    app.dependency_overrides[get_read_db] = override
+    return TestClient(app)
+
+
+def _search(client, **params):
+    response = client.get("/api/v1/search", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def test_search_conversations_and_tasks(client):
+    data = _search(client, q="客服系统")
+    assert data["total"] == 2
+    assert {item["type"] for item in data["items"]} == {"conversation", "task"}
+    conversation = next(item for item in data["items"] if item["type"] == "conversation")
+    assert "<mark>客服系统</mark>" in conversation["snippet"]
+    # 原文中的HTML被转义
+    assert "&lt;script" in conversation["snippet"] and "<script" not in conversation["snippet"]
+
+    data = _search(client, q="客服系统", scope="tasks")
+    assert [item["title"] for item in data["items"]] == ["接口联调"]
+
+    # 多个词需要全部出现；analysis 列同样被检索
+    assert _search(client, q="数据中台 计算")["total"] == 1
+    assert _search(client, q="数据中台", session_id="s1")["total"] == 2
+    assert _search(client, q="不存在的内容")["total"] == 0
+
+
+def test_short_terms_and_pagination(client):
+    # 两个字的词（包括位于文本末尾的词）通过词表展开匹配
+    assert _search(client, q="中台")["total"] == 2
+    assert _search(client, q="进度", scope="conversations")["total"] == 2
+    assert _search(client, q="报告")["total"] == 1
+
+    first = _search(client, q="中台", page_size=1)
+    second = _search(client, q="中台", page_size=1, page=2)
+    assert len(first["items"]) == len(second["items"]) == 1
+    assert first["items"][0]["id"] != second["items"][0]["id"]
+
+
+def test_triggers_follow_writes(search_session, client):
+    task = search_session.query(Task).one()
+    task.description = "编写上线方案"
+    search_session.commit()
+    assert _search(client, q="上线方案")["total"] == 1
+    assert _search(client, q="客服系统", scope="tasks")["total"] == 0
+
+    # 不经过ORM的批量删除同样同步到索引
+    search_session.execute(delete(Conversation).where(Conversation.session_id == "s1"))
+    search_session.commit()
+    assert _search(client, q="数据中台")["total"] == 0
+    integrity = text(f"INSERT INTO {CONVERSATIONS_FTS.name}({CONVERSATIONS_FTS.name}, rank) "
+                     f"VALUES ('integrity-check', 1)")
+    search_session.execute(integrity)
+
+
+def test_match_query_escaping(search_session):
+    connection = search_session.connection()
+    assert build_match_query(connection, CONVERSATIONS_FTS, 'a"b"c') == '"a""b""c"'
+    assert build_match_query(connection, CONVERSATIONS_FTS, "   ") is None
+    assert build_match_query(connection, CONVERSATIONS_FTS, "鑫") is None
+
+
+def test_requests_do_not_inspect_schema(memory_engine, client):
+    """索引是否可用在创建索引时确定，检索请求不查询 sqlite_master"""
+    statements = []
+    event.listen(memory_engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    assert _search(client, q="客服系统")["total"] == 2
+    assert not [statement for statement in statements if "sqlite_master" in statement]
+
+
+def test_unavailable_index_returns_503(memory_engine):
+    session = sessionmaker(bind=memory_engine)()
+
+    def override():
+        yield session
+
+    app = FastAPI()
+    app.include_router(search.router, prefix="/api/v1")
+    app.dependency_overrides[get_read_db] = override
+    client = TestClient(app)
+    assert client.get("/api/v1/search", params={"q": "客服"}).status_code == 503
+    assert client.get("/api/v1/search", params={"q": "客服"}).status_code == 503
+    session.close()
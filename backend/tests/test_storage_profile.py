@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试SQLite存储配置和读写连接池
+"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from models.database import create_sqlite_engines, get_storage_profile
+
+
+def _pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_performance_profile_pragmas(tmp_path):
+    """默认配置在每个连接上启用WAL等PRAGMA，读连接只读"""
+    write_engine, read_engine = create_sqlite_engines(f"sqlite:///{tmp_path / 'app.db'}", get_storage_profile("performance"))
+
+    for engine in (write_engine, read_engine):
+        assert _pragma(engine, "journal_mode") == "wal"
+        assert _pragma(engine, "synchronous") == 1
+        assert _pragma(engine, "temp_store") == 2
+        assert _pragma(engine, "busy_timeout") == 5000
+        assert _pragma(engine, "mmap_size") == 256 * 1024 * 1024
+
+    with write_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+    with read_engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM t")).scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+
+    write_engine.dispose()
+    read_engine.dispose()
+
+
+def test_legacy_profile_and_env_overrides(tmp_path, monkeypatch):
+    """legacy 配置保持SQLite默认值；SQLITE_<字段名> 环境变量覆盖单个字段"""
+    write_engine, _ = create_sqlite_engines(f"sqlite:///{tmp_path / 'legacy.db'}", get_storage_profile("legacy"))
+    assert _pragma(write_engine, "journal_mode") == "delete"
+    write_engine.dispose()
+
+    monkeypatch.setenv("SQLITE_PROFILE", "durable")
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT", "1500")
+    profile = get_storage_profile()
+    assert profile.synchronous == "FULL"
+    assert profile.busy_timeout == 1500
+    assert "PRAGMA mmap_size" not in " ".join(profile.pragmas())
+
+    with pytest.raises(ValueError):
+        get_storage_profile("unknown")
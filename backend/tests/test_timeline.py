@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试任务时间线的批量计算（逐个计算与 numpy 向量化结果一致）
+"""
+import random
+from datetime import datetime
+
+import pytest
+
+from core.timeline import (
+    DAY, NUMPY_AVAILABLE, effective_span, from_microseconds, group_spans, phase_boundaries,
+    resolve_timeline, to_microseconds,
+)
+
+BACKENDS = [False, pytest.param(True, marks=pytest.mark.skipif(not NUMPY_AVAILABLE, reason="未安装 numpy"))]
+
+
+def _us(*args):
+    return to_microseconds(datetime(*args))
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_resolve_timeline_by_status(use_numpy):
+    timeline = resolve_timeline(
+        ["pending", "active", "active", "completed", "cancelled", "unknown"],
+        [_us(2026, 1, 1), _us(2026, 1, 1), _us(2026, 1, 1), _us(2026, 1, 1), None, _us(2026, 1, 1)],
+        [_us(2026, 1, 9)] * 5 + [_us(2026, 1, 9)],
+        [_us(2026, 1, 2), _us(2026, 1, 3), None, _us(2026, 1, 3, 12), None, None],
+        [_us(2026, 1, 5), None, None, _us(2026, 1, 7), None, None],
+        use_numpy=use_numpy,
+    )
+    assert timeline.start_days() == ["2026-01-01", "2026-01-03", "2026-01-01", "2026-01-03", "", ""]
+    assert timeline.end_days() == ["2026-01-09", "2026-01-09", "2026-01-09", "2026-01-07", "2026-01-09", ""]
+    assert timeline.start_types() == ["planned", "actual", "planned", "actual", "planned", "planned"]
+    assert timeline.end_types() == ["planned", "planned", "planned", "actual", "planned", "planned"]
+    assert timeline.visible() == [True, True, True, True, False, False]
+    assert timeline.start[3] == _us(2026, 1, 3, 12)
+
+
+def test_backends_agree():
+    if not NUMPY_AVAILABLE:
+        pytest.skip("未安装 numpy")
+    rng = random.Random(0)
+
+    def column(size):
+        return [None if rng.random() < 0.2 else _us(2026, 1, 1) + rng.randint(0, 400 * DAY) for _ in range(size)]
+
+    size = 1000
+    status = [rng.choice(["pending", "active", "delayed", "completed", "cancelled", None]) for _ in range(size)]
+    columns = [column(size) for _ in range(4)]
+    keys = sorted(rng.randint(0, 50) for _ in range(size))
+    results = []
+    for use_numpy in (False, True):
+        timeline = resolve_timeline(status, *columns, use_numpy=use_numpy)
+        results.append((
+            timeline.start, timeline.end, timeline.start_days(), timeline.end_types(),
+            effective_span(*columns, use_numpy=use_numpy),
+            group_spans(keys, columns[0], columns[1], use_numpy=use_numpy),
+        ))
+    assert results[0] == results[1]
+
+
+def test_phase_boundaries():
+    start = _us(2026, 1, 1)
+    assert phase_boundaries([start, start, None], [start + 10 * DAY, start + 2 * DAY, start]) == [
+        (start + 3 * DAY, start + 3 * DAY, start + 8 * DAY, start + 8 * DAY),
+        (start, start, start + 2 * DAY, start + 2 * DAY),
+        None,
+    ]
+    assert phase_boundaries([start], [start]) == [None]
+    assert from_microseconds(to_microseconds(datetime(2026, 3, 4, 5, 6, 7, 890000))) == \
+        datetime(2026, 3, 4, 5, 6, 7, 890000)